@@ -1,6 +1,41 @@
+import functools
+import time
+
+from cumulusci.robotframework.utils import safe_screenshot
+from page_timing import PAGE_TIMING_JS
 from robot.libraries.BuiltIn import BuiltIn
 
 
+def capture_screenshot_on_error(func):
+    """Captures the page when a keyword fails, like the cumulusci decorator
+    of the same name, but with Capture Failure Artifacts of the
+    OutboundFundsNPSP library, which writes the files in the background.
+    A failure is captured once, by the innermost decorated keyword.
+    """
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return func(self, *args, **kwargs)
+        except Exception as e:
+            if not getattr(e, "_failure_captured", False):
+                e._failure_captured = True
+                try:
+                    library = (
+                        self
+                        if hasattr(type(self), "capture_failure_artifacts")
+                        else self.OutboundFundsNPSP
+                    )
+                except Exception:
+                    # The library isn't imported, so take a plain screenshot
+                    safe_screenshot()
+                else:
+                    library.capture_failure_artifacts()
+            raise
+
+    return wrapper
+
+
 class BaseOutboundFundsNPSPPage:
     @property
     def OutboundFundsNPSP(self):
@@ -25,3 +60,27 @@ class BaseOutboundFundsNPSPPage:
     @property
     def selenium(self):
         return self.builtin.get_library_instance("SeleniumLibrary")
+
+
+class PageLoadBenchmarkMixin:
+    """Records the timings of Go To Page while a page load benchmark runs.
+
+    Mix into a page object ahead of its cumulusci page class; see
+    Start Page Load Benchmark in the OutboundFundsNPSP library.
+    """
+
+    def _go_to_page(self, *args, **kwargs):
+        results = self.OutboundFundsNPSP.page_load_results
+        if results is None:
+            return super()._go_to_page(*args, **kwargs)
+        start = time.perf_counter()
+        super()._go_to_page(*args, **kwargs)
+        self._is_current_page()
+        wall_seconds = time.perf_counter() - start
+        timing = self.selenium.driver.execute_script(PAGE_TIMING_JS)
+        results.add(
+            f"{self._page_type} {self.object_name}",
+            args[0] if args else kwargs.get("object_id"),
+            wall_seconds,
+            timing,
+        )
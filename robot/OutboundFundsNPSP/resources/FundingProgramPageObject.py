@@ -1,8 +1,11 @@
 from cumulusci.robotframework.pageobjects import ListingPage
 from cumulusci.robotframework.pageobjects import DetailPage
 from cumulusci.robotframework.pageobjects import pageobject
-from BaseObjects import BaseOutboundFundsNPSPPage
-from cumulusci.robotframework.utils import capture_screenshot_on_error
+from BaseObjects import (
+    BaseOutboundFundsNPSPPage,
+    PageLoadBenchmarkMixin,
+    capture_screenshot_on_error,
+)
 
 
 @pageobject("Listing", "Funding_Program__c")
@@ -18,7 +21,9 @@ class FundingProgramListingPage(BaseOutboundFundsNPSPPage, ListingPage):
 
 
 @pageobject("Details", "Funding_Program__c")
-class FundingProgramDetailPage(BaseOutboundFundsNPSPPage, DetailPage):
+class FundingProgramDetailPage(
+    PageLoadBenchmarkMixin, BaseOutboundFundsNPSPPage, DetailPage
+):
     @capture_screenshot_on_error
     def _is_current_page(self):
         """Verify we are on the Funding Program detail page
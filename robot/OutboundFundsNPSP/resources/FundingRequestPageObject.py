@@ -1,8 +1,11 @@
 from cumulusci.robotframework.pageobjects import ListingPage
 from cumulusci.robotframework.pageobjects import DetailPage
 from cumulusci.robotframework.pageobjects import pageobject
-from BaseObjects import BaseOutboundFundsNPSPPage
-from cumulusci.robotframework.utils import capture_screenshot_on_error
+from BaseObjects import (
+    BaseOutboundFundsNPSPPage,
+    PageLoadBenchmarkMixin,
+    capture_screenshot_on_error,
+)
 
 
 @pageobject("Listing", "Funding_Request__c")
@@ -18,7 +21,9 @@ class FundingRequestListingPage(BaseOutboundFundsNPSPPage, ListingPage):
 
 
 @pageobject("Details", "Funding_Request__c")
-class FundingRequestDetailPage(BaseOutboundFundsNPSPPage, DetailPage):
+class FundingRequestDetailPage(
+    PageLoadBenchmarkMixin, BaseOutboundFundsNPSPPage, DetailPage
+):
     @capture_screenshot_on_error
     def _is_current_page(self):
         """Verify we are on the Funding Request detail page
@@ -0,0 +1,21 @@
+from cumulusci.robotframework.pageobjects import DetailPage
+from cumulusci.robotframework.pageobjects import pageobject
+from BaseObjects import (
+    BaseOutboundFundsNPSPPage,
+    PageLoadBenchmarkMixin,
+    capture_screenshot_on_error,
+)
+
+
+@pageobject("Details", "GAU_Expenditure__c")
+class GAUExpenditureDetailPage(
+    PageLoadBenchmarkMixin, BaseOutboundFundsNPSPPage, DetailPage
+):
+    @capture_screenshot_on_error
+    def _is_current_page(self):
+        """Verify we are on the GAU Expenditure detail page
+        by verifying that the url contains '/view'
+        """
+        self.selenium.wait_until_location_contains(
+            "/view", timeout=60, message="Detail page did not load in 1 min"
+        )
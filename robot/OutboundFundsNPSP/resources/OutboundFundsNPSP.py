@@ -1,32 +1,100 @@
 import logging
+import os
 import random
 import string
-import warnings
 import time
-
-from BaseObjects import BaseOutboundFundsNPSPPage
+import warnings
+from pathlib import Path
+
+from BaseObjects import BaseOutboundFundsNPSPPage, capture_screenshot_on_error
+from describe_cache import DEFAULT_DESCRIBE_TTL, DescribeCache, get_namespace_prefix
+from field_assertions import (
+    READ_DETAIL_FIELDS_JS,
+    build_record_query,
+    compare_fields,
+    compare_page_fields,
+    format_mismatches,
+    get_field,
+)
+from failure_capture import DEFAULT_MAX_CAPTURES, DEFAULT_MAX_MB, FailureCapture
+from fixture_factory import (
+    CompositeError,
+    build_funding_graph,
+    insert_graph,
+    insert_record,
+)
+from latency_budget import LatencyResults, get_budget
+from locator_registry import LocatorRegistry
+from page_timing import PageLoadResults
+from record_cache import RecordCache
+from robot_cache import JsonFileCache, get_cache_dir, make_key
 from robot.libraries.BuiltIn import RobotNotRunningError
-from locators_54 import outboundfundsnpsp_lex_locators as locators_54
-from locators_51 import outboundfundsnpsp_lex_locators as locators_51
-from cumulusci.robotframework.utils import selenium_retry, capture_screenshot_on_error
-
-locators_by_api_version = {
-    51.0: locators_51,  # Spring '21
-    54.0: locators_54,
-}
+from session_pool import BrowserPool, quit_driver, reset_browser
+from teardown import DEFAULT_MAPPING_PATH, BulkTeardown, load_dependencies
+from user_pool import (
+    DEFAULT_LEASE_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    SfdxUserBackend,
+    UserPool,
+)
+from waits import (
+    IS_LOADING_COMPLETE_JS,
+    IS_TAB_SHOWN_JS,
+    WaitRecorder,
+    count_matches,
+    find_first_match,
+    wait_for_count,
+    wait_for_script,
+)
+from xpath_profile import DOM_SNAPSHOT_JS
+from cumulusci.robotframework.utils import selenium_retry
+
+# locators_<version>.py modules, imported when a test needs that version
+locator_registry = LocatorRegistry()
 # will get populated in _init_locators
 outboundfundsnpsp_lex_locators = {}
 
+# The latest API version of each org instance, probed once per process and
+# shared between processes through the on-disk cache
+API_VERSION_TTL = 24 * 60 * 60
+api_version_by_instance = {}
+
 
 @selenium_retry
 class OutboundFundsNPSP(BaseOutboundFundsNPSPPage):
     ROBOT_LIBRARY_SCOPE = "GLOBAL"
     ROBOT_LIBRARY_VERSION = 1.0
-
-    def __init__(self, debug=False):
+    ROBOT_LISTENER_API_VERSION = 3
+
+    def __init__(
+        self,
+        debug=False,
+        describe_cache_ttl=DEFAULT_DESCRIBE_TTL,
+        max_failure_captures=DEFAULT_MAX_CAPTURES,
+        max_failure_capture_mb=DEFAULT_MAX_MB,
+        user_pool_size=DEFAULT_POOL_SIZE,
+    ):
+        # The library listens for the end of the run to close pooled browsers
+        self.ROBOT_LIBRARY_LISTENER = self
         self.debug = debug
         self.current_page = None
         self._session_records = []
+        self.describe_cache_ttl = float(describe_cache_ttl)
+        self._describe_cache = None
+        self._describe_index = None
+        self.waits = WaitRecorder()
+        self.page_load_results = None
+        self.latency_results = LatencyResults()
+        self.browser_pool = BrowserPool()
+        self.record_cache = RecordCache()
+        self.max_failure_captures = int(max_failure_captures)
+        self.max_failure_capture_mb = float(max_failure_capture_mb)
+        self._failure_capture = None
+        self._run_on_failure_registered = False
+        self.user_pool_size = int(user_pool_size)
+        # Creates the pool users; a SfdxUserBackend for the org unless set
+        self.user_pool_backend = None
+        self._user_pool = None
         # Turn off info logging of all http requests
         logging.getLogger("requests.packages.urllib3.connectionpool").setLevel(
             logging.WARN
@@ -35,78 +103,106 @@ class OutboundFundsNPSP(BaseOutboundFundsNPSPPage):
 
     def _init_locators(self):
         try:
-            client = self.cumulusci.tooling
-            response = client._call_salesforce(
-                "GET", "https://{}/services/data".format(client.sf_instance)
-            )
-            self.latest_api_version = float(response.json()[-1]["version"])
-            if self.latest_api_version not in locators_by_api_version:
+            self.latest_api_version = self._get_latest_api_version()
+            if self.latest_api_version not in locator_registry:
                 warnings.warn(
                     "Could not find locator library for API %d"
                     % self.latest_api_version
                 )
-                self.latest_api_version = max(locators_by_api_version.keys())
+                self.latest_api_version = locator_registry.latest_version
         except RobotNotRunningError:
             # We aren't part of a running test, likely because we are
             # generating keyword documentation. If that's the case, assume
             # the latest supported version
-            self.latest_api_version = max(locators_by_api_version.keys())
-        locators = locators_by_api_version[self.latest_api_version]
+            self.latest_api_version = locator_registry.latest_version
+        locators = locator_registry.get(self.latest_api_version)
         outboundfundsnpsp_lex_locators.update(locators)
+        self.locators = locator_registry.get_service(self.latest_api_version)
+
+    def _get_latest_api_version(self):
+        """ Returns the latest API version of the org. The version is probed
+            with GET /services/data once per org instance, and the answer is
+            shared with the other robot processes through the on-disk cache.
+        """
+        instance_url = self.cumulusci.org.instance_url
+        if instance_url not in api_version_by_instance:
+            cache = JsonFileCache(get_cache_dir("api_version"), ttl=API_VERSION_TTL)
+            api_version_by_instance[instance_url] = cache.get_or_create(
+                make_key(instance_url), self._probe_latest_api_version
+            )
+        return api_version_by_instance[instance_url]
+
+    def _probe_latest_api_version(self):
+        client = self.cumulusci.tooling
+        response = client._call_salesforce(
+            "GET", "https://{}/services/data".format(client.sf_instance)
+        )
+        return float(response.json()[-1]["version"])
 
     def get_outboundfundsnpsp_lex_locators(self, path, *args, **kwargs):
         """ Returns a rendered locator string from the outboundfundsnpsp_lex_locators
             dictionary.  This can be useful if you want to use an element in
             a different way than the built in keywords allow.
         """
-        locator = outboundfundsnpsp_lex_locators
-        for key in path.split("."):
-            locator = locator[key]
-        main_loc = locator.format(*args, **kwargs)
-        return main_loc
+        return self.locators.render(path, *args, **kwargs)
+
+    @property
+    def describe_cache(self):
+        if self._describe_cache is None:
+            self._describe_cache = DescribeCache(ttl=self.describe_cache_ttl)
+        return self._describe_cache
+
+    @property
+    def describe_index(self):
+        """ The global describe of the org, indexed by sobject label and name.
+            It is read from the on-disk describe cache, so parallel robot
+            processes share a single describe call per org.
+        """
+        if self._describe_index is None:
+            self._describe_index = self.describe_cache.get_index(
+                self.cumulusci.org.org_id,
+                self._get_package_version(),
+                self.cumulusci.sf.describe,
+            )
+        return self._describe_index
 
-    def get_namespace_prefix(self, name):
-        parts = name.split("__")
-        if parts[-1] == "c":
-            parts = parts[:-1]
-        if len(parts) > 1:
-            return parts[0] + "__"
+    def _get_package_version(self):
+        """ Identifies the version of the package source under test, so an
+            org gets a fresh describe after the package changes.
+        """
+        return self.cumulusci.project_config.repo_commit
+
+    def invalidate_describe_cache(self, all_orgs=False):
+        """ Discards the cached describe result of the current org, or of every
+            org when all_orgs is true, so the next lookup describes the org again.
+            Use this after installing or upgrading packages in a running suite.
+        """
+        if all_orgs:
+            self.describe_cache.invalidate()
         else:
-            return ""
+            self.describe_cache.invalidate(
+                self.cumulusci.org.org_id, self._get_package_version()
+            )
+        self._describe_index = None
+
+    def get_namespace_prefix(self, name):
+        return get_namespace_prefix(name)
 
     def get_outfundsnpsp_namespace_prefix(self):
-        if not hasattr(self.cumulusci, "_describe_result"):
-            self.cumulusci._describe_result = self.cumulusci.sf.describe()
-        objects = self.cumulusci._describe_result["sobjects"]
-        fundingprogram_object = [o for o in objects if o["label"] == "Funding Program"][
-            0
-        ]
-        return self.get_namespace_prefix(fundingprogram_object["name"])
+        return self.describe_index.get_namespace_prefix("Funding Program")
 
     def get_outfundsnpspext_namespace_prefix(self):
-        if not hasattr(self.cumulusci, "_describe_result"):
-            self.cumulusci._describe_result = self.cumulusci.sf.describe()
-        objects = self.cumulusci._describe_result["sobjects"]
-        gauexp_object = [o for o in objects if o["label"] == "GAU Expenditure"][0]
-        return self.get_namespace_prefix(gauexp_object["name"])
+        return self.describe_index.get_namespace_prefix("GAU Expenditure")
 
     def get_npsp_namespace_prefix(self):
-        if not hasattr(self.cumulusci, "_describe_result"):
-            self.cumulusci._describe_result = self.cumulusci.sf.describe()
-        objects = self.cumulusci._describe_result["sobjects"]
-        gau_object = [o for o in objects if o["label"] == "General Accounting Unit"][0]
-        return self.get_namespace_prefix(gau_object["name"])
+        return self.describe_index.get_namespace_prefix("General Accounting Unit")
 
     def get_outboundfundsnpsp_locator(self, path, *args, **kwargs):
         """ Returns a rendered locator string from the npsp_lex_locators
             dictionary.  This can be useful if you want to use an element in
             a different way than the built in keywords allow.
         """
-        locator = outboundfundsnpsp_lex_locators
-        for key in path.split("."):
-            locator = locator[key]
-        main_loc = locator.format(*args, **kwargs)
-        return main_loc
+        return self.locators.render(path, *args, **kwargs)
 
     def _check_if_element_exists(self, xpath):
         """Checks if the given xpath exists
@@ -149,20 +245,20 @@ class OutboundFundsNPSP(BaseOutboundFundsNPSPPage):
     @capture_screenshot_on_error
     def click_link_with_text(self, text):
         """Click on link with passed text"""
-        locator = outboundfundsnpsp_lex_locators["link"].format(text)
-        self.selenium.wait_until_page_contains_element(locator)
+        locator = self.locators.render("link", text)
+        with self.waits.timed("click_link_with_text"):
+            self.selenium.wait_until_page_contains_element(locator)
         element = self.selenium.driver.find_element_by_xpath(locator)
         self.selenium.driver.execute_script("arguments[0].click()", element)
 
     @capture_screenshot_on_error
     def click_save(self):
         """Click Save button in modal's footer"""
-        locator = outboundfundsnpsp_lex_locators["new_record"]["footer_button"].format(
-            "Save"
-        )
+        locator = self.locators.render("new_record.footer_button", "Save")
         self.selenium.scroll_element_into_view(locator)
         self.salesforce._jsclick(locator)
-        self.salesforce.wait_until_loading_is_complete()
+        with self.waits.timed("click_save"):
+            self.salesforce.wait_until_loading_is_complete()
 
     @capture_screenshot_on_error
     def validate_field_value(self, field, status, value, section=None):
@@ -173,120 +269,137 @@ class OutboundFundsNPSP(BaseOutboundFundsNPSPPage):
             section = "text:" + section
             self.selenium.scroll_element_into_view(section)
         list_found = False
-        locators = outboundfundsnpsp_lex_locators["confirm"].values()
+        locators = self.locators.render_group("confirm", field, value)
+        # All the alternative locators are resolved in one browser round-trip
+        with self.waits.timed("validate_field_value"):
+            match = find_first_match(self.selenium.driver, locators)
         if status == "contains":
-            for i in locators:
-                print("inside for loop")
-                locator = i.format(field, value)
-                print(locator)
-                if self.check_if_element_exists(locator):
-                    print(f"element exists {locator}")
-                    actual_value = self.selenium.get_webelement(locator).text
-                    print(f"actual value is {actual_value}")
-                    assert (
-                        value == actual_value
-                    ), "Expected {} value to be {} but found {}".format(
-                        field, value, actual_value
-                    )
-                    list_found = True
-                    break
+            if match is not None:
+                actual_value = match[2]
+                assert (
+                    value == actual_value
+                ), "Expected {} value to be {} but found {}".format(
+                    field, value, actual_value
+                )
+                list_found = True
         if status == "does not contain":
-            for i in locators:
-                locator = i.format(field, value)
-                if self.check_if_element_exists(locator):
-                    print(f"locator is {locator}")
-                    raise Exception(f"{field} should not contain value {value}")
+            if match is not None:
+                raise Exception(f"{field} should not contain value {value}")
             list_found = True
 
         assert list_found, "locator not found"
 
+    def validate_record_fields(self, obj_name, record_id, **fields):
+        """ Checks the given fields of a record with one SOQL query, e.g.
+            | Validate Record Fields | ${ns}Funding_Request__c | ${id} |
+            | ... | ${ns}Status__c=Awarded | ${ns}Awarded_Amount__c=10000 |
+            Relationship fields like ${ns}FundingProgram__r.Name can be checked
+            too. Fails with one message listing every field that differs.
+        """
+        query = build_record_query(obj_name, record_id, list(fields))
+        records = self.cumulusci.sf.query(query)["records"]
+        assert records, f"No {obj_name} record with Id {record_id}"
+        actual = {name: get_field(records[0], name) for name in fields}
+        mismatches = compare_fields(fields, actual)
+        if mismatches:
+            raise AssertionError(
+                format_mismatches(mismatches, f"{obj_name} {record_id}")
+            )
+
+    @capture_screenshot_on_error
+    def validate_detail_page_fields(self, **fields):
+        """ Checks the values shown for the given field labels on the record
+            page, e.g.
+            | Validate Detail Page Fields | Status=In progress |
+            | ... | Unpaid Disbursements=$80,000.00 |
+            Every visible label and value is read in one browser round-trip.
+            Fails with one message listing every field that differs.
+        """
+        with self.waits.timed("validate_detail_page_fields"):
+            page_fields = self.selenium.driver.execute_script(READ_DETAIL_FIELDS_JS)
+        mismatches = compare_page_fields(fields, page_fields or [])
+        if mismatches:
+            raise AssertionError(format_mismatches(mismatches, "the record page"))
+
     @capture_screenshot_on_error
     def click_tab(self, label):
         """Click on a tab on a record page"""
-        locator = outboundfundsnpsp_lex_locators["tab"]["tab_header"].format(label)
-        self.selenium.wait_until_element_is_enabled(
-            locator, error="Tab button is not available"
-        )
+        locator = self.locators.render("tab.tab_header", label)
+        with self.waits.timed("click_tab"):
+            self.selenium.wait_until_element_is_enabled(
+                locator, error="Tab button is not available"
+            )
         element = self.selenium.driver.find_element_by_xpath(locator)
         self.selenium.driver.execute_script("arguments[0].click()", element)
 
     def click_related_list_link_with_text(self, text):
         """Click on link with passed text in a related list table"""
-        locator = outboundfundsnpsp_lex_locators["related"]["flexi_link"].format(text)
-        self.selenium.wait_until_page_contains_element(locator)
+        locator = self.locators.render("related.flexi_link", text)
+        with self.waits.timed("click_related_list_link_with_text"):
+            self.selenium.wait_until_page_contains_element(locator)
         element = self.selenium.driver.find_element_by_xpath(locator)
         self.selenium.driver.execute_script("arguments[0].click()", element)
 
     def click_related_list_wrapper_button(self, heading, button_title):
         """ loads the related list  and clicks on the button on the list """
-        locator = outboundfundsnpsp_lex_locators["related"]["flexi_button"].format(
-            heading, button_title
-        )
+        locator = self.locators.render("related.flexi_button", heading, button_title)
         self.salesforce._jsclick(locator)
-        self.salesforce.wait_until_loading_is_complete()
+        with self.waits.timed("click_related_list_wrapper_button"):
+            self.salesforce.wait_until_loading_is_complete()
 
     @capture_screenshot_on_error
     def save_disbursement(self):
         """Click Save Disbursement"""
-        locator = outboundfundsnpsp_lex_locators["details"]["button"].format("Save")
+        locator = self.locators.render("details.button", "Save")
         self.selenium.set_focus_to_element(locator)
         self.selenium.get_webelement(locator).click()
 
     def verify_row_count(self, value):
         """verifies if actual row count matches with expected value"""
-        locator = outboundfundsnpsp_lex_locators["related"]["count"]
-        actual_value = self.selenium.get_webelements(locator)
-        count = len(actual_value)
+        locator = self.locators.render("related.count")
+        # Counted in the browser, without a round-trip per row
+        count = count_matches(self.selenium.driver, locator)
         assert int(value) == count, "Expected value to be {} but found {}".format(
             value, count
         )
 
     @capture_screenshot_on_error
-    def select_tab(self, title):
+    def select_tab(self, title, timeout=10):
         """ Switch between different tabs on a record page like Related, Details, News, Activity and Chatter
-            Pass title of the tab
-        """
-        tab_found = False
-        locators = outboundfundsnpsp_lex_locators["tabs"].values()
-        for i in locators:
-            locator = i.format(title)
-            if self.check_if_element_exists(locator):
-                print(locator)
-                buttons = self.selenium.get_webelements(locator)
-                for button in buttons:
-                    print(button)
-                    if button.is_displayed():
-                        print("button displayed is {}".format(button))
-                        self.salesforce._focus(button)
-                        button.click()
-                        time.sleep(5)
-                        tab_found = True
-                        break
-
-        assert tab_found, "tab not found"
+            Pass title of the tab. Waits up to timeout seconds for the tab to
+            be marked selected or, on tab bars that don't mark the selected
+            tab, for the page to finish loading.
+        """
+        driver = self.selenium.driver
+        with self.waits.timed("select_tab: find tab"):
+            match = find_first_match(
+                driver, self.locators.render_group("tabs", title), visible_only=True
+            )
+        assert match is not None, "tab not found"
+
+        button = match[1]
+        self.salesforce._focus(button)
+        button.click()
+        with self.waits.timed("select_tab: tab selected"):
+            wait_for_script(driver, IS_TAB_SHOWN_JS, button, timeout=float(timeout))
 
     @capture_screenshot_on_error
     def select_value_from_picklist(self, dropdown, value):
         """Select given value in the dropdown field"""
-        locator = outboundfundsnpsp_lex_locators["new_record"]["dropdown_field"].format(
-            dropdown
-        )
+        locator = self.locators.render("new_record.dropdown_field", dropdown)
         self.selenium.get_webelement(locator).click()
-        popup_loc = outboundfundsnpsp_lex_locators["new_record"]["dropdown_popup"]
-        self.selenium.wait_until_page_contains_element(
-            popup_loc, error="Picklist dropdown did not open"
-        )
-        value_loc = outboundfundsnpsp_lex_locators["new_record"][
-            "dropdown_value"
-        ].format(value)
+        popup_loc = self.locators.render("new_record.dropdown_popup")
+        with self.waits.timed("select_value_from_picklist"):
+            self.selenium.wait_until_page_contains_element(
+                popup_loc, error="Picklist dropdown did not open"
+            )
+        value_loc = self.locators.render("new_record.dropdown_value", value)
         self.salesforce._jsclick(value_loc)
 
     @capture_screenshot_on_error
     def add_date(self, title, date):
         """ Clicks on the 'Date' field in Form and picks a date in the argument """
-        locator = outboundfundsnpsp_lex_locators["new_record"]["date_field"].format(
-            title
-        )
+        locator = self.locators.render("new_record.date_field", title)
         self.selenium.set_focus_to_element(locator)
         self.selenium.clear_element_text(locator)
         self.selenium.get_webelement(locator).send_keys(date)
@@ -295,17 +408,21 @@ class OutboundFundsNPSP(BaseOutboundFundsNPSPPage):
     def page_should_not_contain_locator(self, path, *args, **kwargs):
         """Waits for the locator specified to be not present on the page"""
         main_loc = self.get_outboundfundsnpsp_lex_locators(path, *args, **kwargs)
-        self.selenium.wait_until_page_does_not_contain_element(main_loc, timeout=60)
+        with self.waits.timed("page_should_not_contain_locator"):
+            self.selenium.wait_until_page_does_not_contain_element(
+                main_loc, timeout=60
+            )
 
     def verify_button_status(self, **kwargs):
         """ Verify the button is disabled/enabled, pass the name of the buttin
         and the expected status of the buttin as either enabled or disabled"""
 
         for key, value in kwargs.items():
-            locator = outboundfundsnpsp_lex_locators["button-with-text"].format(key)
-            self.selenium.wait_until_element_is_visible(
-                locator, error=f"'{key}' is not displayed on the page"
-            )
+            locator = self.locators.render("button-with-text", key)
+            with self.waits.timed("verify_button_status"):
+                self.selenium.wait_until_element_is_visible(
+                    locator, error=f"'{key}' is not displayed on the page"
+                )
             if value == "disabled":
                 actual_value = self.selenium.get_webelement(locator).get_attribute(
                     value
@@ -325,9 +442,472 @@ class OutboundFundsNPSP(BaseOutboundFundsNPSPPage):
 
     def populate_field_with_id(self, id, value):
         """Populate field with id on manage expenditure page"""
-        locator = outboundfundsnpsp_lex_locators["id"].format(id)
+        locator = self.locators.render("id", id)
         if value == "null":
             field = self.selenium.get_webelement(locator)
             self.salesforce._clear(field)
         else:
             self.salesforce._populate_field(locator, value)
+
+    def api_create_funding_graph(
+        self,
+        contacts=1,
+        funding_requests=1,
+        disbursements_per_request=0,
+        requirements_per_request=0,
+        expenditures_per_disbursement=0,
+        assigned_user=None,
+    ):
+        """ Creates an account with contacts, a funding program, funding requests
+            and their disbursements and requirements via API, in as few
+            Composite requests as possible (one per 25 records). With
+            expenditures_per_disbursement, each disbursement's amount is split
+            over that many GAU Expenditures on a new General Accounting Unit.
+            Every record is stored as a session record, so Delete Session
+            Records removes it. Returns a dictionary of id lists keyed by
+            account, contacts, funding_program, funding_requests,
+            disbursements, requirements, gaus and gau_expenditures.
+        """
+        namespaces = {}
+        if int(expenditures_per_disbursement):
+            namespaces = {
+                "npsp_ns": self.get_npsp_namespace_prefix(),
+                "ext_ns": self.get_outfundsnpspext_namespace_prefix(),
+            }
+        graph = build_funding_graph(
+            self.get_outfundsnpsp_namespace_prefix(),
+            self.generate_new_string,
+            contacts=contacts,
+            funding_requests=funding_requests,
+            disbursements_per_request=disbursements_per_request,
+            requirements_per_request=requirements_per_request,
+            expenditures_per_disbursement=expenditures_per_disbursement,
+            assigned_user=assigned_user,
+            **namespaces,
+        )
+        try:
+            ids = insert_graph(
+                self.cumulusci.sf,
+                graph,
+                on_insert=self.salesforce.store_session_record,
+            )
+        except CompositeError as e:
+            raise AssertionError(str(e))
+        return graph.group_ids(ids)
+
+    def api_insert_record(self, obj_name, **fields):
+        """ Inserts a record like Salesforce Insert and returns the whole
+            record like Salesforce Get, in a single Composite request, e.g.
+            | &{contact} = | API Insert Record | Contact | LastName=Rigby |
+            The record is stored as a session record, and cached so API Get
+            Record returns it without another request until the suite ends.
+        """
+        self.builtin.log(f"Inserting {obj_name} with values {fields}")
+        cache = self.record_cache
+        cache.api_calls += 1
+        try:
+            record = insert_record(self.cumulusci.sf, obj_name, fields)
+        except CompositeError as e:
+            raise AssertionError(str(e))
+        self.salesforce.store_session_record(obj_name, record["Id"])
+        cache.inserts += 1
+        cache.invalidate_references(fields)
+        cache.put(record)
+        return record
+
+    def api_get_record(self, obj_name, record_id):
+        """ Returns a record like Salesforce Get, from the record cache when
+            the library inserted or read it earlier and hasn't changed it since.
+        """
+        cache = self.record_cache
+        record = cache.get(record_id)
+        if record is None:
+            self.builtin.log(f"Getting {obj_name} with Id {record_id}")
+            cache.api_calls += 1
+            record = getattr(self.cumulusci.sf, obj_name).get(record_id)
+            cache.put(record)
+        return record
+
+    def api_update_record(self, obj_name, record_id, **fields):
+        """ Updates a record like Salesforce Update, and drops it and the
+            records it looks up from the record cache.
+        """
+        self.builtin.log(f"Updating {obj_name} {record_id} with values {fields}")
+        cache = self.record_cache
+        cache.api_calls += 1
+        cache.invalidate(record_id)
+        cache.invalidate_references(fields)
+        return getattr(self.cumulusci.sf, obj_name).update(record_id, fields)
+
+    def api_delete_record(self, obj_name, record_id):
+        """ Deletes a record like Salesforce Delete, and drops it from the
+            record cache.
+        """
+        self.record_cache.api_calls += 1
+        self.record_cache.invalidate(record_id)
+        self.salesforce.salesforce_delete(obj_name, record_id)
+
+    def invalidate_record_cache(self, *record_ids):
+        """ Drops the given records from the record cache, or every record
+            when none are given. Use it after changing cached records in the
+            browser, so API Get Record reads them again.
+        """
+        self.record_cache.invalidate(*record_ids)
+
+    def log_record_cache_stats(self):
+        """ Logs the API calls made for the record keywords since the last
+            call, and how many Salesforce Get calls the cache saved. Returns
+            the counts as a dictionary.
+        """
+        cache = self.record_cache
+        stats = cache.get_stats()
+        self.builtin.log(cache.format_stats())
+        cache.reset_stats()
+        return stats
+
+    def delete_session_records_in_bulk(self, mapping=None):
+        """ Deletes the records stored with Store Session Record in batches of
+            up to 200 per object, children before parents, using the lookups
+            in datasets/mapping.yml (or the given mapping file) to order them.
+            Row lock errors are retried with backoff. Records that can't be
+            deleted are logged as warnings and left in the session records,
+            so Delete Session Records can still try them one at a time.
+        """
+        records = self.salesforce._session_records
+        dependencies = load_dependencies(mapping or DEFAULT_MAPPING_PATH)
+        stats = BulkTeardown(self.cumulusci.sf, dependencies).delete(records)
+        removed = set(stats.removed)
+        if removed:
+            self.record_cache.invalidate(*removed)
+        records[:] = [record for record in records if record["id"] not in removed]
+        for sobject, record_id, message in stats.failed:
+            self.builtin.log(
+                f"{sobject} {record_id} could not be deleted: {message}", level="WARN"
+            )
+        self.builtin.log(stats.format())
+        return stats
+
+    def open_pooled_browser(self, useralias=None, timeout=60):
+        """ Opens a test browser like Open Test Browser, or reuses the browser
+            an earlier suite of this robot process opened with Open Pooled
+            Browser for the same user, whether or not it was released with
+            Release Pooled Browser. A reused browser is reset first:
+            extra windows and modals are closed, web storage is cleared and
+            it goes to the home page. When the reset fails, e.g. because the
+            session expired, the browser is closed and a new one is opened.
+        """
+        pool = self.browser_pool
+        alias = pool.get_alias(useralias)
+        if pool.acquire(alias) is not None:
+            home_url = self.cumulusci.org.lightning_base_url + "/lightning/page/home"
+            try:
+                self.selenium.switch_browser(alias)
+                closed = reset_browser(
+                    self.selenium.driver, home_url, timeout=float(timeout)
+                )
+            except Exception as e:
+                self.builtin.log(
+                    f"Could not reset pooled browser {alias}, opening a new one: {e}",
+                    level="WARN",
+                )
+                self._close_pooled_browser(alias)
+            else:
+                pool.reused += 1
+                self.builtin.log(
+                    f"Reused pooled browser {alias} ({closed} modals closed)"
+                )
+                return
+        args = [f"alias={alias}"]
+        if useralias:
+            args.append(f"useralias={useralias}")
+        self.builtin.run_keyword("Open Test Browser", *args)
+        pool.add(alias, self.selenium.driver)
+
+    def release_pooled_browser(self):
+        """ Keeps the current browser open for the next suite that calls Open
+            Pooled Browser, in place of Close Browser. Browsers not opened
+            with Open Pooled Browser are closed. The pooled browsers still
+            open when the run ends are closed then.
+        """
+        try:
+            driver = self.selenium.driver
+        except Exception:
+            # No browser is open, e.g. because Suite Setup failed early
+            return
+        alias = self.browser_pool.release(driver)
+        if alias is None:
+            self.selenium.close_browser()
+        else:
+            self.builtin.log(f"Released pooled browser {alias}")
+
+    def _close_pooled_browser(self, alias):
+        driver = self.browser_pool.discard(alias)
+        try:
+            self.selenium.switch_browser(alias)
+            self.selenium.close_browser()
+        except Exception:
+            if driver is not None:
+                quit_driver(driver)
+
+    @property
+    def user_pool(self):
+        """ The pool users of the org, in a lease table in the on-disk cache
+        """
+        if self._user_pool is None:
+            org = self.cumulusci.org
+            self._user_pool = UserPool(
+                get_cache_dir("user_pool") / f"{make_key(org.org_id)}.json",
+                self.user_pool_backend or SfdxUserBackend(org.username),
+                size=self.user_pool_size,
+            )
+        return self._user_pool
+
+    def lease_pool_user(
+        self, profile="perms_test_user", timeout=DEFAULT_LEASE_TIMEOUT
+    ):
+        """ Leases a user of the pool of a permission profile to this robot
+            process, e.g.
+            | ${user} = | Lease Pool User | perms_test_user |
+            | Open Pooled Browser | useralias=${user}[alias] |
+            The profile names a user definition in qa_org/users. The first
+            lease in an org creates the library's user_pool_size users of
+            the profile; later runs reuse them. When parallel robot processes
+            hold every user, waits up to timeout seconds for one to be
+            returned. Returns the user's id, username and sfdx alias.
+        """
+        pool = self.user_pool
+        created = pool.provision(profile)
+        if created:
+            self.builtin.log(f"Created {created} {profile} pool user(s)")
+        user = pool.lease(profile, timeout=float(timeout))
+        self.builtin.log(f"Leased pool user {user['alias']}")
+        return {name: user[name] for name in ("id", "username", "alias")}
+
+    def release_pool_users(self):
+        """ Returns the pool users this robot process leased with Lease Pool
+            User to the other processes. Users still leased when the run ends
+            are returned then.
+        """
+        if self._user_pool is None:
+            return
+        for alias in self._user_pool.release():
+            self.builtin.log(f"Released pool user {alias}")
+
+    def _close(self):
+        """Closes the pooled browsers when robot is done with the library,
+        returns its pool users and waits for the failure artifacts still
+        being written
+        """
+        if self.browser_pool.drivers:
+            logging.getLogger(__name__).info(self.browser_pool.format_stats())
+        self.browser_pool.close_all()
+        if self._user_pool is not None:
+            self._user_pool.release()
+        if self._failure_capture is not None:
+            self._failure_capture.close()
+            logging.getLogger(__name__).info(self._failure_capture.format_stats())
+
+    def _end_suite(self, data, result):
+        """Drops the records cached during the suite, since the next suite
+        may change them in the browser
+        """
+        self.record_cache = RecordCache()
+
+    def _start_test(self, data, result):
+        """Makes SeleniumLibrary capture its failures with Capture Failure
+        Artifacts rather than Capture Page Screenshot
+        """
+        if self._run_on_failure_registered:
+            return
+        try:
+            self.selenium.register_keyword_to_run_on_failure(
+                "Capture Failure Artifacts"
+            )
+        except Exception:
+            # SeleniumLibrary isn't imported yet
+            return
+        self._run_on_failure_registered = True
+
+    @property
+    def failure_capture(self):
+        """ The failure screenshots and DOM snapshots of this run, saved under
+            failures/ in the output directory
+        """
+        if self._failure_capture is None:
+            output_dir = self.builtin.get_variable_value("${OUTPUT DIR}", ".")
+            self._failure_capture = FailureCapture(
+                os.path.join(output_dir, "failures"),
+                max_captures=self.max_failure_captures,
+                max_bytes=self.max_failure_capture_mb * 1024 * 1024,
+            )
+        return self._failure_capture
+
+    def capture_failure_artifacts(self, name=None, dom=True):
+        """ Saves a screenshot of the current page and, unless dom is false,
+            its DOM snapshot, and links them in the log. Only reading them
+            from the browser happens in the keyword; they are written in the
+            background. Screenshots and snapshots identical to earlier ones
+            are not saved again, and once the run has saved the library's
+            max_failure_captures or max_failure_capture_mb, no more are saved.
+            Never fails. Returns the screenshot path, or None.
+        """
+        try:
+            driver = self.selenium.driver
+            png = driver.get_screenshot_as_png()
+            html = driver.execute_script(DOM_SNAPSHOT_JS) if dom else None
+        except Exception as e:
+            self.builtin.log(f"Could not capture the page: {e}", level="WARN")
+            return None
+        if name is None:
+            name = self.builtin.get_variable_value(
+                "${TEST NAME}", None
+            ) or self.builtin.get_variable_value("${SUITE NAME}", "failure")
+        capture = self.failure_capture
+        paths = capture.add(name, png, html.encode("utf-8") if html else None)
+        if paths is None:
+            self.builtin.log(
+                f"Not saving the page of {name}: the failure capture budget "
+                f"is spent ({capture.format_stats()})",
+                level="WARN",
+            )
+            return None
+        screenshot, snapshot = paths
+        output_dir = self.builtin.get_variable_value("${OUTPUT DIR}", ".")
+        link = os.path.relpath(screenshot, output_dir).replace(os.sep, "/")
+        message = f'<a href="{link}"><img src="{link}" width="800px"></a>'
+        if snapshot is not None:
+            snapshot_link = os.path.relpath(snapshot, output_dir).replace(os.sep, "/")
+            message += f'<br><a href="{snapshot_link}">DOM snapshot</a>'
+        self.builtin.log(message, html=True)
+        return str(screenshot)
+
+    def start_page_load_benchmark(self):
+        """ Starts recording the Navigation and Resource Timing of every
+            Go To Page on a page object with PageLoadBenchmarkMixin, along
+            with the time until Lightning reports loading complete.
+        """
+        self.page_load_results = PageLoadResults()
+
+    def stop_page_load_benchmark(self, path=None):
+        """ Stops recording page loads and logs the median and slowest load of
+            each page. When path is given, every visit is written there as CSV
+            if the path ends with .csv, and as JSON otherwise.
+            Returns the summary rows.
+        """
+        results = self.page_load_results
+        if results is None:
+            raise AssertionError("No page load benchmark is running")
+        self.page_load_results = None
+        self.builtin.log(results.format_report())
+        if path:
+            results.write(path)
+        return results.summary()
+
+    @capture_screenshot_on_error
+    def open_manage_expenditures(self, disbursement_id, rows, timeout=120):
+        """ Opens a disbursement's GAU Expenditures tab and waits until Manage
+            Expenditures shows the given number of rows. Returns the seconds
+            from navigating to the disbursement until the rows were shown.
+        """
+        url = "{}/lightning/r/{}/view".format(
+            self.cumulusci.org.lightning_base_url, disbursement_id
+        )
+        start = time.perf_counter()
+        self.selenium.go_to(url)
+        self.click_tab("GAU Expenditures")
+        with self.waits.timed("open_manage_expenditures"):
+            wait_for_count(
+                self.selenium.driver,
+                self.locators.render("manage_expenditures.row"),
+                rows,
+                timeout=float(timeout),
+            )
+        return time.perf_counter() - start
+
+    @capture_screenshot_on_error
+    def save_manage_expenditures(self, rows, timeout=120):
+        """ Clicks Save Updates in Manage Expenditures and waits for the success
+            toast and for the list to be reloaded with the given number of rows.
+            Returns the seconds from the click until the rows were shown.
+        """
+        driver = self.selenium.driver
+        button = self.locators.render("manage_expenditures.button", "Save Updates")
+        toast = self.locators.render("toast", "Success!")
+        start = time.perf_counter()
+        self.salesforce._jsclick(button)
+        with self.waits.timed("save_manage_expenditures"):
+            self.selenium.wait_until_page_contains_element(toast, timeout=timeout)
+            wait_for_script(driver, IS_LOADING_COMPLETE_JS, timeout=float(timeout))
+            wait_for_count(
+                driver,
+                self.locators.render("manage_expenditures.row"),
+                rows,
+                timeout=float(timeout),
+            )
+        return time.perf_counter() - start
+
+    def verify_expenditure_row_count(self, rows):
+        """ Verifies Manage Expenditures shows the given number of rows.
+            Returns the seconds the check took.
+        """
+        start = time.perf_counter()
+        count = count_matches(
+            self.selenium.driver, self.locators.render("manage_expenditures.row")
+        )
+        seconds = time.perf_counter() - start
+        assert int(rows) == count, "Expected {} expenditure rows but found {}".format(
+            rows, count
+        )
+        return seconds
+
+    def check_latency_budget(self, name, seconds, budget, per_row=0, rows=0):
+        """ Fails when seconds is over the budget: budget seconds plus per_row
+            seconds for each of rows. Every check is kept for Log Latency Report.
+        """
+        message = self.latency_results.check(
+            name, float(seconds), get_budget(budget, per_row, rows), rows=int(rows)
+        )
+        if message:
+            raise AssertionError(message)
+
+    def reset_latency_results(self):
+        """ Forgets every latency checked so far, so that Log Latency Report
+            only covers the checks made after this.
+        """
+        self.latency_results = LatencyResults()
+
+    def log_latency_report(self, path=None):
+        """ Logs every latency checked with Check Latency Budget. When path is
+            given, the checks are also written there as JSON.
+        """
+        report = self.latency_results.format_report()
+        self.builtin.log(report)
+        if path:
+            self.latency_results.write(path)
+        return report
+
+    def save_dom_snapshot(self, path):
+        """ Saves the HTML of the current page as the browser has rendered it,
+            for profiling the locators offline with scripts/locator_profile.py.
+            Returns the path.
+        """
+        html = self.selenium.driver.execute_script(DOM_SNAPSHOT_JS)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        Path(path).write_text(html, encoding="utf-8")
+        self.builtin.log(f"Saved DOM snapshot to {path}")
+        return path
+
+    def log_wait_time_report(self, path=None):
+        """ Logs how long each keyword has spent waiting on the browser in
+            this process, longest total wait first. When path is given, the
+            report is also written there as JSON.
+        """
+        report = self.waits.format_report()
+        self.builtin.log(report)
+        if path:
+            self.waits.write_json(path)
+        return report
+
+    def reset_wait_times(self):
+        """Discards the wait times recorded so far"""
+        self.waits.reset()
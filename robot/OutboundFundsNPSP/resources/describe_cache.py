@@ -0,0 +1,84 @@
+"""Global describe results shared between robot processes"""
+
+from robot_cache import JsonFileCache, get_cache_dir, make_key
+
+# Describe results are reused for a day unless invalidated explicitly.
+DEFAULT_DESCRIBE_TTL = 24 * 60 * 60
+
+# Only the parts of each sobject describe the keyword library looks up.
+SOBJECT_FIELDS = ("name", "label", "labelPlural", "keyPrefix", "custom")
+
+
+class DescribeIndex:
+    """Dictionaries over the sobjects of a global describe result"""
+
+    def __init__(self, sobjects):
+        self.sobjects = sobjects
+        self.by_label = {}
+        self.by_name = {}
+        for sobject in sobjects:
+            # Keep the first sobject for a label, like the list lookups did.
+            self.by_label.setdefault(sobject["label"], sobject)
+            self.by_name[sobject["name"].lower()] = sobject
+
+    def get_sobject_name(self, label):
+        """Returns the API name of the sobject with the given label."""
+        try:
+            return self.by_label[label]["name"]
+        except KeyError:
+            raise AssertionError(f"No sobject with label '{label}' in this org")
+
+    def get_namespace_prefix(self, label):
+        """Returns the namespace prefix of the sobject with the given label."""
+        return get_namespace_prefix(self.get_sobject_name(label))
+
+
+def get_namespace_prefix(name):
+    """Returns the namespace prefix, with trailing __, of an API name."""
+    parts = name.split("__")
+    if parts[-1] == "c":
+        parts = parts[:-1]
+    if len(parts) > 1:
+        return parts[0] + "__"
+    else:
+        return ""
+
+
+def compact_describe(describe_result):
+    """Returns the sobject entries of a describe result worth caching."""
+    return [
+        {field: sobject.get(field) for field in SOBJECT_FIELDS}
+        for sobject in describe_result["sobjects"]
+    ]
+
+
+class DescribeCache:
+    """Global describe results cached on disk per org and package version
+
+    Parallel robot workers for the same org share one describe call: the
+    first worker to need it holds a lock while it calls the API, and the
+    others read the result it stores.
+    """
+
+    def __init__(self, directory=None, ttl=DEFAULT_DESCRIBE_TTL):
+        self.cache = JsonFileCache(directory or get_cache_dir("describe"), ttl=ttl)
+
+    def key(self, org_id, package_version):
+        return make_key(org_id, package_version)
+
+    def get_index(self, org_id, package_version, describe):
+        """Returns the DescribeIndex for an org, calling describe() only when
+        no unexpired result is cached.
+        """
+        sobjects = self.cache.get_or_create(
+            self.key(org_id, package_version),
+            lambda: compact_describe(describe()),
+        )
+        return DescribeIndex(sobjects)
+
+    def invalidate(self, org_id=None, package_version=None):
+        """Removes the cached result for one org, or for every org."""
+        if org_id is None:
+            self.cache.invalidate()
+        else:
+            self.cache.invalidate(self.key(org_id, package_version))
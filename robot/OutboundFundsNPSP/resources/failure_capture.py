@@ -0,0 +1,135 @@
+"""Failure screenshots and DOM snapshots, written by a background thread"""
+
+import gzip
+import hashlib
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+DEFAULT_MAX_CAPTURES = 100
+DEFAULT_MAX_MB = 50
+
+# Every file a FailureCapture writes, so a new run can clear the last one's
+ARTIFACT_GLOB = "failure-*"
+
+
+def get_slug(name, length=40):
+    """Returns a file name friendly version of a test name."""
+    slug = re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-").lower()
+    return slug[:length].rstrip("-") or "failure"
+
+
+class FailureCapture:
+    """Saves the screenshots and DOM snapshots of failures within a budget
+
+    The caller only grabs the bytes from the browser; compressing and
+    writing them happens on a background thread. A screenshot or snapshot
+    identical to one saved earlier in the run is not saved again. Once the
+    run has saved max_captures screenshots, or max_bytes of artifacts, new
+    failures are not saved at all.
+    """
+
+    def __init__(
+        self,
+        directory,
+        max_captures=DEFAULT_MAX_CAPTURES,
+        max_bytes=DEFAULT_MAX_MB * 1024 * 1024,
+    ):
+        self.directory = Path(directory)
+        self.max_captures = int(max_captures)
+        self.max_bytes = int(max_bytes)
+        self.saved = 0
+        self.bytes = 0
+        self.duplicates = 0
+        self.skipped = 0
+        self.errors = []
+        self._paths_by_hash = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self._executor = None
+
+    def start(self):
+        """Creates the directory and removes the artifacts of earlier runs."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for path in self.directory.glob(ARTIFACT_GLOB):
+            path.unlink()
+        self._started = True
+
+    def add(self, name, png, html=None):
+        """Queues a failure's screenshot and, if given, its DOM snapshot.
+
+        Returns the (screenshot path, snapshot path) the files are written
+        to, or None when the run's budget is spent. The snapshot path is
+        None without html. Duplicates get the path of the earlier copy.
+        """
+        png_hash = self._hash(png)
+        html_hash = self._hash(html) if html else None
+        with self._lock:
+            if not self._started:
+                self.start()
+            png_path = self._paths_by_hash.get(png_hash)
+            html_path = self._paths_by_hash.get(html_hash)
+            if png_path is not None and (html_hash is None or html_path is not None):
+                self.duplicates += 1
+                return png_path, html_path
+            writes = []
+            if png_path is None:
+                writes.append((png_hash, png, ".png", False))
+            if html_hash is not None and html_path is None:
+                # PNGs come compressed from the browser; snapshots are gzipped
+                writes.append((html_hash, html, ".html.gz", True))
+            # Reserve the uncompressed size until the writes report theirs
+            reserved = sum(len(data) for _, data, _, _ in writes)
+            if (
+                self.saved >= self.max_captures
+                or self.bytes + reserved > self.max_bytes
+            ):
+                self.skipped += 1
+                return None
+            self.saved += 1
+            self.bytes += reserved
+            stem = f"failure-{self.saved:03d}-{get_slug(name)}"
+            paths = {}
+            for digest, _, suffix, _ in writes:
+                paths[digest] = self._paths_by_hash[digest] = self.directory / (
+                    stem + suffix
+                )
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=1, thread_name_prefix="failure-capture"
+                )
+            result = self._paths_by_hash[png_hash], self._paths_by_hash.get(html_hash)
+        for digest, data, _, compress in writes:
+            self._executor.submit(self._write, paths[digest], data, compress)
+        return result
+
+    @staticmethod
+    def _hash(data):
+        return hashlib.sha1(data).hexdigest()
+
+    def _write(self, path, data, compress):
+        reserved = len(data)
+        try:
+            if compress:
+                data = gzip.compress(data, compresslevel=6, mtime=0)
+            path.write_bytes(data)
+        except OSError as e:
+            with self._lock:
+                self.bytes -= reserved
+                self.errors.append(f"{path.name}: {e}")
+            return
+        with self._lock:
+            self.bytes += len(data) - reserved
+
+    def close(self):
+        """Waits until every queued artifact is written."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def format_stats(self):
+        return (
+            f"{self.saved} failure(s) saved ({self.bytes / 1024 / 1024:.1f} MB), "
+            f"{self.duplicates} duplicate(s), {self.skipped} over budget"
+        )
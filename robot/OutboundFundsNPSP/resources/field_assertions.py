@@ -0,0 +1,120 @@
+"""Checks many field values of a record at once, through SOQL or the page"""
+
+import re
+
+# Returns [label, value] for every visible field of the record detail page,
+# in page order. Lightning marks field labels and values with test-id classes
+# in both the record layout and the older page block layouts.
+READ_DETAIL_FIELDS_JS = """
+var isVisible = function (node) {
+    return !!(node.offsetWidth || node.offsetHeight || node.getClientRects().length);
+};
+var clean = function (text) {
+    return (text || "").replace(/\\s+/g, " ").trim();
+};
+var fields = [];
+var labels = document.querySelectorAll(".test-id__field-label");
+for (var i = 0; i < labels.length; i++) {
+    var container = labels[i].closest(
+        "records-record-layout-item, .forcePageBlockItem, .slds-form-element"
+    );
+    var value = container && container.querySelector(".test-id__field-value");
+    if (value && isVisible(labels[i])) {
+        fields.push([clean(labels[i].innerText || labels[i].textContent),
+                     clean(value.innerText || value.textContent)]);
+    }
+}
+return fields;
+"""
+
+FIELD_NAME = re.compile(r"^[A-Za-z]\w*(\.[A-Za-z]\w*)*$")
+
+MISSING = object()
+
+
+def build_record_query(sobject, record_id, fields):
+    """Returns the SOQL query selecting the given fields of one record."""
+    for name in [sobject] + list(fields):
+        if not FIELD_NAME.match(name):
+            raise ValueError(f"'{name}' is not a valid field or object name")
+    record_id = str(record_id).replace("\\", "\\\\").replace("'", "\\'")
+    return "SELECT {} FROM {} WHERE Id = '{}'".format(
+        ", ".join(["Id"] + [name for name in fields if name != "Id"]),
+        sobject,
+        record_id,
+    )
+
+
+def get_field(record, name):
+    """Returns a field of a query result, following relationship names."""
+    value = record
+    for part in name.split("."):
+        if value is None:
+            return None
+        # SOQL results keep the case of the API names, not of the query
+        matches = [key for key in value if key.lower() == part.lower()]
+        if not matches:
+            return MISSING
+        value = value[matches[0]]
+    return value
+
+
+def values_match(expected, actual):
+    """Compares an expected value from a test with a value from the org."""
+    if actual is MISSING:
+        return False
+    if expected is None or expected in ("", "None"):
+        return actual is None or actual == ""
+    if isinstance(actual, bool):
+        return str(expected).lower() == str(actual).lower()
+    if isinstance(actual, (int, float)):
+        try:
+            return float(expected) == float(actual)
+        except (TypeError, ValueError):
+            return False
+    return str(expected) == str(actual)
+
+
+def compare_fields(expected, actual):
+    """Returns (field, expected, actual) for every field that doesn't match.
+
+    actual maps field names to values, or to MISSING for fields that
+    weren't found.
+    """
+    return [
+        (name, value, actual.get(name, MISSING))
+        for name, value in expected.items()
+        if not values_match(value, actual.get(name, MISSING))
+    ]
+
+
+def compare_page_fields(expected, page_fields):
+    """Compares expected values with the [label, value] pairs of a page.
+
+    A label may appear more than once, e.g. in the highlights panel and in
+    the details; it matches when any of its values matches.
+    """
+    values = {}
+    for label, value in page_fields:
+        values.setdefault(label, []).append(value)
+    mismatches = []
+    for label, value in expected.items():
+        found = values.get(label)
+        if found is None:
+            mismatches.append((label, value, MISSING))
+        elif not any(values_match(value, text) for text in found):
+            mismatches.append((label, value, found[0]))
+    return mismatches
+
+
+def format_mismatches(mismatches, where):
+    """Returns one failure message listing every field that didn't match."""
+    lines = [f"{len(mismatches)} field(s) of {where} did not match:"]
+    for name, expected, actual in mismatches:
+        if actual is MISSING:
+            lines.append(
+                f"    {name}: expected {expected!r} but the field was not found"
+            )
+        else:
+            lines.append(f"    {name}: expected {expected!r} but found {actual!r}")
+    return "\n".join(lines)
@@ -0,0 +1,290 @@
+"""Record graphs inserted with the Composite API"""
+
+import json
+from collections import OrderedDict
+from datetime import date, timedelta
+
+# A Composite request may hold at most 25 subrequests.
+COMPOSITE_SUBREQUEST_LIMIT = 25
+
+DISBURSEMENT_AMOUNT = 10000
+
+
+class CompositeError(Exception):
+    """A Composite request failed; nothing in the failing chunk was saved.
+
+    `inserted` holds the (sobject, id) pairs saved by earlier chunks, so
+    the caller can still clean them up.
+    """
+
+    def __init__(self, message, errors, inserted):
+        super().__init__(message)
+        self.errors = errors
+        self.inserted = inserted
+
+
+class Ref:
+    """A lookup field value pointing at another record in the same graph"""
+
+    def __init__(self, reference_id):
+        self.reference_id = reference_id
+
+    def __repr__(self):
+        return f"Ref({self.reference_id!r})"
+
+
+class RecordGraph:
+    """Records to insert together, parents before the records that refer to them"""
+
+    def __init__(self):
+        self.records = OrderedDict()
+        self._counts = {}
+
+    def add(self, role, sobject, **fields):
+        """Adds a record and returns a Ref to it for use in later records."""
+        self._counts[role] = self._counts.get(role, 0) + 1
+        reference_id = f"{role}{self._counts[role]}"
+        for value in fields.values():
+            if isinstance(value, Ref) and value.reference_id not in self.records:
+                raise ValueError(
+                    f"{reference_id} refers to {value.reference_id}, "
+                    "which must be added first"
+                )
+        self.records[reference_id] = (role, sobject, fields)
+        return Ref(reference_id)
+
+    def __len__(self):
+        return len(self.records)
+
+    def group_ids(self, ids):
+        """Returns {role: [id, ...]} for the ids returned by insert_graph."""
+        grouped = OrderedDict()
+        for reference_id, (role, _, _) in self.records.items():
+            grouped.setdefault(role, []).append(ids[reference_id])
+        return grouped
+
+
+def get_composite_errors(responses):
+    """Returns (reference id, error) for the failed subrequests of a
+    Composite response, leaving out those halted by another's failure.
+    """
+    return [
+        (response["referenceId"], error)
+        for response in responses
+        if response["httpStatusCode"] >= 300
+        for error in response["body"]
+        if error.get("errorCode") != "PROCESSING_HALTED"
+    ]
+
+
+def format_composite_errors(errors):
+    return "; ".join(
+        f"{reference_id}: {error.get('errorCode')} {error.get('message')}"
+        for reference_id, error in errors
+    )
+
+
+def insert_record(sf, sobject, fields):
+    """Inserts a record and reads it back in one Composite request.
+
+    Returns the record as a GET of it would, with the fields set by
+    defaults, formulas and triggers. Raises CompositeError when the
+    insert fails; nothing is saved then.
+    """
+    url = f"/services/data/v{sf.sf_version}/sobjects/{sobject}"
+    subrequests = [
+        {"method": "POST", "url": url, "referenceId": "record", "body": fields},
+        {"method": "GET", "url": url + "/@{record.id}", "referenceId": "get"},
+    ]
+    result = sf.restful(
+        "composite",
+        method="POST",
+        data=json.dumps({"allOrNone": True, "compositeRequest": subrequests}),
+    )
+    responses = result["compositeResponse"]
+    errors = get_composite_errors(responses)
+    if errors:
+        raise CompositeError(
+            f"Could not insert {sobject} ({format_composite_errors(errors)})",
+            errors,
+            [],
+        )
+    return responses[1]["body"]
+
+
+def insert_graph(sf, graph, on_insert=None, chunk_size=COMPOSITE_SUBREQUEST_LIMIT):
+    """Inserts a RecordGraph with as few Composite requests as possible.
+
+    Records are sent in chunks of up to chunk_size subrequests, each chunk
+    all-or-none. References within a chunk are resolved by Salesforce;
+    references to earlier chunks use the ids those chunks returned.
+    on_insert(sobject, id) is called for every saved record, in graph
+    order. Returns {reference id: record id}.
+    """
+    ids = {}
+    inserted = []
+    reference_ids = list(graph.records)
+    for start in range(0, len(reference_ids), chunk_size):
+        chunk = reference_ids[start : start + chunk_size]
+        subrequests = []
+        for reference_id in chunk:
+            _, sobject, fields = graph.records[reference_id]
+            body = {}
+            for name, value in fields.items():
+                if isinstance(value, Ref):
+                    value = ids.get(value.reference_id) or (
+                        "@{%s.id}" % value.reference_id
+                    )
+                body[name] = value
+            subrequests.append(
+                {
+                    "method": "POST",
+                    "url": f"/services/data/v{sf.sf_version}/sobjects/{sobject}",
+                    "referenceId": reference_id,
+                    "body": body,
+                }
+            )
+        result = sf.restful(
+            "composite",
+            method="POST",
+            data=json.dumps({"allOrNone": True, "compositeRequest": subrequests}),
+        )
+        responses = result["compositeResponse"]
+        errors = get_composite_errors(responses)
+        if errors:
+            raise CompositeError(
+                f"Could not insert records ({format_composite_errors(errors)})",
+                errors,
+                inserted,
+            )
+        for response in responses:
+            reference_id = response["referenceId"]
+            record_id = response["body"]["id"]
+            ids[reference_id] = record_id
+            sobject = graph.records[reference_id][1]
+            inserted.append((sobject, record_id))
+            if on_insert:
+                on_insert(sobject, record_id)
+    return ids
+
+
+def build_funding_graph(
+    ns,
+    make_name,
+    contacts=1,
+    funding_requests=1,
+    disbursements_per_request=0,
+    requirements_per_request=0,
+    expenditures_per_disbursement=0,
+    assigned_user=None,
+    npsp_ns="",
+    ext_ns="",
+    today=None,
+):
+    """Returns a RecordGraph with an account, its contacts, a funding program,
+    funding requests applied for by the contacts in turn, and disbursements
+    and requirements on each request. With expenditures_per_disbursement,
+    a General Accounting Unit is added and each disbursement's amount is
+    split evenly over that many GAU Expenditures.
+
+    Field values match the API Create keywords in OutboundFundsNPSP.robot.
+    ns, npsp_ns and ext_ns are the Outbound Funds, NPSP and Outbound Funds
+    NPSP extension namespace prefixes; make_name() returns a new record name.
+    """
+    today = today or date.today()
+    graph = RecordGraph()
+    account = graph.add("account", "Account", Name=make_name())
+    contact_refs = [
+        graph.add(
+            "contacts",
+            "Contact",
+            FirstName=make_name(),
+            LastName=make_name(),
+            AccountId=account,
+        )
+        for _ in range(int(contacts))
+    ]
+    program = graph.add(
+        "funding_program",
+        f"{ns}Funding_Program__c",
+        **{
+            "Name": make_name(),
+            f"{ns}Start_Date__c": today.isoformat(),
+            f"{ns}End_Date__c": (today + timedelta(days=90)).isoformat(),
+            f"{ns}Status__c": "In Progress",
+            f"{ns}Total_Program_Amount__c": 100000,
+            f"{ns}Description__c": "Robot API Program",
+        },
+    )
+    expenditures_per_disbursement = int(expenditures_per_disbursement)
+    if expenditures_per_disbursement:
+        gau = graph.add(
+            "gaus",
+            f"{npsp_ns}General_Accounting_Unit__c",
+            **{
+                "Name": make_name(),
+                f"{npsp_ns}Active__c": True,
+                f"{npsp_ns}Total_Allocations__c": 50000,
+                f"{npsp_ns}Description__c": "Robot Test",
+            },
+        )
+        # Rounded down to the cent so the expenditures never exceed the
+        # disbursement and Manage Expenditures can save them
+        expenditure_amount = (
+            DISBURSEMENT_AMOUNT * 100 // expenditures_per_disbursement / 100
+        )
+    for index in range(int(funding_requests)):
+        contact = contact_refs[index % len(contact_refs)] if contact_refs else None
+        request_fields = {
+            "Name": make_name(),
+            f"{ns}Status__c": "In Progress",
+            f"{ns}Requested_Amount__c": 100000,
+            f"{ns}FundingProgram__c": program,
+            f"{ns}Application_Date__c": today.isoformat(),
+            f"{ns}Requested_For__c": "Robot Testing",
+        }
+        if contact:
+            request_fields[f"{ns}Applying_Contact__c"] = contact
+        request = graph.add(
+            "funding_requests", f"{ns}Funding_Request__c", **request_fields
+        )
+        for _ in range(int(disbursements_per_request)):
+            disbursement = graph.add(
+                "disbursements",
+                f"{ns}Disbursement__c",
+                **{
+                    f"{ns}Funding_Request__c": request,
+                    f"{ns}Amount__c": DISBURSEMENT_AMOUNT,
+                    f"{ns}Status__c": "Scheduled",
+                    f"{ns}Scheduled_Date__c": (today + timedelta(days=5)).isoformat(),
+                    f"{ns}Type__c": "Initial",
+                    f"{ns}Disbursement_Date__c": (
+                        today + timedelta(days=10)
+                    ).isoformat(),
+                    f"{ns}Disbursement_Method__c": "Check",
+                },
+            )
+            for _ in range(expenditures_per_disbursement):
+                graph.add(
+                    "gau_expenditures",
+                    f"{ext_ns}GAU_Expenditure__c",
+                    **{
+                        f"{ext_ns}Amount__c": expenditure_amount,
+                        f"{ext_ns}General_Accounting_Unit__c": gau,
+                        f"{ext_ns}Disbursement__c": disbursement,
+                    },
+                )
+        for _ in range(int(requirements_per_request)):
+            requirement_fields = {
+                "Name": make_name(),
+                f"{ns}Due_Date__c": (today + timedelta(days=30)).isoformat(),
+                f"{ns}Status__c": "Open",
+                f"{ns}Funding_Request__c": request,
+                f"{ns}Type__c": "Review",
+            }
+            if contact:
+                requirement_fields[f"{ns}Primary_Contact__c"] = contact
+            if assigned_user:
+                requirement_fields[f"{ns}Assigned__c"] = assigned_user
+            graph.add("requirements", f"{ns}Requirement__c", **requirement_fields)
+    return graph
@@ -0,0 +1,43 @@
+"""Latencies measured by the browser benchmarks, checked against budgets"""
+
+import json
+
+
+def get_budget(base, per_row=0, rows=0):
+    """Returns the seconds allowed for a step: base plus per_row for each row."""
+    return float(base) + float(per_row) * int(rows)
+
+
+class LatencyResults:
+    """Every latency checked while a benchmark runs, within budget or not"""
+
+    def __init__(self):
+        self.rows = []
+
+    def check(self, name, seconds, budget, rows=None):
+        """Records a latency; returns the message when it's over budget."""
+        row = {
+            "name": name,
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "budget": round(budget, 3),
+            "within_budget": seconds <= budget,
+        }
+        self.rows.append(row)
+        if not row["within_budget"]:
+            return f"{name} took {seconds:.2f}s, over its budget of {budget:.2f}s"
+
+    def format_report(self):
+        lines = [f"{'Step':<50} {'Rows':>6} {'Seconds':>8} {'Budget':>8}"]
+        for row in self.rows:
+            flag = "" if row["within_budget"] else "  OVER"
+            rows = "" if row["rows"] is None else row["rows"]
+            lines.append(
+                f"{row['name']:<50} {rows:>6} {row['seconds']:>8.2f} "
+                f"{row['budget']:>8.2f}{flag}"
+            )
+        return "\n".join(lines)
+
+    def write(self, path):
+        with open(path, "w") as f:
+            json.dump(self.rows, f, indent=2)
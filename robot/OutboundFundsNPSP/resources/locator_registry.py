@@ -0,0 +1,161 @@
+"""Locator libraries discovered by API version"""
+
+import functools
+import importlib.util
+import re
+import string
+import sys
+from pathlib import Path
+
+from lxml import etree
+
+LOCATOR_MODULE_PATTERN = re.compile(r"^locators_(\d+)\.py$")
+
+
+class LocatorRegistry:
+    """The locators_<version>.py modules next to this file, by API version.
+
+    Versions are found from the module file names; a module is only imported
+    the first time its locators are requested.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory or Path(__file__).parent)
+        self._paths = None
+        self._locators = {}
+        self._services = {}
+
+    @property
+    def paths(self):
+        if self._paths is None:
+            self._paths = {}
+            for path in self.directory.iterdir():
+                match = LOCATOR_MODULE_PATTERN.match(path.name)
+                if match:
+                    self._paths[float(match.group(1))] = path
+        return self._paths
+
+    @property
+    def versions(self):
+        return sorted(self.paths)
+
+    @property
+    def latest_version(self):
+        return self.versions[-1]
+
+    def __contains__(self, api_version):
+        return api_version in self.paths
+
+    def get(self, api_version):
+        """Returns the locators dictionary for an API version."""
+        if api_version not in self._locators:
+            module = self._import(self.paths[api_version])
+            self._locators[api_version] = module.outboundfundsnpsp_lex_locators
+        return self._locators[api_version]
+
+    def get_service(self, api_version):
+        """Returns the LocatorService for an API version."""
+        if api_version not in self._services:
+            self._services[api_version] = LocatorService(self.get(api_version))
+        return self._services[api_version]
+
+    def _import(self, path):
+        name = path.stem
+        if name in sys.modules:
+            return sys.modules[name]
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        # Register the module first so locator modules that build on another
+        # version (see locators_51) share a single copy of it.
+        sys.modules[name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[name]
+            raise
+        return module
+
+
+def flatten_locators(locators, prefix=""):
+    """Returns {dotted.path: template} for a nested locators dictionary."""
+    flat = {}
+    for key, value in locators.items():
+        path = prefix + key
+        if isinstance(value, dict):
+            flat.update(flatten_locators(value, path + "."))
+        else:
+            flat[path] = value
+    return flat
+
+
+def compile_xpath(path, xpath):
+    """Returns the compiled XPath, raising ValueError naming the locator if
+    it is not valid XPath.
+    """
+    try:
+        return etree.XPath(xpath)
+    except etree.XPathSyntaxError as error:
+        raise ValueError(f"Locator '{path}' is not valid XPath ({error}): {xpath}")
+
+
+def get_field_count(template):
+    """Returns the number of replacement fields in a locator template."""
+    return sum(
+        1 for _, field, _, _ in string.Formatter().parse(template) if field is not None
+    )
+
+
+class LocatorService:
+    """Renders locators from one locators dictionary.
+
+    The nested dictionary is flattened into dotted paths once, and rendered
+    locators are validated as XPath and kept in an LRU cache keyed on the
+    path and the arguments.
+    """
+
+    def __init__(self, locators, cache_size=1024):
+        self.templates = flatten_locators(locators)
+        self.groups = {}
+        for path, template in self.templates.items():
+            group, _, name = path.rpartition(".")
+            self.groups.setdefault(group, {})[name] = template
+        self._render_cached = functools.lru_cache(maxsize=cache_size)(self._render)
+
+    def __getitem__(self, path):
+        """Returns the unrendered template at a dotted path."""
+        return self.templates[path]
+
+    def render_group(self, path, *args, **kwargs):
+        """Returns every locator directly below a dotted path, rendered, in
+        dictionary order.
+        """
+        return [
+            self.render(f"{path}.{name}", *args, **kwargs) for name in self.groups[path]
+        ]
+
+    def render(self, path, *args, **kwargs):
+        """Returns the locator at a dotted path with the arguments filled in."""
+        key = (path, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            # Unhashable arguments can't be cached
+            return self._render(*key)
+        return self._render_cached(*key)
+
+    def compile(self, path, *args, **kwargs):
+        """Returns the rendered locator as a compiled lxml XPath object."""
+        return compile_xpath(path, self.render(path, *args, **kwargs))
+
+    def cache_info(self):
+        return self._render_cached.cache_info()
+
+    def _render(self, path, args, kwargs):
+        try:
+            template = self.templates[path]
+        except KeyError:
+            raise KeyError(f"No locator at '{path}'")
+        locator = template.format(*args, **dict(kwargs))
+        if locator.startswith(("/", "(")):
+            compile_xpath(path, locator)
+        return locator
@@ -54,6 +54,11 @@ outboundfundsnpsp_lex_locators = {
         "button": "//button[contains(@class, 'slds-button') and text() = '{}']",
         "header": "//h1//div[contains(@class, 'entityNameTitle') and contains(text(),'{}')]",
     },
+    "manage_expenditures": {
+        "row": "//c-manage-expenditures//c-gau-expenditure-row",
+        "button": "//c-manage-expenditures//button[text()='{}']",
+    },
+    "toast": "//div[contains(@class, 'forceToastMessage')][.//*[text()='{}']]",
     "link": "//a[contains(text(),'{}')]",
     "id": "//input[@type='text' and @inputmode='decimal' and @step='0.01']",
     "button-with-text": "//button[contains(text(),'{}')]",
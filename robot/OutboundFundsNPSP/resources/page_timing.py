@@ -0,0 +1,100 @@
+"""Browser page-load timings collected while a page load benchmark runs"""
+
+import csv
+import json
+import statistics
+from collections import OrderedDict
+
+# Navigation and Resource Timing for the current document. Run right after
+# Lightning reports loading complete, performance.now() is the time from
+# the start of the navigation until the page was usable.
+PAGE_TIMING_JS = """
+var nav = performance.getEntriesByType("navigation")[0] || {};
+var resources = performance.getEntriesByType("resource");
+var transferSize = 0, slowest = 0;
+for (var i = 0; i < resources.length; i++) {
+    transferSize += resources[i].transferSize || 0;
+    slowest = Math.max(slowest, resources[i].duration);
+}
+return {
+    loading_complete_ms: performance.now(),
+    response_start_ms: nav.responseStart || null,
+    dom_content_loaded_ms: nav.domContentLoadedEventEnd || null,
+    load_event_ms: nav.loadEventEnd || null,
+    document_transfer_size: nav.transferSize || null,
+    resource_count: resources.length,
+    resource_transfer_size: transferSize,
+    slowest_resource_ms: slowest
+};
+"""
+
+FIELDS = (
+    "page",
+    "record_id",
+    "visit",
+    "wall_seconds",
+    "loading_complete_ms",
+    "response_start_ms",
+    "dom_content_loaded_ms",
+    "load_event_ms",
+    "document_transfer_size",
+    "resource_count",
+    "resource_transfer_size",
+    "slowest_resource_ms",
+)
+
+
+class PageLoadResults:
+    """Timings of every page visit made while a benchmark runs"""
+
+    def __init__(self):
+        self.rows = []
+        self._visits = {}
+
+    def add(self, page, record_id, wall_seconds, timing):
+        """Records one visit; timing is the result of PAGE_TIMING_JS."""
+        self._visits[page] = self._visits.get(page, 0) + 1
+        row = {
+            "page": page,
+            "record_id": record_id,
+            "visit": self._visits[page],
+            "wall_seconds": round(wall_seconds, 3),
+        }
+        row.update((field, timing.get(field)) for field in FIELDS[4:])
+        self.rows.append(row)
+        return row
+
+    def summary(self):
+        """Returns the median and slowest loading complete time of each page."""
+        times = OrderedDict()
+        for row in self.rows:
+            times.setdefault(row["page"], []).append(row["loading_complete_ms"])
+        return [
+            {
+                "page": page,
+                "visits": len(values),
+                "median_ms": statistics.median(values),
+                "max_ms": max(values),
+            }
+            for page, values in times.items()
+        ]
+
+    def format_report(self):
+        lines = [f"{'Page':<50} {'Visits':>6} {'Median ms':>10} {'Max ms':>10}"]
+        for row in self.summary():
+            lines.append(
+                f"{row['page']:<50} {row['visits']:>6} "
+                f"{row['median_ms']:>10.0f} {row['max_ms']:>10.0f}"
+            )
+        return "\n".join(lines)
+
+    def write(self, path):
+        """Writes every visit to a .csv file, or with the summary to JSON."""
+        if str(path).endswith(".csv"):
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, FIELDS)
+                writer.writeheader()
+                writer.writerows(self.rows)
+        else:
+            with open(path, "w") as f:
+                json.dump({"summary": self.summary(), "visits": self.rows}, f, indent=2)
@@ -0,0 +1,77 @@
+"""Records written and read by the API keywords, kept for the suite"""
+
+import copy
+import re
+
+SALESFORCE_ID = re.compile(r"^[a-zA-Z0-9]{15}([a-zA-Z0-9]{3})?$")
+
+
+def get_key(record_id):
+    """The 15- and 18-character ids of a record share their first 15."""
+    return record_id[:15]
+
+
+class RecordCache:
+    """Full records by id, as last inserted or read through the library
+
+    The cache is written through: an insert stores the record it returns,
+    and an update or delete drops the record. Inserting or updating a
+    record also drops the cached records it looks up, since roll-ups and
+    triggers may have changed them. Changes made in the browser or by
+    other keywords are not seen, so those records must be invalidated;
+    the library starts a new cache for each suite so they go no further.
+
+    api_calls counts the REST calls made for the cache's keywords; hits
+    and inserts each save the Salesforce Get the keywords used to make.
+    """
+
+    def __init__(self):
+        self.records = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.inserts = 0
+        self.api_calls = 0
+
+    def get(self, record_id):
+        """Returns a copy of the cached record, or None."""
+        record = self.records.get(get_key(record_id))
+        if record is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return copy.deepcopy(record)
+
+    def put(self, record):
+        self.records[get_key(record["Id"])] = copy.deepcopy(record)
+
+    def invalidate(self, *record_ids):
+        """Drops the given records, or every record when none are given."""
+        if not record_ids:
+            self.records.clear()
+        for record_id in record_ids:
+            self.records.pop(get_key(record_id), None)
+
+    def invalidate_references(self, fields):
+        """Drops the cached records the given field values look up."""
+        for value in fields.values():
+            if isinstance(value, str) and SALESFORCE_ID.match(value):
+                self.records.pop(get_key(value), None)
+
+    def get_stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "inserts": self.inserts,
+            "api_calls": self.api_calls,
+            "calls_saved": self.hits + self.inserts,
+        }
+
+    def format_stats(self):
+        return (
+            f"{self.api_calls} API call(s) for records: {self.inserts} insert(s) "
+            f"read back in the same call, {self.hits} cache hit(s), "
+            f"{self.misses} miss(es); {self.hits + self.inserts} call(s) saved"
+        )
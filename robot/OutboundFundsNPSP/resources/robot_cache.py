@@ -0,0 +1,144 @@
+"""On-disk caches shared by the robot processes of a test run"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+# Overrides the default cache location, e.g. to share one cache between
+# checkouts on a CI worker.
+CACHE_DIR_ENV = "OUTBOUNDFUNDSNPSP_CACHE_DIR"
+DEFAULT_CACHE_DIR = Path(".cci", "robot_cache")
+
+
+def get_cache_dir(*parts, project_root=None):
+    """Returns the directory for a named cache, creating it if needed.
+
+    The cache lives under $OUTBOUNDFUNDSNPSP_CACHE_DIR when it is set, and
+    under .cci/robot_cache in the project root (or working directory)
+    otherwise.
+    """
+    root = os.environ.get(CACHE_DIR_ENV)
+    if root:
+        directory = Path(root, *parts)
+    else:
+        directory = Path(project_root or ".", DEFAULT_CACHE_DIR, *parts)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
+def make_key(*parts):
+    """Returns a filename-safe key for the given parts."""
+    return hashlib.sha1("\0".join(str(part) for part in parts).encode()).hexdigest()
+
+
+class FileLock:
+    """A lock shared between processes, held by creating a lock file.
+
+    Lock files older than `stale_after` seconds are assumed to belong to
+    a process that died while holding the lock, and are removed.
+    """
+
+    def __init__(self, path, timeout=120, stale_after=300, poll_interval=0.05):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.poll_interval = poll_interval
+
+    def acquire(self):
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self._remove_if_stale()
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"Timed out waiting for lock {self.path}")
+                time.sleep(self.poll_interval)
+            else:
+                os.write(fd, str(os.getpid()).encode())
+                os.close(fd)
+                return
+
+    def release(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def _remove_if_stale(self):
+        try:
+            age = time.time() - self.path.stat().st_mtime
+        except FileNotFoundError:
+            return
+        if age > self.stale_after:
+            self.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class JsonFileCache:
+    """A directory of JSON entries with an optional time-to-live.
+
+    Entries are written atomically, so processes reading the cache never
+    see a partially written entry. `get_or_create` holds a lock while it
+    builds a missing entry so only one process pays for building it.
+    """
+
+    def __init__(self, directory, ttl=None):
+        self.directory = Path(directory)
+        self.ttl = ttl
+
+    def _path(self, key):
+        return self.directory / f"{key}.json"
+
+    def get(self, key):
+        """Returns the cached value for key, or None if it is missing or expired."""
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if self.ttl is not None and time.time() - entry["created"] > self.ttl:
+            return None
+        return entry["value"]
+
+    def set(self, key, value):
+        path = self._path(key)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump({"created": time.time(), "value": value}, f)
+        os.replace(temp_path, path)
+
+    def invalidate(self, key=None):
+        """Removes the entry for key, or every entry when no key is given."""
+        paths = [self._path(key)] if key else self.directory.glob("*.json")
+        for path in paths:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def lock(self, key):
+        return FileLock(self.directory / f"{key}.lock")
+
+    def get_or_create(self, key, factory):
+        """Returns the cached value for key, calling factory to build and
+        store it when it is missing or expired.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self.lock(key):
+            # Another process may have built the entry while we waited.
+            value = self.get(key)
+            if value is None:
+                value = factory()
+                self.set(key, value)
+        return value
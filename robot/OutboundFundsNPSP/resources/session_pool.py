@@ -0,0 +1,146 @@
+"""Keeps a logged-in browser per Salesforce user open across the suites of a run"""
+
+from urllib.parse import urlparse
+
+from selenium.common.exceptions import NoAlertPresentException, WebDriverException
+
+from waits import IS_LOADING_COMPLETE_JS, wait_for_script
+
+# Closes the visible modals, popovers and toasts with their own close
+# buttons, then clears the state Lightning keeps in web storage. Returns the
+# number of close buttons clicked.
+RESET_PAGE_JS = """
+var closed = 0;
+var buttons = document.querySelectorAll(
+    ".slds-modal__close, .modal-container .closeIcon, .uiModal .closeIcon, " +
+    ".slds-popover__close, .forceToastMessage .toastClose"
+);
+for (var i = 0; i < buttons.length; i++) {
+    if (buttons[i].offsetWidth || buttons[i].offsetHeight) {
+        buttons[i].click();
+        closed++;
+    }
+}
+window.localStorage.clear();
+window.sessionStorage.clear();
+return closed;
+"""
+
+
+class SessionResetError(Exception):
+    """A pooled browser could not be brought back to a clean home page"""
+
+
+def accept_alert(driver):
+    """Accepts an open alert, like a leave page prompt, if there is one."""
+    try:
+        driver.switch_to.alert.accept()
+    except NoAlertPresentException:
+        pass
+
+
+def is_same_page(url, expected):
+    """True when url is expected, apart from its query string and fragment."""
+    url, expected = urlparse(url), urlparse(expected)
+    return (url.scheme, url.netloc, url.path.rstrip("/")) == (
+        expected.scheme,
+        expected.netloc,
+        expected.path.rstrip("/"),
+    )
+
+
+def reset_browser(driver, home_url, timeout=30):
+    """Brings a browser left by another suite back to a clean home page.
+
+    Closes every window but the first, closes modals, clears web storage and
+    goes to home_url. Cookies are kept, so the browser stays logged in.
+    Raises SessionResetError when the browser ends up elsewhere, e.g. on the
+    login page because the session expired. Returns the number of modals
+    closed.
+    """
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    accept_alert(driver)
+    closed = driver.execute_script(RESET_PAGE_JS)
+    driver.get(home_url)
+    accept_alert(driver)
+    wait_for_script(driver, IS_LOADING_COMPLETE_JS, timeout=timeout)
+    if not is_same_page(driver.current_url, home_url):
+        raise SessionResetError(
+            f"Expected the browser at {home_url} but it is at {driver.current_url}"
+        )
+    return closed
+
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+
+class BrowserPool:
+    """The browsers one robot process keeps open, one per Salesforce user"""
+
+    def __init__(self):
+        self.drivers = {}
+        self.released = set()
+        self.opened = 0
+        self.reused = 0
+        self.replaced = 0
+
+    @staticmethod
+    def get_alias(useralias=None):
+        """Returns the SeleniumLibrary alias of the pooled browser of a user."""
+        return "pooled-" + (useralias or "default")
+
+    def add(self, alias, driver):
+        """Adds a browser just opened for a suite, quitting the browser it
+        replaces.
+        """
+        replaced = self.drivers.get(alias)
+        if replaced is not None and replaced is not driver:
+            quit_driver(replaced)
+        self.drivers[alias] = driver
+        self.opened += 1
+
+    def acquire(self, alias):
+        """Returns the browser of an alias for another suite, or None.
+
+        A browser the last suite never released, e.g. because its teardown
+        failed, is handed over too rather than left open beside a new one.
+        """
+        self.released.discard(alias)
+        return self.drivers.get(alias)
+
+    def release(self, driver):
+        """Keeps a suite's browser for the next suite; returns its alias.
+
+        Returns None when the browser isn't one of the pool's.
+        """
+        for alias, pooled in self.drivers.items():
+            if pooled is driver:
+                self.released.add(alias)
+                return alias
+        return None
+
+    def discard(self, alias):
+        """Forgets a browser that could not be reset; returns its driver."""
+        self.released.discard(alias)
+        self.replaced += 1
+        return self.drivers.pop(alias, None)
+
+    def close_all(self):
+        for driver in self.drivers.values():
+            quit_driver(driver)
+        self.drivers.clear()
+        self.released.clear()
+
+    def format_stats(self):
+        return (
+            f"{self.opened} pooled browser(s) opened, {self.reused} reused, "
+            f"{self.replaced} replaced after a failed reset"
+        )
@@ -0,0 +1,225 @@
+"""Bulk deletion of session records in dependency order"""
+
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import yaml
+from simple_salesforce.exceptions import SalesforceError
+
+from describe_cache import get_namespace_prefix
+
+DEFAULT_MAPPING_PATH = Path(__file__).resolve().parents[3] / "datasets" / "mapping.yml"
+
+# sObject Collections delete at most 200 records per request.
+DELETE_BATCH_SIZE = 200
+
+LOCK_ERRORS = frozenset(["UNABLE_TO_LOCK_ROW"])
+# Records already removed, usually by a cascade delete from their parent.
+ALREADY_DELETED_ERRORS = frozenset(["ENTITY_IS_DELETED", "INVALID_CROSS_REFERENCE_KEY"])
+
+
+def local_name(sobject):
+    """Returns the lowercased API name without its namespace prefix.
+
+    Session records are stored under whatever name the test used, e.g.
+    outfunds__disbursement__c, so lookups compare names this way.
+    """
+    return sobject[len(get_namespace_prefix(sobject)) :].lower()
+
+
+def load_dependencies(mapping_path=DEFAULT_MAPPING_PATH):
+    """Returns {object: set of objects it looks up} from a bulk data mapping.
+
+    Objects are keyed by local_name. Self lookups are left out.
+    """
+    with open(mapping_path) as f:
+        mapping = yaml.safe_load(f)
+    objects_by_table = {
+        step["table"]: local_name(step["sf_object"]) for step in mapping.values()
+    }
+    dependencies = {}
+    for step in mapping.values():
+        name = local_name(step["sf_object"])
+        parents = dependencies.setdefault(name, set())
+        for lookup in (step.get("lookups") or {}).values():
+            parent = objects_by_table.get(lookup["table"], local_name(lookup["table"]))
+            if parent != name:
+                parents.add(parent)
+    return dependencies
+
+
+def get_depths(dependencies):
+    """Returns {object: length of its longest chain of lookups to a root}."""
+    depths = {}
+
+    def depth(name, seen=()):
+        if name not in depths:
+            if name in seen:
+                raise ValueError(f"Lookup cycle through {name} in the mapping")
+            parents = dependencies.get(name, ())
+            depths[name] = 1 + max(
+                (depth(parent, seen + (name,)) for parent in parents), default=-1
+            )
+        return depths[name]
+
+    for name in dependencies:
+        depth(name)
+    return depths
+
+
+def plan_deletes(records, dependencies):
+    """Groups session records into waves of {sobject: [id, ...]}.
+
+    Every object in a wave is deleted before any object in the next, and
+    children come before the objects they look up. Objects missing from
+    the mapping go in the first wave; objects with equal depth share a
+    wave and may be deleted in parallel.
+
+    A record stored more than once, or an object stored under names that
+    differ in case, is deleted once, under the name it was first stored as.
+    """
+    depths = get_depths(dependencies)
+    unknown_depth = max(depths.values(), default=0) + 1
+    names = {}
+    by_sobject = OrderedDict()
+    for record in records:
+        sobject = names.setdefault(record["type"].lower(), record["type"])
+        by_sobject.setdefault(sobject, OrderedDict())[record["id"]] = None
+    waves = {}
+    for sobject, ids in by_sobject.items():
+        depth = depths.get(local_name(sobject), unknown_depth)
+        waves.setdefault(depth, OrderedDict())[sobject] = list(ids)
+    return [waves[depth] for depth in sorted(waves, reverse=True)]
+
+
+class TeardownStats:
+    """Counts for one teardown"""
+
+    def __init__(self):
+        self.deleted = 0
+        self.already_deleted = 0
+        self.failed = []
+        self.removed = []
+        self.api_calls = 0
+        self.lock_retries = 0
+        self.seconds = 0.0
+
+    def format(self):
+        return (
+            f"Deleted {self.deleted} records ({self.already_deleted} already "
+            f"deleted, {len(self.failed)} failed) with {self.api_calls} API calls "
+            f"and {self.lock_retries} lock retries in {self.seconds:.2f}s"
+        )
+
+
+class BulkTeardown:
+    """Deletes records with sObject Collections requests, children first.
+
+    Records that fail with UNABLE_TO_LOCK_ROW are retried with exponential
+    backoff; other failures, including a whole batch whose request fails,
+    are reported in TeardownStats.failed as (sobject, id, message) tuples
+    rather than raised.
+    """
+
+    def __init__(
+        self,
+        sf,
+        dependencies,
+        batch_size=DELETE_BATCH_SIZE,
+        lock_retries=5,
+        backoff=0.5,
+        max_workers=4,
+        sleep=time.sleep,
+    ):
+        self.sf = sf
+        self.dependencies = dependencies
+        self.batch_size = batch_size
+        self.lock_retries = lock_retries
+        self.backoff = backoff
+        self.max_workers = max_workers
+        self.sleep = sleep
+
+    def delete(self, records):
+        """Deletes session records ({"type": ..., "id": ...} dicts) and
+        returns the TeardownStats. Every record that is gone afterwards,
+        whether deleted here or before, is listed in stats.removed.
+        """
+        stats = TeardownStats()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for wave in plan_deletes(records, self.dependencies):
+                results = executor.map(
+                    lambda item: self._delete_sobject(*item), wave.items()
+                )
+                for result in results:
+                    self._add(stats, result)
+        stats.seconds = time.perf_counter() - start
+        return stats
+
+    def _add(self, stats, result):
+        stats.deleted += len(result.deleted)
+        stats.already_deleted += len(result.already_deleted)
+        stats.failed.extend(result.failed)
+        stats.api_calls += result.api_calls
+        stats.lock_retries += result.lock_retries
+        stats.removed.extend(result.deleted + result.already_deleted)
+
+    def _delete_sobject(self, sobject, ids):
+        result = _SobjectResult(sobject)
+        for start in range(0, len(ids), self.batch_size):
+            batch = ids[start : start + self.batch_size]
+            for attempt in range(self.lock_retries + 1):
+                if attempt:
+                    result.lock_retries += 1
+                    self.sleep(self.backoff * 2 ** (attempt - 1))
+                batch = self._delete_batch(
+                    result, batch, last=attempt == self.lock_retries
+                )
+                if not batch:
+                    break
+        return result
+
+    def _delete_batch(self, result, ids, last):
+        """Deletes one batch, returning the ids to retry after a lock error."""
+        result.api_calls += 1
+        try:
+            response = self.sf.restful(
+                "composite/sobjects",
+                params={"ids": ",".join(ids), "allOrNone": "false"},
+                method="DELETE",
+            )
+        except SalesforceError as error:
+            result.failed.extend(
+                (result.sobject, record_id, str(error)) for record_id in ids
+            )
+            return []
+        locked = []
+        # Results come back in the order of the ids
+        for record_id, record in zip(ids, response):
+            if record["success"]:
+                result.deleted.append(record_id)
+                continue
+            codes = {error["statusCode"] for error in record["errors"]}
+            if codes & ALREADY_DELETED_ERRORS:
+                result.already_deleted.append(record_id)
+            elif codes & LOCK_ERRORS and not last:
+                locked.append(record_id)
+            else:
+                message = "; ".join(
+                    f"{error['statusCode']}: {error['message']}"
+                    for error in record["errors"]
+                )
+                result.failed.append((result.sobject, record_id, message))
+        return locked
+
+
+class _SobjectResult:
+    def __init__(self, sobject):
+        self.sobject = sobject
+        self.deleted = []
+        self.already_deleted = []
+        self.failed = []
+        self.api_calls = 0
+        self.lock_retries = 0
@@ -0,0 +1,198 @@
+"""Permission test users created once per org and leased to robot processes"""
+
+import json
+import os
+import socket
+import time
+from pathlib import Path
+
+from cumulusci.core.sfdx import sfdx
+from robot_cache import FileLock
+
+DEFAULT_POOL_SIZE = 2
+# Seconds Lease Pool User waits for another process to return a user
+DEFAULT_LEASE_TIMEOUT = 600
+# Leases older than this are assumed to be left by a crashed run
+DEFAULT_LEASE_TTL = 4 * 60 * 60
+
+# The force:user:create definition files, one per permission profile
+USER_DEFINITIONS_DIR = Path(__file__).resolve().parent / "qa_org" / "users"
+
+
+class UserPoolError(Exception):
+    """A pool user could not be created or leased"""
+
+
+def get_definition_path(profile):
+    """Returns the user definition file of a profile, e.g. perms_test_user."""
+    path = USER_DEFINITIONS_DIR / f"{profile}.json"
+    if not path.exists():
+        raise UserPoolError(f"No user definition {path.name} in {USER_DEFINITIONS_DIR}")
+    return path
+
+
+def get_holder():
+    """Returns the name leases of this robot process are held under."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def is_process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    return True
+
+
+class SfdxUserBackend:
+    """Creates pool users with force:user:create, like the
+    create_perms_testing_user task. sfdx keeps the login details of the
+    users it creates, so a user logs in through its sfdx alias.
+    """
+
+    def __init__(self, org_username):
+        self.org_username = org_username
+
+    def create_user(self, definition_path, alias):
+        p = sfdx(
+            "force:user:create",
+            username=self.org_username,
+            args=["--definitionfile", str(definition_path), "-a", alias, "--json"],
+            log_note=f"Creating pool user {alias}",
+        )
+        output = p.stdout_text.read()
+        try:
+            fields = json.loads(output)["result"]["fields"]
+        except (ValueError, KeyError, TypeError):
+            raise UserPoolError(
+                f"Could not create pool user {alias}:\n{output}\n{p.stderr_text.read()}"
+            )
+        return {"id": fields["id"], "username": fields["username"]}
+
+
+class UserPool:
+    """The pool users of one org, in a lease table shared by robot processes
+
+    The table is a JSON file listing the users of each profile and, for a
+    leased user, the process holding it. Every read and write of the table
+    happens under a file lock, so parallel robot processes never lease the
+    same user. Leases of processes that died, or older than lease_ttl, are
+    given to the next process asking.
+    """
+
+    def __init__(self, path, backend, size=DEFAULT_POOL_SIZE, lease_ttl=None):
+        self.path = Path(path)
+        self.backend = backend
+        self.size = int(size)
+        self.lease_ttl = DEFAULT_LEASE_TTL if lease_ttl is None else float(lease_ttl)
+        # Creating users takes a while, so wait and hold the lock for longer
+        self.lock = FileLock(
+            self.path.with_suffix(".lock"), timeout=900, stale_after=900
+        )
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"users": {}}
+
+    def _write(self, table):
+        temp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(table, f, indent=2)
+        os.replace(temp_path, self.path)
+
+    def get_users(self, profile):
+        """Returns the users of a profile and their leases."""
+        return self._read()["users"].get(profile, [])
+
+    def provision(self, profile):
+        """Creates the users the pool of a profile is missing.
+
+        Users are created once per org; later calls only read the table.
+        Returns the number of users created.
+        """
+        if len(self.get_users(profile)) >= self.size:
+            return 0
+        definition_path = get_definition_path(profile)
+        # sfdx aliases are shared by every org on the machine
+        alias_prefix = f"{profile}-{self.path.stem[:6]}"
+        created = 0
+        with self.lock:
+            table = self._read()
+            users = table["users"].setdefault(profile, [])
+            while len(users) < self.size:
+                alias = f"{alias_prefix}-{len(users) + 1}"
+                user = self.backend.create_user(definition_path, alias)
+                users.append(
+                    {
+                        "id": user["id"],
+                        "username": user["username"],
+                        "alias": alias,
+                        "lease": None,
+                    }
+                )
+                # Keep the users created so far if the next one fails
+                self._write(table)
+                created += 1
+        return created
+
+    def _is_expired(self, lease, now):
+        if now - lease["leased"] > self.lease_ttl:
+            return True
+        host, _, pid = lease["holder"].rpartition(":")
+        return host == socket.gethostname() and not is_process_alive(int(pid))
+
+    def lease(
+        self, profile, holder=None, timeout=DEFAULT_LEASE_TIMEOUT, poll_interval=1
+    ):
+        """Leases a user of a profile to holder, waiting up to timeout seconds
+        for one to be returned when they are all leased.
+
+        A holder asking again gets the user it already holds.
+        """
+        holder = holder or get_holder()
+        deadline = time.monotonic() + float(timeout)
+        while True:
+            with self.lock:
+                table = self._read()
+                users = table["users"].get(profile)
+                if not users:
+                    raise UserPoolError(f"No {profile} users have been provisioned")
+                now = time.time()
+                held = [
+                    user
+                    for user in users
+                    if user["lease"] and user["lease"]["holder"] == holder
+                ]
+                if held:
+                    return held[0]
+                for user in users:
+                    if user["lease"] is None or self._is_expired(user["lease"], now):
+                        user["lease"] = {"holder": holder, "leased": now}
+                        self._write(table)
+                        return user
+            if time.monotonic() >= deadline:
+                raise UserPoolError(
+                    f"All {len(users)} {profile} users are leased by other processes"
+                )
+            time.sleep(poll_interval)
+
+    def release(self, holder=None):
+        """Returns every user leased to holder; returns their aliases."""
+        holder = holder or get_holder()
+        with self.lock:
+            table = self._read()
+            released = []
+            for users in table["users"].values():
+                for user in users:
+                    if user["lease"] and user["lease"]["holder"] == holder:
+                        user["lease"] = None
+                        released.append(user["alias"])
+            if released:
+                self._write(table)
+        return released
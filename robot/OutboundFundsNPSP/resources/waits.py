@@ -0,0 +1,181 @@
+"""Browser-side locator resolution and wait-time instrumentation"""
+
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from selenium.common.exceptions import StaleElementReferenceException
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Returns [index, element, text] for the first of the given XPath
+# expressions that matches an element, preferring visible elements when
+# arguments[1] is true, or null when none match.
+FIND_FIRST_MATCH_JS = """
+var xpaths = arguments[0], visibleOnly = arguments[1];
+for (var i = 0; i < xpaths.length; i++) {
+    var nodes = document.evaluate(
+        xpaths[i], document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+    );
+    for (var j = 0; j < nodes.snapshotLength; j++) {
+        var node = nodes.snapshotItem(j);
+        if (!visibleOnly || node.offsetWidth || node.offsetHeight ||
+                node.getClientRects().length) {
+            return [i, node, (node.innerText || node.textContent || "").trim()];
+        }
+    }
+}
+return null;
+"""
+
+# Returns the number of elements an XPath expression matches.
+COUNT_MATCHES_JS = """
+return document.evaluate(
+    arguments[0], document, null, XPathResult.UNORDERED_NODE_SNAPSHOT_TYPE, null
+).snapshotLength;
+"""
+
+# True once a tab, or the role="tab" element or tab bar list item wrapping
+# it, is selected. Only those are checked, since page containers above the
+# tab bar are marked active too.
+IS_TAB_SELECTED_JS = """
+var tab = arguments[0];
+if (!tab.isConnected) {
+    return false;
+}
+var items = [tab, tab.closest("[role='tab']"), tab.closest("[role='tablist'] li")];
+return items.some(function (item) {
+    return !!item && (item.getAttribute("aria-selected") === "true" ||
+        item.classList.contains("slds-is-active") || item.classList.contains("active"));
+});
+"""
+
+# True once no Lightning spinner is visible and the document has loaded.
+IS_LOADING_COMPLETE_JS = """
+if (document.readyState !== "complete") {
+    return false;
+}
+var spinners = document.querySelectorAll(".slds-spinner_container, .forceListViewManagerLoading");
+for (var i = 0; i < spinners.length; i++) {
+    if (spinners[i].offsetWidth || spinners[i].offsetHeight) {
+        return false;
+    }
+}
+return true;
+"""
+
+# True once a tab is selected or, in a tab bar that doesn't mark its
+# selected tab, once the page has finished loading.
+IS_TAB_SHOWN_JS = """
+var tab = arguments[0];
+var isSelected = function () {%s};
+var isLoadingComplete = function () {%s};
+if (isSelected(tab)) {
+    return true;
+}
+var tabBar = tab.isConnected && tab.closest("[role='tablist']");
+if (tabBar && tabBar.querySelector("[aria-selected], li.slds-is-active, li.active")) {
+    return false;
+}
+return isLoadingComplete();
+""" % (
+    IS_TAB_SELECTED_JS,
+    IS_LOADING_COMPLETE_JS,
+)
+
+
+class WaitRecorder:
+    """Collects how long each keyword spends waiting on the browser"""
+
+    def __init__(self):
+        self.durations = defaultdict(list)
+        self.failures = defaultdict(int)
+
+    @contextmanager
+    def timed(self, name):
+        """Records the time spent in the with block under the given name."""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.failures[name] += 1
+            raise
+        finally:
+            self.durations[name].append(time.perf_counter() - start)
+
+    def summary(self):
+        """Returns one dict per wait name, the longest total wait first."""
+        rows = [
+            {
+                "name": name,
+                "count": len(durations),
+                "total": sum(durations),
+                "max": max(durations),
+                "mean": sum(durations) / len(durations),
+                "failures": self.failures[name],
+            }
+            for name, durations in self.durations.items()
+        ]
+        return sorted(rows, key=lambda row: row["total"], reverse=True)
+
+    def format_report(self):
+        """Returns the summary as a text table."""
+        lines = [
+            f"{'Wait':<40} {'Count':>6} {'Total s':>9} {'Mean s':>8} {'Max s':>8} {'Failures':>8}"
+        ]
+        for row in self.summary():
+            lines.append(
+                f"{row['name']:<40} {row['count']:>6} {row['total']:>9.3f} "
+                f"{row['mean']:>8.3f} {row['max']:>8.3f} {row['failures']:>8}"
+            )
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def reset(self):
+        self.durations.clear()
+        self.failures.clear()
+
+
+def find_first_match(driver, xpaths, visible_only=False):
+    """Resolves alternative locators in a single execute_script call.
+
+    Returns (index, element, text) for the first locator that matches, or
+    None when no locator matches.
+    """
+    result = driver.execute_script(FIND_FIRST_MATCH_JS, list(xpaths), visible_only)
+    return tuple(result) if result else None
+
+
+def count_matches(driver, xpath):
+    """Counts the elements matching a locator in a single execute_script call,
+    without fetching a reference to each of them.
+    """
+    return driver.execute_script(COUNT_MATCHES_JS, xpath)
+
+
+def wait_for_script(driver, script, *args, timeout=10, poll_frequency=0.1):
+    """Waits until a script returns a truthy value and returns that value.
+
+    Raises selenium's TimeoutException when the timeout passes first.
+    """
+    wait = WebDriverWait(
+        driver,
+        timeout,
+        poll_frequency=poll_frequency,
+        # Lightning re-renders tabs while switching; keep polling until the
+        # timeout rather than failing on the first stale reference.
+        ignored_exceptions=(StaleElementReferenceException,),
+    )
+    return wait.until(lambda driver: driver.execute_script(script, *args))
+
+
+def wait_for_count(driver, xpath, count, timeout=10, poll_frequency=0.1):
+    """Waits until a locator matches exactly count elements.
+
+    Raises selenium's TimeoutException when the timeout passes first.
+    """
+    wait = WebDriverWait(driver, timeout, poll_frequency=poll_frequency)
+    wait.until(lambda driver: count_matches(driver, xpath) == int(count))
@@ -0,0 +1,170 @@
+"""Offline cost and ambiguity profile of the locators against saved pages"""
+
+import gzip
+import re
+import statistics
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from lxml import etree
+
+from locator_registry import get_field_count
+
+# The page as the browser has rendered it, including what Lightning added
+# after the load, for Save DOM Snapshot.
+DOM_SNAPSHOT_JS = """
+return "<!DOCTYPE html>\\n" + document.documentElement.outerHTML;
+"""
+
+DEFAULT_SAMPLE_ARG = "Status"
+
+# Arguments the locators are filled in with, chosen to match something on
+# the Funding Program, Funding Request, Disbursement and GAU Expenditure
+# pages. Locators not listed get DEFAULT_SAMPLE_ARG for every field.
+SAMPLE_ARGS = {
+    "app_launcher.app_link": ["Outbound Funds"],
+    "app_launcher.app_link_search_result": ["Outbound Funds"],
+    "new_record.label": ["Funding Request Name"],
+    "new_record.title": ["New Funding Request"],
+    "new_record.edit_title": ["Edit"],
+    "new_record.text_field": ["Funding Request Name"],
+    "new_record.dropdown_value": ["Submitted"],
+    "new_record.dd_selection": ["Submitted"],
+    "new_record.button": ["Save"],
+    "new_record.lookup_field": ["Search Funding Programs..."],
+    "new_record.lightning_lookup": ["Funding Program"],
+    "new_record.lookup_value": ["Robot Test"],
+    "new_record.field_input": ["Requested Amount"],
+    "new_record.date_field": ["Application Date"],
+    "new_record.select_date": ["15"],
+    "new_record.text-field": ["Funding Request Name"],
+    "new_record.footer_button": ["Save"],
+    "confirm.check_value": ["Status", "In progress"],
+    "confirm.check_status": ["Status", "Submitted"],
+    "confirm.check_numbers": ["Requested Amount", "10,000"],
+    "tab.tab_header": ["Details"],
+    "tab.record_detail_tab": ["Related"],
+    "tab.verify_details": ["Status"],
+    "tabs.tab": ["Details"],
+    "tabs.spl-tab": ["GAU Expenditures"],
+    "related.title": ["Disbursements"],
+    "related.button": ["Disbursements", "New"],
+    "related.flexi_button": ["Disbursements", "New"],
+    "related.flexi_link": ["View All"],
+    "details.button": ["Edit"],
+    "details.header": ["Robot Test"],
+    "manage_expenditures.button": ["Save Updates"],
+    "toast": ["Success!"],
+    "link": ["View All"],
+    "button-with-text": ["Save"],
+}
+
+# Structural patterns that make a locator slow regardless of the page
+COST_PATTERNS = (
+    # [//x] in a predicate scans the whole document once per candidate node
+    (re.compile(r"\[\s*//"), "predicate scans the whole document"),
+    # //following-sibling:: visits every descendant before its siblings
+    (re.compile(r"//following-sibling::"), "//following-sibling"),
+)
+
+
+def load_snapshot(path):
+    """Returns the parsed document of a saved page, gzipped or not."""
+    if str(path).endswith(".gz"):
+        with gzip.open(path) as f:
+            return etree.parse(f, etree.HTMLParser())
+    return etree.parse(str(path), etree.HTMLParser())
+
+
+def load_snapshots(paths):
+    """Returns {page name: document} for .html files, the .html.gz snapshots
+    of failures, and directories of them.
+    """
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files.extend(
+                sorted(list(path.glob("*.html")) + list(path.glob("*.html.gz")))
+            )
+        else:
+            files.append(path)
+    return OrderedDict((path.name.split(".")[0], load_snapshot(path)) for path in files)
+
+
+def get_sample_args(path, template, samples=None):
+    """Returns the arguments a locator is profiled with."""
+    args = list((SAMPLE_ARGS if samples is None else samples).get(path, []))
+    count = get_field_count(template)
+    return (args + [DEFAULT_SAMPLE_ARG] * count)[:count]
+
+
+def get_cost_notes(xpath):
+    return [note for pattern, note in COST_PATTERNS if pattern.search(xpath)]
+
+
+def time_xpath(xpath, document, repeat=5):
+    """Returns (match count, fastest of repeat evaluations in ms)."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = xpath(document)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    count = len(result) if isinstance(result, list) else int(bool(result))
+    return count, best * 1000
+
+
+def profile_locators(service, snapshots, samples=None, repeat=5, prefixes=()):
+    """Evaluates every locator of a LocatorService against every snapshot.
+
+    Returns a row per locator, slowest first, with the match count and
+    evaluation time on each page.
+    """
+    rows = []
+    for path, template in service.templates.items():
+        if prefixes and not path.startswith(tuple(prefixes)):
+            continue
+        row = {"locator": path, "matches": OrderedDict(), "ms": OrderedDict()}
+        try:
+            row["xpath"] = service.render(
+                path, *get_sample_args(path, template, samples)
+            )
+            xpath = etree.XPath(row["xpath"])
+        except (IndexError, KeyError, ValueError, etree.XPathSyntaxError) as e:
+            row.update(xpath=template, error=str(e), median_ms=0, max_ms=0)
+            row["notes"] = ["could not be evaluated"]
+            rows.append(row)
+            continue
+        for page, document in snapshots.items():
+            row["matches"][page], row["ms"][page] = time_xpath(xpath, document, repeat)
+        times = list(row["ms"].values()) or [0]
+        row["median_ms"] = statistics.median(times)
+        row["max_ms"] = max(times)
+        row["notes"] = get_cost_notes(row["xpath"])
+        if any(count > 1 for count in row["matches"].values()):
+            row["notes"].append("ambiguous")
+        if not any(row["matches"].values()):
+            row["notes"].append("no matches")
+        rows.append(row)
+    return sorted(rows, key=lambda row: (-row["max_ms"], row["locator"]))
+
+
+def format_profile(rows, pages):
+    """Returns a table of the profile, one line per locator."""
+    width = max([len(row["locator"]) for row in rows] + [len("Locator")])
+    lines = [
+        f"{'Locator':<{width}} {'Max ms':>8} {'Median ms':>9}  "
+        + "Matches ("
+        + ", ".join(pages)
+        + ")"
+    ]
+    for row in rows:
+        matches = "/".join(str(row["matches"].get(page, "-")) for page in pages)
+        notes = "; ".join(row["notes"])
+        lines.append(
+            f"{row['locator']:<{width}} {row['max_ms']:>8.2f} "
+            f"{row['median_ms']:>9.2f}  {matches:<{len(pages) * 2}}"
+            + (f"  {notes}" if notes else "")
+        )
+    return "\n".join(lines)
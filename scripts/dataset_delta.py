@@ -0,0 +1,434 @@
+"""Writes the rows that changed between two versions of a storytelling dataset.
+
+Every row gets a key that doesn't depend on its id: the values of the
+step's own key fields, Name unless --key gives others. Steps without a Name
+need a --key. Rows whose key is new are inserts; rows whose key exists in
+both versions with different values, including a looked up row whose key
+changed, are updates. The delta is written as a SQL dataset plus a mapping
+that upserts each object on its key, so a long-lived org can be refreshed
+without a full reload:
+
+    python scripts/dataset_delta.py HEAD~1:datasets/data.sql datasets/data.sql --key ...
+    cci task run load_storytelling_data_delta --org qa
+
+etl_upsert matches org records on the key fields, so they must be unique
+in the new version. These keys are unique in datasets/data.sql:
+
+    Contact=FirstName,LastName
+    outfunds__Funding_Request__c=Name,outfunds__Application_Date__c
+    outfunds__Funding_Request_Role__c=outfunds__Role__c,outfunds__Status__c
+    outfunds__Disbursement__c=outfunds__Type__c,outfunds__Scheduled_Date__c
+    outfunds__Requirement__c=Name,outfunds__Due_Date__c,outfunds__Completed_Date__c
+
+With --external-id-field, the objects that have that field in force-app
+upsert on it instead. It holds a hash of the key, and rows with the same
+key are told apart by their order in the dataset, so objects with no
+unique fields, like GAU_Expenditure__c, can still be given a key such as
+Amount__c.
+
+Either version may be a file or a git object like REF:datasets/data.sql.
+Rows that the delta rows look up are written too, so LoadData can resolve
+their lookups; upserting those unchanged rows leaves them as they are.
+Rows removed from the dataset are reported but not deleted.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import subprocess
+from collections import Counter, OrderedDict
+
+import click
+import yaml
+
+from dataset_mapping import (
+    DEFAULT_MAPPING_PATH,
+    create_table_sql,
+    get_columns,
+    get_load_waves,
+    load_mapping,
+    load_sql,
+    quote,
+)
+
+DEFAULT_SQL_OUTPUT = "datasets/delta.sql"
+DEFAULT_MAPPING_OUTPUT = "datasets/delta_mapping.yml"
+DEFAULT_OBJECTS_DIR = "force-app/main/default/objects"
+
+
+def get_key_fields(step, overrides=None):
+    """Returns the fields that identify a row of the step, or None when it
+    has no Name and no key was given for it.
+    """
+    if overrides and step.name in overrides:
+        return overrides[step.name]
+    if "Name" in step.fields:
+        return ["Name"]
+    return None
+
+
+def get_objects_with_field(field, objects_dir=DEFAULT_OBJECTS_DIR):
+    """Returns the names of the objects whose source defines the field."""
+    if not os.path.isdir(objects_dir):
+        return set()
+    return {
+        name
+        for name in os.listdir(objects_dir)
+        if os.path.exists(
+            os.path.join(objects_dir, name, "fields", f"{field}.field-meta.xml")
+        )
+    }
+
+
+def read_rows(connection, step):
+    """Returns {id: {column: value}} for a step's table."""
+    columns = [
+        column
+        for column in step.columns
+        if column in get_columns(connection, step.table)
+    ]
+    query = "SELECT id, {} FROM {} ORDER BY id".format(
+        ", ".join(quote(column) for column in columns), quote(step.table)
+    )
+    return OrderedDict(
+        (row[0], dict(zip(columns, row[1:]))) for row in connection.execute(query)
+    )
+
+
+def as_id(value):
+    return int(value) if value not in (None, "") else None
+
+
+class DatasetVersion:
+    """The rows of one version of a dataset, each with its stable key"""
+
+    def __init__(self, steps, connection, key_overrides=None):
+        self.steps = steps
+        self.rows = {}
+        self.keys = {}
+        self.ids_by_key = {}
+        self.duplicates = {}
+        # Parents before children, so a row's parents already have keys
+        for wave in get_load_waves(steps):
+            for name in wave:
+                self._add_step(steps[name], connection, key_overrides)
+
+    def _add_step(self, step, connection, key_overrides):
+        rows = read_rows(connection, step)
+        key_fields = get_key_fields(step, key_overrides)
+        if key_fields is None:
+            raise ValueError(f"No key fields for {step.name}")
+        keys = {}
+        seen = Counter()
+        for row_id, row in rows.items():
+            # Only the row's own fields: a renamed parent makes its children
+            # updates, not new rows
+            values = [row.get(field) for field in key_fields]
+            material = json.dumps([step.name] + values)
+            # Rows with the same key fields are told apart by their order in
+            # the dataset
+            seen[material] += 1
+            if seen[material] > 1:
+                material += f"#{seen[material]}"
+                self.duplicates.setdefault(step.name, []).append(
+                    dict(zip(key_fields, values))
+                )
+            keys[row_id] = hashlib.sha1(material.encode()).hexdigest()[:20]
+        self.rows[step.name] = rows
+        self.keys[step.name] = keys
+        self.ids_by_key[step.name] = {key: row_id for row_id, key in keys.items()}
+
+    def get_parent_key(self, lookup, value):
+        parent_id = as_id(value)
+        if parent_id is None:
+            return None
+        parent = self.step_for_table(lookup.table)
+        return self.keys.get(parent.name, {}).get(parent_id, f"missing {parent_id}")
+
+    def step_for_table(self, table):
+        for step in self.steps.values():
+            if step.table == table:
+                return step
+        raise KeyError(f"No step loads table {table}")
+
+    def get_content(self, step, row_id):
+        """Returns a row's values with lookups replaced by the parents' keys."""
+        row = self.rows[step.name][row_id]
+        content = [row.get(field) for field in step.fields]
+        # Self lookups point at rows of this step, which have keys by now
+        content += [
+            self.get_parent_key(lookup, row.get(lookup.column))
+            for lookup in step.lookups
+        ]
+        return content
+
+
+class DatasetDelta:
+    """The inserted, updated and removed rows of each step"""
+
+    def __init__(self, old, new):
+        self.new = new
+        self.inserts = OrderedDict()
+        self.updates = OrderedDict()
+        self.removed = OrderedDict()
+        self.unchanged = OrderedDict()
+        for name, step in new.steps.items():
+            old_ids = old.ids_by_key.get(name, {})
+            inserts, updates, unchanged = [], [], 0
+            for row_id, key in new.keys[name].items():
+                if key not in old_ids:
+                    inserts.append(row_id)
+                elif old.get_content(step, old_ids[key]) != new.get_content(
+                    step, row_id
+                ):
+                    updates.append(row_id)
+                else:
+                    unchanged += 1
+            self.inserts[name] = inserts
+            self.updates[name] = updates
+            self.unchanged[name] = unchanged
+            self.removed[name] = len(set(old_ids) - set(new.ids_by_key[name]))
+
+    def get_rows_to_write(self):
+        """Returns {step name: set of new ids}: the changed rows and every
+        row they look up, directly or through other rows.
+        """
+        needed = {
+            name: set(self.inserts[name]) | set(self.updates[name])
+            for name in self.new.steps
+        }
+        pending = [(name, row_id) for name, ids in needed.items() for row_id in ids]
+        while pending:
+            name, row_id = pending.pop()
+            step = self.new.steps[name]
+            row = self.new.rows[name][row_id]
+            for lookup in step.lookups:
+                parent_id = as_id(row.get(lookup.column))
+                parent = self.new.step_for_table(lookup.table)
+                if (
+                    parent_id in self.new.rows.get(parent.name, {})
+                    and parent_id not in needed[parent.name]
+                ):
+                    needed[parent.name].add(parent_id)
+                    pending.append((parent.name, parent_id))
+        return needed
+
+    def format(self):
+        lines = []
+        for name in self.new.steps:
+            lines.append(
+                f"{name}: {len(self.inserts[name])} inserted, "
+                f"{len(self.updates[name])} updated, {self.unchanged[name]} unchanged, "
+                f"{self.removed[name]} removed"
+            )
+        return "\n".join(lines)
+
+
+def write_delta_sql(delta, path, external_id_field=None, external_id_steps=()):
+    """Writes the delta rows as a SQL dataset in the style of data.sql.
+
+    The tables of external_id_steps get an external_id_field column holding
+    the row keys.
+    """
+    connection = sqlite3.connect(":memory:")
+    for name, ids in delta.get_rows_to_write().items():
+        step = delta.new.steps[name]
+        extra_fields = [external_id_field] if name in external_id_steps else []
+        connection.execute(create_table_sql(step, extra_fields))
+        rows = delta.new.rows[name]
+        keys = delta.new.keys[name]
+        connection.executemany(
+            "INSERT INTO {} VALUES ({})".format(
+                quote(step.table),
+                ", ".join("?" * (len(step.columns) + len(extra_fields) + 1)),
+            ),
+            [
+                [row_id]
+                + [rows[row_id].get(column) for column in step.columns]
+                + [keys[row_id] for _ in extra_fields]
+                for row_id in sorted(ids)
+            ],
+        )
+    with open(path, "w") as f:
+        for line in connection.iterdump():
+            f.write(line + "\n")
+
+
+def build_delta_mapping(
+    mapping,
+    steps,
+    external_id_field=None,
+    key_overrides=None,
+    external_id_steps=(),
+):
+    """Returns the mapping with every step upserting on its key.
+
+    external_id_steps upsert on the external id field, which holds the row
+    keys. The other steps use etl_upsert on their key fields.
+    """
+    delta_mapping = OrderedDict()
+    for name, settings in mapping.items():
+        settings = dict(settings)
+        if name in external_id_steps:
+            settings["fields"] = list(settings.get("fields") or []) + [
+                external_id_field
+            ]
+            settings["action"] = "upsert"
+            settings["update_key"] = external_id_field
+        else:
+            settings["action"] = "etl_upsert"
+            settings["update_key"] = get_key_fields(steps[name], key_overrides)
+        delta_mapping[name] = settings
+    return delta_mapping
+
+
+def read_source(source):
+    """Returns the SQL in a file, or in a git object like REF:path."""
+    if os.path.exists(source):
+        with open(source) as f:
+            return f.read()
+    try:
+        return subprocess.run(
+            ["git", "show", source], capture_output=True, text=True, check=True
+        ).stdout
+    except (OSError, subprocess.CalledProcessError) as error:
+        stderr = getattr(error, "stderr", None)
+        raise click.BadParameter(
+            f"{source} is neither a file nor a git object ({(stderr or str(error)).strip()})"
+        )
+
+
+def parse_keys(ctx, param, values):
+    overrides = {}
+    for value in values:
+        name, _, fields = value.partition("=")
+        if not fields:
+            raise click.BadParameter(f"expected STEP=FIELD[,FIELD...], got {value}")
+        overrides[name] = fields.split(",")
+    return overrides
+
+
+@click.command()
+@click.argument("old")
+@click.argument("new")
+@click.option(
+    "--mapping",
+    default=DEFAULT_MAPPING_PATH,
+    show_default=True,
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--output-sql",
+    default=DEFAULT_SQL_OUTPUT,
+    show_default=True,
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--output-mapping",
+    default=DEFAULT_MAPPING_OUTPUT,
+    show_default=True,
+    type=click.Path(dir_okay=False),
+)
+@click.option(
+    "--external-id-field",
+    help="External id field to write the row keys to and upsert on, for the "
+    "objects that have it. Other objects are upserted on their key fields "
+    "with etl_upsert.",
+)
+@click.option(
+    "--objects-dir",
+    default=DEFAULT_OBJECTS_DIR,
+    show_default=True,
+    type=click.Path(file_okay=False),
+    help="Object source to look up which objects have the external id field.",
+)
+@click.option(
+    "--key",
+    "key_overrides",
+    multiple=True,
+    callback=parse_keys,
+    metavar="STEP=FIELD[,FIELD...]",
+    help="Fields identifying the rows of a step: its own fields, not lookups. "
+    "Required for steps without a Name. Repeatable.",
+)
+def main(
+    old,
+    new,
+    mapping,
+    output_sql,
+    output_mapping,
+    external_id_field,
+    objects_dir,
+    key_overrides,
+):
+    """Writes the rows of NEW that are not in OLD, or differ from it."""
+    steps = load_mapping(mapping)
+    unknown = set(key_overrides) - set(steps)
+    if unknown:
+        raise click.UsageError(
+            "--key names unknown steps: " + ", ".join(sorted(unknown))
+        )
+    for name, fields in key_overrides.items():
+        not_mapped = [field for field in fields if field not in steps[name].fields]
+        if not_mapped:
+            raise click.UsageError(
+                f"--key for {name} names fields it doesn't map: "
+                + ", ".join(not_mapped)
+            )
+    no_key = [
+        name for name in steps if get_key_fields(steps[name], key_overrides) is None
+    ]
+    if no_key:
+        raise click.UsageError(
+            "Give a --key STEP=FIELD[,FIELD...] for the steps without a Name: "
+            + ", ".join(no_key)
+        )
+    external_id_steps = set()
+    if external_id_field:
+        objects = get_objects_with_field(external_id_field, objects_dir)
+        external_id_steps = {
+            name for name, step in steps.items() if step.sf_object in objects
+        }
+        if not external_id_steps:
+            raise click.UsageError(
+                f"No mapped object in {objects_dir} has the field {external_id_field}"
+            )
+
+    old_version = DatasetVersion(steps, load_sql(read_source(old)), key_overrides)
+    new_version = DatasetVersion(steps, load_sql(read_source(new)), key_overrides)
+    not_unique = [
+        f"{name} ({', '.join(OrderedDict.fromkeys(map(json.dumps, duplicates)))})"
+        for name, duplicates in new_version.duplicates.items()
+        if name not in external_id_steps
+    ]
+    if not_unique:
+        raise click.UsageError(
+            "etl_upsert can't tell apart the rows with the same key fields in "
+            "NEW; give unique --key fields for: " + "; ".join(not_unique)
+        )
+    delta = DatasetDelta(old_version, new_version)
+    click.echo(delta.format())
+
+    write_delta_sql(delta, output_sql, external_id_field, external_id_steps)
+    with open(mapping) as f:
+        original_mapping = yaml.safe_load(f)
+    with open(output_mapping, "w") as f:
+        yaml.safe_dump(
+            dict(
+                build_delta_mapping(
+                    original_mapping,
+                    steps,
+                    external_id_field,
+                    key_overrides,
+                    external_id_steps,
+                )
+            ),
+            f,
+            sort_keys=False,
+        )
+    click.echo(f"Wrote {output_sql} and {output_mapping}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""The bulk data mapping and the SQL datasets it describes"""
+
+import sqlite3
+from collections import OrderedDict
+
+import yaml
+
+DEFAULT_MAPPING_PATH = "datasets/mapping.yml"
+DEFAULT_SQL_PATH = "datasets/data.sql"
+
+
+class Lookup:
+    """A lookup field of a mapping step and the column holding its key"""
+
+    def __init__(self, field, settings):
+        self.field = field
+        self.column = settings.get("key_field") or field
+        self.table = settings["table"]
+        # Lookups with "after" are filled in by a second pass once the
+        # table they point at has been loaded.
+        self.after = settings.get("after")
+
+    def __repr__(self):
+        return f"Lookup({self.field!r} -> {self.table!r})"
+
+
+class Step:
+    """One sobject in the mapping, loaded into and extracted from one table"""
+
+    def __init__(self, name, settings):
+        self.name = name
+        self.sf_object = settings["sf_object"]
+        self.table = settings["table"]
+        self.fields = list(settings.get("fields") or [])
+        self.lookups = [
+            Lookup(field, lookup)
+            for field, lookup in (settings.get("lookups") or {}).items()
+        ]
+
+    @property
+    def columns(self):
+        """The table's columns after id: mapped fields, then lookup keys."""
+        return self.fields + [lookup.column for lookup in self.lookups]
+
+    def __repr__(self):
+        return f"Step({self.name!r})"
+
+
+def load_mapping(path=DEFAULT_MAPPING_PATH):
+    """Returns {step name: Step} in mapping order."""
+    with open(path) as f:
+        mapping = yaml.safe_load(f)
+    return OrderedDict(
+        (name, Step(name, settings)) for name, settings in mapping.items()
+    )
+
+
+def quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def create_table_sql(step, extra_fields=()):
+    """Returns the CREATE TABLE statement for a step, as in datasets/data.sql.
+
+    extra_fields are added as columns after the step's own columns.
+    """
+    columns = ["\tid INTEGER NOT NULL"]
+    columns += [
+        f"\t{quote(column)} VARCHAR(255)"
+        for column in step.columns + list(extra_fields)
+    ]
+    columns.append("\tPRIMARY KEY (id)")
+    return f"CREATE TABLE {quote(step.table)} (\n" + ", \n".join(columns) + "\n)"
+
+
+def open_sql_dataset(path=DEFAULT_SQL_PATH, connection=None):
+    """Loads a SQL dump like datasets/data.sql into an in-memory database."""
+    with open(path) as f:
+        return load_sql(f.read(), connection)
+
+
+def load_sql(script, connection=None):
+    """Runs a SQL dump in a new in-memory database, or the given one."""
+    connection = connection or sqlite3.connect(":memory:")
+    connection.executescript(script)
+    return connection
+
+
+def get_columns(connection, table):
+    """Returns the column names of a table, or [] when it doesn't exist."""
+    return [row[1] for row in connection.execute(f"PRAGMA table_info({quote(table)})")]
+
+
+def get_dependencies(steps):
+    """Returns {step name: set of step names it must be loaded after}.
+
+    Self lookups and lookups marked "after" are filled in by a later pass,
+    so they don't order the steps.
+    """
+    steps_by_table = {step.table: name for name, step in steps.items()}
+    dependencies = OrderedDict()
+    for name, step in steps.items():
+        dependencies[name] = {
+            steps_by_table[lookup.table]
+            for lookup in step.lookups
+            if not lookup.after
+            and lookup.table in steps_by_table
+            and steps_by_table[lookup.table] != name
+        }
+    return dependencies
+
+
+def get_load_waves(steps):
+    """Returns the steps as waves of names, in mapping order within a wave.
+
+    Every step comes after the steps it looks up, so the steps of one wave
+    can be loaded at the same time once the earlier waves are loaded.
+    Raises ValueError naming the steps involved if the lookups form a cycle.
+    """
+    remaining = get_dependencies(steps)
+    loaded = set()
+    waves = []
+    while remaining:
+        wave = [name for name, parents in remaining.items() if parents <= loaded]
+        if not wave:
+            raise ValueError("Lookup cycle between " + ", ".join(remaining))
+        waves.append(wave)
+        loaded.update(wave)
+        for name in wave:
+            del remaining[name]
+    return waves
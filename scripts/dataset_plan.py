@@ -0,0 +1,214 @@
+"""Checks a storytelling dataset against datasets/mapping.yml and plans its load.
+
+The dataset is copied into an in-memory SQLite database with an index on
+every lookup column. The checks are:
+
+- every mapped table and column exists,
+- every lookup points at a mapped table,
+- every filled lookup refers to an existing row (one query over all lookups),
+- mapped tables with no rows and mapped fields that are empty in every row
+  are reported as warnings.
+
+The load order is printed as waves: the objects of one wave only look up
+objects of earlier waves, so they can be loaded at the same time.
+"""
+
+import json
+import sqlite3
+import sys
+
+import click
+
+from dataset_mapping import (
+    DEFAULT_MAPPING_PATH,
+    DEFAULT_SQL_PATH,
+    get_columns,
+    get_load_waves,
+    load_mapping,
+    open_sql_dataset,
+    quote,
+)
+
+# Dangling references listed per lookup before the rest are only counted.
+MAX_DANGLING_EXAMPLES = 5
+
+
+class DatasetPlan:
+    """The problems found in a dataset and the waves to load it in"""
+
+    def __init__(self, steps, connection):
+        self.steps = steps
+        self.connection = connection
+        self.errors = []
+        self.warnings = []
+        self.row_counts = {}
+        self.waves = []
+
+    def check(self):
+        tables = {step.table for step in self.steps.values()}
+        checkable = []
+        for step in self.steps.values():
+            columns = get_columns(self.connection, step.table)
+            if not columns:
+                self.errors.append(f"{step.name}: table {step.table} is missing")
+                continue
+            missing = [column for column in step.columns if column not in columns]
+            for column in missing:
+                self.errors.append(f"{step.name}: column {column} is missing")
+            for lookup in step.lookups:
+                if lookup.table not in tables:
+                    self.errors.append(
+                        f"{step.name}.{lookup.field}: looks up {lookup.table}, "
+                        "which is not mapped"
+                    )
+            if not missing:
+                checkable.append(step)
+        self.index_lookups(checkable)
+        self.check_references(
+            [
+                (step, lookup)
+                for step in checkable
+                for lookup in step.lookups
+                if lookup.table in tables and get_columns(self.connection, lookup.table)
+            ]
+        )
+        for step in checkable:
+            self.check_empty(step)
+        try:
+            self.waves = get_load_waves(self.steps)
+        except ValueError as e:
+            self.errors.append(str(e))
+        return self
+
+    def index_lookups(self, steps):
+        for step in steps:
+            for lookup in step.lookups:
+                self.connection.execute(
+                    "CREATE INDEX IF NOT EXISTS {} ON {} ({})".format(
+                        quote(f"lookup_{step.table}_{lookup.column}"),
+                        quote(step.table),
+                        quote(lookup.column),
+                    )
+                )
+
+    def check_references(self, lookups):
+        """Finds the dangling references of every lookup in one query."""
+        if not lookups:
+            return
+        selects = [
+            f"SELECT {index} AS lookup, child.id, child.{quote(lookup.column)} "
+            f"FROM {quote(step.table)} AS child "
+            f"LEFT JOIN {quote(lookup.table)} AS parent "
+            f"ON parent.id = CAST(child.{quote(lookup.column)} AS INTEGER) "
+            f"WHERE child.{quote(lookup.column)} IS NOT NULL "
+            f"AND child.{quote(lookup.column)} != '' AND parent.id IS NULL"
+            for index, (step, lookup) in enumerate(lookups)
+        ]
+        dangling = {}
+        for index, row_id, value in self.connection.execute(
+            " UNION ALL ".join(selects) + " ORDER BY lookup, child.id"
+        ):
+            dangling.setdefault(index, []).append((row_id, value))
+        for index, rows in dangling.items():
+            step, lookup = lookups[index]
+            examples = ", ".join(
+                f"row {row_id} -> {value}"
+                for row_id, value in rows[:MAX_DANGLING_EXAMPLES]
+            )
+            more = len(rows) - MAX_DANGLING_EXAMPLES
+            if more > 0:
+                examples += f" and {more} more"
+            self.errors.append(
+                f"{step.name}.{lookup.field}: {len(rows)} rows refer to missing "
+                f"{lookup.table} rows ({examples})"
+            )
+
+    def check_empty(self, step):
+        counts = [
+            f"SUM({quote(column)} IS NOT NULL AND {quote(column)} != '')"
+            for column in step.columns
+        ]
+        row = self.connection.execute(
+            f"SELECT {', '.join(['COUNT(*)'] + counts)} FROM {quote(step.table)}"
+        ).fetchone()
+        self.row_counts[step.name] = row[0]
+        if not row[0]:
+            self.warnings.append(f"{step.name}: no rows")
+            return
+        names = step.fields + [lookup.field for lookup in step.lookups]
+        for name, filled in zip(names, row[1:]):
+            if not filled:
+                self.warnings.append(f"{step.name}.{name}: empty in every row")
+
+    def as_dict(self):
+        return {
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "rows": self.row_counts,
+            "waves": self.waves,
+        }
+
+    def format(self):
+        lines = [f"Error: {error}" for error in self.errors]
+        lines += [f"Warning: {warning}" for warning in self.warnings]
+        lines.append("Load waves:")
+        for number, wave in enumerate(self.waves, 1):
+            lines.append(
+                f"  {number}. "
+                + ", ".join(f"{name} ({self.row_counts.get(name, 0)})" for name in wave)
+            )
+        return "\n".join(lines)
+
+
+def open_dataset(sql_path=None, database=None):
+    """Returns an in-memory copy of a SQL dump or of a SQLite file."""
+    if database:
+        source = sqlite3.connect(f"file:{database}?mode=ro", uri=True)
+        connection = sqlite3.connect(":memory:")
+        source.backup(connection)
+        source.close()
+        return connection
+    return open_sql_dataset(sql_path or DEFAULT_SQL_PATH)
+
+
+@click.command()
+@click.option(
+    "--mapping",
+    default=DEFAULT_MAPPING_PATH,
+    show_default=True,
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--sql",
+    "sql_path",
+    default=DEFAULT_SQL_PATH,
+    show_default=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="SQL dataset to check.",
+)
+@click.option(
+    "--database",
+    type=click.Path(exists=True, dir_okay=False),
+    help="SQLite dataset to check instead of --sql, e.g. from generate_dataset.py.",
+)
+@click.option(
+    "--format",
+    "report_format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+)
+def main(mapping, sql_path, database, report_format):
+    plan = DatasetPlan(load_mapping(mapping), open_dataset(sql_path, database))
+    plan.check()
+    if report_format == "json":
+        json.dump(plan.as_dict(), sys.stdout, indent=2)
+        click.echo()
+    else:
+        click.echo(plan.format())
+    if plan.errors:
+        raise click.ClickException(f"{len(plan.errors)} problems found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Generates a storytelling dataset of any size from datasets/mapping.yml.
+
+Rows are modelled on datasets/data.sql: each generated row copies the
+field values of a template row, and each lookup the template row fills is
+pointed at a random row of the table it looks up, so every foreign key in
+the output is valid. Rows are streamed into the SQLite file in batches, so
+memory use doesn't grow with the size of the dataset.
+
+    python scripts/generate_dataset.py --output datasets/scaled.db \\
+        --count outfunds__Funding_Request__c=100000 \\
+        --count GAU_Expenditure__c=1000000
+
+The file can be loaded with the load_scaled_storytelling_data task.
+"""
+
+import itertools
+import os
+import random
+import sqlite3
+import time
+
+import click
+
+from dataset_mapping import (
+    DEFAULT_MAPPING_PATH,
+    DEFAULT_SQL_PATH,
+    create_table_sql,
+    get_columns,
+    load_mapping,
+    open_sql_dataset,
+    quote,
+)
+
+DEFAULT_BATCH_SIZE = 10000
+
+
+def get_template_rows(connection, step):
+    """Returns the rows of a step's table as lists in Step.columns order.
+
+    Columns the template doesn't have are filled with empty strings.
+    """
+    existing = set(get_columns(connection, step.table))
+    if not existing:
+        return []
+    selected = [
+        quote(column) if column in existing else "''" for column in step.columns
+    ]
+    query = f"SELECT {', '.join(selected)} FROM {quote(step.table)} ORDER BY id"
+    return [list(row) for row in connection.execute(query)]
+
+
+def get_counts(steps, template, scale_factor=1.0, overrides=None):
+    """Returns {table: number of rows to generate}.
+
+    Tables get scale_factor times as many rows as the template has, unless
+    overrides gives a count for the table.
+    """
+    overrides = overrides or {}
+    counts = {}
+    for step in steps.values():
+        if step.table in overrides:
+            counts[step.table] = overrides[step.table]
+        else:
+            (template_count,) = template.execute(
+                f"SELECT COUNT(*) FROM {quote(step.table)}"
+            ).fetchone()
+            counts[step.table] = int(round(template_count * scale_factor))
+    return counts
+
+
+def generate_rows(step, count, template_rows, counts, rng):
+    """Yields count rows for a step, each starting with its id."""
+    lookups = [
+        (len(step.fields) + index, lookup) for index, lookup in enumerate(step.lookups)
+    ]
+    for row_id in range(1, count + 1):
+        if template_rows:
+            values = list(template_rows[(row_id - 1) % len(template_rows)])
+        else:
+            values = [""] * len(step.columns)
+        for position, lookup in lookups:
+            parent_count = counts.get(lookup.table, 0)
+            if parent_count == 0 or (template_rows and not values[position]):
+                # Keep optional lookups empty where the template leaves them empty
+                values[position] = ""
+            else:
+                values[position] = str(rng.randint(1, parent_count))
+        yield [row_id] + values
+
+
+def write_dataset(
+    output,
+    steps,
+    template,
+    counts,
+    seed=0,
+    batch_size=DEFAULT_BATCH_SIZE,
+):
+    """Writes the generated tables to a new SQLite file at output."""
+    if os.path.exists(output):
+        os.remove(output)
+    rng = random.Random(seed)
+    connection = sqlite3.connect(output)
+    try:
+        # The file is rebuilt from scratch on failure, so skip the journal.
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        for step in steps.values():
+            connection.execute(create_table_sql(step))
+            insert = "INSERT INTO {} VALUES ({})".format(
+                quote(step.table), ", ".join("?" * (len(step.columns) + 1))
+            )
+            rows = generate_rows(
+                step,
+                counts[step.table],
+                get_template_rows(template, step),
+                counts,
+                rng,
+            )
+            while True:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    break
+                connection.executemany(insert, batch)
+                connection.commit()
+    finally:
+        connection.close()
+
+
+def parse_count(ctx, param, values):
+    counts = {}
+    for value in values:
+        table, _, count = value.partition("=")
+        try:
+            counts[table] = int(count)
+        except ValueError:
+            raise click.BadParameter(f"expected TABLE=ROWS, got {value}")
+        if counts[table] < 0:
+            raise click.BadParameter(f"row count for {table} must not be negative")
+    return counts
+
+
+@click.command()
+@click.option(
+    "--output",
+    "-o",
+    required=True,
+    type=click.Path(dir_okay=False),
+    help="SQLite file to write. An existing file is replaced.",
+)
+@click.option(
+    "--mapping",
+    default=DEFAULT_MAPPING_PATH,
+    show_default=True,
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--template",
+    default=DEFAULT_SQL_PATH,
+    show_default=True,
+    type=click.Path(exists=True, dir_okay=False),
+    help="SQL dataset the generated rows are modelled on.",
+)
+@click.option(
+    "--scale-factor",
+    type=click.FloatRange(min=0),
+    default=1.0,
+    show_default=True,
+    help="Rows per table, as a multiple of the template's rows.",
+)
+@click.option(
+    "--count",
+    "overrides",
+    multiple=True,
+    callback=parse_count,
+    metavar="TABLE=ROWS",
+    help="Row count for one table, overriding --scale-factor. Repeatable.",
+)
+@click.option("--seed", type=int, default=0, show_default=True)
+@click.option(
+    "--batch-size",
+    type=click.IntRange(min=1),
+    default=DEFAULT_BATCH_SIZE,
+    show_default=True,
+)
+def main(output, mapping, template, scale_factor, overrides, seed, batch_size):
+    steps = load_mapping(mapping)
+    unknown = set(overrides) - {step.table for step in steps.values()}
+    if unknown:
+        raise click.UsageError(
+            "--count names tables not in the mapping: " + ", ".join(sorted(unknown))
+        )
+    template_db = open_sql_dataset(template)
+    counts = get_counts(steps, template_db, scale_factor, overrides)
+
+    start = time.perf_counter()
+    write_dataset(output, steps, template_db, counts, seed=seed, batch_size=batch_size)
+    for table, count in counts.items():
+        click.echo(f"{table}: {count} rows")
+    click.echo(
+        f"Wrote {sum(counts.values())} rows to {output} "
+        f"in {time.perf_counter() - start:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
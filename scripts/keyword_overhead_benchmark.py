@@ -0,0 +1,160 @@
+"""Measures the per-call overhead of the keyword wrappers.
+
+    python scripts/keyword_overhead_benchmark.py --calls 200000
+
+@capture_screenshot_on_error of BaseObjects wraps a keyword in a try block.
+The cumulusci @selenium_retry mixes in a selenium property that patches
+driver.execute, so every webdriver command goes through the retry wrapper,
+and a click also runs the wait for aura script. Both are timed against stub libraries, so the numbers are the
+Python overhead alone, without a browser round-trip.
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import click
+from cumulusci.robotframework.utils import RetryingSeleniumLibraryMixin, selenium_retry
+from selenium.webdriver.remote.command import Command
+
+# The keyword library, for its capture_screenshot_on_error and to report
+# which selenium property it ends up with
+RESOURCES_DIR = (
+    Path(__file__).resolve().parents[1] / "robot" / "OutboundFundsNPSP" / "resources"
+)
+sys.path.insert(0, str(RESOURCES_DIR))
+
+from BaseObjects import capture_screenshot_on_error  # noqa: E402
+from OutboundFundsNPSP import OutboundFundsNPSP  # noqa: E402
+
+
+class StubDriver:
+    """Answers every webdriver command at once"""
+
+    def __init__(self):
+        self.commands = []
+
+    def execute(self, driver_command, params=None):
+        self.commands.append(driver_command)
+        return {"value": None}
+
+    def execute_async_script(self, script, *args):
+        return self.execute(
+            Command.W3C_EXECUTE_SCRIPT_ASYNC, {"script": script, "args": list(args)}
+        )
+
+
+class StubSeleniumLibrary:
+    def __init__(self):
+        self.driver = StubDriver()
+
+
+class StubBuiltIn:
+    def __init__(self, selenium):
+        self.selenium = selenium
+
+    def get_library_instance(self, name):
+        return self.selenium
+
+    def log(self, message, level="INFO"):
+        pass
+
+
+class Keywords:
+    """A library with one keyword per wrapper, over the stub libraries"""
+
+    def __init__(self):
+        self.builtin = StubBuiltIn(StubSeleniumLibrary())
+
+    def plain(self):
+        pass
+
+    @capture_screenshot_on_error
+    def screenshot_on_error(self):
+        pass
+
+
+RetryingKeywords = selenium_retry(Keywords)
+
+
+def time_calls(function, calls, repeat):
+    """Returns the best seconds per call over `repeat` runs of `calls` calls."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / calls
+
+
+def get_selenium_owner(library_class):
+    """Returns the class whose selenium property a library class uses."""
+    for cls in library_class.__mro__:
+        if "selenium" in vars(cls):
+            return cls
+    return None
+
+
+def measure(calls, repeat):
+    """Returns (name, seconds per call, baseline name) rows."""
+    keywords = RetryingKeywords()
+    driver = keywords.builtin.selenium.driver
+    plain_execute = driver.execute
+    # The first lookup patches driver.execute
+    retrying_execute = keywords.selenium.driver.execute
+
+    rows = []
+    for name, function, baseline in (
+        ("keyword call", keywords.plain, None),
+        (
+            "@capture_screenshot_on_error keyword",
+            keywords.screenshot_on_error,
+            "keyword call",
+        ),
+        ("driver.execute", lambda: plain_execute(Command.FIND_ELEMENT), None),
+        (
+            "@selenium_retry driver.execute",
+            lambda: retrying_execute(Command.FIND_ELEMENT),
+            "driver.execute",
+        ),
+        (
+            "@selenium_retry click (waits for aura)",
+            lambda: retrying_execute(Command.CLICK_ELEMENT),
+            "driver.execute",
+        ),
+        (
+            "@selenium_retry selenium property",
+            lambda: keywords.selenium,
+            None,
+        ),
+    ):
+        rows.append((name, time_calls(function, calls, repeat), baseline))
+        del driver.commands[:]
+    return rows
+
+
+@click.command()
+@click.option("--calls", default=100000, show_default=True, help="Calls per run.")
+@click.option("--repeat", default=5, show_default=True, help="Runs per wrapper.")
+def main(calls, repeat):
+    """Times each keyword wrapper against the call it wraps."""
+    rows = measure(calls, repeat)
+    times = {name: seconds for name, seconds, _ in rows}
+    width = max(len(name) for name, _, _ in rows)
+    print(f"{'Call':<{width}} {'ns/call':>9} {'Overhead ns':>11}")
+    for name, seconds, baseline in rows:
+        overhead = f"{(seconds - times[baseline]) * 1e9:>11.0f}" if baseline else ""
+        print(f"{name:<{width}} {seconds * 1e9:>9.0f} {overhead}".rstrip())
+
+    owner = get_selenium_owner(OutboundFundsNPSP)
+    patched = owner is RetryingSeleniumLibraryMixin
+    print(
+        f"OutboundFundsNPSP.selenium is {owner.__name__}.selenium: "
+        + ("driver.execute is patched" if patched else "driver.execute is not patched")
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,105 +1,499 @@
 import bs4 as bs
 import glob
-import esprima
+from esprima.tokenizer import Tokenizer
 import re
 import json
 import os
+import hashlib
+import subprocess
+import sys
+import xml.etree.ElementTree as ET
 import click
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
 from pathlib import Path
 
+# Bump whenever the audit rules or the scanners change so stale cached
+# results are discarded.
+CACHE_VERSION = "2"
+CACHE_DIR_NAME = ".labelaudit_cache"
+
+# Elements html.parser never sends an end tag for, as BeautifulSoup knows them.
+VOID_ELEMENTS = frozenset(bs.builder.HTMLParserTreeBuilder().empty_element_tags)
+
+AUDITED_SUFFIXES = (".js", ".html")
+SARIF_SCHEMA = "https://json.schemastore.org/sarif-2.1.0.json"
+
+
+def is_ignored_js_path(path):
+    """Return True for javascript files that are never audited."""
+    return (
+        os.path.basename(path) == "moment.js"
+        or os.path.basename(path) == "chart.js"
+        or "__tests__" in path
+    )
+
+
+def get_short_path(path):
+    return path.replace(os.path.join("force-app", "main", "default", ""), "")
+
+
+def format_offense(short_path, offense):
+    """Return the report line printed for a single offense."""
+    kind = offense[0]
+    if kind == "JS":
+        _, line, last_value, value = offense
+        return f"JS: {short_path} -- line {line} -- {last_value}: {value}"
+    if kind == "HTML attribute":
+        _, line, tag_name, attribute, value = offense
+        return f"HTML attribute: {short_path} -- line {line} -- {tag_name} {attribute}: {value}"
+    _, line, value = offense
+    return f"HTML contents: {short_path} -- line {line} String: {value}"
+
+
+# This strips out the decorators, which aren't supported in esprima.
+DECORATOR_PATTERN = re.compile(r"@\w+(\(.*\))?")
+JS_STRIP_CHARACTERS = "\u00a0'\"/.;() "
+JS_IGNORABLE_SUFFIXES = ("__r", "__c")
+
+
+class AuditRules:
+    """The .labelauditignore.json dictionary compiled for fast lookups.
+
+    The dictionary lists are turned into frozensets once, so every token and
+    attribute check is a constant-time membership test.
+    """
+
+    def __init__(self, strings_dict):
+        self.ignorable_js_values = frozenset(strings_dict.get("ignorable_js_values"))
+        self.ignorable_js_last_values = frozenset(
+            strings_dict.get("ignorable_js_last_values")
+        )
+        self.string_attributes_to_check = frozenset(
+            strings_dict.get("string_attributes_to_check")
+        )
+
+    def js_offenses(self, tokens):
+        """Yield (line, last_value, value) for each offending token in a
+        single pass over a stream of esprima tokens.
+        """
+        last_value = ""
+        for token in tokens:
+            if token.type == "Punctuator":
+                continue
+            value = token.value.strip(JS_STRIP_CHARACTERS)
+            if (
+                token.type == "String"
+                # assumes title case in any user-exposed strings
+                and value[0:1].isupper()
+                # allows for constants with ALLUPPER naming convention
+                and not value.isupper()
+                and not last_value.isupper()
+                and value not in self.ignorable_js_values
+                # allows for lwc attributes that expect string values
+                and last_value not in self.ignorable_js_last_values
+                and not value.endswith(JS_IGNORABLE_SUFFIXES)
+            ):
+                yield token.loc.start.line, last_value, value
+            last_value = value
+
+
+def compile_rules(strings_dict):
+    """Return the AuditRules for a dictionary, passing compiled rules through."""
+    if isinstance(strings_dict, AuditRules):
+        return strings_dict
+    return AuditRules(strings_dict)
+
+
+def iter_js_tokens(source):
+    """Yield the esprima tokens of a javascript file with decorators removed."""
+    if "@" in source:
+        source = DECORATOR_PATTERN.sub("", source)
+    # Drive the tokenizer directly rather than through esprima.tokenize, which
+    # collects every token into a list before returning.
+    tokenizer = Tokenizer(source, {"loc": True})
+    while True:
+        token = tokenizer.getNextToken()
+        if not token:
+            return
+        yield token
+
+
+def audit_js_source(source, rules):
+    """Return the offenses found in the body of a javascript file."""
+    return [
+        ("JS", line, last_value, value)
+        for line, last_value, value in rules.js_offenses(iter_js_tokens(source))
+    ]
+
+
+def is_reportable_attribute(rules, name, value):
+    """Return True for checked attribute values that are not {evaluated}."""
+    return (
+        name in rules.string_attributes_to_check
+        and not value.startswith("{")
+        and not value == ""
+    )
+
+
+def get_reportable_contents(tag_value):
+    """Return the stripped tag contents if they are not {evaluated}."""
+    # Strip spaces and known non-alpha characters like pipes
+    if tag_value:
+        tag_value = str(tag_value).strip("\u00a0 (|\t\n")
+        if tag_value and not tag_value.startswith("{"):
+            return tag_value
+    return None
+
+
+def soup_html_source(source, rules):
+    """Return the offenses found in an HTML template using BeautifulSoup."""
+    offenses = []
+    soup = bs.BeautifulSoup(source, "html.parser", multi_valued_attributes=None)
+
+    for tag in soup.find_all():
+
+        # Find all tag attribute values that are not {evaluated}
+        for k, v in tag.attrs.items():
+            if is_reportable_attribute(rules, k, v):
+                offenses.append(("HTML attribute", tag.sourceline, tag.name, k, v))
+
+        # Find all tag contents that are not {evaluated}
+        tag_value = get_reportable_contents(tag.string)
+        if tag_value:
+            offenses.append(("HTML contents", tag.sourceline, tag_value))
+
+    return offenses
+
+
+class _OpenElement:
+    """An element the streaming scanner has seen the start tag of.
+
+    Only what is needed to compute the BeautifulSoup `.string` of the element
+    is kept: the number of children and the value of the first one.
+    """
+
+    __slots__ = ("name", "line", "index", "children", "string", "in_text")
+
+    def __init__(self, name, line, index):
+        self.name = name
+        self.line = line
+        self.index = index
+        self.children = 0
+        self.string = None
+        self.in_text = False
+
+    def add_text(self, data):
+        # Consecutive data events form a single string child.
+        if self.in_text:
+            if self.children == 1:
+                self.string += data
+            return
+        self.add_child(data)
+        self.in_text = True
+
+    def add_child(self, string):
+        self.children += 1
+        self.string = string
+        self.in_text = False
+
+    def get_string(self):
+        return self.string if self.children == 1 else None
+
+
+class StreamingTemplateScanner(HTMLParser):
+    """Report label offenses from start-tag, data and end-tag events without
+    building a document tree.
+
+    Mirrors how BeautifulSoup's html.parser builder nests elements, so the
+    offenses and their line numbers match soup_html_source exactly.
+    """
+
+    def __init__(self, rules):
+        super().__init__(convert_charrefs=True)
+        self.rules = rules
+        self.stack = []
+        self.tag_count = 0
+        self.already_closed_empty_elements = []
+        self.offenses = []
+
+    def scan(self, source):
+        """Return the offenses of a template, in document order."""
+        self.feed(source)
+        self.close()
+        self.offenses.sort(key=lambda entry: entry[:2])
+        return [offense for _, _, offense in self.offenses]
+
+    def close(self):
+        super().close()
+        while self.stack:
+            self._pop()
+
+    def _report(self, element, order, offense):
+        # Attribute offenses are known at the start tag and content offenses
+        # at the end tag, so sort on the start tag position to restore the
+        # order BeautifulSoup walks the tree in.
+        self.offenses.append((element.index, order, offense))
+
+    def _pop(self):
+        element = self.stack.pop()
+        string = element.get_string()
+        tag_value = get_reportable_contents(string)
+        if tag_value:
+            self._report(element, 1, ("HTML contents", element.line, tag_value))
+        self._add_string(string)
+
+    def _add_string(self, string):
+        if self.stack:
+            self.stack[-1].add_child(string)
+
+    def handle_starttag(self, tag, attrs, handle_empty_element=True):
+        if self.stack:
+            self.stack[-1].in_text = False
+        element = _OpenElement(tag, self.getpos()[0], self.tag_count)
+        self.tag_count += 1
+
+        # Later duplicates replace the value but keep the first position.
+        attributes = {}
+        for name, value in attrs:
+            attributes[name] = "" if value is None else value
+        for name, value in attributes.items():
+            if is_reportable_attribute(self.rules, name, value):
+                self._report(
+                    element, 0, ("HTML attribute", element.line, tag, name, value)
+                )
+
+        self.stack.append(element)
+        if handle_empty_element and tag in VOID_ELEMENTS:
+            self.handle_endtag(tag, check_already_closed=False)
+            self.already_closed_empty_elements.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs, handle_empty_element=False)
+        self.handle_endtag(tag, check_already_closed=False)
+
+    def handle_endtag(self, tag, check_already_closed=True):
+        if check_already_closed and tag in self.already_closed_empty_elements:
+            self.already_closed_empty_elements.remove(tag)
+            return
+        if self.stack:
+            self.stack[-1].in_text = False
+        # Close every element up to the most recent one with this name; a
+        # stray end tag with no open element closes nothing.
+        if any(element.name == tag for element in self.stack):
+            while self.stack[-1].name != tag:
+                self._pop()
+            self._pop()
+
+    def handle_data(self, data):
+        if self.stack:
+            self.stack[-1].add_text(data)
+
+    def handle_comment(self, data):
+        self._add_string(data)
+
+    def handle_decl(self, decl):
+        self._add_string(decl[len("DOCTYPE ") :])
+
+    def handle_pi(self, data):
+        self._add_string(data)
+
+    def unknown_decl(self, data):
+        if data.upper().startswith("CDATA["):
+            data = data[len("CDATA[") :]
+        self._add_string(data)
+
+
+def stream_html_source(source, rules):
+    """Return the offenses found in an HTML template using a streaming scan."""
+    return StreamingTemplateScanner(rules).scan(source)
+
+
+HTML_ENGINES = {"stream": stream_html_source, "bs4": soup_html_source}
+
+
+def audit_html_source(source, rules, engine="stream"):
+    """Return the offenses found in the body of an HTML template."""
+    return HTML_ENGINES[engine](source, rules)
+
+
+def audit_file(kind, path, rules, html_engine="stream"):
+    """Return the offenses found in a single file of the given kind."""
+    with open(path) as f:
+        source = f.read()
+    if kind == "js":
+        return audit_js_source(source, rules)
+    return audit_html_source(source, rules, engine=html_engine)
+
+
+# Compiled rules and HTML engine of a pool worker, set once per process by
+# _init_worker.
+_worker_rules = None
+_worker_html_engine = None
+
+
+def _init_worker(rules, html_engine):
+    global _worker_rules, _worker_html_engine
+    _worker_rules = rules
+    _worker_html_engine = html_engine
+
+
+def _audit_file_task(task):
+    kind, path = task
+    return audit_file(kind, path, _worker_rules, _worker_html_engine)
+
 
 def check_js(paths, strings_dict):
     """Return the count of user-exposed hard-coded strings in javascript files."""
     js_offenses = 0
+    rules = compile_rules(strings_dict)
 
     for path in paths:
-
-        if (
-            os.path.basename(path) == "moment.js"
-            or os.path.basename(path) == "chart.js"
-            or "__tests__" in path
-        ):
+        if is_ignored_js_path(path):
             continue
-
-        short_path = path.replace(os.path.join("force-app", "main", "default", ""), "")
-
-        with open(path) as f:
-            last_value = ""
-
-            # This strips out the decorators, which aren't supported in esprima.
-            js_body = re.sub(r"@\w+(\(.*\))?", "", f.read())
-
-            parsed_js = esprima.tokenize(js_body, {"loc": True})
-            parsed_js = [
-                element for element in parsed_js if element.type != "Punctuator"
-            ]
-            for item in parsed_js:
-                item.value = item.value.strip("\u00a0'\"/.;() ")
-                if (
-                    item.type == "String"
-                    and item.value not in strings_dict.get("ignorable_js_values")
-                    and not item.value.endswith("__r")
-                    and not item.value.endswith("__c")
-                    and last_value
-                    not in strings_dict.get(
-                        "ignorable_js_last_values"
-                    )  # allows for lwc attributes that expect string values
-                    and item.value[
-                        0:1
-                    ].isupper()  # assumes title case in any user-exposed strings
-                    and not item.value.isupper()  # allows for constants with ALLUPPER naming convention
-                    and not last_value.isupper()  # allows for constants with ALLUPPER naming convention
-                ):
-                    print(
-                        f"JS: {short_path} -- line {str(item.loc.start.line)} -- {last_value}: {item.value}"
-                    )
-                    js_offenses += 1
-                last_value = item.value
+        for offense in audit_file("js", path, rules):
+            print(format_offense(get_short_path(path), offense))
+            js_offenses += 1
     return js_offenses
 
 
-def check_html(paths, strings_dict):
+def check_html(paths, strings_dict, engine="stream"):
     """Return the count of user-exposed hard-coded strings in HTML files."""
     html_offenses = 0
+    rules = compile_rules(strings_dict)
 
     for path in paths:
+        for offense in audit_file("html", path, rules, html_engine=engine):
+            print(format_offense(get_short_path(path), offense))
+            html_offenses += 1
 
-        short_path = path.replace(os.path.join("force-app", "main", "default", ""), "")
+    return html_offenses
 
-        with open(path) as f:
-            soup = bs.BeautifulSoup(f, "html.parser", multi_valued_attributes=None)
 
-        for tag in soup.find_all():
+class ResultCache:
+    """On-disk store of per-file offenses, keyed on the file content, the
+    dictionary file contents and the HTML engine, so unchanged files are not
+    parsed again.
+    """
 
-            # Find all tag attribute values that are not {evaluated}
-            for k, v in tag.attrs.items():
-                if (
-                    k in strings_dict.get("string_attributes_to_check")
-                    and not v.startswith("{")
-                    and not v == ""
-                ):
-                    print(
-                        f"HTML attribute: {short_path} -- line {tag.sourceline} -- {tag.name} {k}: {v}"
-                    )
-                    html_offenses += 1
-
-            # Find all tag contents that are not {evaluated}, stripping spaces and known non-alpha characters like pipes
-            tag_value = tag.string
-            if tag_value:
-                tag_value = str(tag_value).strip("\u00a0 (|\t\n")
-                if tag_value and not tag_value.startswith("{"):
-                    print(
-                        f"HTML contents: {short_path} -- line {tag.sourceline} String: {tag_value}"
-                    )
-                    html_offenses += 1
+    def __init__(self, directory, dictionary_bytes, html_engine="stream"):
+        self.directory = Path(directory)
+        self.dictionary_hash = hashlib.sha256(dictionary_bytes).hexdigest()
+        self.html_engine = html_engine
 
-    return html_offenses
+    def key(self, kind, path):
+        digest = hashlib.sha256()
+        digest.update(CACHE_VERSION.encode())
+        digest.update(kind.encode())
+        digest.update(self.html_engine.encode())
+        digest.update(self.dictionary_hash.encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key):
+        try:
+            with open(self._entry_path(key)) as f:
+                return [tuple(offense) for offense in json.load(f)]
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, offenses):
+        entry_path = self._entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so concurrent runs never read a
+        # partially written entry.
+        temp_path = entry_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(offenses, f)
+        os.replace(temp_path, entry_path)
+
+
+def audit_paths(tasks, rules, cache=None, jobs=None, html_engine="stream"):
+    """Yield the offenses for each (kind, path) task, in task order.
+
+    Results are looked up in the cache first; the remaining files are audited
+    across a process pool and written back to the cache. Each file's offenses
+    are yielded as soon as it and every file before it have been audited.
+    """
+    cached = [None] * len(tasks)
+    keys = [None] * len(tasks)
+    misses = []
+    for index, (kind, path) in enumerate(tasks):
+        if cache is not None:
+            keys[index] = cache.key(kind, path)
+            cached[index] = cache.get(keys[index])
+        if cached[index] is None:
+            misses.append(tasks[index])
+
+    rules = compile_rules(rules)
+    executor = None
+    if jobs == 1 or len(misses) < 2:
+        audited = (audit_file(kind, path, rules, html_engine) for kind, path in misses)
+    else:
+        executor = ProcessPoolExecutor(
+            max_workers=jobs, initializer=_init_worker, initargs=(rules, html_engine)
+        )
+        audited = executor.map(_audit_file_task, misses, chunksize=8)
+
+    try:
+        for index, offenses in enumerate(cached):
+            if offenses is None:
+                offenses = next(audited)
+                if cache is not None:
+                    cache.put(keys[index], offenses)
+            yield offenses
+    finally:
+        if executor is not None:
+            executor.shutdown()
 
 
 def get_all_paths(path):
     return glob.glob(path, recursive=True)
 
 
+def is_audited_path(path):
+    """Return True for the files get_all_paths would find in a full audit.
+
+    path is relative to the root of the repository.
+    """
+    parts = Path(path).parts
+    return (
+        len(parts) > 1
+        and parts[0] == "force-app"
+        and Path(path).suffix in AUDITED_SUFFIXES
+    )
+
+
+def run_git(*args):
+    try:
+        result = subprocess.run(
+            ["git", *args], capture_output=True, text=True, check=True
+        )
+    except FileNotFoundError:
+        raise click.ClickException("git is not installed")
+    except subprocess.CalledProcessError as error:
+        raise click.ClickException(error.stderr.strip() or str(error))
+    return result.stdout.splitlines()
+
+
+def get_changed_paths(ref):
+    """Return the existing JS and HTML files that differ from a git ref,
+    including uncommitted and untracked files.
+
+    Works from any directory of the repository; the paths returned are
+    relative to the current directory.
+    """
+    top = run_git("rev-parse", "--show-toplevel")[0]
+    changed = run_git("-C", top, "diff", "--name-only", "--diff-filter=d", ref, "--")
+    changed += run_git("-C", top, "ls-files", "--others", "--exclude-standard")
+    paths = {os.path.join(top, path) for path in changed if is_audited_path(path)}
+    return sorted(os.path.relpath(path) for path in paths if os.path.isfile(path))
+
+
 def find_dictionary_file():
     """Return the filepath of the .labelauditignore.json dictionary file."""
     file_name = ".labelauditignore.json"
@@ -110,13 +504,406 @@ def find_dictionary_file():
             return file_path
 
 
+RULE_IDS = {
+    "JS": "hard-coded-js-string",
+    "HTML attribute": "hard-coded-html-attribute",
+    "HTML contents": "hard-coded-html-contents",
+}
+
+RULE_DESCRIPTIONS = {
+    "hard-coded-js-string": "User-exposed string literal in javascript",
+    "hard-coded-html-attribute": "User-exposed attribute value in a template",
+    "hard-coded-html-contents": "User-exposed text in a template",
+}
+
+
+def offense_to_dict(path, offense):
+    """Return the machine-readable form of an offense."""
+    kind, line = offense[:2]
+    result = {
+        "rule": RULE_IDS[kind],
+        "path": Path(path).as_posix(),
+        "line": line,
+        "message": format_offense(get_short_path(path), offense),
+    }
+    if kind == "JS":
+        result.update(last_value=offense[2], value=offense[3])
+    elif kind == "HTML attribute":
+        result.update(tag=offense[2], attribute=offense[3], value=offense[4])
+    else:
+        result.update(value=offense[2])
+    return result
+
+
+class TextReport:
+    """The human readable report: one line per offense and a summary."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def start(self):
+        pass
+
+    def add(self, path, offense):
+        print(format_offense(get_short_path(path), offense), file=self.stream)
+
+    def finish(self, total_offenses):
+        if total_offenses == 0:
+            print(
+                "No strings found. Well done! \U0001F389 \U0001F600", file=self.stream
+            )
+
+
+class JsonReport(TextReport):
+    """One JSON object per offense per line, written as offenses are found."""
+
+    def add(self, path, offense):
+        print(json.dumps(offense_to_dict(path, offense)), file=self.stream)
+        self.stream.flush()
+
+    def finish(self, total_offenses):
+        pass
+
+
+class SarifReport(TextReport):
+    """A SARIF 2.1.0 log whose results array is written as offenses are found."""
+
+    def start(self):
+        driver = {
+            "name": "label_audit",
+            "rules": [
+                {"id": rule_id, "shortDescription": {"text": description}}
+                for rule_id, description in RULE_DESCRIPTIONS.items()
+            ],
+        }
+        header = json.dumps(
+            {
+                "$schema": SARIF_SCHEMA,
+                "version": "2.1.0",
+                "runs": [{"tool": {"driver": driver}, "results": []}],
+            }
+        )
+        # Leave the results array and the enclosing objects open.
+        self.stream.write(header[: -len("]}]}")])
+        self.separator = ""
+
+    def add(self, path, offense):
+        details = offense_to_dict(path, offense)
+        result = {
+            "ruleId": details["rule"],
+            "level": "error",
+            "message": {"text": details["message"]},
+            "locations": [
+                {
+                    "physicalLocation": {
+                        "artifactLocation": {"uri": details["path"]},
+                        "region": {"startLine": details["line"]},
+                    }
+                }
+            ],
+        }
+        self.stream.write(self.separator + json.dumps(result))
+        self.stream.flush()
+        self.separator = ","
+
+    def finish(self, total_offenses):
+        self.stream.write("]}]}\n")
+
+
+REPORTS = {"text": TextReport, "json": JsonReport, "sarif": SarifReport}
+
+
+DEFAULT_LABELS_PATH = "force-app/main/default/labels/CustomLabels.labels-meta.xml"
+DEFAULT_SOURCE_ROOT = "force-app"
+LABEL_INDEX_NAME = "label_index.json"
+# Bump whenever the reference patterns change so stale indexes are rebuilt.
+LABEL_INDEX_VERSION = "1"
+METADATA_NS = "{http://soap.sforce.com/2006/04/metadata}"
+
+# import name from "@salesforce/label/c.Name" in LWC
+LWC_LABEL_PATTERN = re.compile(r"""["']@salesforce/label/(\w+)\.(\w+)["']""")
+# $Label.c.Name in Aura, $Label.Name in Visualforce
+GLOBAL_LABEL_PATTERN = re.compile(r"\$Label\s*\.\s*(?:(\w+)\s*\.\s*)?(\w+)")
+# Label.Name, System.Label.Name and Label.namespace.Name in Apex, which is
+# case-insensitive. Method calls like Label.get(...) are not references.
+APEX_LABEL_PATTERN = re.compile(
+    r"\bLabel\s*\.\s*(?:(\w+)\s*\.\s*)?(\w+)\b(?!\s*\()", re.IGNORECASE
+)
+
+LABEL_PATTERNS = {
+    ".js": (LWC_LABEL_PATTERN, GLOBAL_LABEL_PATTERN),
+    ".cls": (APEX_LABEL_PATTERN,),
+    ".trigger": (APEX_LABEL_PATTERN,),
+    ".cmp": (GLOBAL_LABEL_PATTERN,),
+    ".app": (GLOBAL_LABEL_PATTERN,),
+    ".page": (GLOBAL_LABEL_PATTERN,),
+    ".component": (GLOBAL_LABEL_PATTERN,),
+}
+
+
+def iter_labels(path):
+    """Yield a dict for each label of a CustomLabels file.
+
+    The file is parsed incrementally and each label is discarded once read,
+    so memory does not grow with the number of labels.
+    """
+    context = ET.iterparse(path, events=("start", "end"))
+    _, root = next(context)
+    for event, element in context:
+        if event == "end" and element.tag == METADATA_NS + "labels":
+            label = {
+                child.tag[len(METADATA_NS) :]: (child.text or "").strip()
+                for child in element
+            }
+            if label.get("fullName"):
+                yield label
+            root.clear()
+
+
+def find_label_references(source, suffix, namespaces=("c",)):
+    """Return [namespace, name, line] references to custom labels, by line.
+
+    namespaces are the ones whose labels are defined in the labels file;
+    references without a namespace have namespace None.
+    """
+    references = []
+    for pattern in LABEL_PATTERNS.get(suffix, ()):
+        for match in pattern.finditer(source):
+            namespace, name = match.groups()
+            line = source.count("\n", 0, match.start()) + 1
+            references.append([namespace, name, line])
+    # Labels of other packages are defined elsewhere
+    return sorted(
+        (
+            reference
+            for reference in references
+            if reference[0] is None or reference[0].lower() in namespaces
+        ),
+        key=lambda reference: (reference[2], reference[1]),
+    )
+
+
+def get_file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def get_project_namespace():
+    """Return the namespace in sfdx-project.json, if there is one."""
+    try:
+        with open("sfdx-project.json") as f:
+            return json.load(f).get("namespace") or None
+    except (OSError, ValueError):
+        return None
+
+
+class LabelIndex:
+    """The custom labels and an inverted index of where they are referenced.
+
+    Each file's references are kept with the file's modification time and
+    size, so update() only rescans files that changed, and the labels file
+    is only parsed again when it changed.
+    """
+
+    def __init__(self, labels_path, source_root, namespace=None):
+        self.labels_path = labels_path
+        self.source_root = source_root
+        self.namespace = namespace
+        self.labels_stamp = None
+        self.labels = {}
+        self.files = {}
+        self.usages = {}
+        self.scanned = 0
+
+    @property
+    def settings(self):
+        return [LABEL_INDEX_VERSION, self.labels_path, self.source_root, self.namespace]
+
+    @classmethod
+    def load(cls, path, labels_path, source_root, namespace=None):
+        """Return the saved index, or an empty one if it is missing or stale."""
+        index = cls(labels_path, source_root, namespace)
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if saved.get("settings") == index.settings:
+            index.labels_stamp = saved["labels_stamp"]
+            index.labels = saved["labels"]
+            index.files = saved["files"]
+        return index
+
+    def save(self, path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(
+                {
+                    "settings": self.settings,
+                    "labels_stamp": self.labels_stamp,
+                    "labels": self.labels,
+                    "files": self.files,
+                },
+                f,
+            )
+        os.replace(temp_path, path)
+
+    def iter_source_paths(self):
+        for directory, _, names in os.walk(self.source_root):
+            for name in sorted(names):
+                path = os.path.join(directory, name)
+                suffix = os.path.splitext(name)[1]
+                if suffix in LABEL_PATTERNS and not (
+                    suffix == ".js" and is_ignored_js_path(path)
+                ):
+                    yield path, suffix
+
+    def update(self):
+        """Bring the index up to date with the labels file and source tree."""
+        stamp = get_file_stamp(self.labels_path)
+        if stamp != self.labels_stamp:
+            # Label names are case-insensitive, so they are keyed lowercase
+            self.labels = {
+                label["fullName"].lower(): label
+                for label in iter_labels(self.labels_path)
+            }
+            self.labels_stamp = stamp
+
+        namespaces = ("c", self.namespace.lower()) if self.namespace else ("c",)
+        files = {}
+        self.usages = {}
+        self.scanned = 0
+        for path, suffix in self.iter_source_paths():
+            stamp = get_file_stamp(path)
+            entry = self.files.get(path)
+            if entry is None or entry["stamp"] != stamp:
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    references = find_label_references(f.read(), suffix, namespaces)
+                entry = {"stamp": stamp, "references": references}
+                self.scanned += 1
+            files[path] = entry
+            for _, name, line in entry["references"]:
+                self.usages.setdefault(name.lower(), []).append((path, line))
+        self.files = files
+        return self
+
+    def get_unused(self):
+        """Return the names of labels that nothing references."""
+        return sorted(
+            label["fullName"]
+            for key, label in self.labels.items()
+            if key not in self.usages
+        )
+
+    def get_missing(self):
+        """Return (path, line, name) for references to undefined labels."""
+        return sorted(
+            (path, line, name)
+            for path, entry in self.files.items()
+            for _, name, line in entry["references"]
+            if name.lower() not in self.labels
+        )
+
+    def get_duplicate_values(self):
+        """Return (value, names) for values shared by more than one label."""
+        names_by_value = {}
+        for label in self.labels.values():
+            names_by_value.setdefault(label.get("value", ""), []).append(
+                label["fullName"]
+            )
+        return sorted(
+            (value, sorted(names))
+            for value, names in names_by_value.items()
+            if len(names) > 1
+        )
+
+    def as_dict(self):
+        return {
+            "labels": len(self.labels),
+            "files": len(self.files),
+            "scanned": self.scanned,
+            "references": sum(len(usages) for usages in self.usages.values()),
+            "missing": [
+                {"path": Path(path).as_posix(), "line": line, "label": name}
+                for path, line, name in self.get_missing()
+            ],
+            "unused": self.get_unused(),
+            "duplicate_values": [
+                {"value": value, "labels": names}
+                for value, names in self.get_duplicate_values()
+            ],
+        }
+
+    def format(self):
+        lines = [
+            f"Missing label: {get_short_path(path)} -- line {line} -- {name}"
+            for path, line, name in self.get_missing()
+        ]
+        lines += [f"Unused label: {name}" for name in self.get_unused()]
+        lines += [
+            f"Duplicate value: {', '.join(names)} -- {value}"
+            for value, names in self.get_duplicate_values()
+        ]
+        details = self.as_dict()
+        lines.append(
+            f"{details['labels']} labels, {details['references']} references in "
+            f"{details['files']} files ({details['scanned']} rescanned)"
+        )
+        return "\n".join(lines)
+
+
 @click.command()
 @click.argument("filenames", type=click.Path(exists=True), nargs=-1)
-def main(filenames):
+@click.option(
+    "--since",
+    metavar="REF",
+    help="Only audit JS and HTML files that changed since this git ref.",
+)
+@click.option(
+    "--format",
+    "report_format",
+    type=click.Choice(sorted(REPORTS)),
+    default="text",
+    show_default=True,
+    help="Report format. json writes one object per offense per line.",
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory for cached results. Defaults to "
+    + CACHE_DIR_NAME
+    + " next to the dictionary file.",
+)
+@click.option("--no-cache", is_flag=True, help="Audit every file from scratch.")
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    help="Number of worker processes. Defaults to the number of CPUs.",
+)
+@click.option(
+    "--engine",
+    type=click.Choice(["stream", "bs4"]),
+    default="stream",
+    show_default=True,
+    help="HTML scanner. bs4 parses each template into a full BeautifulSoup tree.",
+)
+def main(filenames, since, report_format, cache_dir, no_cache, jobs, engine):
+    """Report hard-coded user-exposed strings in JS and HTML files."""
+
+    if filenames and since:
+        raise click.UsageError("FILENAMES and --since cannot be used together.")
+
+    dictionary_file = find_dictionary_file()
+    dictionary_bytes = dictionary_file.read_bytes()
+    rules = compile_rules(json.loads(dictionary_bytes))
 
-    strings_dict = json.load(open(find_dictionary_file()))
+    if since:
+        filenames = get_changed_paths(since)
 
-    if filenames:
+    if filenames or since:
         js_paths = [
             filename for filename in filenames if Path(filename).suffix == ".js"
         ]
@@ -127,19 +914,120 @@ def main(filenames):
         js_paths = get_all_paths("force-app/**/*.js")
         html_paths = get_all_paths("force-app/**/*.html")
 
-    js_offenses = 0
-    js_offenses += check_js(js_paths, strings_dict)
+    cache = None
+    if not no_cache:
+        cache = ResultCache(
+            cache_dir or dictionary_file.parent / CACHE_DIR_NAME,
+            dictionary_bytes,
+            html_engine=engine,
+        )
 
-    html_offenses = 0
-    html_offenses += check_html(html_paths, strings_dict)
+    # JS offenses are reported before HTML offenses, each in path order.
+    tasks = [("js", path) for path in js_paths if not is_ignored_js_path(path)]
+    tasks += [("html", path) for path in html_paths]
 
-    total_offenses = js_offenses + html_offenses
+    report = REPORTS[report_format](sys.stdout)
+    report.start()
+    total_offenses = 0
+    results = audit_paths(tasks, rules, cache=cache, jobs=jobs, html_engine=engine)
+    for (kind, path), offenses in zip(tasks, results):
+        for offense in offenses:
+            report.add(path, offense)
+            total_offenses += 1
+    report.finish(total_offenses)
 
-    if total_offenses == 0:
-        print("No strings found. Well done! \U0001F389 \U0001F600")
-    else:
+    if total_offenses:
         raise click.ClickException("Total Strings: " + str(total_offenses))
 
 
+@click.command()
+@click.option(
+    "--labels",
+    "labels_path",
+    default=DEFAULT_LABELS_PATH,
+    show_default=True,
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--source",
+    "source_root",
+    default=DEFAULT_SOURCE_ROOT,
+    show_default=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="Directory searched for label references.",
+)
+@click.option(
+    "--namespace",
+    help="Package namespace labels may be referenced with. "
+    "Defaults to the namespace in sfdx-project.json.",
+)
+@click.option(
+    "--format",
+    "report_format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+)
+@click.option(
+    "--cache-dir",
+    type=click.Path(file_okay=False),
+    help="Directory for the saved index. Defaults to "
+    + CACHE_DIR_NAME
+    + " next to the dictionary file.",
+)
+@click.option("--no-cache", is_flag=True, help="Rebuild the index from scratch.")
+def labels(labels_path, source_root, namespace, report_format, cache_dir, no_cache):
+    """Report unused, missing and duplicate-value custom labels."""
+    namespace = namespace or get_project_namespace()
+    if no_cache:
+        index = LabelIndex(labels_path, source_root, namespace)
+    else:
+        index_path = Path(
+            cache_dir or find_dictionary_file().parent / CACHE_DIR_NAME,
+            LABEL_INDEX_NAME,
+        )
+        index = LabelIndex.load(index_path, labels_path, source_root, namespace)
+    index.update()
+    if not no_cache:
+        index.save(index_path)
+
+    if report_format == "json":
+        click.echo(json.dumps(index.as_dict(), indent=2))
+    else:
+        click.echo(index.format())
+
+    problems = (
+        len(index.get_missing())
+        + len(index.get_unused())
+        + len(index.get_duplicate_values())
+    )
+    if problems:
+        raise click.ClickException("Total Label Problems: " + str(problems))
+
+
+class DefaultCommandGroup(click.Group):
+    """Runs the default command when the first argument names no command, so
+    `label_audit.py [FILENAMES]` keeps auditing hard-coded strings.
+    """
+
+    default_command = "strings"
+
+    def parse_args(self, ctx, args):
+        if not args or (args[0] not in self.commands and args[0] != "--help"):
+            args = [self.default_command] + list(args)
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=DefaultCommandGroup)
+def cli():
+    """Audits user-exposed strings and custom labels. Without a command,
+    runs strings.
+    """
+
+
+cli.add_command(main, "strings")
+cli.add_command(labels)
+
+
 if __name__ == "__main__":
-    main()
+    cli()
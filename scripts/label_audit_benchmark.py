@@ -0,0 +1,171 @@
+import contextlib
+import io
+import json
+import os
+import random
+import re
+import tempfile
+import time
+
+import click
+import esprima
+
+import label_audit
+
+COMPONENT_TEMPLATE = """import {{ LightningElement, api, track, wire }} from "lwc";
+import {{ getRecord }} from "lightning/uiRecordApi";
+import {fields_import}
+
+const FIELDS = [{fields}];
+const MAX_ROWS = {max_rows};
+
+export default class {class_name} extends LightningElement {{
+    @api recordId;
+    @api objectApiName;
+    @track rows = [];
+    mode = "{mode}";
+    title = "{title}";
+    iconName = "standard:{icon}";
+
+    @wire(getRecord, {{ recordId: "$recordId", fields: FIELDS }})
+    wiredRecord({{ error, data }}) {{
+        if (data) {{
+            this.rows = data.fields.{relationship}.value.split(",");
+        }} else if (error) {{
+            this.error = error.body.message;
+        }}
+    }}
+
+    get hasRows() {{
+        return this.rows.length > 0 && this.rows.length < MAX_ROWS;
+    }}
+
+    handleClick(event) {{
+        const detail = {{ id: event.target.dataset.id, label: "{label}" }};
+        this.dispatchEvent(new CustomEvent("select", {{ detail }}));
+    }}
+}}
+"""
+
+WORDS = ["Funding", "Request", "Program", "Disbursement", "Amount", "Status"]
+
+
+def legacy_check_js(paths, strings_dict):
+    """The check_js implementation this benchmark measures against."""
+    js_offenses = 0
+
+    for path in paths:
+
+        if (
+            os.path.basename(path) == "moment.js"
+            or os.path.basename(path) == "chart.js"
+            or "__tests__" in path
+        ):
+            continue
+
+        short_path = path.replace(os.path.join("force-app", "main", "default", ""), "")
+
+        with open(path) as f:
+            last_value = ""
+
+            js_body = re.sub(r"@\w+(\(.*\))?", "", f.read())
+
+            parsed_js = esprima.tokenize(js_body, {"loc": True})
+            parsed_js = [
+                element for element in parsed_js if element.type != "Punctuator"
+            ]
+            for item in parsed_js:
+                item.value = item.value.strip("\u00a0'\"/.;() ")
+                if (
+                    item.type == "String"
+                    and item.value not in strings_dict.get("ignorable_js_values")
+                    and not item.value.endswith("__r")
+                    and not item.value.endswith("__c")
+                    and last_value not in strings_dict.get("ignorable_js_last_values")
+                    and item.value[0:1].isupper()
+                    and not item.value.isupper()
+                    and not last_value.isupper()
+                ):
+                    print(
+                        f"JS: {short_path} -- line {str(item.loc.start.line)} -- {last_value}: {item.value}"
+                    )
+                    js_offenses += 1
+                last_value = item.value
+    return js_offenses
+
+
+def generate_corpus(directory, files, seed=0):
+    """Write a synthetic tree of LWC javascript files and return their paths."""
+    generator = random.Random(seed)
+    paths = []
+    for index in range(files):
+        name = f"component{index}"
+        bundle = os.path.join(directory, "force-app", "main", "default", "lwc", name)
+        os.makedirs(bundle)
+        fields = ", ".join(
+            f'"outfunds__Funding_Request__c.Field{n}__c"'
+            for n in range(generator.randint(2, 12))
+        )
+        source = COMPONENT_TEMPLATE.format(
+            fields_import=f'LABEL_{index} from "@salesforce/label/c.Label{index}";',
+            fields=fields,
+            max_rows=generator.randint(10, 500),
+            class_name=f"Component{index}",
+            mode=generator.choice(["view", "edit", "readonly"]),
+            # Roughly one in ten components exposes a hard-coded title.
+            title=(
+                " ".join(generator.sample(WORDS, 2)) if generator.random() < 0.1 else ""
+            ),
+            icon=generator.choice(["account", "contact", "custom"]),
+            relationship=generator.choice(["Name", "outfunds__Status__c"]),
+            label=generator.choice(["", "{LABEL}", "Selected Row"]),
+        )
+        path = os.path.join(bundle, f"{name}.js")
+        with open(path, "w") as f:
+            f.write(source)
+        paths.append(path)
+    return paths
+
+
+def time_check(check, paths, strings_dict, repeat):
+    """Return the best wall time over `repeat` runs and the captured report."""
+    best = None
+    for _ in range(repeat):
+        output = io.StringIO()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(output):
+            check(paths, strings_dict)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, output.getvalue()
+
+
+@click.command()
+@click.option("--files", default=5000, show_default=True, help="Corpus size.")
+@click.option("--repeat", default=3, show_default=True, help="Runs per engine.")
+def main(files, repeat):
+    """Compare check_js against the legacy implementation on a synthetic corpus."""
+    with open(label_audit.find_dictionary_file()) as f:
+        strings_dict = json.load(f)
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = generate_corpus(directory, files)
+        legacy_time, legacy_report = time_check(
+            legacy_check_js, paths, strings_dict, repeat
+        )
+        compiled_time, compiled_report = time_check(
+            label_audit.check_js, paths, strings_dict, repeat
+        )
+
+    if legacy_report != compiled_report:
+        raise click.ClickException("check_js report differs from the legacy report")
+
+    print(f"Files:    {files}")
+    print(f"Offenses: {legacy_report.count(chr(10))}")
+    print(f"Legacy:   {legacy_time:.3f}s")
+    print(f"Compiled: {compiled_time:.3f}s")
+    print(f"Speedup:  {legacy_time / compiled_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Profiles the robot locators against saved pages, without an org.
+
+Every locator template in locators_<version>.py is filled in with sample
+arguments, compiled once with lxml and evaluated against each snapshot.
+The report lists each locator's evaluation time and match count per page,
+slowest first, and flags locators that are ambiguous (more than one match
+on a page), match nothing, or use patterns that scan the whole document.
+
+    cci task run robot_dom_snapshots --org qa
+    python scripts/locator_profile.py
+    python scripts/locator_profile.py page.html --locator confirm. --format json
+
+Snapshots are the .html files written by the Save DOM Snapshot keyword,
+or the .html.gz files Capture Failure Artifacts writes under failures/,
+given as files or directories. --samples takes a JSON file of
+{"locator.path": ["arg", ...]} to override the sample arguments.
+"""
+
+import json
+import sys
+from pathlib import Path
+
+import click
+
+# The locator libraries live with the robot keyword library
+RESOURCES_DIR = (
+    Path(__file__).resolve().parents[1] / "robot" / "OutboundFundsNPSP" / "resources"
+)
+sys.path.insert(0, str(RESOURCES_DIR))
+
+from locator_registry import LocatorRegistry  # noqa: E402
+from xpath_profile import (  # noqa: E402
+    SAMPLE_ARGS,
+    format_profile,
+    load_snapshots,
+    profile_locators,
+)
+
+DEFAULT_SNAPSHOT_DIR = "robot/OutboundFundsNPSP/results/snapshots"
+
+
+@click.command()
+@click.argument("snapshots", nargs=-1, type=click.Path(exists=True))
+@click.option(
+    "--api-version",
+    type=float,
+    help="Version of the locators to profile. Defaults to the latest.",
+)
+@click.option(
+    "--samples",
+    type=click.Path(exists=True, dir_okay=False),
+    help="JSON file of sample arguments by locator path.",
+)
+@click.option(
+    "--locator",
+    "prefixes",
+    multiple=True,
+    help="Only profile locators whose path starts with this. Repeatable.",
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="Evaluations per locator and page; the fastest is reported.",
+)
+@click.option(
+    "--format",
+    "report_format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+)
+def main(snapshots, api_version, samples, prefixes, repeat, report_format):
+    """Reports the cost and match counts of every locator on saved pages."""
+    if not snapshots:
+        if not Path(DEFAULT_SNAPSHOT_DIR).is_dir():
+            raise click.UsageError(
+                f"No snapshots given and {DEFAULT_SNAPSHOT_DIR} does not exist"
+            )
+        snapshots = [DEFAULT_SNAPSHOT_DIR]
+    documents = load_snapshots(snapshots)
+    if not documents:
+        raise click.ClickException("No .html snapshots in " + ", ".join(snapshots))
+
+    registry = LocatorRegistry(RESOURCES_DIR)
+    if api_version is None:
+        api_version = registry.latest_version
+    elif api_version not in registry:
+        raise click.BadParameter(
+            f"no locators for {api_version}; have "
+            + ", ".join(str(version) for version in registry.versions),
+            param_hint="--api-version",
+        )
+    sample_args = dict(SAMPLE_ARGS)
+    if samples:
+        with open(samples) as f:
+            sample_args.update(json.load(f))
+
+    rows = profile_locators(
+        registry.get_service(api_version), documents, sample_args, repeat, prefixes
+    )
+    if report_format == "json":
+        click.echo(json.dumps({"pages": list(documents), "locators": rows}, indent=2))
+    else:
+        click.echo(format_profile(rows, list(documents)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""Runs the robot suites in parallel shards balanced by their past durations.
+
+Suites are never split: each .robot file runs whole in one shard, so its
+Suite Setup and Suite Teardown (and the Delete Session Records it calls)
+stay with its tests. Suites are dealt out longest first, each to the shard
+with the least work so far, using the median suite times recorded by
+scripts/robot_timings.py. Suites without history are estimated from their
+tests' times, or from the number of tests they have.
+
+    python scripts/robot_shards.py --shards 3 --dry-run
+    python scripts/robot_shards.py --shards 3 --org qa -- --exclude perms
+
+Each shard runs in its own robot process with its own output under
+OUTPUT_DIR/shard-N, and the outputs are merged into OUTPUT_DIR/output.xml,
+log.html and report.html. Arguments after -- are passed to every robot
+process.
+"""
+
+import heapq
+import os
+import shlex
+import subprocess
+import sys
+from collections import OrderedDict
+
+import click
+from robot.api import TestSuiteBuilder
+
+from robot_timings import DEFAULT_HISTORY_PATH, TimingHistory
+
+DEFAULT_TESTS_PATH = "robot/OutboundFundsNPSP/tests"
+DEFAULT_OUTPUT_DIR = "robot/OutboundFundsNPSP/results"
+
+# Estimate per test for suites that have never been timed.
+DEFAULT_TEST_SECONDS = 60
+
+
+def get_full_name(suite):
+    # Robot Framework 7 renamed longname to full_name
+    return getattr(suite, "full_name", None) or suite.longname
+
+
+def discover_suites(path=DEFAULT_TESTS_PATH):
+    """Returns {suite full name: [test names]} for every suite with tests."""
+    suites = OrderedDict()
+    pending = [TestSuiteBuilder().build(path)]
+    while pending:
+        suite = pending.pop(0)
+        if suite.tests:
+            suites[get_full_name(suite)] = [test.name for test in suite.tests]
+        pending.extend(suite.suites)
+    return suites
+
+
+def estimate_durations(suites, suite_times, test_times):
+    """Returns {suite name: (seconds, basis)}, basis saying where seconds came from."""
+    durations = OrderedDict()
+    for name, tests in suites.items():
+        if name in suite_times:
+            durations[name] = (suite_times[name], "history")
+            continue
+        known = [
+            test_times[f"{name}.{test}"]
+            for test in tests
+            if f"{name}.{test}" in test_times
+        ]
+        if known:
+            # Untimed tests are assumed to take as long as the timed ones
+            durations[name] = (sum(known) / len(known) * len(tests), "tests")
+        else:
+            durations[name] = (DEFAULT_TEST_SECONDS * len(tests), "default")
+    return durations
+
+
+class Shard:
+    """The suites one robot process runs"""
+
+    def __init__(self, number):
+        self.number = number
+        self.suites = []
+        self.seconds = 0.0
+
+    def __lt__(self, other):
+        return (self.seconds, self.number) < (other.seconds, other.number)
+
+
+def plan_shards(durations, shards):
+    """Deals the suites out longest first, each to the least loaded shard.
+
+    Returns the shards that received suites, in shard number order.
+    """
+    heap = [Shard(number) for number in range(1, shards + 1)]
+    ordered = sorted(durations.items(), key=lambda item: (-item[1][0], item[0]))
+    for name, (seconds, _) in ordered:
+        shard = heapq.heappop(heap)
+        shard.suites.append(name)
+        shard.seconds += seconds
+        heapq.heappush(heap, shard)
+    return sorted((shard for shard in heap if shard.suites), key=lambda s: s.number)
+
+
+def get_shard_dir(output_dir, shard):
+    return os.path.join(output_dir, f"shard-{shard.number}")
+
+
+def build_command(shard, tests_path, output_dir, org=None, robot_args=()):
+    """Returns the robot command line that runs a shard."""
+    command = [sys.executable, "-m", "robot"]
+    if org:
+        command += ["--variable", f"org:{org}"]
+    for name in shard.suites:
+        command += ["--suite", name]
+    command += [
+        "--outputdir",
+        get_shard_dir(output_dir, shard),
+        "--log",
+        "NONE",
+        "--report",
+        "NONE",
+    ]
+    return command + list(robot_args) + [tests_path]
+
+
+def build_merge_command(shards, output_dir):
+    """Returns the rebot command line that merges the shard outputs."""
+    return (
+        [sys.executable, "-m", "robot.rebot", "--merge", "--outputdir", output_dir]
+        + ["--output", "output.xml"]
+        + [
+            os.path.join(get_shard_dir(output_dir, shard), "output.xml")
+            for shard in shards
+        ]
+    )
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}m {seconds:02d}s"
+
+
+def format_plan(shards, durations):
+    lines = []
+    for shard in shards:
+        lines.append(f"Shard {shard.number} ({format_duration(shard.seconds)}):")
+        for name in shard.suites:
+            seconds, basis = durations[name]
+            lines.append(f"  {name} ({format_duration(seconds)}, {basis})")
+    return "\n".join(lines)
+
+
+def run_shards(commands):
+    """Runs the shard commands at the same time; returns their exit codes."""
+    processes = [subprocess.Popen(command) for command in commands]
+    return [process.wait() for process in processes]
+
+
+@click.command(context_settings={"ignore_unknown_options": True})
+@click.argument("robot_args", nargs=-1, type=click.UNPROCESSED)
+@click.option(
+    "--shards",
+    "-k",
+    type=click.IntRange(min=1),
+    default=2,
+    show_default=True,
+    help="Number of robot processes to run at the same time.",
+)
+@click.option(
+    "--tests",
+    "tests_path",
+    default=DEFAULT_TESTS_PATH,
+    show_default=True,
+    type=click.Path(exists=True),
+)
+@click.option(
+    "--history",
+    default=DEFAULT_HISTORY_PATH,
+    show_default=True,
+    type=click.Path(dir_okay=False),
+    help="Timing history written by robot_timings.py.",
+)
+@click.option(
+    "--runs",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="Number of recent runs the median durations are taken from.",
+)
+@click.option(
+    "--output-dir",
+    default=DEFAULT_OUTPUT_DIR,
+    show_default=True,
+    type=click.Path(file_okay=False),
+)
+@click.option("--org", help="CumulusCI org to run the tests against.")
+@click.option(
+    "--dry-run", is_flag=True, help="Print the shards and commands without running."
+)
+def main(robot_args, shards, tests_path, history, runs, output_dir, org, dry_run):
+    """Runs the robot suites in balanced parallel shards."""
+    suites = discover_suites(tests_path)
+    if not suites:
+        raise click.ClickException(f"No suites with tests in {tests_path}")
+    suite_times, test_times = {}, {}
+    if os.path.exists(history):
+        timing_history = TimingHistory(history)
+        suite_times = timing_history.get_suite_times(runs)
+        test_times = timing_history.get_test_times(runs)
+    durations = estimate_durations(suites, suite_times, test_times)
+    planned = plan_shards(durations, shards)
+    click.echo(format_plan(planned, durations))
+
+    commands = [
+        build_command(shard, tests_path, output_dir, org, robot_args)
+        for shard in planned
+    ]
+    merge_command = build_merge_command(planned, output_dir)
+    if dry_run:
+        for command in commands + [merge_command]:
+            click.echo(" ".join(shlex.quote(part) for part in command))
+        return
+
+    exit_codes = run_shards(commands)
+    merge_exit_code = subprocess.call(merge_command)
+    # robot exits with the number of failed tests, or 251+ on errors
+    if merge_exit_code or any(exit_codes):
+        raise click.ClickException(
+            "Shards exited with "
+            + ", ".join(str(code) for code in exit_codes)
+            + f"; merge exited with {merge_exit_code}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+"""Keeps a history of robot keyword and test timings and reports regressions.
+
+Each output.xml is streamed with iterparse and cleared as it is read, so
+nightly logs of any size can be imported. The calls, total and slowest
+time of every keyword, the retries made by selenium_retry and the time
+of every test and suite are stored in a SQLite history:
+
+    python scripts/robot_timings.py robot/OutboundFundsNPSP/results/output.xml
+
+The latest run is then compared with the median of the earlier runs of
+the same suite.
+Keywords whose mean time per call, and tests whose time, grew by more
+than the threshold are reported as regressions, followed by the
+OutboundFundsNPSP library keywords and the time lost to selenium_retry.
+Run without OUTPUT arguments to report on the history as it is.
+"""
+
+import json
+import re
+import sqlite3
+import statistics
+import sys
+from collections import OrderedDict
+from datetime import datetime
+from xml.etree import ElementTree
+
+import click
+
+DEFAULT_HISTORY_PATH = "robot/OutboundFundsNPSP/results/timings.db"
+DEFAULT_LIBRARY = "OutboundFundsNPSP"
+
+# cumulusci's selenium_retry logs this warning and sleeps before retrying
+# a selenium command once.
+RETRY_MESSAGE = re.compile(r"^Retrying \S+ command$")
+RETRY_SLEEP_SECONDS = 2
+
+# Robot Framework < 7 writes start and end times; 7 writes start and elapsed.
+LEGACY_TIMESTAMP = re.compile(r"^\d{8} \d\d:\d\d:\d\d\.\d{3}$")
+NOT_RUN = ("NOT RUN", "NOT_RUN")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    generated TEXT NOT NULL,
+    suite TEXT NOT NULL,
+    source TEXT,
+    UNIQUE (generated, suite)
+);
+CREATE TABLE IF NOT EXISTS keyword_times (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    calls INTEGER NOT NULL,
+    total_seconds REAL NOT NULL,
+    max_seconds REAL NOT NULL,
+    retries INTEGER NOT NULL,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS test_times (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    status TEXT,
+    seconds REAL
+);
+CREATE TABLE IF NOT EXISTS suite_times (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    name TEXT NOT NULL,
+    status TEXT,
+    seconds REAL
+);
+"""
+
+
+def parse_timestamp(value):
+    """Returns an output.xml timestamp as a datetime, whichever version wrote it."""
+    if not value or value == "N/A":
+        return None
+    if LEGACY_TIMESTAMP.match(value):
+        # Much faster than strptime, which matters for millions of keywords
+        return datetime(
+            int(value[0:4]),
+            int(value[4:6]),
+            int(value[6:8]),
+            int(value[9:11]),
+            int(value[12:14]),
+            int(value[15:17]),
+            int(value[18:21]) * 1000,
+        )
+    return datetime.fromisoformat(value)
+
+
+def get_status(element):
+    """Returns (status, seconds) from the status of a kw, test or suite."""
+    status = element.find("status")
+    if status is None:
+        return None, None
+    if status.get("elapsed") is not None:
+        return status.get("status"), float(status.get("elapsed"))
+    start = parse_timestamp(status.get("starttime"))
+    end = parse_timestamp(status.get("endtime"))
+    if start is None or end is None:
+        return status.get("status"), None
+    return status.get("status"), (end - start).total_seconds()
+
+
+def get_keyword_name(element):
+    library = element.get("library") or element.get("owner")
+    name = element.get("name", "")
+    return f"{library}.{name}" if library else name
+
+
+class RunTimings:
+    """The keyword and test times of one output.xml"""
+
+    def __init__(self):
+        self.generated = None
+        self.suite = None
+        self.keywords = OrderedDict()
+        self.tests = []
+        self.suites = []
+
+    def _keyword(self, name):
+        if name not in self.keywords:
+            self.keywords[name] = {
+                "calls": 0,
+                "total_seconds": 0.0,
+                "max_seconds": 0.0,
+                "retries": 0,
+            }
+        return self.keywords[name]
+
+    def add_keyword(self, name, seconds):
+        keyword = self._keyword(name)
+        keyword["calls"] += 1
+        keyword["total_seconds"] += seconds
+        keyword["max_seconds"] = max(keyword["max_seconds"], seconds)
+
+    def add_retry(self, name):
+        self._keyword(name)["retries"] += 1
+
+
+def parse_output(source):
+    """Streams an output.xml file into a RunTimings.
+
+    Elements are cleared once read, so memory stays flat however long
+    the run was.
+    """
+    timings = RunTimings()
+    keywords = []
+    suites = []
+    for event, element in ElementTree.iterparse(source, events=("start", "end")):
+        tag = element.tag
+        if event == "start":
+            if tag == "robot":
+                generated = parse_timestamp(element.get("generated"))
+                timings.generated = generated and generated.isoformat()
+            elif tag == "suite" and element.get("id"):
+                suites.append(element.get("name"))
+                timings.suite = timings.suite or element.get("name")
+            elif tag == "kw":
+                keywords.append(get_keyword_name(element))
+            continue
+        if tag == "msg":
+            # Retries are charged to the keyword that made the selenium call
+            if (
+                keywords
+                and element.get("level") == "WARN"
+                and RETRY_MESSAGE.match(element.text or "")
+            ):
+                timings.add_retry(keywords[-1])
+        elif tag == "kw":
+            name = keywords.pop()
+            status, seconds = get_status(element)
+            if status not in NOT_RUN and seconds is not None:
+                timings.add_keyword(name, seconds)
+        elif tag == "test":
+            status, seconds = get_status(element)
+            timings.tests.append(
+                (".".join(suites + [element.get("name")]), status, seconds)
+            )
+        elif tag == "suite" and element.get("id"):
+            # The suites under <statistics> have no id and aren't results
+            status, seconds = get_status(element)
+            timings.suites.append((".".join(suites), status, seconds))
+            suites.pop()
+        else:
+            continue
+        element.clear()
+    if timings.generated is None or timings.suite is None:
+        raise ValueError(f"{source} is not a robot output.xml file")
+    return timings
+
+
+class TimingHistory:
+    """The timings of past runs, in a SQLite file"""
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript(SCHEMA)
+
+    def add_run(self, timings, source=None):
+        """Stores a run. Returns False if it was imported before."""
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT OR IGNORE INTO runs (generated, suite, source) VALUES (?, ?, ?)",
+                (timings.generated, timings.suite, source),
+            )
+            if not cursor.rowcount:
+                return False
+            run_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO keyword_times VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        run_id,
+                        name,
+                        keyword["calls"],
+                        keyword["total_seconds"],
+                        keyword["max_seconds"],
+                        keyword["retries"],
+                    )
+                    for name, keyword in timings.keywords.items()
+                ],
+            )
+            self.connection.executemany(
+                "INSERT INTO test_times VALUES (?, ?, ?, ?)",
+                [(run_id,) + test for test in timings.tests],
+            )
+            self.connection.executemany(
+                "INSERT INTO suite_times VALUES (?, ?, ?, ?)",
+                [(run_id,) + suite for suite in timings.suites],
+            )
+        return True
+
+    def get_runs(self, limit, suite=None):
+        """Returns up to limit (id, generated, suite) rows, latest first."""
+        return self.connection.execute(
+            "SELECT id, generated, suite FROM runs WHERE ? IS NULL OR suite = ? "
+            "ORDER BY generated DESC, id DESC LIMIT ?",
+            (suite, suite, limit),
+        ).fetchall()
+
+    def get_keywords(self, run_id):
+        """Returns {name: row} for the keywords of a run."""
+        self.connection.row_factory = sqlite3.Row
+        try:
+            rows = self.connection.execute(
+                "SELECT * FROM keyword_times WHERE run_id = ? ORDER BY name",
+                (run_id,),
+            ).fetchall()
+        finally:
+            self.connection.row_factory = None
+        return OrderedDict((row["name"], dict(row)) for row in rows)
+
+    def get_tests(self, run_id):
+        """Returns {name: seconds} for the tests of a run that finished."""
+        return OrderedDict(
+            self.connection.execute(
+                "SELECT name, seconds FROM test_times "
+                "WHERE run_id = ? AND seconds IS NOT NULL ORDER BY name",
+                (run_id,),
+            ).fetchall()
+        )
+
+    def get_suite_times(self, runs=5):
+        """Returns {suite name: median seconds} over the latest runs it was in."""
+        return self._get_median_times("suite_times", runs)
+
+    def get_test_times(self, runs=5):
+        """Returns {test name: median seconds} over the latest runs it was in."""
+        return self._get_median_times("test_times", runs)
+
+    def _get_median_times(self, table, runs):
+        times = {}
+        for name, seconds in self.connection.execute(
+            f"SELECT times.name, times.seconds FROM {table} AS times "
+            "JOIN runs ON runs.id = times.run_id WHERE times.seconds IS NOT NULL "
+            "ORDER BY runs.generated DESC, runs.id DESC"
+        ):
+            values = times.setdefault(name, [])
+            if len(values) < runs:
+                values.append(seconds)
+        return {name: statistics.median(values) for name, values in times.items()}
+
+
+def get_mean(keyword):
+    return keyword["total_seconds"] / keyword["calls"] if keyword["calls"] else 0.0
+
+
+class RegressionReport:
+    """The latest run compared with the median of the runs before it"""
+
+    def __init__(self, history, baseline_runs=5, threshold=0.2, min_seconds=0.1):
+        self.threshold = threshold
+        self.min_seconds = min_seconds
+        latest = history.get_runs(1)
+        if not latest:
+            raise ValueError("The timing history has no runs")
+        # Only runs of the same top-level suite are comparable
+        runs = history.get_runs(baseline_runs + 1, suite=latest[0][2])
+        self.latest, self.baseline = runs[0], runs[1:]
+        self.keywords = history.get_keywords(self.latest[0])
+        self.tests = history.get_tests(self.latest[0])
+        baseline_keywords = {}
+        baseline_tests = {}
+        for run_id, _, _ in self.baseline:
+            for name, keyword in history.get_keywords(run_id).items():
+                baseline_keywords.setdefault(name, []).append(get_mean(keyword))
+            for name, seconds in history.get_tests(run_id).items():
+                baseline_tests.setdefault(name, []).append(seconds)
+        self.baseline_keywords = {
+            name: statistics.median(values)
+            for name, values in baseline_keywords.items()
+        }
+        self.baseline_tests = {
+            name: statistics.median(values) for name, values in baseline_tests.items()
+        }
+
+    def compare(self, kind, name, latest, baseline):
+        row = {"kind": kind, "name": name, "latest": latest, "baseline": baseline}
+        row["change"] = (latest - baseline) / baseline if baseline else None
+        row["regression"] = (
+            baseline is not None
+            and latest - baseline >= self.min_seconds
+            and latest > baseline * (1 + self.threshold)
+        )
+        return row
+
+    def get_regressions(self):
+        """Returns the keywords (by mean per call) and tests that got slower."""
+        rows = [
+            self.compare(
+                "keyword", name, get_mean(keyword), self.baseline_keywords.get(name)
+            )
+            for name, keyword in self.keywords.items()
+        ]
+        rows += [
+            self.compare("test", name, seconds, self.baseline_tests.get(name))
+            for name, seconds in self.tests.items()
+        ]
+        regressions = [row for row in rows if row["regression"]]
+        return sorted(
+            regressions, key=lambda row: row["latest"] - row["baseline"], reverse=True
+        )
+
+    def get_library_keywords(self, library=DEFAULT_LIBRARY):
+        """Returns the library's keywords in the latest run, most time first."""
+        rows = []
+        for name, keyword in self.keywords.items():
+            if name.startswith(library + "."):
+                row = self.compare(
+                    "keyword", name, get_mean(keyword), self.baseline_keywords.get(name)
+                )
+                row.update(
+                    calls=keyword["calls"],
+                    total_seconds=keyword["total_seconds"],
+                    retries=keyword["retries"],
+                )
+                rows.append(row)
+        return sorted(rows, key=lambda row: row["total_seconds"], reverse=True)
+
+    def get_retries(self):
+        """Returns the selenium_retry retries of the latest run per keyword."""
+        retries = OrderedDict(
+            (name, keyword["retries"])
+            for name, keyword in sorted(
+                self.keywords.items(), key=lambda item: -item[1]["retries"]
+            )
+            if keyword["retries"]
+        )
+        return {
+            "retries": sum(retries.values()),
+            "seconds": sum(retries.values()) * RETRY_SLEEP_SECONDS,
+            "keywords": retries,
+        }
+
+    def as_dict(self, library=DEFAULT_LIBRARY):
+        return {
+            "latest": {"generated": self.latest[1], "suite": self.latest[2]},
+            "baseline_runs": len(self.baseline),
+            "regressions": self.get_regressions(),
+            "library_keywords": self.get_library_keywords(library),
+            "selenium_retry": self.get_retries(),
+        }
+
+    def format(self, library=DEFAULT_LIBRARY):
+        lines = [
+            f"Run {self.latest[1]} ({self.latest[2]}) compared with the median "
+            f"of {len(self.baseline)} earlier runs"
+        ]
+        regressions = self.get_regressions()
+        lines.append(f"Regressions: {len(regressions)}")
+        for row in regressions:
+            lines.append(
+                f"  {row['kind']} {row['name']}: {row['baseline']:.2f}s -> "
+                f"{row['latest']:.2f}s ({row['change']:+.0%})"
+            )
+        lines.append(f"{library} keywords:")
+        lines.append(
+            f"  {'Keyword':<50} {'Calls':>6} {'Total s':>8} {'Mean s':>7} "
+            f"{'Baseline':>8} {'Retries':>7}"
+        )
+        for row in self.get_library_keywords(library):
+            baseline = "-" if row["baseline"] is None else f"{row['baseline']:.2f}"
+            lines.append(
+                f"  {row['name'][len(library) + 1:]:<50} {row['calls']:>6} "
+                f"{row['total_seconds']:>8.2f} {row['latest']:>7.2f} "
+                f"{baseline:>8} {row['retries']:>7}"
+            )
+        retries = self.get_retries()
+        lines.append(
+            f"selenium_retry: {retries['retries']} retried commands, "
+            f"{retries['seconds']}s spent waiting to retry"
+        )
+        for name, count in retries["keywords"].items():
+            lines.append(f"  {name}: {count}")
+        return "\n".join(lines)
+
+
+@click.command()
+@click.argument("outputs", type=click.Path(exists=True, dir_okay=False), nargs=-1)
+@click.option(
+    "--history",
+    default=DEFAULT_HISTORY_PATH,
+    show_default=True,
+    type=click.Path(dir_okay=False),
+    help="SQLite file holding the timings of past runs.",
+)
+@click.option(
+    "--baseline-runs",
+    type=click.IntRange(min=1),
+    default=5,
+    show_default=True,
+    help="Number of earlier runs the latest run is compared with.",
+)
+@click.option(
+    "--threshold",
+    type=click.FloatRange(min=0),
+    default=0.2,
+    show_default=True,
+    help="Slowdown, as a fraction of the baseline, reported as a regression.",
+)
+@click.option(
+    "--min-seconds",
+    type=click.FloatRange(min=0),
+    default=0.1,
+    show_default=True,
+    help="Smallest slowdown in seconds reported as a regression.",
+)
+@click.option("--library", default=DEFAULT_LIBRARY, show_default=True)
+@click.option(
+    "--format",
+    "report_format",
+    type=click.Choice(["text", "json"]),
+    default="text",
+    show_default=True,
+)
+@click.option(
+    "--fail-on-regression",
+    is_flag=True,
+    help="Exit with an error when the latest run has regressions.",
+)
+def main(
+    outputs,
+    history,
+    baseline_runs,
+    threshold,
+    min_seconds,
+    library,
+    report_format,
+    fail_on_regression,
+):
+    """Imports OUTPUT files into the timing history and reports regressions."""
+    timing_history = TimingHistory(history)
+    for output in outputs:
+        try:
+            timings = parse_output(output)
+        except (ElementTree.ParseError, ValueError) as e:
+            raise click.ClickException(f"Could not read {output}: {e}")
+        if not timing_history.add_run(timings, output):
+            click.echo(f"{output} was imported before", err=True)
+
+    try:
+        report = RegressionReport(timing_history, baseline_runs, threshold, min_seconds)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    if report_format == "json":
+        json.dump(report.as_dict(library), sys.stdout, indent=2)
+        click.echo()
+    else:
+        click.echo(report.format(library))
+    regressions = report.get_regressions()
+    if fail_on_regression and regressions:
+        raise click.ClickException(f"{len(regressions)} regressions found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+# The audit scripts and the robot keyword libraries are plain modules rather
+# than installed packages, so make them importable the same way their runners do.
+for directory in ("scripts", "robot/OutboundFundsNPSP/resources"):
+    path = str(REPO_ROOT / directory)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+
+@pytest.fixture(autouse=True)
+def robot_cache_dir(tmp_path, monkeypatch):
+    """Keeps the keyword library's on-disk caches out of the working tree."""
+    monkeypatch.setenv("OUTBOUNDFUNDSNPSP_CACHE_DIR", str(tmp_path / "robot_cache"))
+    return tmp_path / "robot_cache"
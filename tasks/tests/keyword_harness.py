@@ -0,0 +1,894 @@
+"""Runs the OutboundFundsNPSP keywords without robot, a browser or an org.
+
+KeywordTestCase puts stand-ins behind the library properties of
+BaseOutboundFundsNPSPPage:
+
+* FakeBuiltIn answers get_library_instance from a registry of libraries and
+  run_keyword from a registry of keyword functions.
+* StubSeleniumLibrary drives StubDrivers, which load the static pages in
+  fixtures/html and answer the scripts the library runs with lxml. The pages
+  never change on their own, so every wait is a single check.
+* StubSalesforceLibrary and StubCumulusCI stand in for the cumulusci
+  libraries. CumulusCI.sf and CumulusCI.tooling are real simple_salesforce
+  clients whose requests FakeSalesforceAPI answers with responses.
+* FakeUserBackend creates the pool users of Lease Pool User in place of
+  force:user:create.
+"""
+
+import hashlib
+import json
+import re
+import unittest
+from collections import OrderedDict
+from itertools import count
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from types import SimpleNamespace
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import responses
+from lxml import etree
+from selenium.common.exceptions import (
+    NoAlertPresentException,
+    NoSuchElementException,
+    WebDriverException,
+)
+from SeleniumLibrary.errors import ElementNotFound
+from simple_salesforce import Salesforce
+
+import OutboundFundsNPSP as library_module
+from OutboundFundsNPSP import OutboundFundsNPSP
+from field_assertions import READ_DETAIL_FIELDS_JS
+from page_timing import PAGE_TIMING_JS
+from session_pool import RESET_PAGE_JS
+from waits import (
+    COUNT_MATCHES_JS,
+    FIND_FIRST_MATCH_JS,
+    IS_LOADING_COMPLETE_JS,
+    IS_TAB_SHOWN_JS,
+)
+from xpath_profile import DOM_SNAPSHOT_JS
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures" / "html"
+
+INSTANCE_URL = "https://example.my.salesforce.com"
+LIGHTNING_URL = "https://example.lightning.force.com"
+HOME_URL = LIGHTNING_URL + "/lightning/page/home"
+ORG_ID = "00D000000000001AAA"
+API_VERSION = "54.0"
+
+# The fixture page shown for each URL, first match wins
+ROUTES = (
+    (r"^/$", "login.html"),
+    (r"/lightning/page/home", "home.html"),
+    (r"/lightning/o/\w+/list", "listing.html"),
+    (r"/lightning/o/\w+/new", "new_funding_request.html"),
+    (r"/lightning/r/\w*Disbursement__c/\w+/view", "disbursement_detail.html"),
+    # Open Manage Expenditures goes to a disbursement by its id alone
+    (r"/lightning/r/\w+/view", "disbursement_detail.html"),
+    (r"/lightning/r/\w+/\w+/view", "funding_request_detail.html"),
+)
+
+# The sobjects of the global describe, as installed in a namespaced org
+SOBJECTS = [
+    ("Account", "Account", "Accounts", "001", False),
+    ("Contact", "Contact", "Contacts", "003", False),
+    (
+        "outfunds__Funding_Program__c",
+        "Funding Program",
+        "Funding Programs",
+        "a0B",
+        True,
+    ),
+    (
+        "outfunds__Funding_Request__c",
+        "Funding Request",
+        "Funding Requests",
+        "a0A",
+        True,
+    ),
+    ("outfunds__Disbursement__c", "Disbursement", "Disbursements", "a0D", True),
+    ("outfunds__Requirement__c", "Requirement", "Requirements", "a0R", True),
+    (
+        "npsp__General_Accounting_Unit__c",
+        "General Accounting Unit",
+        "General Accounting Units",
+        "a0G",
+        True,
+    ),
+    (
+        "outfundsnpspext__GAU_Expenditure__c",
+        "GAU Expenditure",
+        "GAU Expenditures",
+        "a0E",
+        True,
+    ),
+]
+
+CLASS_XPATH = "contains(concat(' ', normalize-space(@class), ' '), ' {} ')"
+
+# Attributes selenium reports as "true" when present, whatever their value
+BOOLEAN_ATTRIBUTES = frozenset(["checked", "disabled", "hidden", "readonly"])
+
+
+def has_class(node, name):
+    return name in (node.get("class") or "").split()
+
+
+def is_visible(node):
+    """Whether a node is shown, judged by the hidden attribute and inline style."""
+    for element in [node] + list(node.iterancestors()):
+        style = (element.get("style") or "").replace(" ", "").lower()
+        if "display:none" in style or element.get("hidden") is not None:
+            return False
+    return True
+
+
+def get_text(node):
+    return " ".join(node.xpath("string()").split())
+
+
+class StubElement:
+    """A WebElement over a node of a fixture page"""
+
+    def __init__(self, driver, node):
+        self.driver = driver
+        self.node = node
+
+    def __eq__(self, other):
+        return isinstance(other, StubElement) and other.node is self.node
+
+    def __hash__(self):
+        return id(self.node)
+
+    def __repr__(self):
+        return f"<StubElement {self.node.tag} {get_text(self.node)[:30]!r}>"
+
+    @property
+    def text(self):
+        return get_text(self.node) if is_visible(self.node) else ""
+
+    @property
+    def tag_name(self):
+        return self.node.tag
+
+    def get_attribute(self, name):
+        if name == "value" and self.node.tag == "input":
+            return self.node.get("value", "")
+        value = self.node.get(name)
+        if value is not None and name in BOOLEAN_ATTRIBUTES:
+            return "true"
+        return value
+
+    def is_displayed(self):
+        return is_visible(self.node)
+
+    def is_enabled(self):
+        return self.node.get("disabled") is None
+
+    def click(self):
+        """Clicks the node; a tab becomes the selected tab of its tab list."""
+        self.driver.clicks.append(self)
+        if self.node.get("role") == "tab":
+            tablist = next(
+                (a for a in self.node.iterancestors() if a.get("role") == "tablist"),
+                None,
+            )
+            tabs = tablist.xpath(".//*[@role='tab']") if tablist is not None else []
+            for tab in tabs:
+                tab.set("aria-selected", "false")
+            self.node.set("aria-selected", "true")
+
+    def clear(self):
+        self.node.set("value", "")
+
+    def send_keys(self, *values):
+        self.node.set("value", self.node.get("value", "") + "".join(values))
+
+
+class StubSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @property
+    def alert(self):
+        raise NoAlertPresentException()
+
+    def window(self, handle):
+        if handle not in self.driver.window_handles:
+            raise WebDriverException(f"No window {handle}")
+        self.driver.current_window = handle
+
+
+class StubDriver:
+    """A webdriver that shows the fixture page routed to each URL
+
+    Scripts are answered by the Python version of each script the keyword
+    library runs; any other script fails, so a new script can't go untested.
+    """
+
+    def __init__(self, routes=ROUTES):
+        self.routes = routes
+        # {url: url the browser lands on instead}, e.g. the login page
+        self.redirects = {}
+        self.document = etree.fromstring("<html><body></body></html>").getroottree()
+        self.current_url = "data:,"
+        self.window_handles = ["main"]
+        self.current_window = "main"
+        self.switch_to = StubSwitchTo(self)
+        self.focused = None
+        self.clicks = []
+        self.scripts = []
+        self.quit_called = False
+        self._scripts = {
+            FIND_FIRST_MATCH_JS: self._find_first_match,
+            COUNT_MATCHES_JS: lambda xpath: len(self.document.xpath(xpath)),
+            IS_TAB_SHOWN_JS: self._is_tab_shown,
+            IS_LOADING_COMPLETE_JS: self._is_loading_complete,
+            READ_DETAIL_FIELDS_JS: self._read_detail_fields,
+            PAGE_TIMING_JS: self._page_timing,
+            DOM_SNAPSHOT_JS: self._dom_snapshot,
+            RESET_PAGE_JS: self._reset_page,
+            "arguments[0].click()": lambda element: element.click(),
+        }
+
+    def get(self, url):
+        url = self.redirects.get(url, url)
+        for pattern, name in self.routes:
+            if re.search(pattern, urlparse(url).path):
+                self.load(name)
+                self.current_url = url
+                return
+        raise WebDriverException(f"No fixture page for {url}")
+
+    def load(self, name):
+        """Shows a page of fixtures/html without changing the URL."""
+        self.document = etree.parse(str(FIXTURES_DIR / name), etree.HTMLParser())
+
+    def find_elements_by_xpath(self, xpath):
+        return [StubElement(self, node) for node in self.document.xpath(xpath)]
+
+    def find_element_by_xpath(self, xpath):
+        elements = self.find_elements_by_xpath(xpath)
+        if not elements:
+            raise NoSuchElementException(f"Unable to locate element: {xpath}")
+        return elements[0]
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        try:
+            handler = self._scripts[script]
+        except KeyError:
+            raise NotImplementedError(
+                "StubDriver has no Python version of the script: " + script[:80]
+            )
+        return handler(*args)
+
+    def execute_async_script(self, script, *args):
+        self.scripts.append(script)
+
+    def get_screenshot_as_png(self):
+        """Returns stand-in PNG bytes, the same for the same page."""
+        page = etree.tostring(self.document) + self.current_url.encode()
+        return b"\x89PNG\r\n\x1a\n" + hashlib.sha1(page).digest()
+
+    def close(self):
+        self.window_handles.remove(self.current_window)
+
+    def quit(self):
+        self.quit_called = True
+
+    def _find_first_match(self, xpaths, visible_only):
+        for index, xpath in enumerate(xpaths):
+            for node in self.document.xpath(xpath):
+                if not visible_only or is_visible(node):
+                    return [index, StubElement(self, node), get_text(node)]
+        return None
+
+    def _is_tab_selected(self, element):
+        # The tab, its role="tab" element and its tab bar list item, not the
+        # page containers around the tab bar
+        items = element.node.xpath(
+            "self::* | ancestor::*[@role='tab'][1] | ancestor::li[ancestor::*[@role='tablist']][1]"
+        )
+        return any(
+            item.get("aria-selected") == "true"
+            or has_class(item, "slds-is-active")
+            or has_class(item, "active")
+            for item in items
+        )
+
+    def _is_tab_shown(self, element):
+        if self._is_tab_selected(element):
+            return True
+        tablist = next(
+            (a for a in element.node.iterancestors() if a.get("role") == "tablist"),
+            None,
+        )
+        if tablist is not None and tablist.xpath(
+            ".//*[@aria-selected] | .//li[{} or {}]".format(
+                CLASS_XPATH.format("slds-is-active"), CLASS_XPATH.format("active")
+            )
+        ):
+            return False
+        return self._is_loading_complete()
+
+    def _is_loading_complete(self):
+        spinners = self.document.xpath(
+            "//*[{} or {}]".format(
+                CLASS_XPATH.format("slds-spinner_container"),
+                CLASS_XPATH.format("forceListViewManagerLoading"),
+            )
+        )
+        return not any(is_visible(spinner) for spinner in spinners)
+
+    def _read_detail_fields(self):
+        fields = []
+        for label in self.document.xpath(
+            "//*[{}]".format(CLASS_XPATH.format("test-id__field-label"))
+        ):
+            container = next(
+                (
+                    node
+                    for node in [label] + list(label.iterancestors())
+                    if node.tag == "records-record-layout-item"
+                    or has_class(node, "forcePageBlockItem")
+                    or has_class(node, "slds-form-element")
+                ),
+                None,
+            )
+            if container is None or not is_visible(label):
+                continue
+            values = container.xpath(
+                ".//*[{}]".format(CLASS_XPATH.format("test-id__field-value"))
+            )
+            if values:
+                fields.append([get_text(label), get_text(values[0])])
+        return fields
+
+    def _page_timing(self):
+        return {
+            "loading_complete_ms": 1500.0,
+            "response_start_ms": 200.0,
+            "dom_content_loaded_ms": 600.0,
+            "load_event_ms": 900.0,
+            "document_transfer_size": 20000,
+            "resource_count": 40,
+            "resource_transfer_size": 400000,
+            "slowest_resource_ms": 350.0,
+        }
+
+    def _dom_snapshot(self):
+        return "<!DOCTYPE html>\n" + etree.tostring(
+            self.document.getroot(), method="html", encoding="unicode"
+        )
+
+    def _reset_page(self):
+        buttons = self.document.xpath(
+            "//*[{} or {}]".format(
+                CLASS_XPATH.format("slds-modal__close"),
+                CLASS_XPATH.format("toastClose"),
+            )
+        )
+        return len([button for button in buttons if is_visible(button)])
+
+
+class StubSeleniumLibrary:
+    """The SeleniumLibrary keywords the keyword library and page objects use"""
+
+    def __init__(self):
+        self.drivers = OrderedDict()
+        self.screenshots = []
+        self.implicit_wait = 0.0
+        self._driver = None
+
+    @property
+    def driver(self):
+        if self._driver is None:
+            raise RuntimeError("No browser is open.")
+        return self._driver
+
+    def open_browser(self, url, alias=None):
+        driver = StubDriver()
+        driver.get(url)
+        self.drivers[alias or f"browser{len(self.drivers) + 1}"] = driver
+        self._driver = driver
+        return driver
+
+    def switch_browser(self, alias):
+        try:
+            self._driver = self.drivers[alias]
+        except KeyError:
+            raise RuntimeError(f"Non-existing index or alias '{alias}'.")
+
+    def close_browser(self):
+        driver = self.driver
+        driver.quit()
+        for alias, open_driver in list(self.drivers.items()):
+            if open_driver is driver:
+                del self.drivers[alias]
+        self._driver = None
+
+    def find_elements(self, locator):
+        if isinstance(locator, StubElement):
+            return [locator]
+        if locator.startswith("text:"):
+            locator = "//*[contains(text(), '{}')]".format(locator[len("text:") :])
+        elif locator.startswith("xpath:"):
+            locator = locator[len("xpath:") :]
+        return self.driver.find_elements_by_xpath(locator)
+
+    def get_webelement(self, locator):
+        elements = self.find_elements(locator)
+        if not elements:
+            raise ElementNotFound(f"Element with locator '{locator}' not found.")
+        return elements[0]
+
+    def get_element_count(self, locator):
+        return len(self.find_elements(locator))
+
+    def go_to(self, url):
+        self.driver.get(url)
+
+    def wait_until_page_contains_element(
+        self, locator, timeout=None, error=None, limit=None
+    ):
+        if not self.find_elements(locator):
+            raise AssertionError(error or f"Element '{locator}' did not appear.")
+
+    def wait_until_page_does_not_contain_element(
+        self, locator, timeout=None, error=None, limit=None
+    ):
+        if self.find_elements(locator):
+            raise AssertionError(error or f"Element '{locator}' did not disappear.")
+
+    def wait_until_element_is_enabled(self, locator, timeout=None, error=None):
+        elements = self.find_elements(locator)
+        if not elements or not elements[0].is_enabled():
+            raise AssertionError(error or f"Element '{locator}' was not enabled.")
+
+    def wait_until_element_is_visible(self, locator, timeout=None, error=None):
+        elements = self.find_elements(locator)
+        if not elements or not elements[0].is_displayed():
+            raise AssertionError(error or f"Element '{locator}' not visible.")
+
+    def wait_until_location_contains(self, expected, timeout=None, message=None):
+        if expected not in self.driver.current_url:
+            raise AssertionError(message or f"Location did not contain '{expected}'.")
+
+    def location_should_contain(self, expected, message=None):
+        if expected not in self.driver.current_url:
+            raise AssertionError(
+                message
+                or f"Location should have contained '{expected}' but it was "
+                f"'{self.driver.current_url}'."
+            )
+
+    def scroll_element_into_view(self, locator):
+        self.get_webelement(locator)
+
+    def set_focus_to_element(self, locator):
+        self.driver.focused = self.get_webelement(locator)
+
+    def clear_element_text(self, locator):
+        self.get_webelement(locator).clear()
+
+    def set_selenium_implicit_wait(self, value):
+        previous, self.implicit_wait = self.implicit_wait, value
+        return previous
+
+    def capture_page_screenshot(self, filename=None):
+        self.screenshots.append(self._driver and self._driver.current_url)
+        return filename
+
+
+class StubSalesforceLibrary:
+    """The cumulusci Salesforce library keywords the keyword library uses"""
+
+    def __init__(self, selenium, cumulusci):
+        self.selenium = selenium
+        self.cumulusci = cumulusci
+        self._session_records = []
+        self.loading_waits = 0
+
+    def _jsclick(self, locator):
+        self.selenium.wait_until_page_contains_element(locator)
+        self.selenium.get_webelement(locator).click()
+
+    def _focus(self, element):
+        self.selenium.driver.focused = element
+
+    def _clear(self, element):
+        element.clear()
+
+    def _populate_field(self, locator, value):
+        field = self.selenium.get_webelement(locator)
+        self._focus(field)
+        self._clear(field)
+        field.send_keys(value)
+
+    def wait_until_loading_is_complete(self, locator=None):
+        self.loading_waits += 1
+        if locator:
+            self.selenium.wait_until_page_contains_element(locator)
+
+    def store_session_record(self, obj_type, obj_id):
+        self._session_records.append({"type": obj_type, "id": obj_id})
+
+    def salesforce_delete(self, obj_name, obj_id):
+        getattr(self.cumulusci.sf, obj_name).delete(obj_id)
+        self._session_records.remove({"type": obj_name, "id": obj_id})
+
+
+class StubCumulusCI:
+    """The cumulusci CumulusCI library, with clients for FakeSalesforceAPI"""
+
+    def __init__(self, namespace_prefix="outfunds__"):
+        self.org = SimpleNamespace(
+            instance_url=INSTANCE_URL,
+            lightning_base_url=LIGHTNING_URL,
+            org_id=ORG_ID,
+            username="admin@example.com",
+        )
+        self.project_config = SimpleNamespace(repo_commit="0123abc")
+        self.sf = Salesforce(
+            instance_url=INSTANCE_URL, session_id="session", version=API_VERSION
+        )
+        self.tooling = Salesforce(
+            instance_url=INSTANCE_URL, session_id="session", version=API_VERSION
+        )
+        self.namespace_prefix = namespace_prefix
+
+    def get_namespace_prefix(self):
+        return self.namespace_prefix
+
+
+class FakeBuiltIn:
+    """BuiltIn with a registry of library instances and keywords"""
+
+    def __init__(self):
+        self.libraries = OrderedDict()
+        self.keywords = {}
+        self.variables = {}
+        self.messages = []
+
+    def register_library(self, name, instance):
+        self.libraries[name] = instance
+
+    def register_keyword(self, name, function):
+        self.keywords[name.lower()] = function
+
+    def get_library_instance(self, name=None, all=False):
+        if all:
+            return dict(self.libraries)
+        try:
+            return self.libraries[name]
+        except KeyError:
+            raise RuntimeError(f"No library '{name}' found.")
+
+    def run_keyword(self, name, *args):
+        try:
+            keyword = self.keywords[name.lower()]
+        except KeyError:
+            raise RuntimeError(f"No keyword with name '{name}' found.")
+        return keyword(*args)
+
+    def get_variable_value(self, name, default=None):
+        return self.variables.get(name, default)
+
+    def log(self, message, level="INFO", html=False, console=False):
+        self.messages.append((level, str(message)))
+
+
+class FakeUserBackend:
+    """Creates pool users without sfdx, with ids in the order of creation"""
+
+    def __init__(self):
+        self.created = []
+
+    def create_user(self, definition_path, alias):
+        self.created.append((Path(definition_path).name, alias))
+        number = len(self.created)
+        return {
+            "id": f"005{number:012d}AAA",
+            "username": f"user{number}@example.com",
+        }
+
+
+class FakeSalesforceAPI:
+    """The REST resources the keyword library calls, over in-memory records
+
+    Answers the versions list, the global describe, Composite inserts and
+    gets, single-record SOQL queries, gets, updates and deletes, and sObject
+    Collections deletes.
+    """
+
+    def __init__(self, instance_url=INSTANCE_URL, version=API_VERSION):
+        self.records = OrderedDict()
+        # {sobject: (errorCode, message)} for inserts to fail
+        self.insert_errors = {}
+        self._ids = count(1)
+        self.key_prefixes = {name: prefix for name, _, _, prefix, _ in SOBJECTS}
+        data_url = f"{instance_url}/services/data"
+        base_url = re.escape(f"{data_url}/v{version}/")
+        self.mock = responses.RequestsMock(assert_all_requests_are_fired=False)
+        self.mock.add(
+            responses.GET,
+            data_url,
+            json=[{"version": "53.0"}, {"version": version}],
+        )
+        self.mock.add(
+            responses.GET,
+            re.compile(base_url + r"sobjects/?$"),
+            json={
+                "sobjects": [
+                    {
+                        "name": name,
+                        "label": label,
+                        "labelPlural": label_plural,
+                        "keyPrefix": prefix,
+                        "custom": custom,
+                    }
+                    for name, label, label_plural, prefix, custom in SOBJECTS
+                ]
+            },
+        )
+        self.mock.add_callback(
+            responses.POST, re.compile(base_url + r"composite$"), self._composite
+        )
+        self.mock.add_callback(
+            responses.GET, re.compile(base_url + r"query/?(\?.*)?$"), self._query
+        )
+        record_url = re.compile(base_url + r"sobjects/(\w+)/(\w+)$")
+        self.mock.add_callback(responses.GET, record_url, self._get)
+        self.mock.add_callback(responses.PATCH, record_url, self._update)
+        self.mock.add_callback(responses.DELETE, record_url, self._delete_record)
+        self.mock.add_callback(
+            responses.DELETE,
+            re.compile(base_url + r"composite/sobjects(\?.*)?$"),
+            self._delete,
+        )
+
+    def start(self):
+        self.mock.start()
+
+    def stop(self):
+        self.mock.stop()
+        self.mock.reset()
+
+    def count_calls(self, method, path):
+        """Returns how many requests were made to a path ending in path."""
+        return len(
+            [
+                call
+                for call in self.mock.calls
+                if call.request.method == method
+                and urlparse(call.request.url).path.rstrip("/").endswith(path)
+            ]
+        )
+
+    def insert(self, sobject, **fields):
+        """Adds a record as if it had been inserted; returns its id."""
+        prefix = self.key_prefixes.get(sobject, "a0Z")
+        record_id = f"{prefix}{next(self._ids):012d}AAA"
+        self.records[record_id] = dict(
+            fields, Id=record_id, attributes={"type": sobject}
+        )
+        return record_id
+
+    def _composite(self, request):
+        body = json.loads(request.body)
+        ids = {}
+        responses_ = []
+        failed = False
+        for subrequest in body["compositeRequest"]:
+            sobject = subrequest["url"].rsplit("/", 1)[-1]
+            if subrequest["method"] == "GET" and not failed:
+                url = re.sub(
+                    r"@\{(\w+)\.id\}",
+                    lambda match: ids[match.group(1)],
+                    subrequest["url"],
+                )
+                status, record = self._get_record(url.rsplit("/", 1)[-1])
+                responses_.append(
+                    {
+                        "referenceId": subrequest["referenceId"],
+                        "httpStatusCode": status,
+                        "body": record,
+                    }
+                )
+                continue
+            if failed:
+                responses_.append(
+                    {
+                        "referenceId": subrequest["referenceId"],
+                        "httpStatusCode": 400,
+                        "body": [
+                            {"errorCode": "PROCESSING_HALTED", "message": "halted"}
+                        ],
+                    }
+                )
+                continue
+            if sobject in self.insert_errors:
+                code, message = self.insert_errors[sobject]
+                failed = True
+                responses_.append(
+                    {
+                        "referenceId": subrequest["referenceId"],
+                        "httpStatusCode": 400,
+                        "body": [{"errorCode": code, "message": message}],
+                    }
+                )
+                continue
+            fields = {
+                name: self._resolve_reference(value, ids)
+                for name, value in subrequest["body"].items()
+            }
+            record_id = self.insert(sobject, **fields)
+            ids[subrequest["referenceId"]] = record_id
+            responses_.append(
+                {
+                    "referenceId": subrequest["referenceId"],
+                    "httpStatusCode": 201,
+                    "body": {"id": record_id, "success": True, "errors": []},
+                }
+            )
+        if failed:
+            # All or none: roll back the chunk and halt the other subrequests
+            for record_id in ids.values():
+                del self.records[record_id]
+            for response in responses_:
+                if response["httpStatusCode"] == 201:
+                    response["httpStatusCode"] = 400
+                    response["body"] = [
+                        {"errorCode": "PROCESSING_HALTED", "message": "halted"}
+                    ]
+        return (200, {}, json.dumps({"compositeResponse": responses_}))
+
+    @staticmethod
+    def _resolve_reference(value, ids):
+        if isinstance(value, str):
+            match = re.match(r"^@\{(\w+)\.id\}$", value)
+            if match:
+                return ids[match.group(1)]
+        return value
+
+    def _query(self, request):
+        soql = parse_qs(urlparse(request.url).query)["q"][0]
+        match = re.match(
+            r"SELECT (.+) FROM (\w+) WHERE Id = '(\w+)'$", soql, re.IGNORECASE
+        )
+        if not match:
+            return (400, {}, json.dumps([{"errorCode": "MALFORMED_QUERY"}]))
+        names, sobject, record_id = match.groups()
+        stored = self.records.get(record_id)
+        records = []
+        if stored is not None and stored["attributes"]["type"] == sobject:
+            record = {"attributes": {"type": sobject}}
+            for name in names.split(", "):
+                self._select(record, stored, name.split("."))
+            records.append(record)
+        result = {"totalSize": len(records), "done": True, "records": records}
+        return (200, {}, json.dumps(result))
+
+    def _select(self, record, stored, parts):
+        """Copies a field, or a field of a looked-up record, into a result."""
+        name = parts[0]
+        if len(parts) == 1:
+            record[name] = stored.get(name)
+            return
+        lookup = name[: -len("__r")] + "__c" if name.endswith("__r") else name + "Id"
+        parent = self.records.get(stored.get(lookup))
+        if parent is None:
+            record[name] = None
+            return
+        related = record.setdefault(name, {"attributes": parent["attributes"]})
+        self._select(related, parent, parts[1:])
+
+    def _get_record(self, record_id):
+        record = self.records.get(record_id)
+        if record is None:
+            return 404, [{"errorCode": "NOT_FOUND", "message": "not found"}]
+        return 200, record
+
+    def _get(self, request):
+        status, body = self._get_record(urlparse(request.url).path.rsplit("/", 1)[-1])
+        return (status, {}, json.dumps(body))
+
+    def _update(self, request):
+        record_id = urlparse(request.url).path.rsplit("/", 1)[-1]
+        if record_id not in self.records:
+            return self._get(request)
+        self.records[record_id].update(json.loads(request.body))
+        return (204, {}, "")
+
+    def _delete_record(self, request):
+        record_id = urlparse(request.url).path.rsplit("/", 1)[-1]
+        if self.records.pop(record_id, None) is None:
+            return self._get(request)
+        return (204, {}, "")
+
+    def _delete(self, request):
+        query = parse_qs(urlparse(request.url).query)
+        results = []
+        for record_id in query["ids"][0].split(","):
+            if self.records.pop(record_id, None) is not None:
+                results.append({"id": record_id, "success": True, "errors": []})
+            else:
+                results.append(
+                    {
+                        "id": record_id,
+                        "success": False,
+                        "errors": [
+                            {
+                                "statusCode": "ENTITY_IS_DELETED",
+                                "message": "entity is deleted",
+                            }
+                        ],
+                    }
+                )
+        return (200, {}, json.dumps(results))
+
+
+class KeywordTestCase(unittest.TestCase):
+    """Sets up the libraries the OutboundFundsNPSP keywords run against.
+
+    self.library is a new OutboundFundsNPSP with a browser open at the
+    home page; Open Test Browser opens another stub browser there.
+    ${OUTPUT DIR} is self.output_dir, a temporary directory.
+    """
+
+    def setUp(self):
+        self.api = FakeSalesforceAPI()
+        self.api.start()
+        self.addCleanup(self.api.stop)
+
+        self.builtin = FakeBuiltIn()
+        output_dir = TemporaryDirectory()
+        self.addCleanup(output_dir.cleanup)
+        self.output_dir = Path(output_dir.name)
+        self.builtin.variables["${OUTPUT DIR}"] = output_dir.name
+        for target in ("BaseObjects.BuiltIn", "cumulusci.robotframework.utils.BuiltIn"):
+            patcher = mock.patch(target, return_value=self.builtin)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        self.selenium = StubSeleniumLibrary()
+        self.cumulusci = StubCumulusCI()
+        self.salesforce = StubSalesforceLibrary(self.selenium, self.cumulusci)
+        for name, instance in (
+            ("SeleniumLibrary", self.selenium),
+            ("cumulusci.robotframework.Salesforce", self.salesforce),
+            ("cumulusci.robotframework.CumulusCI", self.cumulusci),
+        ):
+            self.builtin.register_library(name, instance)
+        self.builtin.register_keyword("Open Test Browser", self.open_test_browser)
+
+        # Probe the API version of the fake org, rather than any memo
+        library_module.api_version_by_instance.clear()
+        self.addCleanup(library_module.api_version_by_instance.clear)
+        self.library = OutboundFundsNPSP()
+        self.users = FakeUserBackend()
+        self.library.user_pool_backend = self.users
+        self.addCleanup(self.library._close)
+        self.builtin.register_library("OutboundFundsNPSP", self.library)
+        self.selenium.open_browser(HOME_URL)
+
+    def open_test_browser(self, *args):
+        options = dict(arg.split("=", 1) for arg in args)
+        self.selenium.open_browser(HOME_URL, alias=options.get("alias"))
+
+    @property
+    def driver(self):
+        return self.selenium.driver
+
+    def get_failure_artifacts(self):
+        """Waits until the failure captures are written; returns their names."""
+        self.library.failure_capture.close()
+        directory = self.output_dir / "failures"
+        return sorted(path.name for path in directory.glob("*"))
+
+    def show_page(self, path):
+        """Goes to a page of the org, e.g. /lightning/r/a0A.../view."""
+        self.selenium.go_to(LIGHTNING_URL + path)
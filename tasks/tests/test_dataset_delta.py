@@ -0,0 +1,294 @@
+import subprocess
+import unittest
+from unittest import mock
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import yaml
+from click.testing import CliRunner
+
+import dataset_delta
+from dataset_mapping import load_mapping, load_sql, open_sql_dataset
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+MAPPING_PATH = REPO_ROOT / "datasets" / "mapping.yml"
+SQL_PATH = REPO_ROOT / "datasets" / "data.sql"
+
+NEW_GAU = "INSERT INTO \"npsp__General_Accounting_Unit__c\" VALUES(3,'Library');"
+CHANGED_PROGRAM = (
+    'UPDATE "outfunds__Funding_Program__c" SET "outfunds__Status__c" = \'Closed\' '
+    "WHERE \"Name\" = 'Education'"
+)
+# Keys that are unique in datasets/data.sql
+KEYS = {
+    "Contact": ["FirstName", "LastName"],
+    "outfunds__Funding_Request__c": ["Name", "outfunds__Application_Date__c"],
+    "outfunds__Funding_Request_Role__c": ["outfunds__Role__c", "outfunds__Status__c"],
+    "outfunds__Disbursement__c": ["outfunds__Type__c", "outfunds__Scheduled_Date__c"],
+    "outfunds__Requirement__c": [
+        "Name",
+        "outfunds__Due_Date__c",
+        "outfunds__Completed_Date__c",
+    ],
+    "GAU_Expenditure__c": ["Amount__c"],
+}
+
+
+def get_key_args(**keys):
+    keys = {**KEYS, **keys}
+    return [
+        arg
+        for name, fields in keys.items()
+        for arg in ("--key", f"{name}={','.join(fields)}")
+    ]
+
+
+def make_version(*statements, keys=KEYS):
+    steps = load_mapping(MAPPING_PATH)
+    connection = open_sql_dataset(SQL_PATH)
+    for statement in statements:
+        connection.execute(statement)
+    return dataset_delta.DatasetVersion(steps, connection, keys)
+
+
+class TestDatasetDelta(unittest.TestCase):
+    def test_keys_do_not_depend_on_ids(self):
+        version = make_version()
+        renumbered = make_version(
+            'UPDATE "npsp__General_Accounting_Unit__c" SET id = id + 10',
+            'UPDATE "GAU_Expenditure__c" '
+            "SET general_accounting_unit__c = general_accounting_unit__c + 10",
+        )
+
+        delta = dataset_delta.DatasetDelta(version, renumbered)
+
+        self.assertEqual(0, sum(len(ids) for ids in delta.inserts.values()))
+        self.assertEqual(0, sum(len(ids) for ids in delta.updates.values()))
+
+    def test_duplicate_keys_are_numbered(self):
+        keys = dict(KEYS)
+        del keys["outfunds__Funding_Request__c"]
+        version = make_version(keys=keys)
+
+        # There are two "Skills for Success" requests
+        self.assertEqual(
+            6, len(set(version.keys["outfunds__Funding_Request__c"].values()))
+        )
+        self.assertEqual(
+            [{"Name": "Skills for Success"}],
+            version.duplicates["outfunds__Funding_Request__c"],
+        )
+
+    def test_steps_without_a_name_need_a_key(self):
+        with self.assertRaisesRegex(ValueError, "No key fields for Contact"):
+            make_version(keys={})
+
+    def test_inserts_updates_and_parents(self):
+        delta = dataset_delta.DatasetDelta(
+            make_version(), make_version(NEW_GAU, CHANGED_PROGRAM)
+        )
+
+        self.assertEqual([3], delta.inserts["npsp__General_Accounting_Unit__c"])
+        self.assertEqual([3], delta.updates["outfunds__Funding_Program__c"])
+        self.assertEqual(5, delta.unchanged["outfunds__Funding_Program__c"])
+        rows = delta.get_rows_to_write()
+        self.assertEqual({3}, rows["npsp__General_Accounting_Unit__c"])
+        self.assertEqual({3}, rows["outfunds__Funding_Program__c"])
+        self.assertEqual(set(), rows["Contact"])
+
+    def test_changed_parent_key_updates_children(self):
+        delta = dataset_delta.DatasetDelta(
+            make_version(),
+            make_version(
+                'UPDATE "npsp__General_Accounting_Unit__c" SET "Name" = \'Renamed\' '
+                "WHERE id = 1"
+            ),
+        )
+
+        self.assertEqual([1], delta.inserts["npsp__General_Accounting_Unit__c"])
+        self.assertEqual(1, delta.removed["npsp__General_Accounting_Unit__c"])
+        # The expenditures keep their keys and now look up the renamed GAU
+        self.assertEqual([], delta.inserts["GAU_Expenditure__c"])
+        self.assertEqual([1, 5], delta.updates["GAU_Expenditure__c"])
+        self.assertEqual(0, delta.removed["GAU_Expenditure__c"])
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.directory = Path(self.temp_dir.name)
+        self.new_sql = self.directory / "new.sql"
+        self.new_sql.write_text(
+            SQL_PATH.read_text().replace(
+                "INSERT INTO \"GAU_Expenditure__c\" VALUES(1,'1250.0','1','5');",
+                "INSERT INTO \"GAU_Expenditure__c\" VALUES(1,'1250.0','1','5');\n"
+                "INSERT INTO \"GAU_Expenditure__c\" VALUES(6,'99.0','2','1');",
+            )
+        )
+
+    def run_delta(self, *args, exit_code=0):
+        output_sql = self.directory / "delta.sql"
+        output_mapping = self.directory / "delta_mapping.yml"
+        result = CliRunner().invoke(
+            dataset_delta.main,
+            [
+                "--mapping",
+                str(MAPPING_PATH),
+                "--output-sql",
+                str(output_sql),
+                "--output-mapping",
+                str(output_mapping),
+                *args,
+            ],
+        )
+        self.assertEqual(exit_code, result.exit_code, result.output)
+        if exit_code:
+            return result, None, None
+        return (
+            result,
+            load_sql(output_sql.read_text()),
+            yaml.safe_load(output_mapping.read_text()),
+        )
+
+    def test_etl_upsert_on_key_fields(self):
+        result, delta, mapping = self.run_delta(
+            *get_key_args(), str(SQL_PATH), str(self.new_sql)
+        )
+
+        self.assertIn("GAU_Expenditure__c: 1 inserted, 0 updated", result.output)
+        self.assertEqual(
+            [(6, "99.0", "2", "1")],
+            delta.execute('SELECT * FROM "GAU_Expenditure__c"').fetchall(),
+        )
+        # The disbursement and GAU it looks up come along, with their parents
+        self.assertEqual(
+            [(1,)],
+            delta.execute('SELECT id FROM "outfunds__Disbursement__c"').fetchall(),
+        )
+        self.assertEqual(
+            [(6,)],
+            delta.execute('SELECT id FROM "outfunds__Funding_Request__c"').fetchall(),
+        )
+        self.assertEqual("etl_upsert", mapping["Account"]["action"])
+        self.assertEqual(["Name"], mapping["Account"]["update_key"])
+        self.assertEqual(
+            ["outfunds__Type__c", "outfunds__Scheduled_Date__c"],
+            mapping["outfunds__Disbursement__c"]["update_key"],
+        )
+        self.assertEqual(list(load_mapping(MAPPING_PATH)), list(mapping))
+
+    def test_steps_without_a_name_need_a_key(self):
+        result, _, _ = self.run_delta(str(SQL_PATH), str(self.new_sql), exit_code=2)
+
+        self.assertIn("steps without a Name: Contact,", result.output)
+        self.assertNotIn("Account", result.output)
+
+    def test_key_must_be_mapped_fields(self):
+        result, _, _ = self.run_delta(
+            *get_key_args(GAU_Expenditure__c=["General_Accounting_Unit__c"]),
+            str(SQL_PATH),
+            str(self.new_sql),
+            exit_code=2,
+        )
+
+        self.assertIn("doesn't map: General_Accounting_Unit__c", result.output)
+
+    def test_etl_upsert_keys_must_be_unique(self):
+        result, _, _ = self.run_delta(
+            *get_key_args(outfunds__Funding_Request__c=["Name"]),
+            str(SQL_PATH),
+            str(self.new_sql),
+            exit_code=2,
+        )
+
+        self.assertIn(
+            'outfunds__Funding_Request__c ({"Name": "Skills for Success"})',
+            result.output,
+        )
+
+    def make_objects_dir(self, *objects):
+        objects_dir = self.directory / "objects"
+        for name in objects:
+            fields_dir = objects_dir / name / "fields"
+            fields_dir.mkdir(parents=True)
+            (fields_dir / "Dataset_Key__c.field-meta.xml").write_text("<CustomField/>")
+        return objects_dir
+
+    def test_upsert_on_external_id(self):
+        objects_dir = self.make_objects_dir(
+            "GAU_Expenditure__c", "outfunds__Funding_Request__c"
+        )
+        _, delta, mapping = self.run_delta(
+            "--external-id-field",
+            "Dataset_Key__c",
+            "--objects-dir",
+            str(objects_dir),
+            # The two "Skills for Success" requests get keys of their own
+            *get_key_args(outfunds__Funding_Request__c=["Name"]),
+            str(SQL_PATH),
+            str(self.new_sql),
+        )
+
+        (key,) = delta.execute(
+            'SELECT "Dataset_Key__c" FROM "GAU_Expenditure__c"'
+        ).fetchone()
+        self.assertEqual(20, len(key))
+        self.assertEqual("upsert", mapping["GAU_Expenditure__c"]["action"])
+        self.assertEqual("Dataset_Key__c", mapping["GAU_Expenditure__c"]["update_key"])
+        self.assertEqual("Dataset_Key__c", mapping["GAU_Expenditure__c"]["fields"][-1])
+        # Objects without the field keep etl_upsert and their columns
+        self.assertEqual("etl_upsert", mapping["Contact"]["action"])
+        self.assertNotIn("Dataset_Key__c", mapping["Contact"]["fields"])
+        self.assertEqual(
+            ["Name"], mapping["outfunds__Funding_Request__c"]["fields"][:1]
+        )
+        self.assertNotIn(
+            "Dataset_Key__c",
+            [
+                row[1]
+                for row in delta.execute(
+                    'PRAGMA table_info("outfunds__Disbursement__c")'
+                )
+            ],
+        )
+
+    def test_external_id_field_no_object_has(self):
+        result, _, _ = self.run_delta(
+            "--external-id-field",
+            "Dataset_Key__c",
+            "--objects-dir",
+            str(self.make_objects_dir()),
+            *get_key_args(),
+            str(SQL_PATH),
+            str(self.new_sql),
+            exit_code=2,
+        )
+
+        self.assertIn("has the field Dataset_Key__c", result.output)
+
+    def test_git_objects(self):
+        subprocess.run(["git", "init", "-q"], cwd=self.directory, check=True)
+        (self.directory / "data.sql").write_text(SQL_PATH.read_text())
+        subprocess.run(["git", "add", "data.sql"], cwd=self.directory, check=True)
+        subprocess.run(
+            [
+                "git",
+                "-c",
+                "user.name=t",
+                "-c",
+                "user.email=t@example.com",
+                "commit",
+                "-q",
+                "-m",
+                "data",
+            ],
+            cwd=self.directory,
+            check=True,
+        )
+        with mock.patch.dict("os.environ", {"GIT_DIR": str(self.directory / ".git")}):
+            result, _, _ = self.run_delta(
+                *get_key_args(), "HEAD:data.sql", str(self.new_sql)
+            )
+
+        self.assertIn("GAU_Expenditure__c: 1 inserted", result.output)
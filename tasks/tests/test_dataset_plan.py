@@ -0,0 +1,141 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from click.testing import CliRunner
+
+import dataset_plan
+from dataset_mapping import get_load_waves, load_mapping, open_sql_dataset
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+MAPPING_PATH = REPO_ROOT / "datasets" / "mapping.yml"
+SQL_PATH = REPO_ROOT / "datasets" / "data.sql"
+
+
+class TestLoadWaves(unittest.TestCase):
+    def test_storytelling_waves(self):
+        self.assertEqual(
+            [
+                [
+                    "Account",
+                    "outfunds__Funding_Program__c",
+                    "npsp__General_Accounting_Unit__c",
+                ],
+                ["Contact"],
+                ["outfunds__Funding_Request__c"],
+                ["outfunds__Funding_Request_Role__c", "outfunds__Disbursement__c"],
+                ["outfunds__Requirement__c", "GAU_Expenditure__c"],
+            ],
+            get_load_waves(load_mapping(MAPPING_PATH)),
+        )
+
+    def test_cycles(self):
+        with TemporaryDirectory() as directory:
+            mapping = Path(directory, "mapping.yml")
+            mapping.write_text(
+                "A:\n  sf_object: A\n  table: A\n"
+                "  lookups:\n    B__c:\n      table: B\n"
+                "B:\n  sf_object: B\n  table: B\n"
+                "  lookups:\n    A__c:\n      table: A\n"
+            )
+            with self.assertRaisesRegex(ValueError, "cycle between A, B"):
+                get_load_waves(load_mapping(mapping))
+
+
+class TestDatasetPlan(unittest.TestCase):
+    def plan(self, *statements):
+        connection = open_sql_dataset(SQL_PATH)
+        for statement in statements:
+            connection.execute(statement)
+        return dataset_plan.DatasetPlan(load_mapping(MAPPING_PATH), connection).check()
+
+    def test_storytelling_dataset_is_consistent(self):
+        plan = self.plan()
+
+        self.assertEqual([], plan.errors)
+        self.assertIn(
+            "outfunds__Requirement__c.outfunds__Disbursement__c: empty in every row",
+            plan.warnings,
+        )
+        self.assertEqual(6, plan.row_counts["outfunds__Funding_Request__c"])
+
+    def test_dangling_references(self):
+        plan = self.plan(
+            "INSERT INTO \"GAU_Expenditure__c\" VALUES(6, '1.0', '1', '99')",
+            "INSERT INTO \"GAU_Expenditure__c\" VALUES(7, '1.0', '3', '98')",
+            "UPDATE \"outfunds__Disbursement__c\" SET outfunds__funding_request__c = ''",
+        )
+
+        self.assertEqual(
+            [
+                "GAU_Expenditure__c.General_Accounting_Unit__c: 1 rows refer to "
+                "missing npsp__General_Accounting_Unit__c rows (row 7 -> 3)",
+                "GAU_Expenditure__c.Disbursement__c: 2 rows refer to missing "
+                "outfunds__Disbursement__c rows (row 6 -> 99, row 7 -> 98)",
+            ],
+            plan.errors,
+        )
+        self.assertIn(
+            "outfunds__Disbursement__c.outfunds__Funding_Request__c: "
+            "empty in every row",
+            plan.warnings,
+        )
+
+    def test_missing_tables_and_columns(self):
+        plan = self.plan(
+            'DROP TABLE "outfunds__Funding_Request_Role__c"',
+            'ALTER TABLE "Contact" RENAME COLUMN "Title" TO "JobTitle"',
+            'DELETE FROM "npsp__General_Accounting_Unit__c"',
+        )
+
+        self.assertEqual(
+            [
+                "Contact: column Title is missing",
+                "outfunds__Funding_Request_Role__c: table "
+                "outfunds__Funding_Request_Role__c is missing",
+                "GAU_Expenditure__c.General_Accounting_Unit__c: 5 rows refer to "
+                "missing npsp__General_Accounting_Unit__c rows "
+                "(row 1 -> 1, row 2 -> 2, row 3 -> 2, row 4 -> 2, row 5 -> 1)",
+            ],
+            plan.errors,
+        )
+        self.assertIn("npsp__General_Accounting_Unit__c: no rows", plan.warnings)
+
+
+class TestMain(unittest.TestCase):
+    def test_json(self):
+        result = CliRunner().invoke(
+            dataset_plan.main,
+            [
+                "--mapping",
+                str(MAPPING_PATH),
+                "--sql",
+                str(SQL_PATH),
+                "--format",
+                "json",
+            ],
+        )
+
+        self.assertEqual(0, result.exit_code, result.output)
+        report = json.loads(result.output)
+        self.assertEqual([], report["errors"])
+        self.assertEqual(5, len(report["waves"]))
+
+    def test_errors_fail(self):
+        with TemporaryDirectory() as directory:
+            sql_path = Path(directory, "data.sql")
+            sql_path.write_text(
+                SQL_PATH.read_text().replace(
+                    "INSERT INTO \"GAU_Expenditure__c\" VALUES(1,'1250.0','1','5');",
+                    "INSERT INTO \"GAU_Expenditure__c\" VALUES(1,'1250.0','1','50');",
+                )
+            )
+            result = CliRunner().invoke(
+                dataset_plan.main,
+                ["--mapping", str(MAPPING_PATH), "--sql", str(sql_path)],
+            )
+
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("row 1 -> 50", result.output)
+        self.assertIn("1. Account (6)", result.output)
@@ -0,0 +1,127 @@
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from describe_cache import DescribeCache, DescribeIndex
+from OutboundFundsNPSP import OutboundFundsNPSP
+from robot_cache import JsonFileCache
+
+DESCRIBE_RESULT = {
+    "sobjects": [
+        {"name": "Account", "label": "Account", "keyPrefix": "001"},
+        {"name": "outfunds__Funding_Program__c", "label": "Funding Program"},
+        {"name": "GAU_Expenditure__c", "label": "GAU Expenditure"},
+        {
+            "name": "npsp__General_Accounting_Unit__c",
+            "label": "General Accounting Unit",
+        },
+    ]
+}
+
+
+class TestJsonFileCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_ttl(self):
+        cache = JsonFileCache(self.temp_dir.name, ttl=60)
+        cache.set("key", {"a": 1})
+
+        self.assertEqual({"a": 1}, cache.get("key"))
+        with mock.patch("robot_cache.time.time", return_value=time.time() + 61):
+            self.assertIsNone(cache.get("key"))
+
+    def test_invalidate(self):
+        cache = JsonFileCache(self.temp_dir.name)
+        cache.set("one", 1)
+        cache.set("two", 2)
+
+        cache.invalidate("one")
+        self.assertIsNone(cache.get("one"))
+        self.assertEqual(2, cache.get("two"))
+        cache.invalidate()
+        self.assertIsNone(cache.get("two"))
+
+    def test_get_or_create_builds_once(self):
+        cache = JsonFileCache(self.temp_dir.name)
+        factory = mock.Mock(side_effect=lambda: time.sleep(0.1) or "value")
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            values = list(
+                executor.map(lambda _: cache.get_or_create("key", factory), range(8))
+            )
+
+        self.assertEqual(["value"] * 8, values)
+        factory.assert_called_once()
+
+
+class TestDescribeCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_index(self):
+        index = DescribeIndex(DESCRIBE_RESULT["sobjects"])
+
+        self.assertEqual(
+            "outfunds__Funding_Program__c", index.get_sobject_name("Funding Program")
+        )
+        self.assertEqual("outfunds__", index.get_namespace_prefix("Funding Program"))
+        self.assertEqual("", index.get_namespace_prefix("GAU Expenditure"))
+        with self.assertRaises(AssertionError):
+            index.get_sobject_name("Missing")
+
+    def test_describe_once_per_org_and_version(self):
+        describe = mock.Mock(return_value=DESCRIBE_RESULT)
+        for _ in range(3):
+            # Each worker process has its own DescribeCache over the same directory.
+            DescribeCache(self.temp_dir.name).get_index("00D1", "abc", describe)
+        self.assertEqual(1, describe.call_count)
+
+        DescribeCache(self.temp_dir.name).get_index("00D1", "def", describe)
+        DescribeCache(self.temp_dir.name).get_index("00D2", "abc", describe)
+        self.assertEqual(3, describe.call_count)
+
+        DescribeCache(self.temp_dir.name).invalidate("00D1", "abc")
+        DescribeCache(self.temp_dir.name).get_index("00D1", "abc", describe)
+        self.assertEqual(4, describe.call_count)
+
+
+class TestNamespacePrefixKeywords(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.cumulusci = mock.Mock()
+        self.cumulusci.org.org_id = "00D1"
+        self.cumulusci.project_config.repo_commit = "abc"
+        self.cumulusci.sf.describe.return_value = DESCRIBE_RESULT
+        self.cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        patcher = mock.patch.object(
+            OutboundFundsNPSP, "cumulusci", new_callable=mock.PropertyMock
+        )
+        patcher.start().return_value = self.cumulusci
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+        self.library = OutboundFundsNPSP()
+        self.library._describe_cache = DescribeCache(self.temp_dir.name)
+
+    def test_namespace_prefixes(self):
+        self.assertEqual("outfunds__", self.library.get_outfundsnpsp_namespace_prefix())
+        self.assertEqual("", self.library.get_outfundsnpspext_namespace_prefix())
+        self.assertEqual("npsp__", self.library.get_npsp_namespace_prefix())
+        self.cumulusci.sf.describe.assert_called_once()
+
+    def test_invalidate_describe_cache(self):
+        self.library.get_npsp_namespace_prefix()
+        self.library.invalidate_describe_cache()
+        self.library.get_npsp_namespace_prefix()
+
+        self.assertEqual(2, self.cumulusci.sf.describe.call_count)
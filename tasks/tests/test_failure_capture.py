@@ -0,0 +1,148 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from BaseObjects import capture_screenshot_on_error
+from failure_capture import FailureCapture, get_slug
+from xpath_profile import load_snapshots
+
+PAGE = b"<!DOCTYPE html>\n<html><body><h1>Funding Request</h1></body></html>"
+
+
+class TestFailureCapture(unittest.TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name, "failures")
+
+    def get_files(self):
+        return sorted(path.name for path in self.directory.iterdir())
+
+    def test_add_writes_screenshot_and_snapshot(self):
+        capture = FailureCapture(self.directory)
+
+        png_path, html_path = capture.add("Create Funding Request", b"png", PAGE)
+        capture.close()
+
+        self.assertEqual(b"png", png_path.read_bytes())
+        self.assertEqual(
+            [
+                "failure-001-create-funding-request.html.gz",
+                "failure-001-create-funding-request.png",
+            ],
+            self.get_files(),
+        )
+        # The gzipped snapshots can be profiled like saved pages
+        documents = load_snapshots([self.directory])
+        self.assertEqual(["failure-001-create-funding-request"], list(documents))
+        self.assertEqual(
+            ["Funding Request"],
+            documents["failure-001-create-funding-request"].xpath("//h1/text()"),
+        )
+        self.assertEqual(3 + html_path.stat().st_size, capture.bytes)
+
+    def test_add_dedupes_by_hash(self):
+        capture = FailureCapture(self.directory)
+        first = capture.add("First", b"png", PAGE)
+
+        self.assertEqual(first, capture.add("Second", b"png", PAGE))
+        # A new snapshot of the same screen is still saved
+        png_path, html_path = capture.add("Third", b"png", PAGE + b"<p>")
+        capture.close()
+
+        self.assertEqual(first[0], png_path)
+        self.assertEqual("failure-002-third.html.gz", html_path.name)
+        self.assertEqual(3, len(self.get_files()))
+        self.assertEqual(1, capture.duplicates)
+
+    def test_budget_by_count(self):
+        capture = FailureCapture(self.directory, max_captures=2)
+
+        capture.add("One", b"1")
+        capture.add("Two", b"2")
+
+        self.assertIsNone(capture.add("Three", b"3"))
+        capture.close()
+        self.assertEqual(2, len(self.get_files()))
+        self.assertIn("2 failure(s) saved", capture.format_stats())
+        self.assertIn("1 over budget", capture.format_stats())
+
+    def test_budget_by_size(self):
+        capture = FailureCapture(self.directory, max_bytes=100)
+
+        capture.add("Small", b"x" * 60)
+
+        self.assertIsNone(capture.add("Large", b"y" * 60))
+        self.assertIsNotNone(capture.add("Smaller", b"z" * 40))
+        capture.close()
+
+    def test_start_removes_earlier_runs(self):
+        self.directory.mkdir()
+        (self.directory / "failure-001-old.png").write_bytes(b"old")
+        (self.directory / "notes.txt").write_text("kept")
+
+        capture = FailureCapture(self.directory)
+        capture.add("New", b"new")
+        capture.close()
+
+        self.assertEqual(["failure-001-new.png", "notes.txt"], self.get_files())
+
+    def test_write_error(self):
+        capture = FailureCapture(self.directory)
+        capture.start()
+        self.directory.rmdir()
+
+        capture.add("Lost", b"png")
+        capture.close()
+
+        self.assertEqual(0, capture.bytes)
+        self.assertIn("failure-001-lost.png", capture.errors[0])
+
+    def test_get_slug(self):
+        self.assertEqual("create-gau-expenditure", get_slug("Create GAU Expenditure!"))
+        self.assertEqual("failure", get_slug("???"))
+        self.assertEqual("a" * 40, get_slug("a" * 60))
+
+
+class Page:
+    def __init__(self, library):
+        self.OutboundFundsNPSP = library
+
+    @capture_screenshot_on_error
+    def inner(self):
+        raise AssertionError("not found")
+
+    @capture_screenshot_on_error
+    def outer(self):
+        self.inner()
+
+    @capture_screenshot_on_error
+    def passes(self):
+        return "ok"
+
+
+class TestCaptureScreenshotOnError(unittest.TestCase):
+    def test_failure_is_captured_once(self):
+        library = mock.Mock()
+
+        with self.assertRaisesRegex(AssertionError, "not found"):
+            Page(library).outer()
+
+        library.capture_failure_artifacts.assert_called_once_with()
+
+    def test_success_is_not_captured(self):
+        library = mock.Mock()
+
+        self.assertEqual("ok", Page(library).passes())
+        library.capture_failure_artifacts.assert_not_called()
+
+    @mock.patch("BaseObjects.safe_screenshot")
+    def test_without_library(self, safe_screenshot):
+        page = Page(None)
+        del page.OutboundFundsNPSP
+
+        with self.assertRaises(AssertionError):
+            page.inner()
+
+        safe_screenshot.assert_called_once_with()
@@ -0,0 +1,170 @@
+import unittest
+from unittest import mock
+
+from field_assertions import (
+    MISSING,
+    READ_DETAIL_FIELDS_JS,
+    build_record_query,
+    compare_fields,
+    compare_page_fields,
+    format_mismatches,
+    get_field,
+    values_match,
+)
+from OutboundFundsNPSP import OutboundFundsNPSP
+
+RECORD = {
+    "attributes": {"type": "outfunds__Funding_Request__c"},
+    "Id": "a0A000000000001AAA",
+    "Name": "Robot Test",
+    "outfunds__Status__c": "Awarded",
+    "outfunds__Awarded_Amount__c": 10000.0,
+    "outfunds__Closed__c": False,
+    "outfunds__Close_Date__c": None,
+    "outfunds__FundingProgram__r": {
+        "attributes": {"type": "outfunds__Funding_Program__c"},
+        "Name": "Robot Program",
+    },
+    "outfunds__Applying_Contact__r": None,
+}
+
+
+class TestFieldAssertions(unittest.TestCase):
+    def test_build_record_query(self):
+        self.assertEqual(
+            "SELECT Id, Name, outfunds__FundingProgram__r.Name "
+            "FROM outfunds__Funding_Request__c WHERE Id = 'a0A\\'x'",
+            build_record_query(
+                "outfunds__Funding_Request__c",
+                "a0A'x",
+                ["Id", "Name", "outfunds__FundingProgram__r.Name"],
+            ),
+        )
+        with self.assertRaises(ValueError):
+            build_record_query("Contact", "003", ["Name FROM Account"])
+
+    def test_get_field(self):
+        self.assertEqual(
+            "Robot Program", get_field(RECORD, "OUTFUNDS__FundingProgram__r.name")
+        )
+        self.assertIsNone(get_field(RECORD, "outfunds__Applying_Contact__r.Name"))
+        self.assertIs(MISSING, get_field(RECORD, "outfunds__Missing__c"))
+
+    def test_values_match(self):
+        for expected, actual in (
+            ("10000", 10000.0),
+            ("false", False),
+            ("", None),
+            ("None", None),
+            ("Awarded", "Awarded"),
+        ):
+            with self.subTest(expected=expected, actual=actual):
+                self.assertTrue(values_match(expected, actual))
+        for expected, actual in (
+            ("$10,000.00", 10000.0),
+            ("awarded", "Awarded"),
+            ("", MISSING),
+            ("x", None),
+        ):
+            with self.subTest(expected=expected, actual=actual):
+                self.assertFalse(values_match(expected, actual))
+
+    def test_compare_page_fields_accepts_any_occurrence(self):
+        page_fields = [
+            ["Status", "Awarded"],
+            ["Amount", "$5.00"],
+            ["Amount", "$10,000.00"],
+        ]
+
+        self.assertEqual(
+            [("Status", "Open", "Awarded"), ("Owner", "Robot", MISSING)],
+            compare_page_fields(
+                {"Amount": "$10,000.00", "Status": "Open", "Owner": "Robot"},
+                page_fields,
+            ),
+        )
+
+    def test_format_mismatches(self):
+        message = format_mismatches(
+            compare_fields(
+                {"Name": "Robot Test", "Status": "Open", "Stage": "New"},
+                {"Name": "Robot Test", "Status": "Awarded"},
+            ),
+            "the record page",
+        )
+
+        self.assertEqual(
+            "2 field(s) of the record page did not match:\n"
+            "    Status: expected 'Open' but found 'Awarded'\n"
+            "    Stage: expected 'New' but the field was not found",
+            message,
+        )
+
+
+class TestLibraryFieldAssertions(unittest.TestCase):
+    def setUp(self):
+        self.cumulusci = mock.Mock()
+        self.cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        self.selenium = mock.Mock()
+        for name, value in (("cumulusci", self.cumulusci), ("selenium", self.selenium)):
+            patcher = mock.patch.object(
+                OutboundFundsNPSP, name, new_callable=mock.PropertyMock
+            )
+            patcher.start().return_value = value
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(OutboundFundsNPSP, "capture_failure_artifacts")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.library = OutboundFundsNPSP()
+
+    def test_validate_record_fields_in_one_query(self):
+        self.cumulusci.sf.query.return_value = {"records": [RECORD]}
+
+        self.library.validate_record_fields(
+            "outfunds__Funding_Request__c",
+            RECORD["Id"],
+            outfunds__Status__c="Awarded",
+            outfunds__Awarded_Amount__c="10000",
+            **{"outfunds__FundingProgram__r.Name": "Robot Program"},
+        )
+        self.cumulusci.sf.query.assert_called_once()
+
+        with self.assertRaisesRegex(
+            AssertionError,
+            r"2 field\(s\) of outfunds__Funding_Request__c a0A000000000001AAA",
+        ):
+            self.library.validate_record_fields(
+                "outfunds__Funding_Request__c",
+                RECORD["Id"],
+                outfunds__Status__c="Open",
+                outfunds__Closed__c="true",
+            )
+
+    def test_validate_record_fields_without_record(self):
+        self.cumulusci.sf.query.return_value = {"records": []}
+
+        with self.assertRaisesRegex(AssertionError, "No Contact record"):
+            self.library.validate_record_fields("Contact", "003", Name="Robot")
+
+    def test_validate_detail_page_fields_in_one_call(self):
+        self.selenium.driver.execute_script.return_value = [
+            ["Unpaid Disbursements", "$80,000.00"],
+            ["Available for Disbursement", "$20,000.00"],
+        ]
+
+        self.library.validate_detail_page_fields(
+            **{
+                "Unpaid Disbursements": "$80,000.00",
+                "Available for Disbursement": "$20,000.00",
+            }
+        )
+        self.selenium.driver.execute_script.assert_called_once_with(
+            READ_DETAIL_FIELDS_JS
+        )
+
+        with self.assertRaisesRegex(AssertionError, "Unpaid Disbursements: expected"):
+            self.library.validate_detail_page_fields(
+                **{"Unpaid Disbursements": "$0.00"}
+            )
@@ -0,0 +1,285 @@
+import itertools
+import json
+import re
+import unittest
+from datetime import date
+from unittest import mock
+
+import responses
+from simple_salesforce import Salesforce
+
+from fixture_factory import (
+    CompositeError,
+    RecordGraph,
+    build_funding_graph,
+    insert_graph,
+    insert_record,
+)
+from OutboundFundsNPSP import OutboundFundsNPSP
+
+INSTANCE_URL = "https://example.my.salesforce.com"
+COMPOSITE_URL = f"{INSTANCE_URL}/services/data/v54.0/composite"
+REFERENCE = re.compile(r"^@\{(\w+)\.id\}$")
+
+
+class FakeCompositeApi:
+    """Stands in for the Composite resource, resolving references like Salesforce"""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.records = {}
+        self.requests = []
+        self._ids = itertools.count(1)
+
+    def __call__(self, request):
+        payload = json.loads(request.body)
+        self.requests.append(payload)
+        assert payload["allOrNone"] is True
+        assert len(payload["compositeRequest"]) <= 25
+        ids = {}
+        results = []
+        for subrequest in payload["compositeRequest"]:
+            reference_id = subrequest["referenceId"]
+            if reference_id == self.fail_on:
+                return (200, {}, json.dumps(self._failure(payload, reference_id)))
+            body = {}
+            for name, value in subrequest["body"].items():
+                match = REFERENCE.match(str(value))
+                body[name] = ids[match.group(1)] if match else value
+            sobject = subrequest["url"].rsplit("/", 1)[-1]
+            record_id = f"a0{next(self._ids):016d}"
+            ids[reference_id] = record_id
+            self.records[record_id] = (sobject, body)
+            results.append(
+                {
+                    "body": {"id": record_id, "success": True, "errors": []},
+                    "httpStatusCode": 201,
+                    "referenceId": reference_id,
+                }
+            )
+        return (200, {}, json.dumps({"compositeResponse": results}))
+
+    def _failure(self, payload, failed_reference_id):
+        results = []
+        for subrequest in payload["compositeRequest"]:
+            reference_id = subrequest["referenceId"]
+            if reference_id == failed_reference_id:
+                error = {"errorCode": "REQUIRED_FIELD_MISSING", "message": "Name"}
+            else:
+                error = {"errorCode": "PROCESSING_HALTED", "message": "halted"}
+            results.append(
+                {"body": [error], "httpStatusCode": 400, "referenceId": reference_id}
+            )
+        return {"compositeResponse": results}
+
+
+def make_sf():
+    return Salesforce(instance_url=INSTANCE_URL, session_id="session", version="54.0")
+
+
+def make_names():
+    counter = itertools.count(1)
+    return lambda: f"Robot Test {next(counter)}"
+
+
+class TestInsertGraph(unittest.TestCase):
+    def add_api(self, **kwargs):
+        api = FakeCompositeApi(**kwargs)
+        responses.add_callback(responses.POST, COMPOSITE_URL, callback=api)
+        return api
+
+    def test_references_must_point_backwards(self):
+        graph = RecordGraph()
+        with self.assertRaises(ValueError):
+            graph.add("contacts", "Contact", AccountId=RecordGraph().add("a", "A"))
+
+    @responses.activate
+    def test_graph_in_one_request(self):
+        api = self.add_api()
+        graph = build_funding_graph(
+            "outfunds__",
+            make_names(),
+            contacts=2,
+            funding_requests=3,
+            disbursements_per_request=2,
+            requirements_per_request=1,
+            assigned_user="005000000000001",
+            today=date(2021, 1, 1),
+        )
+        inserted = []
+
+        ids = insert_graph(
+            make_sf(), graph, on_insert=lambda *record: inserted.append(record)
+        )
+
+        self.assertEqual(1, len(api.requests))
+        self.assertEqual(16, len(ids))
+        grouped = graph.group_ids(ids)
+        self.assertEqual(
+            [1, 2, 1, 3, 6, 3], [len(group_ids) for group_ids in grouped.values()]
+        )
+        (program_id,) = grouped["funding_program"]
+        for request_id, contact_id in zip(
+            grouped["funding_requests"], grouped["contacts"] * 2
+        ):
+            sobject, fields = api.records[request_id]
+            self.assertEqual("outfunds__Funding_Request__c", sobject)
+            self.assertEqual(program_id, fields["outfunds__FundingProgram__c"])
+            self.assertEqual(contact_id, fields["outfunds__Applying_Contact__c"])
+        _, program = api.records[program_id]
+        self.assertEqual("2021-04-01", program["outfunds__End_Date__c"])
+        # Parents are stored before children, so they are deleted last
+        self.assertEqual(("Account", grouped["account"][0]), inserted[0])
+        self.assertEqual("outfunds__Requirement__c", inserted[-1][0])
+
+    @responses.activate
+    def test_expenditures_split_the_disbursement_amount(self):
+        api = self.add_api()
+        graph = build_funding_graph(
+            "outfunds__",
+            make_names(),
+            disbursements_per_request=1,
+            expenditures_per_disbursement=30,
+            npsp_ns="npsp__",
+        )
+
+        grouped = graph.group_ids(insert_graph(make_sf(), graph))
+
+        self.assertEqual(2, len(api.requests))
+        self.assertEqual(30, len(grouped["gau_expenditures"]))
+        (gau_id,) = grouped["gaus"]
+        (disbursement_id,) = grouped["disbursements"]
+        amounts = []
+        for expenditure_id in grouped["gau_expenditures"]:
+            sobject, fields = api.records[expenditure_id]
+            self.assertEqual("GAU_Expenditure__c", sobject)
+            self.assertEqual(gau_id, fields["General_Accounting_Unit__c"])
+            self.assertEqual(disbursement_id, fields["Disbursement__c"])
+            amounts.append(fields["Amount__c"])
+        self.assertEqual(333.33, amounts[0])
+        self.assertLessEqual(sum(amounts), 10000)
+
+    @responses.activate
+    def test_references_across_chunks_use_returned_ids(self):
+        api = self.add_api()
+        graph = build_funding_graph(
+            "",
+            make_names(),
+            contacts=1,
+            funding_requests=12,
+            disbursements_per_request=1,
+        )
+
+        ids = insert_graph(make_sf(), graph)
+
+        self.assertEqual(2, len(api.requests))
+        program_id = ids["funding_program1"]
+        last_chunk = api.requests[1]["compositeRequest"]
+        self.assertTrue(
+            all(
+                subrequest["body"].get("FundingProgram__c", program_id) == program_id
+                for subrequest in last_chunk
+            )
+        )
+        for request_id in graph.group_ids(ids)["funding_requests"]:
+            self.assertEqual(
+                program_id, api.records[request_id][1]["FundingProgram__c"]
+            )
+
+    @responses.activate
+    def test_failed_chunk_reports_errors_and_earlier_records(self):
+        self.add_api(fail_on="funding_requests25")
+        graph = build_funding_graph("", make_names(), funding_requests=30)
+        inserted = []
+
+        with self.assertRaisesRegex(CompositeError, "REQUIRED_FIELD_MISSING") as cm:
+            insert_graph(
+                make_sf(), graph, on_insert=lambda *record: inserted.append(record)
+            )
+
+        self.assertEqual(25, len(inserted))
+        self.assertEqual(inserted, cm.exception.inserted)
+        self.assertEqual(1, len(cm.exception.errors))
+
+
+class TestInsertRecord(unittest.TestCase):
+    @responses.activate
+    def test_insert_and_get_in_one_request(self):
+        record = {
+            "attributes": {"type": "Contact"},
+            "Id": "003000000000001AAA",
+            "LastName": "Rigby",
+            "Name": "Rigby",
+        }
+        responses.add(
+            responses.POST,
+            COMPOSITE_URL,
+            json={
+                "compositeResponse": [
+                    {
+                        "body": {"id": record["Id"], "success": True, "errors": []},
+                        "httpStatusCode": 201,
+                        "referenceId": "record",
+                    },
+                    {"body": record, "httpStatusCode": 200, "referenceId": "get"},
+                ]
+            },
+        )
+
+        self.assertEqual(
+            record, insert_record(make_sf(), "Contact", {"LastName": "Rigby"})
+        )
+
+        payload = json.loads(responses.calls[0].request.body)
+        self.assertEqual(
+            [
+                ("POST", "/services/data/v54.0/sobjects/Contact"),
+                ("GET", "/services/data/v54.0/sobjects/Contact/@{record.id}"),
+            ],
+            [(sub["method"], sub["url"]) for sub in payload["compositeRequest"]],
+        )
+
+    @responses.activate
+    def test_failed_insert(self):
+        api = FakeCompositeApi(fail_on="record")
+        responses.add_callback(responses.POST, COMPOSITE_URL, callback=api)
+
+        with self.assertRaisesRegex(
+            CompositeError, r"Could not insert Contact \(record: REQUIRED_FIELD_MISSING"
+        ) as cm:
+            insert_record(make_sf(), "Contact", {"FirstName": "Eleanor"})
+
+        self.assertEqual([], cm.exception.inserted)
+
+
+class TestApiCreateFundingGraph(unittest.TestCase):
+    @responses.activate
+    def test_records_are_stored_as_session_records(self):
+        api = FakeCompositeApi()
+        responses.add_callback(responses.POST, COMPOSITE_URL, callback=api)
+        cumulusci = mock.Mock()
+        cumulusci.sf = make_sf()
+        cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        salesforce = mock.Mock()
+        for name, value in (("cumulusci", cumulusci), ("salesforce", salesforce)):
+            patcher = mock.patch.object(
+                OutboundFundsNPSP, name, new_callable=mock.PropertyMock
+            )
+            patcher.start().return_value = value
+            self.addCleanup(patcher.stop)
+        library = OutboundFundsNPSP()
+
+        with mock.patch.object(
+            library, "get_outfundsnpsp_namespace_prefix", return_value="outfunds__"
+        ):
+            graph = library.api_create_funding_graph(
+                contacts=1, funding_requests=2, disbursements_per_request=1
+            )
+
+        self.assertEqual(1, len(api.requests))
+        self.assertEqual(7, salesforce.store_session_record.call_count)
+        salesforce.store_session_record.assert_any_call(
+            "outfunds__Disbursement__c", graph["disbursements"][1]
+        )
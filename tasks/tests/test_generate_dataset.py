@@ -0,0 +1,152 @@
+import sqlite3
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from click.testing import CliRunner
+
+import generate_dataset
+from dataset_mapping import (
+    create_table_sql,
+    get_columns,
+    load_mapping,
+    open_sql_dataset,
+    quote,
+)
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+MAPPING_PATH = REPO_ROOT / "datasets" / "mapping.yml"
+SQL_PATH = REPO_ROOT / "datasets" / "data.sql"
+
+
+class TestMapping(unittest.TestCase):
+    def test_tables_match_the_dataset(self):
+        steps = load_mapping(MAPPING_PATH)
+        dataset = open_sql_dataset(SQL_PATH)
+        reference = sqlite3.connect(":memory:")
+
+        for step in steps.values():
+            with self.subTest(step.name):
+                reference.execute(create_table_sql(step))
+                self.assertEqual(
+                    get_columns(dataset, step.table), get_columns(reference, step.table)
+                )
+
+    def test_lookup_columns(self):
+        steps = load_mapping(MAPPING_PATH)
+        program = steps["outfunds__Funding_Program__c"]
+
+        (lookup,) = program.lookups
+        self.assertEqual("outfunds__Parent_Funding_Program__c", lookup.column)
+        self.assertEqual("outfunds__Funding_Program__c", lookup.after)
+        self.assertEqual(
+            ["account_id", "reports_to_id"],
+            [lookup.column for lookup in steps["Contact"].lookups],
+        )
+
+
+class TestGenerateDataset(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.output = Path(self.temp_dir.name, "scaled.db")
+
+    def generate(self, *args):
+        result = CliRunner().invoke(
+            generate_dataset.main,
+            [
+                "--output",
+                str(self.output),
+                "--mapping",
+                str(MAPPING_PATH),
+                "--template",
+                str(SQL_PATH),
+                *args,
+            ],
+        )
+        self.assertEqual(0, result.exit_code, result.output)
+        return sqlite3.connect(str(self.output))
+
+    def count(self, connection, table):
+        return connection.execute(f"SELECT COUNT(*) FROM {quote(table)}").fetchone()[0]
+
+    def test_counts(self):
+        connection = self.generate(
+            "--scale-factor",
+            "3",
+            "--count",
+            "GAU_Expenditure__c=2500",
+            "--batch-size",
+            "1000",
+        )
+
+        self.assertEqual(18, self.count(connection, "Account"))
+        self.assertEqual(15, self.count(connection, "outfunds__Disbursement__c"))
+        self.assertEqual(2500, self.count(connection, "GAU_Expenditure__c"))
+
+    def test_foreign_keys_are_valid(self):
+        connection = self.generate(
+            "--count",
+            "outfunds__Funding_Request__c=500",
+            "--count",
+            "outfunds__Disbursement__c=2000",
+            "--count",
+            "GAU_Expenditure__c=5000",
+        )
+
+        for step in load_mapping(MAPPING_PATH).values():
+            for lookup in step.lookups:
+                with self.subTest(step=step.name, lookup=lookup.field):
+                    (dangling,) = connection.execute(
+                        f"SELECT COUNT(*) FROM {quote(step.table)} AS child "
+                        f"WHERE child.{quote(lookup.column)} != '' AND NOT EXISTS "
+                        f"(SELECT 1 FROM {quote(lookup.table)} AS parent "
+                        f"WHERE parent.id = CAST(child.{quote(lookup.column)} AS INTEGER))"
+                    ).fetchone()
+                    self.assertEqual(0, dangling)
+        (used_requests,) = connection.execute(
+            "SELECT COUNT(DISTINCT outfunds__funding_request__c) "
+            'FROM "outfunds__Disbursement__c"'
+        ).fetchone()
+        self.assertGreater(used_requests, 5)
+
+    def test_optional_lookups_stay_empty(self):
+        connection = self.generate("--scale-factor", "2")
+
+        (filled,) = connection.execute(
+            'SELECT COUNT(*) FROM "outfunds__Requirement__c" '
+            "WHERE outfunds__disbursement__c != ''"
+        ).fetchone()
+        self.assertEqual(0, filled)
+
+    def test_same_seed_same_dataset(self):
+        first = (
+            self.generate("--seed", "7")
+            .execute('SELECT * FROM "GAU_Expenditure__c"')
+            .fetchall()
+        )
+        second = (
+            self.generate("--seed", "7")
+            .execute('SELECT * FROM "GAU_Expenditure__c"')
+            .fetchall()
+        )
+
+        self.assertEqual(first, second)
+
+    def test_unknown_table(self):
+        result = CliRunner().invoke(
+            generate_dataset.main,
+            [
+                "--output",
+                str(self.output),
+                "--mapping",
+                str(MAPPING_PATH),
+                "--template",
+                str(SQL_PATH),
+                "--count",
+                "Lead=5",
+            ],
+        )
+
+        self.assertEqual(2, result.exit_code)
+        self.assertIn("Lead", result.output)
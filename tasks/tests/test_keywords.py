@@ -0,0 +1,873 @@
+import json
+import re
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+from unittest.mock import ANY
+
+from click.testing import CliRunner
+from cumulusci.robotframework.pageobjects import PageObjects
+from robot.api import get_model
+from robot.api.parsing import ModelVisitor
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.remote.command import Command
+from simple_salesforce.exceptions import SalesforceResourceNotFound
+
+from BaseObjects import PageLoadBenchmarkMixin
+from DisbursementPageObject import DisbursementDetailPage
+from FundingProgramPageObject import FundingProgramDetailPage, FundingProgramListingPage
+from FundingRequestPageObject import FundingRequestDetailPage, FundingRequestListingPage
+from GAUExpenditurePageObject import GAUExpenditureDetailPage
+import keyword_overhead_benchmark
+from keyword_harness import (
+    HOME_URL,
+    INSTANCE_URL,
+    ORG_ID,
+    KeywordTestCase,
+    StubElement,
+)
+from OutboundFundsNPSP import OutboundFundsNPSP
+from robot_cache import make_key
+from waits import IS_TAB_SHOWN_JS
+from xpath_profile import load_snapshot
+
+BENCHMARKS_DIR = (
+    Path(__file__).parents[2] / "robot" / "OutboundFundsNPSP" / "benchmarks"
+)
+REQUEST_PAGE = "/lightning/r/outfunds__Funding_Request__c/a0A000000000001AAA/view"
+NEW_REQUEST_PAGE = "/lightning/o/outfunds__Funding_Request__c/new"
+DISBURSEMENT_ID = "a0D000000000001AAA"
+
+
+class PageVisitFinder(ModelVisitor):
+    """Collects the (page type, object name) of each page a suite goes to."""
+
+    def __init__(self):
+        self.pages = []
+
+    def visit_KeywordCall(self, node):
+        if node.keyword == "Go To Page" and "${" not in node.args[1]:
+            self.pages.append(tuple(node.args[:2]))
+        elif node.keyword == "Visit Record Page":
+            # PageLoad.robot wraps Go To Page Details in this keyword
+            self.pages.append(("Details", node.args[0]))
+
+
+def get_keywords():
+    """Returns the keywords the OutboundFundsNPSP class itself defines."""
+    # selenium_retry subclasses the library class; the keywords are on its base
+    library_class = OutboundFundsNPSP.__bases__[0]
+    return sorted(
+        name
+        for name, value in vars(library_class).items()
+        if callable(value) and not name.startswith("_")
+    )
+
+
+class TestLocatorKeywords(KeywordTestCase):
+    def test_get_outboundfundsnpsp_lex_locators(self):
+        self.assertEqual(
+            "//a[@class='slds-tabs_default__link' and text()='Details']",
+            self.library.get_outboundfundsnpsp_lex_locators(
+                "tab.tab_header", "Details"
+            ),
+        )
+
+    def test_get_outboundfundsnpsp_locator(self):
+        self.assertEqual(
+            "//c-manage-expenditures//button[text()='Save Updates']",
+            self.library.get_outboundfundsnpsp_locator(
+                "manage_expenditures.button", "Save Updates"
+            ),
+        )
+
+    def test_check_if_element_exists(self):
+        self.show_page(REQUEST_PAGE)
+
+        self.assertTrue(self.library.check_if_element_exists("//tbody/tr"))
+        self.assertFalse(
+            self.library.check_if_element_exists("//c-manage-expenditures")
+        )
+
+    def test_new_random_string(self):
+        self.assertRegex(self.library.new_random_string(len=8), "^[a-z]{8}$")
+
+    def test_generate_new_string(self):
+        self.assertRegex(self.library.generate_new_string(), "^Robot Test [a-z]{5}$")
+        self.assertRegex(self.library.generate_new_string("GAU"), "^GAU [a-z]{5}$")
+
+    def test_random_email(self):
+        self.assertRegex(self.library.random_email(), r"^robot_[a-z]{5}@example\.com$")
+
+    def test_get_namespace_prefix(self):
+        self.assertEqual(
+            "outfunds__",
+            self.library.get_namespace_prefix("outfunds__Funding_Program__c"),
+        )
+        self.assertEqual("", self.library.get_namespace_prefix("Funding_Program__c"))
+
+
+class TestDescribeKeywords(KeywordTestCase):
+    def test_get_outfundsnpsp_namespace_prefix(self):
+        self.assertEqual("outfunds__", self.library.get_outfundsnpsp_namespace_prefix())
+
+    def test_get_outfundsnpspext_namespace_prefix(self):
+        self.assertEqual(
+            "outfundsnpspext__", self.library.get_outfundsnpspext_namespace_prefix()
+        )
+
+    def test_get_npsp_namespace_prefix(self):
+        self.assertEqual("npsp__", self.library.get_npsp_namespace_prefix())
+        self.library.get_outfundsnpsp_namespace_prefix()
+
+        self.assertEqual(1, self.api.count_calls("GET", "/sobjects"))
+
+    def test_invalidate_describe_cache(self):
+        self.library.get_npsp_namespace_prefix()
+        self.library.invalidate_describe_cache()
+        self.library.get_npsp_namespace_prefix()
+        self.library.invalidate_describe_cache(all_orgs=True)
+        self.library.get_npsp_namespace_prefix()
+
+        self.assertEqual(3, self.api.count_calls("GET", "/sobjects"))
+
+
+class TestRecordPageKeywords(KeywordTestCase):
+    def setUp(self):
+        super().setUp()
+        self.show_page(REQUEST_PAGE)
+
+    def test_click_link_with_text(self):
+        self.library.click_link_with_text("Robot Test Program")
+
+        self.assertEqual("Robot Test Program", self.driver.clicks[-1].text)
+
+    def test_click_link_with_text_captures_failure(self):
+        self.builtin.variables["${TEST NAME}"] = "Click Program Link"
+
+        with self.assertRaises(AssertionError):
+            self.library.click_link_with_text("Another Program")
+
+        self.assertEqual(
+            [
+                "failure-001-click-program-link.html.gz",
+                "failure-001-click-program-link.png",
+            ],
+            self.get_failure_artifacts(),
+        )
+        self.assertEqual([], self.selenium.screenshots)
+
+    def test_capture_failure_artifacts(self):
+        path = self.library.capture_failure_artifacts("Manage Expenditures")
+        self.library.capture_failure_artifacts("Manage Expenditures")
+        self.show_page(NEW_REQUEST_PAGE)
+        self.library.capture_failure_artifacts("New Funding Request", dom=False)
+
+        self.assertEqual(
+            str(self.output_dir / "failures" / "failure-001-manage-expenditures.png"),
+            path,
+        )
+        self.assertEqual(
+            [
+                "failure-001-manage-expenditures.html.gz",
+                "failure-001-manage-expenditures.png",
+                "failure-002-new-funding-request.png",
+            ],
+            self.get_failure_artifacts(),
+        )
+        self.assertEqual(1, self.library.failure_capture.duplicates)
+        level, message = self.builtin.messages[0]
+        self.assertIn(
+            '<img src="failures/failure-001-manage-expenditures.png"', message
+        )
+        self.assertIn(
+            'href="failures/failure-001-manage-expenditures.html.gz"', message
+        )
+
+    def test_capture_failure_artifacts_over_budget(self):
+        self.library.max_failure_captures = 1
+        self.library.capture_failure_artifacts("First")
+        self.show_page(NEW_REQUEST_PAGE)
+
+        self.assertIsNone(self.library.capture_failure_artifacts("Second"))
+        self.assertEqual("WARN", self.builtin.messages[-1][0])
+        self.assertIn("budget is spent", self.builtin.messages[-1][1])
+
+    def test_capture_failure_artifacts_without_browser(self):
+        self.selenium.close_browser()
+
+        self.assertIsNone(self.library.capture_failure_artifacts())
+        self.assertEqual("WARN", self.builtin.messages[-1][0])
+
+    def test_validate_field_value(self):
+        self.library.validate_field_value("Status", "contains", "In progress")
+        self.library.validate_field_value(
+            "Status", "does not contain", "Submitted", section="Status"
+        )
+        # One round-trip for all the alternative locators
+        self.assertEqual(2, len(self.driver.scripts))
+
+        with self.assertRaisesRegex(Exception, "should not contain value"):
+            self.library.validate_field_value(
+                "Status", "does not contain", "In progress"
+            )
+        with self.assertRaisesRegex(AssertionError, "locator not found"):
+            self.library.validate_field_value("Status", "contains", "Awarded")
+
+    def test_validate_detail_page_fields(self):
+        self.library.validate_detail_page_fields(
+            Status="In progress", **{"Requested Amount": "$10,000.00"}
+        )
+
+        with self.assertRaises(AssertionError) as context:
+            self.library.validate_detail_page_fields(
+                Status="Awarded", **{"Hidden Field": "Hidden"}
+            )
+        message = str(context.exception)
+        self.assertIn("2 field(s) of the record page did not match", message)
+        self.assertIn("Status: expected 'Awarded' but found 'In progress'", message)
+        self.assertIn("Hidden Field: expected 'Hidden' but the field was not", message)
+
+    def test_click_tab(self):
+        self.library.click_tab("Related")
+
+        (tab,) = self.driver.find_elements_by_xpath("//a[text()='Related']")
+        self.assertEqual("true", tab.get_attribute("aria-selected"))
+        self.assertIn("click_tab", self.library.waits.durations)
+
+    def test_click_related_list_link_with_text(self):
+        self.library.click_related_list_link_with_text("View All")
+
+        self.assertEqual("View All", self.driver.clicks[-1].text)
+
+    def test_click_related_list_wrapper_button(self):
+        self.library.click_related_list_wrapper_button("Disbursements", "New")
+
+        self.assertEqual("New", self.driver.clicks[-1].text)
+        self.assertEqual(1, self.salesforce.loading_waits)
+
+    def test_save_disbursement(self):
+        self.library.save_disbursement()
+
+        self.assertEqual("Save", self.driver.clicks[-1].text)
+        self.assertEqual(self.driver.clicks[-1], self.driver.focused)
+
+    def test_verify_row_count(self):
+        self.library.verify_row_count("2")
+
+        with self.assertRaisesRegex(AssertionError, "Expected value to be 3"):
+            self.library.verify_row_count(3)
+
+    def test_select_tab(self):
+        self.library.select_tab("Related")
+
+        related, details = self.driver.find_elements_by_xpath("//a[@role='tab']")
+        self.assertEqual("true", related.get_attribute("aria-selected"))
+        self.assertEqual("false", details.get_attribute("aria-selected"))
+        self.assertEqual(related, self.driver.focused)
+        self.assertEqual(1, self.driver.scripts.count(IS_TAB_SHOWN_JS))
+
+    @mock.patch.object(StubElement, "click")
+    def test_select_tab_waits_once_for_the_tab(self, click):
+        with self.assertRaises(TimeoutException):
+            self.library.select_tab("Related", timeout=0)
+
+        self.assertEqual(1, self.driver.scripts.count(IS_TAB_SHOWN_JS))
+
+    @mock.patch.object(StubElement, "click")
+    def test_select_tab_without_selected_tabs(self, click):
+        for node in self.driver.document.xpath("//*[@role='tablist']//*"):
+            node.attrib.pop("aria-selected", None)
+            node.set("class", node.get("class", "").replace("slds-is-active", ""))
+
+        self.library.select_tab("Related", timeout=0)
+
+        click.assert_called_once_with()
+
+    def test_select_tab_not_found(self):
+        with self.assertRaisesRegex(AssertionError, "tab not found"):
+            self.library.select_tab("Chatter")
+
+    def test_verify_button_status(self):
+        self.library.verify_button_status(
+            Save="enabled", **{"Edit Disbursements": "disabled"}
+        )
+
+        with self.assertRaisesRegex(Exception, "Expected Save status to be disabled"):
+            self.library.verify_button_status(Save="disabled")
+        with self.assertRaisesRegex(AssertionError, "'Cancel' is not displayed"):
+            self.library.verify_button_status(Cancel="enabled")
+
+    def test_page_should_not_contain_locator(self):
+        self.library.page_should_not_contain_locator("toast", "Success!")
+
+        with self.assertRaises(AssertionError):
+            self.library.page_should_not_contain_locator("link", "Robot Test Program")
+
+    def test_save_dom_snapshot(self):
+        with TemporaryDirectory() as directory:
+            path = Path(directory, "snapshots", "funding_request.html")
+
+            self.assertEqual(path, self.library.save_dom_snapshot(path))
+
+            document = load_snapshot(path)
+        self.assertEqual(2, len(document.xpath("//tbody/tr")))
+
+
+class TestNewRecordKeywords(KeywordTestCase):
+    def setUp(self):
+        super().setUp()
+        self.show_page(NEW_REQUEST_PAGE)
+
+    def test_select_value_from_picklist(self):
+        self.library.select_value_from_picklist("Status", "Submitted")
+
+        self.assertEqual(
+            ["--None--", "Submitted"], [element.text for element in self.driver.clicks]
+        )
+
+    def test_add_date(self):
+        self.library.add_date("Application Date", "2/2/2022")
+
+        (field,) = self.driver.find_elements_by_xpath("//input")
+        self.assertEqual("2/2/2022", field.get_attribute("value"))
+
+    def test_click_save(self):
+        self.library.click_save()
+
+        self.assertEqual("Save", self.driver.clicks[-1].text)
+        self.assertEqual(1, self.salesforce.loading_waits)
+
+
+class TestManageExpendituresKeywords(KeywordTestCase):
+    def test_open_manage_expenditures(self):
+        seconds = self.library.open_manage_expenditures(DISBURSEMENT_ID, "3")
+
+        self.assertGreaterEqual(seconds, 0)
+        self.assertTrue(self.driver.current_url.endswith(f"/{DISBURSEMENT_ID}/view"))
+        self.assertEqual("GAU Expenditures", self.driver.clicks[-1].text)
+
+        with self.assertRaises(TimeoutException):
+            self.library.open_manage_expenditures(DISBURSEMENT_ID, 4, timeout=0.2)
+
+    def test_save_manage_expenditures(self):
+        self.library.open_manage_expenditures(DISBURSEMENT_ID, 3)
+
+        seconds = self.library.save_manage_expenditures(3)
+
+        self.assertGreaterEqual(seconds, 0)
+        self.assertEqual("Save Updates", self.driver.clicks[-1].text)
+
+    def test_verify_expenditure_row_count(self):
+        self.library.open_manage_expenditures(DISBURSEMENT_ID, 3)
+
+        self.library.verify_expenditure_row_count(3)
+        with self.assertRaisesRegex(AssertionError, "Expected 2 expenditure rows"):
+            self.library.verify_expenditure_row_count("2")
+
+    def test_populate_field_with_id(self):
+        self.library.open_manage_expenditures(DISBURSEMENT_ID, 3)
+        field = self.driver.find_elements_by_xpath("//input")[0]
+
+        self.library.populate_field_with_id("amount", "1000")
+        self.assertEqual("1000", field.get_attribute("value"))
+
+        self.library.populate_field_with_id("amount", "null")
+        self.assertEqual("", field.get_attribute("value"))
+
+
+class TestApiKeywords(KeywordTestCase):
+    def test_api_create_funding_graph(self):
+        ids = self.library.api_create_funding_graph(
+            contacts=2,
+            funding_requests=2,
+            disbursements_per_request=1,
+            expenditures_per_disbursement=2,
+        )
+
+        self.assertEqual(
+            {
+                "account": 1,
+                "contacts": 2,
+                "funding_program": 1,
+                "gaus": 1,
+                "funding_requests": 2,
+                "disbursements": 2,
+                "gau_expenditures": 4,
+            },
+            {role: len(role_ids) for role, role_ids in ids.items()},
+        )
+        self.assertEqual(1, self.api.count_calls("POST", "/composite"))
+        self.assertEqual(13, len(self.salesforce._session_records))
+        disbursement = self.api.records[ids["disbursements"][0]]
+        self.assertEqual(
+            ids["funding_requests"][0],
+            disbursement["outfunds__Funding_Request__c"],
+        )
+
+    def test_api_create_funding_graph_error(self):
+        self.api.insert_errors["Contact"] = ("REQUIRED_FIELD_MISSING", "LastName")
+
+        with self.assertRaisesRegex(AssertionError, "REQUIRED_FIELD_MISSING"):
+            self.library.api_create_funding_graph()
+
+        self.assertEqual({}, dict(self.api.records))
+        self.assertEqual([], self.salesforce._session_records)
+
+    def test_validate_record_fields(self):
+        program_id = self.api.insert("outfunds__Funding_Program__c", Name="Robot")
+        request_id = self.api.insert(
+            "outfunds__Funding_Request__c",
+            Name="Robot Request",
+            outfunds__Status__c="In Progress",
+            outfunds__Requested_Amount__c=100000,
+            outfunds__FundingProgram__c=program_id,
+        )
+
+        self.library.validate_record_fields(
+            "outfunds__Funding_Request__c",
+            request_id,
+            outfunds__Status__c="In Progress",
+            outfunds__Requested_Amount__c="100000",
+            **{"outfunds__FundingProgram__r.Name": "Robot"},
+        )
+
+        with self.assertRaises(AssertionError) as context:
+            self.library.validate_record_fields(
+                "outfunds__Funding_Request__c",
+                request_id,
+                outfunds__Status__c="Awarded",
+                **{"outfunds__FundingProgram__r.Name": "Other"},
+            )
+        self.assertIn(
+            "2 field(s) of outfunds__Funding_Request__c", str(context.exception)
+        )
+        with self.assertRaisesRegex(AssertionError, "No outfunds__Funding_Program__c"):
+            self.library.validate_record_fields(
+                "outfunds__Funding_Program__c", request_id, Name="Robot"
+            )
+
+    def test_delete_session_records_in_bulk(self):
+        self.library.api_create_funding_graph(
+            funding_requests=2, disbursements_per_request=2
+        )
+        self.salesforce.store_session_record("Contact", "003000000000999AAA")
+
+        stats = self.library.delete_session_records_in_bulk()
+
+        self.assertEqual(9, stats.deleted)
+        self.assertEqual(1, stats.already_deleted)
+        self.assertEqual({}, dict(self.api.records))
+        self.assertEqual([], self.salesforce._session_records)
+        self.assertEqual(stats.format(), self.builtin.messages[-1][1])
+
+    def test_delete_session_records_in_bulk_drops_cached_records(self):
+        contact = self.library.api_insert_record("Contact", LastName="Rigby")
+
+        self.library.delete_session_records_in_bulk()
+
+        self.assertEqual({}, self.library.record_cache.records)
+        with self.assertRaises(SalesforceResourceNotFound):
+            self.library.api_get_record("Contact", contact["Id"])
+
+    def test_api_insert_record(self):
+        account = self.library.api_insert_record("Account", Name="Robot")
+
+        contact = self.library.api_insert_record(
+            "Contact", LastName="Rigby", AccountId=account["Id"]
+        )
+
+        self.assertEqual("Rigby", contact["LastName"])
+        self.assertEqual({"type": "Contact"}, contact["attributes"])
+        self.assertEqual(2, self.api.count_calls("POST", "/composite"))
+        self.assertEqual(
+            [
+                {"type": "Account", "id": account["Id"]},
+                {"type": "Contact", "id": contact["Id"]},
+            ],
+            self.salesforce._session_records,
+        )
+        # The account's roll-ups may have changed with the new contact
+        self.assertEqual([contact["Id"][:15]], list(self.library.record_cache.records))
+
+    def test_api_insert_record_error(self):
+        self.api.insert_errors["Contact"] = ("REQUIRED_FIELD_MISSING", "LastName")
+
+        with self.assertRaisesRegex(AssertionError, "REQUIRED_FIELD_MISSING LastName"):
+            self.library.api_insert_record("Contact", FirstName="Eleanor")
+
+        self.assertEqual([], self.salesforce._session_records)
+        self.assertEqual({}, self.library.record_cache.records)
+
+    def test_api_get_record(self):
+        contact = self.library.api_insert_record("Contact", LastName="Rigby")
+        account_id = self.api.insert("Account", Name="Robot")
+
+        self.assertEqual(contact, self.library.api_get_record("Contact", contact["Id"]))
+        # A copy, so changing it doesn't change the cache
+        self.library.api_get_record("Contact", contact["Id"])["LastName"] = "Other"
+        self.assertEqual(
+            "Rigby",
+            self.library.api_get_record("Contact", contact["Id"][:15])["LastName"],
+        )
+        account = self.library.api_get_record("Account", account_id)
+        self.assertEqual(account, self.library.api_get_record("Account", account_id))
+
+        self.assertEqual(1, self.api.count_calls("GET", account_id))
+        self.assertEqual(
+            {"hits": 4, "misses": 1, "inserts": 1, "api_calls": 2, "calls_saved": 5},
+            self.library.record_cache.get_stats(),
+        )
+
+    def test_api_update_record(self):
+        account = self.library.api_insert_record("Account", Name="Robot")
+        contact = self.library.api_insert_record("Contact", LastName="Rigby")
+        self.library.api_get_record("Account", account["Id"])
+
+        self.library.api_update_record(
+            "Contact", contact["Id"], LastName="Other", AccountId=account["Id"]
+        )
+
+        self.assertEqual({}, self.library.record_cache.records)
+        self.assertEqual(
+            "Other", self.library.api_get_record("Contact", contact["Id"])["LastName"]
+        )
+
+    def test_api_delete_record(self):
+        contact = self.library.api_insert_record("Contact", LastName="Rigby")
+
+        self.library.api_delete_record("Contact", contact["Id"])
+
+        self.assertEqual({}, dict(self.api.records))
+        self.assertEqual([], self.salesforce._session_records)
+        with self.assertRaises(SalesforceResourceNotFound):
+            self.library.api_get_record("Contact", contact["Id"])
+
+    def test_invalidate_record_cache(self):
+        first = self.library.api_insert_record("Contact", LastName="First")
+        second = self.library.api_insert_record("Contact", LastName="Second")
+
+        self.library.invalidate_record_cache(first["Id"])
+        self.assertEqual([second["Id"][:15]], list(self.library.record_cache.records))
+        self.library.invalidate_record_cache()
+        self.assertEqual({}, self.library.record_cache.records)
+
+    def test_log_record_cache_stats(self):
+        contact = self.library.api_insert_record("Contact", LastName="Rigby")
+        self.library.api_get_record("Contact", contact["Id"])
+
+        stats = self.library.log_record_cache_stats()
+
+        self.assertEqual(
+            {"hits": 1, "misses": 0, "inserts": 1, "api_calls": 1, "calls_saved": 2},
+            stats,
+        )
+        self.assertEqual(
+            (
+                "INFO",
+                "1 API call(s) for records: 1 insert(s) read back in the same call, "
+                "1 cache hit(s), 0 miss(es); 2 call(s) saved",
+            ),
+            self.builtin.messages[-1],
+        )
+        # Each suite logs its own counts
+        self.assertEqual(0, self.library.log_record_cache_stats()["api_calls"])
+
+    def test_record_cache_ends_with_the_suite(self):
+        contact = self.library.api_insert_record("Contact", LastName="Rigby")
+
+        self.library._end_suite(mock.Mock(), mock.Mock())
+
+        self.assertEqual({}, self.library.record_cache.records)
+        self.library.api_get_record("Contact", contact["Id"])
+        self.assertEqual(1, self.api.count_calls("GET", contact["Id"]))
+
+
+class TestPooledBrowserKeywords(KeywordTestCase):
+    def test_open_pooled_browser(self):
+        self.library.open_pooled_browser()
+        driver = self.driver
+        driver.window_handles.append("popup")
+        self.show_page(REQUEST_PAGE)
+        self.library.release_pooled_browser()
+
+        self.library.open_pooled_browser()
+
+        self.assertIs(driver, self.selenium.drivers["pooled-default"])
+        self.assertIs(driver, self.driver)
+        self.assertEqual(HOME_URL, driver.current_url)
+        self.assertEqual(["main"], driver.window_handles)
+        self.assertEqual(1, self.library.browser_pool.reused)
+        self.assertIn(
+            ("INFO", "Reused pooled browser pooled-default (0 modals closed)"),
+            self.builtin.messages,
+        )
+
+    def test_open_pooled_browser_after_session_expired(self):
+        self.library.open_pooled_browser(useralias="permtest")
+        expired = self.driver
+        expired.redirects[HOME_URL] = INSTANCE_URL + "/"
+        self.library.release_pooled_browser()
+
+        self.library.open_pooled_browser(useralias="permtest")
+
+        self.assertTrue(expired.quit_called)
+        self.assertIsNot(expired, self.driver)
+        self.assertIs(self.driver, self.selenium.drivers["pooled-permtest"])
+        self.assertEqual(
+            ["WARN"], [level for level, _ in self.builtin.messages if level != "INFO"]
+        )
+
+    def test_release_pooled_browser(self):
+        driver = self.driver
+
+        self.library.release_pooled_browser()
+        # Nothing left to release
+        self.library.release_pooled_browser()
+
+        self.assertTrue(driver.quit_called)
+        self.assertEqual({}, dict(self.selenium.drivers))
+
+    def test_lease_pool_user(self):
+        user = self.library.lease_pool_user()
+        # The same process asking again keeps its user
+        self.assertEqual(user, self.library.lease_pool_user("perms_test_user"))
+
+        self.assertEqual(
+            {
+                "id": "005000000000001AAA",
+                "username": "user1@example.com",
+                "alias": user["alias"],
+            },
+            user,
+        )
+        self.assertEqual(
+            [("perms_test_user.json", user["alias"]), ("perms_test_user.json", ANY)],
+            self.users.created,
+        )
+        self.assertIn(
+            ("INFO", "Created 2 perms_test_user pool user(s)"), self.builtin.messages
+        )
+
+    def test_lease_pool_user_reuses_users_of_the_org(self):
+        self.library.lease_pool_user()
+        self.library.release_pool_users()
+        library = OutboundFundsNPSP()
+        library.user_pool_backend = self.users
+        self.addCleanup(library._close)
+
+        library.lease_pool_user()
+
+        self.assertEqual(2, len(self.users.created))
+        self.assertEqual(make_key(ORG_ID) + ".json", library.user_pool.path.name)
+
+    def test_release_pool_users(self):
+        user = self.library.lease_pool_user()
+        # Nothing leased yet
+        OutboundFundsNPSP().release_pool_users()
+
+        self.library.release_pool_users()
+
+        self.assertIn(
+            ("INFO", f"Released pool user {user['alias']}"), self.builtin.messages
+        )
+        leases = [
+            user["lease"]
+            for user in self.library.user_pool.get_users("perms_test_user")
+        ]
+        self.assertEqual([None, None], leases)
+
+    def test_close_returns_pool_users(self):
+        self.library.lease_pool_user()
+
+        self.library._close()
+
+        leases = [
+            user["lease"]
+            for user in self.library.user_pool.get_users("perms_test_user")
+        ]
+        self.assertEqual([None, None], leases)
+
+    def test_close_quits_pooled_browsers(self):
+        self.library.open_pooled_browser()
+        self.library.release_pooled_browser()
+        driver = self.driver
+
+        self.library._close()
+
+        self.assertTrue(driver.quit_called)
+
+
+class TestBenchmarkKeywords(KeywordTestCase):
+    def test_start_page_load_benchmark(self):
+        self.library.start_page_load_benchmark()
+        FundingRequestDetailPage()._go_to_page("a0A000000000001AAA")
+
+        self.assertEqual(1, len(self.library.page_load_results.rows))
+
+    def test_stop_page_load_benchmark(self):
+        self.library.check_latency_budget("save", 1.5, 2)
+        self.library.start_page_load_benchmark()
+        page = DisbursementDetailPage()
+        page._go_to_page(DISBURSEMENT_ID)
+        page._go_to_page(DISBURSEMENT_ID)
+
+        with TemporaryDirectory() as directory:
+            path = Path(directory, "page_load.json")
+            summary = self.library.stop_page_load_benchmark(str(path))
+            visits = json.loads(path.read_text())["visits"]
+
+        self.assertEqual(
+            [
+                {
+                    "page": "Details outfunds__Disbursement__c",
+                    "visits": 2,
+                    "median_ms": 1500.0,
+                    "max_ms": 1500.0,
+                }
+            ],
+            summary,
+        )
+        self.assertEqual(DISBURSEMENT_ID, visits[0]["record_id"])
+        self.assertIsNone(self.library.page_load_results)
+        self.assertEqual(1, len(self.library.latency_results.rows))
+
+    def test_check_latency_budget(self):
+        self.library.check_latency_budget("save", "1.5", "2")
+
+        with self.assertRaisesRegex(AssertionError, "over its budget of 2.00s"):
+            self.library.check_latency_budget("save", 2.5, 1, per_row="0.5", rows="2")
+
+    def test_reset_latency_results(self):
+        self.library.check_latency_budget("save", 1.5, 2)
+
+        self.library.reset_latency_results()
+
+        self.assertEqual([], self.library.latency_results.rows)
+
+    def test_log_latency_report(self):
+        self.library.check_latency_budget("open manage expenditures", 1.5, 2)
+
+        with TemporaryDirectory() as directory:
+            path = Path(directory, "latency.json")
+            report = self.library.log_latency_report(str(path))
+            self.assertTrue(path.exists())
+
+        self.assertIn("open manage expenditures", report)
+        self.assertEqual(("INFO", report), self.builtin.messages[-1])
+
+    def test_log_wait_time_report(self):
+        self.show_page(REQUEST_PAGE)
+        self.library.click_tab("Related")
+
+        with TemporaryDirectory() as directory:
+            path = Path(directory, "waits.json")
+            report = self.library.log_wait_time_report(path)
+            rows = json.loads(path.read_text())
+
+        self.assertIn("click_tab", report)
+        self.assertEqual(["click_tab"], [row["name"] for row in rows])
+
+    def test_reset_wait_times(self):
+        self.show_page(REQUEST_PAGE)
+        self.library.click_tab("Related")
+
+        self.library.reset_wait_times()
+
+        self.assertEqual([], self.library.waits.summary())
+
+
+class TestPageObjects(KeywordTestCase):
+    def test_listing_pages(self):
+        for page_class, object_name in (
+            (FundingProgramListingPage, "outfunds__Funding_Program__c"),
+            (FundingRequestListingPage, "outfunds__Funding_Request__c"),
+        ):
+            with self.subTest(page_class.__name__):
+                page = page_class()
+                page._go_to_page(filter_name="Recent")
+                page._is_current_page()
+
+                self.assertIn(
+                    f"/lightning/o/{object_name}/list?", self.driver.current_url
+                )
+
+    def test_detail_pages(self):
+        for page_class, object_name in (
+            (FundingProgramDetailPage, "outfunds__Funding_Program__c"),
+            (FundingRequestDetailPage, "outfunds__Funding_Request__c"),
+            (DisbursementDetailPage, "outfunds__Disbursement__c"),
+            (GAUExpenditureDetailPage, "outfunds__GAU_Expenditure__c"),
+        ):
+            with self.subTest(page_class.__name__):
+                page = page_class()
+                page._go_to_page("a00000000000001AAA")
+                page._is_current_page()
+
+                self.assertIn(
+                    f"/lightning/r/{object_name}/a00000000000001AAA/view",
+                    self.driver.current_url,
+                )
+
+    def test_benchmark_suites_use_registered_page_objects(self):
+        for path in sorted(BENCHMARKS_DIR.glob("*.robot")):
+            finder = PageVisitFinder()
+            finder.visit(get_model(str(path)))
+            for page_type, object_name in finder.pages:
+                with self.subTest(f"{path.name}: {page_type} {object_name}"):
+                    # Go To Page only finds page objects by their exact name
+                    page_class = PageObjects.registry.get((page_type, object_name))
+                    self.assertIsNotNone(page_class)
+                    if page_type == "Details":
+                        self.assertTrue(issubclass(page_class, PageLoadBenchmarkMixin))
+
+    def test_is_current_page_captures_failure(self):
+        with self.assertRaisesRegex(AssertionError, "Detail page did not load"):
+            FundingRequestDetailPage()._is_current_page()
+        with self.assertRaisesRegex(AssertionError, "not a Funding Request List"):
+            FundingRequestListingPage()._is_current_page()
+
+        # Both failed on the same page, which is saved once
+        self.assertEqual(2, len(self.get_failure_artifacts()))
+        self.assertEqual(1, self.library.failure_capture.duplicates)
+
+
+class TestKeywordCoverage(unittest.TestCase):
+    def test_every_keyword_is_tested(self):
+        tests = [
+            name
+            for test_case in globals().values()
+            if isinstance(test_case, type) and issubclass(test_case, KeywordTestCase)
+            for name in vars(test_case)
+            if name.startswith("test_")
+        ]
+        untested = [
+            keyword
+            for keyword in get_keywords()
+            if not any(re.match(f"test_{keyword}(_|$)", name) for name in tests)
+        ]
+
+        self.assertEqual([], untested)
+
+
+class TestKeywordOverheadBenchmark(unittest.TestCase):
+    def test_click_waits_for_aura(self):
+        keywords = keyword_overhead_benchmark.RetryingKeywords()
+
+        keywords.selenium.driver.execute(Command.CLICK_ELEMENT)
+
+        self.assertEqual(
+            [Command.CLICK_ELEMENT, Command.W3C_EXECUTE_SCRIPT_ASYNC],
+            keywords.builtin.selenium.driver.commands,
+        )
+
+    def test_main(self):
+        result = CliRunner().invoke(
+            keyword_overhead_benchmark.main, ["--calls", "10", "--repeat", "1"]
+        )
+
+        self.assertEqual(0, result.exit_code, result.output)
+        self.assertIn("@capture_screenshot_on_error keyword", result.output)
+        self.assertIn("@selenium_retry click (waits for aura)", result.output)
+        self.assertIn("OutboundFundsNPSP.selenium is", result.output)
@@ -0,0 +1,515 @@
+import contextlib
+import io
+import json
+import os
+import subprocess
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from click.testing import CliRunner
+
+import label_audit
+import label_audit_benchmark
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+JS_SOURCE = """import { LightningElement, api } from "lwc";
+export default class Foo extends LightningElement {
+    @api recordId;
+    title = "Hello World";
+    mode = "View Mode";
+    CONSTANT = "Some Thing";
+}
+"""
+
+HTML_SOURCE = """<template>
+    <lightning-card title="Card Title">
+        <p>Hard coded text</p>
+        <span>{label}</span>
+    </lightning-card>
+</template>
+"""
+
+
+class LabelAuditTestCase(unittest.TestCase):
+    def setUp(self):
+        self.strings_dict = json.loads(
+            (REPO_ROOT / ".labelauditignore.json").read_text()
+        )
+        self.rules = label_audit.compile_rules(self.strings_dict)
+        self.temp_dir = TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        (self.root / ".labelauditignore.json").write_text(json.dumps(self.strings_dict))
+        self.js_path = self.root / "foo.js"
+        self.js_path.write_text(JS_SOURCE)
+        self.html_path = self.root / "foo.html"
+        self.html_path.write_text(HTML_SOURCE)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def invoke(self, *args):
+        return CliRunner().invoke(
+            label_audit.main,
+            [str(self.js_path), str(self.html_path), *args],
+            catch_exceptions=False,
+        )
+
+
+class TestAuditSource(LabelAuditTestCase):
+    def test_audit_js_source(self):
+        offenses = label_audit.audit_js_source(JS_SOURCE, self.rules)
+        self.assertEqual([("JS", 4, "title", "Hello World")], offenses)
+
+    def test_js_rules_match_legacy_check_js(self):
+        with TemporaryDirectory() as directory:
+            paths = label_audit_benchmark.generate_corpus(directory, 50)
+            legacy = io.StringIO()
+            with contextlib.redirect_stdout(legacy):
+                legacy_count = label_audit_benchmark.legacy_check_js(
+                    paths, self.strings_dict
+                )
+            compiled = io.StringIO()
+            with contextlib.redirect_stdout(compiled):
+                compiled_count = label_audit.check_js(paths, self.strings_dict)
+
+        self.assertEqual(legacy_count, compiled_count)
+        self.assertEqual(legacy.getvalue(), compiled.getvalue())
+
+    def test_js_rules_use_compiled_dictionary(self):
+        rules = label_audit.compile_rules(
+            {
+                "ignorable_js_values": ["Ignored Value"],
+                "ignorable_js_last_values": ["mode"],
+                "string_attributes_to_check": [],
+            }
+        )
+        source = 'a = "Ignored Value"; mode = "Edit"; b = "Field__c"; c = "Shown";'
+
+        self.assertIsInstance(rules.ignorable_js_values, frozenset)
+        self.assertEqual(
+            [("JS", 1, "c", "Shown")], label_audit.audit_js_source(source, rules)
+        )
+
+    def test_audit_html_source(self):
+        offenses = label_audit.audit_html_source(HTML_SOURCE, self.rules)
+        self.assertEqual(
+            [
+                ("HTML attribute", 2, "lightning-card", "title", "Card Title"),
+                ("HTML contents", 3, "Hard coded text"),
+            ],
+            offenses,
+        )
+
+
+class TestResultCache(LabelAuditTestCase):
+    def test_cached_rerun_matches_uncached_report(self):
+        cache_dir = str(self.root / "cache")
+        uncached = self.invoke("--no-cache")
+        first = self.invoke("--cache-dir", cache_dir)
+        second = self.invoke("--cache-dir", cache_dir, "--jobs", "2")
+
+        self.assertEqual(1, uncached.exit_code)
+        self.assertIn("Total Strings: 3", uncached.output)
+        self.assertEqual(uncached.output, first.output)
+        self.assertEqual(uncached.output, second.output)
+        self.assertEqual(2, len(list((self.root / "cache").glob("*/*.json"))))
+
+    def test_cache_is_keyed_on_content(self):
+        cache = label_audit.ResultCache(self.root / "cache", b"{}")
+        key = cache.key("js", self.js_path)
+        cache.put(key, [("JS", 1, "title", "Hello")])
+
+        self.assertEqual([("JS", 1, "title", "Hello")], cache.get(key))
+        self.js_path.write_text(JS_SOURCE + "\n")
+        self.assertIsNone(cache.get(cache.key("js", self.js_path)))
+
+    def test_cache_is_keyed_on_dictionary(self):
+        first = label_audit.ResultCache(self.root / "cache", b"{}")
+        second = label_audit.ResultCache(self.root / "cache", b'{"a": []}')
+
+        self.assertNotEqual(
+            first.key("js", self.js_path), second.key("js", self.js_path)
+        )
+
+    def test_cache_is_keyed_on_html_engine(self):
+        stream = label_audit.ResultCache(self.root / "cache", b"{}")
+        bs4 = label_audit.ResultCache(self.root / "cache", b"{}", html_engine="bs4")
+
+        self.assertNotEqual(
+            stream.key("html", self.html_path), bs4.key("html", self.html_path)
+        )
+
+    def test_engines_do_not_share_cached_results(self):
+        cache_dir = str(self.root / "cache")
+        with mock.patch.dict(label_audit.HTML_ENGINES, stream=lambda source, rules: []):
+            stream = self.invoke("--cache-dir", cache_dir)
+        bs4 = self.invoke("--cache-dir", cache_dir, "--engine", "bs4")
+
+        self.assertIn("Total Strings: 1", stream.output)
+        self.assertEqual(
+            self.invoke("--no-cache", "--engine", "bs4").output, bs4.output
+        )
+        self.assertIn("Total Strings: 3", bs4.output)
+
+    def test_audit_paths_preserves_task_order(self):
+        tasks = [("html", str(self.html_path)), ("js", str(self.js_path))] * 3
+        results = list(label_audit.audit_paths(tasks, self.rules, jobs=2))
+
+        self.assertEqual(
+            [label_audit.audit_file(kind, path, self.rules) for kind, path in tasks],
+            results,
+        )
+
+
+class EveryAttribute:
+    """Stands in for string_attributes_to_check and matches every attribute."""
+
+    def __contains__(self, name):
+        return True
+
+
+EDGE_CASE_TEMPLATES = [
+    '<div title="A"><p title="B">Nested</p></div>',
+    "<p>Text<!-- comment --></p><p><!-- Only Comment --></p>",
+    "<div><br>After Break</div><div><br/></div><span>Text</br></span>",
+    "<ul><li>One<li>Two</ul>",
+    "<b>Unclosed <i>Deep",
+    "</stray><p title=x title=y>Duplicate</p>",
+    "<p>&amp; Escaped &lt;b&gt;</p><p title='&quot;Quoted&quot;'>x</p>",
+    '<lightning-input label="Name" disabled></lightning-input> (|Piped|',
+    "<div>\n  <span>Inner</span>\n</div><a><b><c>Deep</c></b></a>",
+    "<input><input></input></input><p>{evaluated}</p>",
+    '<script>const a = "<p>Script</p>";</script><p><![CDATA[Data]]></p>',
+]
+
+
+class TestHtmlEngineParity(LabelAuditTestCase):
+    def assert_engines_agree(self, source, rules):
+        self.assertEqual(
+            label_audit.audit_html_source(source, rules, engine="bs4"),
+            label_audit.audit_html_source(source, rules, engine="stream"),
+        )
+
+    def test_lwc_templates(self):
+        every_attribute = label_audit.compile_rules(self.strings_dict)
+        every_attribute.string_attributes_to_check = EveryAttribute()
+        templates = sorted(
+            (REPO_ROOT / "force-app" / "main" / "default" / "lwc").glob("**/*.html")
+        )
+
+        self.assertTrue(templates)
+        for template in templates:
+            with self.subTest(template=template.name):
+                source = template.read_text()
+                self.assert_engines_agree(source, self.rules)
+                self.assert_engines_agree(source, every_attribute)
+
+    def test_edge_cases(self):
+        for source in EDGE_CASE_TEMPLATES:
+            with self.subTest(source=source):
+                self.assert_engines_agree(source, self.rules)
+
+    def test_engine_option(self):
+        self.assertEqual(
+            self.invoke("--no-cache", "--engine", "bs4").output,
+            self.invoke("--no-cache", "--engine", "stream").output,
+        )
+
+
+class TestReportFormats(LabelAuditTestCase):
+    def report_lines(self, result):
+        # Older click runners mix the error summary from stderr into stdout.
+        return [
+            line for line in result.stdout.splitlines() if not line.startswith("Error:")
+        ]
+
+    def test_json(self):
+        result = self.invoke("--no-cache", "--format", "json")
+        offenses = [json.loads(line) for line in self.report_lines(result)]
+
+        self.assertEqual(1, result.exit_code)
+        self.assertEqual(
+            ["hard-coded-js-string", "hard-coded-html-attribute"],
+            [offense["rule"] for offense in offenses[:2]],
+        )
+        self.assertEqual(
+            {
+                "rule": "hard-coded-js-string",
+                "path": self.js_path.as_posix(),
+                "line": 4,
+                "message": f"JS: {self.js_path} -- line 4 -- title: Hello World",
+                "last_value": "title",
+                "value": "Hello World",
+            },
+            offenses[0],
+        )
+
+    def test_sarif(self):
+        result = self.invoke("--no-cache", "--format", "sarif")
+        log = json.loads("".join(self.report_lines(result)))
+        results = log["runs"][0]["results"]
+
+        self.assertEqual("2.1.0", log["version"])
+        self.assertEqual(3, len(results))
+        self.assertEqual(
+            {"uri": self.html_path.as_posix()},
+            results[2]["locations"][0]["physicalLocation"]["artifactLocation"],
+        )
+        self.assertEqual(
+            {"startLine": 3}, results[2]["locations"][0]["physicalLocation"]["region"]
+        )
+
+    def test_sarif_without_offenses(self):
+        self.js_path.write_text("const a = 1;")
+        self.html_path.write_text("<template></template>")
+        result = self.invoke("--no-cache", "--format", "sarif")
+
+        self.assertEqual(0, result.exit_code)
+        log = json.loads("".join(self.report_lines(result)))
+        self.assertEqual([], log["runs"][0]["results"])
+
+
+class TestSince(LabelAuditTestCase):
+    def git(self, *args):
+        subprocess.run(
+            ["git", "-c", "user.name=test", "-c", "user.email=test@example.com"]
+            + list(args),
+            cwd=self.root,
+            check=True,
+            capture_output=True,
+        )
+
+    def make_changes(self):
+        bundle = self.root / "force-app" / "main" / "default" / "lwc" / "foo"
+        bundle.mkdir(parents=True)
+        (bundle / "foo.js").write_text("const a = 1;")
+        (bundle / "foo.html").write_text("<template></template>")
+        (bundle / "foo.css").write_text("")
+        (self.root / "scripts").mkdir()
+        (self.root / "scripts" / "README").write_text("")
+        self.git("init", "-q")
+        self.git("add", "-A")
+        self.git("commit", "-q", "-m", "base")
+
+        (bundle / "foo.js").write_text(JS_SOURCE)
+        (bundle / "foo.css").write_text("p {}")
+        (bundle / "new.html").write_text(HTML_SOURCE)
+        (self.root / "outside.js").write_text(JS_SOURCE)
+
+    def run_since(self, directory):
+        cwd = os.getcwd()
+        os.chdir(directory)
+        try:
+            changed = label_audit.get_changed_paths("HEAD")
+            result = CliRunner().invoke(
+                label_audit.main, ["--since", "HEAD", "--no-cache"]
+            )
+        finally:
+            os.chdir(cwd)
+        return changed, result
+
+    def test_changed_paths(self):
+        self.make_changes()
+
+        changed, result = self.run_since(self.root)
+
+        self.assertEqual(
+            [
+                "force-app/main/default/lwc/foo/foo.js",
+                "force-app/main/default/lwc/foo/new.html",
+            ],
+            changed,
+        )
+        self.assertIn("JS: lwc/foo/foo.js -- line 4", result.output)
+        self.assertIn("Total Strings: 3", result.output)
+
+    def test_changed_paths_from_a_subdirectory(self):
+        self.make_changes()
+
+        changed, result = self.run_since(self.root / "scripts")
+
+        self.assertEqual(
+            [
+                "../force-app/main/default/lwc/foo/foo.js",
+                "../force-app/main/default/lwc/foo/new.html",
+            ],
+            changed,
+        )
+        self.assertIn("Total Strings: 3", result.output)
+
+    def test_since_and_filenames_are_exclusive(self):
+        result = self.invoke("--since", "HEAD")
+
+        self.assertEqual(2, result.exit_code)
+
+
+LABELS_XML = """<?xml version="1.0" encoding="UTF-8"?>
+<CustomLabels xmlns="http://soap.sforce.com/2006/04/metadata">
+    <labels>
+        <fullName>Used_In_Apex</fullName>
+        <language>en_US</language>
+        <protected>true</protected>
+        <shortDescription>Used In Apex</shortDescription>
+        <value>Save</value>
+    </labels>
+    <labels>
+        <fullName>Used_In_Lwc</fullName>
+        <language>en_US</language>
+        <protected>true</protected>
+        <shortDescription>Used In Lwc</shortDescription>
+        <value>Save</value>
+    </labels>
+    <labels>
+        <fullName>Never_Used</fullName>
+        <language>en_US</language>
+        <protected>true</protected>
+        <shortDescription>Never Used</shortDescription>
+        <value>Cancel</value>
+    </labels>
+</CustomLabels>
+"""
+
+APEX_SOURCE = """public with sharing class Foo {
+    public static String get() {
+        String a = System.Label.used_in_apex;
+        String b = Label.Missing_Label + Label.Used_In_Apex.toUpperCase();
+        return a + Label.npsp.Other_Package + Label.get('c', 'Dynamic');
+    }
+}
+"""
+
+LWC_LABEL_SOURCE = """import { LightningElement } from "lwc";
+import usedInLwc from "@salesforce/label/c.Used_In_Lwc";
+import namespaced from '@salesforce/label/outfundsnpspext.Used_In_Apex';
+import other from "@salesforce/label/npsp.Other_Package";
+"""
+
+
+class TestLabelIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.root = Path(self.temp_dir.name)
+        self.labels_path = self.root / "CustomLabels.labels-meta.xml"
+        self.labels_path.write_text(LABELS_XML)
+        self.source = self.root / "force-app"
+        (self.source / "classes").mkdir(parents=True)
+        (self.source / "lwc" / "foo").mkdir(parents=True)
+        self.apex_path = self.source / "classes" / "Foo.cls"
+        self.apex_path.write_text(APEX_SOURCE)
+        (self.source / "lwc" / "foo" / "foo.js").write_text(LWC_LABEL_SOURCE)
+        (self.source / "lwc" / "foo" / "foo.html").write_text(HTML_SOURCE)
+        self.index_path = self.root / "cache" / "label_index.json"
+
+    def build_index(self):
+        index = label_audit.LabelIndex.load(
+            self.index_path,
+            str(self.labels_path),
+            str(self.source),
+            "outfundsnpspext",
+        )
+        index.update()
+        index.save(self.index_path)
+        return index
+
+    def test_iter_labels(self):
+        labels = list(label_audit.iter_labels(str(self.labels_path)))
+
+        self.assertEqual(
+            ["Used_In_Apex", "Used_In_Lwc", "Never_Used"],
+            [label["fullName"] for label in labels],
+        )
+        self.assertEqual("Cancel", labels[2]["value"])
+
+    def test_find_label_references(self):
+        self.assertEqual(
+            [
+                [None, "used_in_apex", 3],
+                [None, "Missing_Label", 4],
+                [None, "Used_In_Apex", 4],
+            ],
+            label_audit.find_label_references(APEX_SOURCE, ".cls"),
+        )
+        self.assertEqual(
+            [["c", "Used_In_Lwc", 2], ["outfundsnpspext", "Used_In_Apex", 3]],
+            label_audit.find_label_references(
+                LWC_LABEL_SOURCE, ".js", ("c", "outfundsnpspext")
+            ),
+        )
+        self.assertEqual(
+            [["c", "Title", 1], [None, "Site_Name", 2]],
+            label_audit.find_label_references(
+                '<aura:component label="{!$Label.c.Title}">\n{!$Label.Site_Name}',
+                ".cmp",
+            ),
+        )
+
+    def test_report(self):
+        index = self.build_index()
+
+        self.assertEqual(["Never_Used"], index.get_unused())
+        self.assertEqual(
+            [(str(self.apex_path), 4, "Missing_Label")], index.get_missing()
+        )
+        self.assertEqual(
+            [("Save", ["Used_In_Apex", "Used_In_Lwc"])], index.get_duplicate_values()
+        )
+        self.assertEqual(
+            [(str(self.apex_path), 3), (str(self.apex_path), 4)],
+            sorted(index.usages["used_in_apex"])[:2],
+        )
+        self.assertEqual(2, index.scanned)
+        self.assertIn("Unused label: Never_Used", index.format())
+
+    def test_rerun_rescans_changed_files(self):
+        self.build_index()
+        self.assertEqual(0, self.build_index().scanned)
+
+        self.apex_path.write_text("public class Foo {}\n")
+        index = self.build_index()
+
+        self.assertEqual(1, index.scanned)
+        self.assertEqual([], index.get_missing())
+        self.assertEqual(["Never_Used"], index.get_unused())
+        self.assertEqual(1, len(index.usages["used_in_apex"]))
+
+    def test_stale_index_is_rebuilt(self):
+        self.build_index()
+        index = label_audit.LabelIndex.load(
+            self.index_path, str(self.labels_path), str(self.source)
+        )
+
+        self.assertEqual({}, index.files)
+        self.assertEqual(2, index.update().scanned)
+
+    def test_labels_command(self):
+        runner = CliRunner()
+        args = [
+            "labels",
+            "--labels",
+            str(self.labels_path),
+            "--source",
+            str(self.source),
+            "--namespace",
+            "outfundsnpspext",
+            "--cache-dir",
+            str(self.root / "cache"),
+        ]
+        result = runner.invoke(label_audit.cli, args)
+        rerun = runner.invoke(label_audit.cli, args + ["--format", "json"])
+
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("Missing label: ", result.output)
+        self.assertIn("Total Label Problems: 3", result.output)
+        report = json.loads(rerun.output[: rerun.output.rindex("}") + 1])
+        self.assertEqual(0, report["scanned"])
+        self.assertEqual(["Never_Used"], report["unused"])
+
+    def test_strings_is_the_default_command(self):
+        html_path = self.source / "lwc" / "foo" / "foo.html"
+        result = CliRunner().invoke(label_audit.cli, [str(html_path), "--no-cache"])
+
+        self.assertIn("Total Strings: 2", result.output)
@@ -0,0 +1,67 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from latency_budget import LatencyResults, get_budget
+from OutboundFundsNPSP import OutboundFundsNPSP
+
+
+class TestLatencyResults(unittest.TestCase):
+    def test_budget_grows_with_rows(self):
+        self.assertEqual(15, get_budget(15))
+        self.assertAlmostEqual(40, get_budget("15", "0.05", "500"))
+
+    def test_check_records_every_latency(self):
+        results = LatencyResults()
+
+        self.assertIsNone(results.check("Render 10 expenditures", 2.5, 15.5, 10))
+        message = results.check("Save 500 expenditures", 50.0, 40.0, 500)
+
+        self.assertEqual(
+            "Save 500 expenditures took 50.00s, over its budget of 40.00s", message
+        )
+        self.assertEqual([True, False], [row["within_budget"] for row in results.rows])
+        self.assertIn("OVER", results.format_report().splitlines()[2])
+        with TemporaryDirectory() as directory:
+            path = Path(directory, "latency.json")
+            results.write(path)
+            self.assertEqual(500, json.loads(path.read_text())[1]["rows"])
+
+
+class TestLibraryLatencyBudget(unittest.TestCase):
+    def setUp(self):
+        cumulusci = mock.Mock()
+        cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        self.selenium = mock.Mock()
+        for name, value in (
+            ("cumulusci", cumulusci),
+            ("selenium", self.selenium),
+            ("builtin", mock.Mock()),
+        ):
+            patcher = mock.patch.object(
+                OutboundFundsNPSP, name, new_callable=mock.PropertyMock
+            )
+            patcher.start().return_value = value
+            self.addCleanup(patcher.stop)
+        self.library = OutboundFundsNPSP()
+
+    def test_check_latency_budget(self):
+        self.library.check_latency_budget(
+            "Render 100 expenditures", "9.5", 5, 0.05, 100
+        )
+        with self.assertRaisesRegex(AssertionError, "over its budget of 10.00s"):
+            self.library.check_latency_budget(
+                "Save 100 expenditures", "10.5", "5", "0.05", "100"
+            )
+        self.assertIn("Save 100 expenditures", self.library.log_latency_report())
+
+    def test_verify_expenditure_row_count(self):
+        self.selenium.driver.execute_script.return_value = 100
+
+        self.assertGreaterEqual(self.library.verify_expenditure_row_count("100"), 0)
+        with self.assertRaisesRegex(AssertionError, "Expected 10 expenditure rows"):
+            self.library.verify_expenditure_row_count(10)
@@ -0,0 +1,163 @@
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from click.testing import CliRunner
+
+import locator_profile
+from locator_registry import LocatorRegistry, LocatorService
+from OutboundFundsNPSP import OutboundFundsNPSP
+from xpath_profile import (
+    DOM_SNAPSHOT_JS,
+    format_profile,
+    get_cost_notes,
+    get_sample_args,
+    load_snapshots,
+    profile_locators,
+)
+
+# A trimmed stand-in for a saved Funding Request detail page
+DETAIL_PAGE = """<!DOCTYPE html>
+<html><body>
+<div class="slds-form-element slds-form-element_stacked">
+    <div class="field-label-container"><span>Status</span></div>
+    <div><span class="test-id__field-value"><span>
+        <lightning-formatted-text>Submitted</lightning-formatted-text>
+    </span></span></div>
+</div>
+<table><tbody>
+    <tr><td>Disbursement 1</td><td>Scheduled</td></tr>
+    <tr><td>Disbursement 2</td><td>Paid</td></tr>
+</tbody></table>
+<button class="slds-button">Edit</button>
+</body></html>
+"""
+
+LOCATORS = {
+    "confirm": {
+        "check_status": "//div[contains(@class, 'field-label-container')]"
+        "[.//span[text()='{}']]//following-sibling::div"
+        "//lightning-formatted-text[text()='{}']",
+    },
+    "related": {"count": "//tbody/tr/td[1]"},
+    "details": {"button": "//button[contains(@class, 'slds-button') and text()='{}']"},
+    "list": "//div[.//span[text()='{}']][//div[contains(@class,'uiMenu')]]",
+    "named": "//button[text()='{label}']",
+}
+
+
+class TestXPathProfile(unittest.TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        (self.directory / "funding_request.html").write_text(DETAIL_PAGE)
+        (self.directory / "empty.html").write_text("<html><body></body></html>")
+        self.snapshots = load_snapshots([self.directory])
+
+    def test_profile(self):
+        rows = profile_locators(
+            LocatorService(LOCATORS),
+            self.snapshots,
+            {"confirm.check_status": ["Status", "Submitted"]},
+            repeat=2,
+        )
+        by_path = {row["locator"]: row for row in rows}
+
+        self.assertEqual(["empty", "funding_request"], list(self.snapshots))
+        self.assertEqual(
+            {"empty": 0, "funding_request": 1},
+            dict(by_path["confirm.check_status"]["matches"]),
+        )
+        self.assertEqual(
+            ["//following-sibling"], by_path["confirm.check_status"]["notes"]
+        )
+        self.assertEqual(2, by_path["related.count"]["matches"]["funding_request"])
+        self.assertEqual(["ambiguous"], by_path["related.count"]["notes"])
+        self.assertEqual(
+            ["predicate scans the whole document", "no matches"],
+            by_path["list"]["notes"],
+        )
+        self.assertEqual(["could not be evaluated"], by_path["named"]["notes"])
+        self.assertEqual(
+            sorted(row["max_ms"] for row in rows)[::-1], [row["max_ms"] for row in rows]
+        )
+        table = format_profile(rows, list(self.snapshots))
+        self.assertIn("Matches (empty, funding_request)", table)
+        self.assertIn("0/2", table)
+
+    def test_sample_args(self):
+        template = LOCATORS["confirm"]["check_status"]
+        self.assertEqual(
+            ["Status", "Status"], get_sample_args("confirm.check_status", template, {})
+        )
+        self.assertEqual([], get_sample_args("related.count", "//tbody/tr/td[1]"))
+
+    def test_package_locators_render_with_sample_args(self):
+        registry = LocatorRegistry()
+        for version in registry.versions:
+            rows = profile_locators(registry.get_service(version), self.snapshots)
+            with self.subTest(version=version):
+                self.assertFalse([row for row in rows if "error" in row])
+
+    def test_cost_notes(self):
+        self.assertEqual([], get_cost_notes("//a[contains(@data-label,'x')]"))
+
+    def test_command(self):
+        result = CliRunner().invoke(
+            locator_profile.main,
+            [
+                str(self.directory / "funding_request.html"),
+                "--locator",
+                "related.",
+                "--repeat",
+                "1",
+                "--format",
+                "json",
+            ],
+        )
+
+        self.assertEqual(0, result.exit_code, result.output)
+        report = json.loads(result.output)
+        self.assertEqual(["funding_request"], report["pages"])
+        self.assertTrue(report["locators"])
+        self.assertTrue(
+            all(row["locator"].startswith("related.") for row in report["locators"])
+        )
+
+    def test_command_unknown_version(self):
+        result = CliRunner().invoke(
+            locator_profile.main, [str(self.directory), "--api-version", "40"]
+        )
+
+        self.assertEqual(2, result.exit_code)
+        self.assertIn("no locators for 40.0", result.output)
+
+
+class TestSaveDomSnapshot(unittest.TestCase):
+    def test_save_dom_snapshot(self):
+        cumulusci = mock.Mock()
+        cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        selenium = mock.Mock()
+        selenium.driver.execute_script.return_value = DETAIL_PAGE
+        for name, value in (
+            ("cumulusci", cumulusci),
+            ("selenium", selenium),
+            ("builtin", mock.Mock()),
+        ):
+            patcher = mock.patch.object(
+                OutboundFundsNPSP, name, new_callable=mock.PropertyMock
+            )
+            patcher.start().return_value = value
+            self.addCleanup(patcher.stop)
+
+        with TemporaryDirectory() as directory:
+            path = Path(directory, "snapshots", "funding_request.html")
+            OutboundFundsNPSP().save_dom_snapshot(str(path))
+            self.assertEqual(DETAIL_PAGE, path.read_text())
+
+        selenium.driver.execute_script.assert_called_once_with(DOM_SNAPSHOT_JS)
@@ -0,0 +1,146 @@
+import sys
+import unittest
+from tempfile import TemporaryDirectory
+from pathlib import Path
+from unittest import mock
+
+import OutboundFundsNPSP as library_module
+from locator_registry import LocatorRegistry, LocatorService, get_field_count
+from OutboundFundsNPSP import OutboundFundsNPSP
+
+
+class TestLocatorRegistry(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.directory = Path(self.temp_dir.name)
+        for version in (60, 58):
+            (self.directory / f"locators_{version}.py").write_text(
+                f"outboundfundsnpsp_lex_locators = {{'version': '{version}'}}\n"
+            )
+        (self.directory / "locators_helpers.py").write_text("")
+        self.addCleanup(sys.modules.pop, "locators_58", None)
+        self.addCleanup(sys.modules.pop, "locators_60", None)
+
+    def test_versions_are_found_without_importing(self):
+        registry = LocatorRegistry(self.directory)
+
+        self.assertEqual([58.0, 60.0], registry.versions)
+        self.assertEqual(60.0, registry.latest_version)
+        self.assertIn(58.0, registry)
+        self.assertNotIn(59.0, registry)
+        self.assertNotIn("locators_58", sys.modules)
+
+    def test_modules_are_imported_on_first_use(self):
+        registry = LocatorRegistry(self.directory)
+
+        self.assertEqual({"version": "58"}, registry.get(58.0))
+        self.assertIn("locators_58", sys.modules)
+        self.assertNotIn("locators_60", sys.modules)
+        self.assertIs(registry.get(58.0), registry.get(58.0))
+
+    def test_package_locators(self):
+        registry = LocatorRegistry()
+
+        self.assertEqual([51.0, 54.0], registry.versions)
+        self.assertEqual(
+            registry.get(54.0)["new_record"], registry.get(51.0)["new_record"]
+        )
+
+
+LOCATORS = {
+    "link": "//a[contains(text(),'{}')]",
+    "confirm": {
+        "first": "//span[text()='{}']/../div[text()='{}']",
+        "second": "//div[text()='{}']//span[text()='{}']",
+    },
+    "count": "//tbody/tr/td[1]",
+}
+
+
+class TestLocatorService(unittest.TestCase):
+    def test_render(self):
+        service = LocatorService(LOCATORS)
+
+        self.assertEqual("//a[contains(text(),'Save')]", service.render("link", "Save"))
+        self.assertEqual("//tbody/tr/td[1]", service.render("count"))
+        self.assertEqual(
+            [
+                "//span[text()='a']/../div[text()='b']",
+                "//div[text()='a']//span[text()='b']",
+            ],
+            service.render_group("confirm", "a", "b"),
+        )
+
+    def test_render_is_cached(self):
+        service = LocatorService(LOCATORS)
+
+        first = service.render("link", "Save")
+        self.assertIs(first, service.render("link", "Save"))
+        self.assertEqual(1, service.cache_info().hits)
+
+    def test_invalid_xpath_fails_fast(self):
+        service = LocatorService(LOCATORS)
+
+        with self.assertRaisesRegex(ValueError, "Locator 'link' is not valid XPath"):
+            service.render("link", "Robot's Program")
+
+    def test_unknown_path(self):
+        with self.assertRaisesRegex(KeyError, "confirm.third"):
+            LocatorService(LOCATORS).render("confirm.third")
+
+    def test_compile(self):
+        xpath = LocatorService(LOCATORS).compile("count")
+
+        self.assertEqual("//tbody/tr/td[1]", xpath.path)
+
+
+class TestPackageLocators(unittest.TestCase):
+    def test_every_locator_is_valid_xpath(self):
+        registry = LocatorRegistry()
+        for version in registry.versions:
+            service = registry.get_service(version)
+            for path, template in service.templates.items():
+                with self.subTest(version=version, path=path):
+                    args = ["Sample"] * get_field_count(template)
+                    service.compile(path, *args)
+
+
+class TestApiVersionProbe(unittest.TestCase):
+    def setUp(self):
+        self.cumulusci = mock.Mock()
+        self.cumulusci.org.instance_url = "https://example.my.salesforce.com"
+        self.probe = self.cumulusci.tooling._call_salesforce
+        self.probe.return_value.json.return_value = [
+            {"version": "53.0"},
+            {"version": "54.0"},
+        ]
+        patcher = mock.patch.object(
+            OutboundFundsNPSP, "cumulusci", new_callable=mock.PropertyMock
+        )
+        patcher.start().return_value = self.cumulusci
+        self.addCleanup(patcher.stop)
+        self.addCleanup(library_module.api_version_by_instance.clear)
+
+    def test_probe_is_memoized_per_instance(self):
+        OutboundFundsNPSP()
+        library = OutboundFundsNPSP()
+
+        self.assertEqual(54.0, library.latest_api_version)
+        self.probe.assert_called_once()
+
+    def test_probe_is_shared_through_disk_cache(self):
+        OutboundFundsNPSP()
+        # A new robot process starts without the in-memory memo.
+        library_module.api_version_by_instance.clear()
+        OutboundFundsNPSP()
+
+        self.probe.assert_called_once()
+
+    def test_unknown_version_falls_back_to_latest_locators(self):
+        self.probe.return_value.json.return_value = [{"version": "99.0"}]
+
+        with self.assertWarns(UserWarning):
+            library = OutboundFundsNPSP()
+
+        self.assertEqual(54.0, library.latest_api_version)
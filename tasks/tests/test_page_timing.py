@@ -0,0 +1,140 @@
+import csv
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from BaseObjects import PageLoadBenchmarkMixin
+from OutboundFundsNPSP import OutboundFundsNPSP
+from page_timing import PAGE_TIMING_JS, PageLoadResults
+
+
+def timing(loading_complete_ms):
+    return {"loading_complete_ms": loading_complete_ms, "resource_count": 10}
+
+
+class TestPageLoadResults(unittest.TestCase):
+    def test_summary_per_page(self):
+        results = PageLoadResults()
+        for ms in (1200, 900, 3000):
+            results.add("Details Funding_Request__c", "a01", 1.5, timing(ms))
+        row = results.add("Details Disbursement__c", "a02", 0.8, timing(700))
+
+        self.assertEqual(1, row["visit"])
+        self.assertEqual(3, results.rows[2]["visit"])
+        self.assertEqual(
+            [
+                {
+                    "page": "Details Funding_Request__c",
+                    "visits": 3,
+                    "median_ms": 1200,
+                    "max_ms": 3000,
+                },
+                {
+                    "page": "Details Disbursement__c",
+                    "visits": 1,
+                    "median_ms": 700,
+                    "max_ms": 700,
+                },
+            ],
+            results.summary(),
+        )
+        self.assertIn("Details Disbursement__c", results.format_report())
+
+    def test_write_csv_and_json(self):
+        results = PageLoadResults()
+        results.add("Details Funding_Program__c", "a03", 2.0, timing(1500))
+        with TemporaryDirectory() as directory:
+            csv_path = Path(directory, "page_load.csv")
+            results.write(csv_path)
+            with open(csv_path, newline="") as f:
+                (row,) = list(csv.DictReader(f))
+            self.assertEqual("1500", row["loading_complete_ms"])
+            self.assertEqual("", row["load_event_ms"])
+
+            json_path = Path(directory, "page_load.json")
+            results.write(json_path)
+            data = json.loads(json_path.read_text())
+            self.assertEqual(1, data["summary"][0]["visits"])
+            self.assertEqual("a03", data["visits"][0]["record_id"])
+
+
+class DetailPage:
+    _page_type = "Details"
+    object_name = "Funding_Request__c"
+
+    def __init__(self):
+        self.calls = []
+
+    def _go_to_page(self, object_id=None, **kwargs):
+        self.calls.append(object_id)
+
+    def _is_current_page(self):
+        self.calls.append("current")
+
+
+class BenchmarkedDetailPage(PageLoadBenchmarkMixin, DetailPage):
+    def __init__(self, library, selenium):
+        super().__init__()
+        self.OutboundFundsNPSP = library
+        self.selenium = selenium
+
+
+class TestPageLoadBenchmarkMixin(unittest.TestCase):
+    def test_go_to_page_without_benchmark(self):
+        library = mock.Mock(page_load_results=None)
+        selenium = mock.Mock()
+        page = BenchmarkedDetailPage(library, selenium)
+
+        page._go_to_page("a01")
+
+        self.assertEqual(["a01"], page.calls)
+        selenium.driver.execute_script.assert_not_called()
+
+    def test_go_to_page_records_timing(self):
+        library = mock.Mock(page_load_results=PageLoadResults())
+        selenium = mock.Mock()
+        selenium.driver.execute_script.return_value = timing(1800)
+        page = BenchmarkedDetailPage(library, selenium)
+
+        page._go_to_page(object_id="a01")
+
+        self.assertEqual(["a01", "current"], page.calls)
+        selenium.driver.execute_script.assert_called_once_with(PAGE_TIMING_JS)
+        (row,) = library.page_load_results.rows
+        self.assertEqual("Details Funding_Request__c", row["page"])
+        self.assertEqual("a01", row["record_id"])
+        self.assertEqual(1800, row["loading_complete_ms"])
+
+
+class TestLibraryPageLoadBenchmark(unittest.TestCase):
+    def setUp(self):
+        cumulusci = mock.Mock()
+        cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        for name, value in (("cumulusci", cumulusci), ("builtin", mock.Mock())):
+            patcher = mock.patch.object(
+                OutboundFundsNPSP, name, new_callable=mock.PropertyMock
+            )
+            patcher.start().return_value = value
+            self.addCleanup(patcher.stop)
+        self.library = OutboundFundsNPSP()
+
+    def test_start_and_stop(self):
+        self.library.start_page_load_benchmark()
+        self.library.page_load_results.add(
+            "Details Disbursement__c", "a04", 1, timing(500)
+        )
+        with TemporaryDirectory() as directory:
+            path = Path(directory, "page_load.json")
+            summary = self.library.stop_page_load_benchmark(str(path))
+            self.assertTrue(path.exists())
+
+        self.assertEqual("Details Disbursement__c", summary[0]["page"])
+        self.assertIsNone(self.library.page_load_results)
+
+    def test_stop_without_start(self):
+        with self.assertRaisesRegex(AssertionError, "No page load benchmark"):
+            self.library.stop_page_load_benchmark()
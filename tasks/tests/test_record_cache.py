@@ -0,0 +1,68 @@
+import unittest
+
+from record_cache import RecordCache
+
+CONTACT = {
+    "attributes": {"type": "Contact"},
+    "Id": "003000000000001AAA",
+    "AccountId": "001000000000001AAA",
+    "LastName": "Rigby",
+}
+ACCOUNT = {"attributes": {"type": "Account"}, "Id": "001000000000001AAA"}
+
+
+class TestRecordCache(unittest.TestCase):
+    def test_get_returns_a_copy(self):
+        cache = RecordCache()
+        cache.put(CONTACT)
+
+        record = cache.get("003000000000001")
+        record["attributes"]["type"] = "Lead"
+
+        self.assertEqual(CONTACT, cache.get("003000000000001AAA"))
+        self.assertIsNone(cache.get("003000000000002AAA"))
+        self.assertEqual((2, 1), (cache.hits, cache.misses))
+
+    def test_invalidate(self):
+        cache = RecordCache()
+        cache.put(CONTACT)
+        cache.put(ACCOUNT)
+
+        cache.invalidate("003000000000001")
+        self.assertEqual(["001000000000001"], list(cache.records))
+        cache.invalidate()
+        self.assertEqual({}, cache.records)
+
+    def test_invalidate_references(self):
+        cache = RecordCache()
+        cache.put(ACCOUNT)
+        cache.put(CONTACT)
+
+        cache.invalidate_references({"AccountId": ACCOUNT["Id"], "Amount__c": 100})
+
+        self.assertEqual(["003000000000001"], list(cache.records))
+
+    def test_invalidate_references_ignores_values_that_arent_ids(self):
+        cache = RecordCache()
+        cache.put({"attributes": {"type": "Account"}, "Id": "Robot Testing00"})
+
+        cache.invalidate_references({"Name": "Robot Testing00", "Type": "Review"})
+
+        self.assertEqual(["Robot Testing00"], list(cache.records))
+
+    def test_stats(self):
+        cache = RecordCache()
+        cache.inserts = 2
+        cache.api_calls = 3
+        cache.put(CONTACT)
+        cache.get(CONTACT["Id"])
+        cache.get(ACCOUNT["Id"])
+
+        self.assertEqual(
+            {"hits": 1, "misses": 1, "inserts": 2, "api_calls": 3, "calls_saved": 3},
+            cache.get_stats(),
+        )
+        cache.reset_stats()
+        self.assertEqual(0, cache.get_stats()["calls_saved"])
+        # The records outlive the counts
+        self.assertEqual(["003000000000001"], list(cache.records))
@@ -0,0 +1,116 @@
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from click.testing import CliRunner
+
+import robot_shards
+from robot_shards import discover_suites, estimate_durations, plan_shards
+from robot_timings import TimingHistory, parse_output
+
+SUITE = """*** Settings ***
+Suite Setup       Log    setup {name}
+Suite Teardown    Log    teardown {name}
+
+*** Test Cases ***
+{tests}
+"""
+
+
+def write_tests(directory):
+    tests = Path(directory, "tests")
+    for path, test_count in (
+        ("browser/FundingProgram/FundingProgram.robot", 2),
+        ("browser/FundingRequest/FundingRequest.robot", 3),
+        ("create_contact.robot", 1),
+    ):
+        path = tests / path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            SUITE.format(
+                name=path.stem,
+                tests="\n".join(
+                    f"Test {number}\n    Log    {number}"
+                    for number in range(1, test_count + 1)
+                ),
+            )
+        )
+    return tests
+
+
+class TestPlan(unittest.TestCase):
+    def test_discover_suites(self):
+        with TemporaryDirectory() as directory:
+            suites = discover_suites(str(write_tests(directory)))
+
+        self.assertEqual(
+            {
+                "Tests.Create Contact": ["Test 1"],
+                "Tests.Browser.FundingProgram.FundingProgram": ["Test 1", "Test 2"],
+                "Tests.Browser.FundingRequest.FundingRequest": [
+                    "Test 1",
+                    "Test 2",
+                    "Test 3",
+                ],
+            },
+            dict(suites),
+        )
+
+    def test_estimate_durations(self):
+        durations = estimate_durations(
+            {"A": ["One", "Two"], "B": ["One", "Two"], "C": ["One"]},
+            {"A": 100.0},
+            {"B.One": 30.0},
+        )
+
+        self.assertEqual(
+            {"A": (100.0, "history"), "B": (60.0, "tests"), "C": (60, "default")},
+            dict(durations),
+        )
+
+    def test_longest_suites_first_to_least_loaded_shard(self):
+        durations = {
+            name: (seconds, "history")
+            for name, seconds in (("A", 70), ("B", 60), ("C", 50), ("D", 40), ("E", 30))
+        }
+
+        shards = plan_shards(durations, 2)
+
+        self.assertEqual([["A", "D", "E"], ["B", "C"]], [s.suites for s in shards])
+        self.assertEqual([140, 110], [shard.seconds for shard in shards])
+
+    def test_unused_shards_are_dropped(self):
+        shards = plan_shards({"A": (10, "default")}, 3)
+        self.assertEqual([1], [shard.number for shard in shards])
+
+
+class TestCommand(unittest.TestCase):
+    def test_run_and_merge(self):
+        with TemporaryDirectory() as directory:
+            tests = write_tests(directory)
+            output_dir = Path(directory, "results")
+            args = ["--tests", str(tests), "--output-dir", str(output_dir)]
+            args += ["--history", str(Path(directory, "timings.db"))]
+
+            result = CliRunner().invoke(
+                robot_shards.main, args + ["-k", "2", "--dry-run"]
+            )
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertIn("Shard 2 (3m 00s)", result.output)
+            self.assertFalse(output_dir.exists())
+
+            result = CliRunner().invoke(
+                robot_shards.main,
+                args + ["-k", "2", "--", "--console", "none"],
+            )
+            self.assertEqual(0, result.exit_code, result.output)
+            self.assertTrue((output_dir / "shard-2" / "output.xml").exists())
+            timings = parse_output(str(output_dir / "output.xml"))
+
+            history = TimingHistory(str(Path(directory, "timings.db")))
+            history.add_run(timings)
+            self.assertIn("Tests.Create Contact", history.get_suite_times())
+
+        self.assertEqual(6, len(timings.tests))
+        # Six tests plus the setup and teardown of each of the three suites
+        self.assertEqual(12, timings.keywords["BuiltIn.Log"]["calls"])
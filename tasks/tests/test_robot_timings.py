@@ -0,0 +1,227 @@
+import io
+import json
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+import robot
+from click.testing import CliRunner
+
+import robot_timings
+from robot_timings import RegressionReport, TimingHistory, parse_output
+
+LIBRARY = """
+import time
+from robot.api import logger
+
+
+def select_tab(seconds):
+    time.sleep(float(seconds))
+
+
+def click_save():
+    logger.warn("Retrying clickElement command")
+    logger.info("Retrying is not a warning")
+"""
+
+SUITE = """*** Settings ***
+Library    {library}
+
+*** Test Cases ***
+Open Record
+    Select Tab    0.01
+    Save Record
+
+Not Run
+    Skip    not today
+
+*** Keywords ***
+Save Record
+    Click Save
+    IF    False
+        Click Save
+    END
+"""
+
+
+def legacy_output(generated, select_tab_ms, test_ms):
+    """Returns an output.xml as written by Robot Framework 6."""
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<robot generator="Robot 6.1 (Python 3.8.10 on linux)" generated="{generated}">
+<suite id="s1" name="Tests">
+<suite id="s1-s1" name="Funding Request">
+<test id="s1-s1-t1" name="Create Funding Request">
+<kw name="Select Tab" library="OutboundFundsNPSP">
+<arg>Details</arg>
+<msg timestamp="{generated}" level="WARN">Retrying clickElement command</msg>
+<status status="PASS" starttime="20220101 10:00:00.000" endtime="20220101 10:00:00.{select_tab_ms:03d}"/>
+</kw>
+<kw name="Click Save" library="OutboundFundsNPSP">
+<status status="PASS" starttime="20220101 10:00:01.000" endtime="20220101 10:00:01.500"/>
+</kw>
+<status status="PASS" starttime="20220101 10:00:00.000" endtime="20220101 10:00:0{test_ms // 1000}.{test_ms % 1000:03d}"/>
+</test>
+<status status="PASS" starttime="20220101 10:00:00.000" endtime="20220101 10:00:09.000"/>
+</suite>
+<status status="PASS" starttime="20220101 10:00:00.000" endtime="20220101 10:00:09.000"/>
+</suite>
+<errors>
+<msg timestamp="{generated}" level="WARN">Retrying clickElement command</msg>
+</errors>
+</robot>
+"""
+
+
+class TestParseOutput(unittest.TestCase):
+    def test_robot_output(self):
+        with TemporaryDirectory() as directory:
+            library = Path(directory, "FakeLibrary.py")
+            library.write_text(LIBRARY)
+            suite = Path(directory, "Records.robot")
+            suite.write_text(SUITE.format(library=library))
+            output = Path(directory, "output.xml")
+            robot.run(
+                str(suite),
+                output=str(output),
+                log=None,
+                report=None,
+                stdout=io.StringIO(),
+                stderr=io.StringIO(),
+            )
+
+            timings = parse_output(str(output))
+
+        self.assertEqual("Records", timings.suite)
+        select_tab = timings.keywords["FakeLibrary.Select Tab"]
+        self.assertEqual(1, select_tab["calls"])
+        self.assertGreaterEqual(select_tab["total_seconds"], 0.01)
+        # The Click Save in the IF branch that didn't run is not counted
+        self.assertEqual(1, timings.keywords["FakeLibrary.Click Save"]["calls"])
+        self.assertEqual(1, timings.keywords["FakeLibrary.Click Save"]["retries"])
+        self.assertEqual(1, timings.keywords["Save Record"]["calls"])
+        self.assertEqual(
+            [("Records.Open Record", "PASS"), ("Records.Not Run", "SKIP")],
+            [test[:2] for test in timings.tests],
+        )
+
+    def test_legacy_output(self):
+        with TemporaryDirectory() as directory:
+            output = Path(directory, "output.xml")
+            output.write_text(legacy_output("20220101 10:00:09.000", 250, 2500))
+
+            timings = parse_output(str(output))
+
+        self.assertEqual("2022-01-01T10:00:09", timings.generated)
+        select_tab = timings.keywords["OutboundFundsNPSP.Select Tab"]
+        self.assertAlmostEqual(0.25, select_tab["total_seconds"])
+        self.assertEqual(1, select_tab["retries"])
+        self.assertEqual(
+            [("Tests.Funding Request.Create Funding Request", "PASS", 2.5)],
+            timings.tests,
+        )
+        self.assertEqual(
+            [("Tests.Funding Request", "PASS", 9.0), ("Tests", "PASS", 9.0)],
+            timings.suites,
+        )
+
+    def test_not_an_output(self):
+        with TemporaryDirectory() as directory:
+            output = Path(directory, "output.xml")
+            output.write_text("<testsuite/>")
+            with self.assertRaises(ValueError):
+                parse_output(str(output))
+
+
+class TestRegressionReport(unittest.TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.history = TimingHistory(str(self.directory / "timings.db"))
+
+    def add_run(self, day, select_tab_ms, test_ms=2000):
+        output = self.directory / f"output{day}.xml"
+        output.write_text(
+            legacy_output(f"202201{day:02d} 10:00:09.000", select_tab_ms, test_ms)
+        )
+        return self.history.add_run(parse_output(str(output)), str(output))
+
+    def test_latest_run_against_median_baseline(self):
+        for day, select_tab_ms in ((1, 200), (2, 900), (3, 250), (4, 230)):
+            self.add_run(day, select_tab_ms)
+        self.add_run(5, 700, test_ms=4000)
+
+        report = RegressionReport(self.history, baseline_runs=4)
+
+        self.assertEqual(
+            [
+                ("test", "Tests.Funding Request.Create Funding Request"),
+                ("keyword", "OutboundFundsNPSP.Select Tab"),
+            ],
+            [(row["kind"], row["name"]) for row in report.get_regressions()],
+        )
+        select_tab = report.get_library_keywords()[0]
+        self.assertEqual("OutboundFundsNPSP.Select Tab", select_tab["name"])
+        self.assertAlmostEqual(0.24, select_tab["baseline"])
+        self.assertEqual(
+            {"retries": 1, "seconds": 2},
+            {
+                key: value
+                for key, value in report.get_retries().items()
+                if key != "keywords"
+            },
+        )
+        self.assertIn("selenium_retry: 1 retried commands", report.format())
+
+    def test_small_changes_are_not_regressions(self):
+        self.add_run(1, 200)
+        self.add_run(2, 260)
+
+        self.assertEqual([], RegressionReport(self.history).get_regressions())
+
+    def test_runs_are_imported_once(self):
+        self.assertTrue(self.add_run(1, 200))
+        self.assertFalse(self.add_run(1, 200))
+
+
+class TestCommand(unittest.TestCase):
+    def invoke(self, *args):
+        return CliRunner().invoke(
+            robot_timings.main, ["--history", str(self.history)] + list(args)
+        )
+
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+        self.history = self.directory / "timings.db"
+
+    def write_output(self, name, generated, select_tab_ms):
+        path = self.directory / name
+        path.write_text(legacy_output(generated, select_tab_ms, 2000))
+        return str(path)
+
+    def test_import_and_report(self):
+        old = self.write_output("old.xml", "20220101 10:00:09.000", 200)
+        new = self.write_output("new.xml", "20220102 10:00:09.000", 900)
+
+        result = self.invoke("--fail-on-regression", old)
+        self.assertEqual(0, result.exit_code, result.output)
+
+        result = self.invoke("--format", "json", new)
+        self.assertEqual(0, result.exit_code, result.output)
+        report = json.loads(result.output)
+        self.assertEqual(1, report["baseline_runs"])
+        self.assertEqual(
+            ["OutboundFundsNPSP.Select Tab"],
+            [row["name"] for row in report["regressions"]],
+        )
+
+        result = self.invoke("--fail-on-regression")
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("1 regressions found", result.output)
+
+    def test_empty_history(self):
+        result = self.invoke()
+        self.assertEqual(1, result.exit_code)
+        self.assertIn("no runs", result.output)
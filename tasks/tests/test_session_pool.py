@@ -0,0 +1,305 @@
+import functools
+import shutil
+import threading
+import unittest
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from selenium.common.exceptions import NoAlertPresentException, WebDriverException
+
+from OutboundFundsNPSP import OutboundFundsNPSP
+from session_pool import (
+    RESET_PAGE_JS,
+    BrowserPool,
+    SessionResetError,
+    is_same_page,
+    reset_browser,
+)
+
+HOME_URL = "https://example.lightning.force.com/lightning/page/home"
+
+# A stand-in for a Lightning page a suite left behind: a modal is open and
+# the page has written to web storage.
+STAND_IN_HTML = """<!DOCTYPE html>
+<html>
+<body>
+<h1 id="title">Home</h1>
+<section class="slds-modal">
+    <button class="slds-modal__close" onclick="this.parentNode.remove()">X</button>
+</section>
+<script>
+localStorage.setItem("aura", "cached");
+sessionStorage.setItem("tab", "Details");
+</script>
+</body>
+</html>
+"""
+
+
+class FakeSwitchTo:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @property
+    def alert(self):
+        raise NoAlertPresentException()
+
+    def window(self, handle):
+        self.driver.current_window = handle
+
+
+class FakeDriver:
+    def __init__(self, windows=("main",), landing_url=None):
+        self.window_handles = list(windows)
+        self.current_window = self.window_handles[-1]
+        self.switch_to = FakeSwitchTo(self)
+        self.landing_url = landing_url
+        self.current_url = "https://example.lightning.force.com/lightning/r/a01/view"
+        self.scripts = []
+
+    def close(self):
+        self.window_handles.remove(self.current_window)
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        return 1 if script == RESET_PAGE_JS else True
+
+    def get(self, url):
+        self.current_url = self.landing_url or url
+
+
+class TestResetBrowser(unittest.TestCase):
+    def test_reset(self):
+        driver = FakeDriver(windows=("main", "popup"))
+
+        closed = reset_browser(driver, HOME_URL)
+
+        self.assertEqual(1, closed)
+        self.assertEqual(["main"], driver.window_handles)
+        self.assertEqual("main", driver.current_window)
+        self.assertEqual(RESET_PAGE_JS, driver.scripts[0])
+        self.assertEqual(HOME_URL, driver.current_url)
+
+    def test_reset_to_login_page(self):
+        driver = FakeDriver(
+            landing_url="https://example.my.salesforce.com/?ec=302&startURL=%2F"
+        )
+
+        with self.assertRaisesRegex(SessionResetError, "my.salesforce.com"):
+            reset_browser(driver, HOME_URL)
+
+    def test_is_same_page(self):
+        self.assertTrue(is_same_page(HOME_URL + "/?t=1", HOME_URL))
+        self.assertFalse(is_same_page(HOME_URL.replace("home", "login"), HOME_URL))
+
+
+class TestBrowserPool(unittest.TestCase):
+    def test_acquire(self):
+        pool = BrowserPool()
+        driver = mock.Mock()
+        alias = pool.get_alias("permtest")
+        pool.add(alias, driver)
+
+        self.assertEqual(alias, pool.release(driver))
+        self.assertIs(driver, pool.acquire(alias))
+        self.assertEqual(set(), pool.released)
+        # A browser that was never released is handed over too
+        self.assertIs(driver, pool.acquire(alias))
+        self.assertIsNone(pool.acquire(pool.get_alias()))
+        self.assertIsNone(pool.release(mock.Mock()))
+
+    def test_add_quits_the_browser_it_replaces(self):
+        pool = BrowserPool()
+        first, second = mock.Mock(), mock.Mock()
+        pool.add("pooled-default", first)
+        pool.add("pooled-default", first)
+        first.quit.assert_not_called()
+
+        pool.add("pooled-default", second)
+
+        first.quit.assert_called_once_with()
+        self.assertEqual({"pooled-default": second}, pool.drivers)
+
+    def test_discard_and_close_all(self):
+        pool = BrowserPool()
+        discarded, kept = mock.Mock(), mock.Mock()
+        kept.quit.side_effect = WebDriverException("gone")
+        pool.add("pooled-default", discarded)
+        pool.add("pooled-permtest", kept)
+        pool.release(discarded)
+
+        self.assertIs(discarded, pool.discard("pooled-default"))
+        pool.close_all()
+
+        kept.quit.assert_called_once_with()
+        discarded.quit.assert_not_called()
+        self.assertEqual({}, pool.drivers)
+        self.assertIn("2 pooled browser(s) opened", pool.format_stats())
+        self.assertIn("1 replaced", pool.format_stats())
+
+
+class TestLibraryBrowserPool(unittest.TestCase):
+    def setUp(self):
+        cumulusci = mock.Mock()
+        cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        cumulusci.org.lightning_base_url = "https://example.lightning.force.com"
+        self.selenium = mock.Mock()
+        self.builtin = mock.Mock()
+        self.builtin.run_keyword.side_effect = self.open_test_browser
+        for name, value in (
+            ("cumulusci", cumulusci),
+            ("selenium", self.selenium),
+            ("builtin", self.builtin),
+        ):
+            patcher = mock.patch.object(
+                OutboundFundsNPSP, name, new_callable=mock.PropertyMock
+            )
+            patcher.start().return_value = value
+            self.addCleanup(patcher.stop)
+        patcher = mock.patch("OutboundFundsNPSP.reset_browser", return_value=0)
+        self.reset_browser = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.library = OutboundFundsNPSP()
+
+    def open_test_browser(self, name, *args):
+        self.selenium.driver = mock.Mock(name=" ".join(args))
+
+    def test_open_release_and_reuse(self):
+        self.library.open_pooled_browser()
+        driver = self.selenium.driver
+        self.library.release_pooled_browser()
+        self.library.open_pooled_browser()
+
+        self.builtin.run_keyword.assert_called_once_with(
+            "Open Test Browser", "alias=pooled-default"
+        )
+        self.selenium.switch_browser.assert_called_once_with("pooled-default")
+        self.reset_browser.assert_called_once_with(driver, HOME_URL, timeout=60.0)
+        self.selenium.close_browser.assert_not_called()
+        self.assertEqual(1, self.library.browser_pool.reused)
+
+    def test_reuse_browser_that_was_not_released(self):
+        self.library.open_pooled_browser()
+        driver = self.selenium.driver
+
+        self.library.open_pooled_browser()
+
+        self.builtin.run_keyword.assert_called_once()
+        self.reset_browser.assert_called_once_with(driver, HOME_URL, timeout=60.0)
+        self.assertEqual({"pooled-default": driver}, self.library.browser_pool.drivers)
+
+    def test_one_browser_per_user(self):
+        self.library.open_pooled_browser()
+        self.library.release_pooled_browser()
+        self.library.open_pooled_browser(useralias="permtest")
+
+        self.builtin.run_keyword.assert_called_with(
+            "Open Test Browser", "alias=pooled-permtest", "useralias=permtest"
+        )
+        self.reset_browser.assert_not_called()
+
+    def test_failed_reset_opens_new_browser(self):
+        self.reset_browser.side_effect = SessionResetError("login page")
+        self.library.open_pooled_browser()
+        first = self.selenium.driver
+        self.library.release_pooled_browser()
+
+        self.library.open_pooled_browser()
+
+        self.selenium.close_browser.assert_called_once_with()
+        self.assertEqual(2, self.builtin.run_keyword.call_count)
+        self.assertIsNot(first, self.selenium.driver)
+        self.assertEqual(
+            {"pooled-default": self.selenium.driver}, self.library.browser_pool.drivers
+        )
+        self.assertEqual("WARN", self.builtin.log.call_args_list[-1][1]["level"])
+
+    def test_release_closes_other_browsers(self):
+        self.library.release_pooled_browser()
+
+        self.selenium.close_browser.assert_called_once_with()
+
+    def test_close_quits_pooled_browsers(self):
+        self.library.open_pooled_browser()
+        driver = self.selenium.driver
+
+        self.library._close()
+
+        driver.quit.assert_called_once_with()
+
+
+def find_chromedriver():
+    return shutil.which("chromedriver")
+
+
+@unittest.skipUnless(find_chromedriver(), "needs chromedriver and Chrome")
+class TestResetHeadlessBrowser(unittest.TestCase):
+    def setUp(self):
+        from selenium import webdriver
+
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        Path(directory.name, "home.html").write_text(STAND_IN_HTML)
+        Path(directory.name, "expired.html").write_text(
+            "<script>location.replace('/login.html')</script>"
+        )
+        Path(directory.name, "login.html").write_text("<h1>Log In</h1>")
+        handler = functools.partial(SimpleHTTPRequestHandler, directory=directory.name)
+        server = HTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.home_url = "http://127.0.0.1:{}/home.html".format(server.server_port)
+
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless")
+        options.add_argument("--no-sandbox")
+        self.driver = webdriver.Chrome(
+            executable_path=find_chromedriver(), options=options
+        )
+        self.addCleanup(self.driver.quit)
+
+    def test_reset_stand_in_page(self):
+        self.driver.get(self.home_url)
+        self.driver.execute_script("window.open('about:blank')")
+
+        closed = reset_browser(self.driver, self.home_url, timeout=10)
+
+        self.assertEqual(1, closed)
+        self.assertEqual(1, len(self.driver.window_handles))
+        # The stand-in writes to storage again as it loads
+        self.assertEqual(
+            ["cached", "Details"],
+            self.driver.execute_script(
+                "return [localStorage.getItem('aura'), "
+                "sessionStorage.getItem('tab')];"
+            ),
+        )
+
+    def test_reset_clears_storage_left_by_suite(self):
+        self.driver.get(self.home_url)
+        self.driver.execute_script(
+            "localStorage.setItem('left', 'behind');"
+            "sessionStorage.setItem('left', 'behind');"
+        )
+
+        reset_browser(self.driver, self.home_url, timeout=10)
+
+        self.assertEqual(
+            [None, None],
+            self.driver.execute_script(
+                "return [localStorage.getItem('left'), "
+                "sessionStorage.getItem('left')];"
+            ),
+        )
+
+    def test_reset_fails_when_sent_to_login(self):
+        self.driver.get(self.home_url)
+        expired_url = self.home_url.replace("home.html", "expired.html")
+
+        with self.assertRaisesRegex(SessionResetError, "login.html"):
+            reset_browser(self.driver, expired_url, timeout=10)
@@ -0,0 +1,232 @@
+import json
+import unittest
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
+
+import responses
+from simple_salesforce import Salesforce
+
+from OutboundFundsNPSP import OutboundFundsNPSP
+from teardown import BulkTeardown, load_dependencies, local_name, plan_deletes
+
+INSTANCE_URL = "https://example.my.salesforce.com"
+COLLECTIONS_URL = f"{INSTANCE_URL}/services/data/v54.0/composite/sobjects"
+
+
+class FakeCollectionsApi:
+    """Stands in for sObject Collections delete, failing ids as configured"""
+
+    def __init__(self, errors=None):
+        # {id: [statusCode, ...]} returned by successive deletes of that id
+        self.errors = errors or {}
+        self.calls = []
+
+    def __call__(self, request):
+        query = parse_qs(urlparse(request.url).query)
+        ids = query["ids"][0].split(",")
+        assert query["allOrNone"] == ["false"]
+        assert len(ids) <= 200
+        self.calls.append(ids)
+        results = []
+        for record_id in ids:
+            codes = self.errors.get(record_id)
+            if codes:
+                code = codes.pop(0)
+                results.append(
+                    {
+                        "id": record_id,
+                        "success": False,
+                        "errors": [{"statusCode": code, "message": "no"}],
+                    }
+                )
+            else:
+                results.append({"id": record_id, "success": True, "errors": []})
+        return (200, {}, json.dumps(results))
+
+
+def make_sf():
+    return Salesforce(instance_url=INSTANCE_URL, session_id="session", version="54.0")
+
+
+def records(sobject, count, start=0):
+    return [
+        {"type": sobject, "id": f"{sobject}-{i}"} for i in range(start, start + count)
+    ]
+
+
+class TestPlan(unittest.TestCase):
+    def test_local_name(self):
+        self.assertEqual("disbursement__c", local_name("outfunds__disbursement__c"))
+        self.assertEqual("disbursement__c", local_name("Disbursement__c"))
+        self.assertEqual("account", local_name("Account"))
+
+    def test_children_are_deleted_before_parents(self):
+        session = (
+            records("Account", 1)
+            + records("outfunds__Funding_Program__c", 1)
+            + records("outfunds__Funding_Request__c", 2)
+            + records("outfunds__disbursement__c", 2)
+            + records("outfunds__Requirement__c", 1)
+            + records("outfundsnpspext__GAU_Expenditure__c", 1)
+            + records("npsp__General_Accounting_Unit__c", 1)
+            + records("Custom_Thing__c", 1)
+        )
+
+        waves = plan_deletes(session, load_dependencies())
+
+        self.assertEqual(
+            [
+                ["Custom_Thing__c"],
+                ["outfunds__Requirement__c", "outfundsnpspext__GAU_Expenditure__c"],
+                ["outfunds__disbursement__c"],
+                ["outfunds__Funding_Request__c"],
+                [
+                    "Account",
+                    "outfunds__Funding_Program__c",
+                    "npsp__General_Accounting_Unit__c",
+                ],
+            ],
+            [list(wave) for wave in waves],
+        )
+
+    def test_records_are_deleted_once_per_object(self):
+        session = (
+            records("Contact", 2)
+            + records("outfunds__Funding_Request__c", 1)
+            + records("Contact", 1)
+            + [{"type": "contact", "id": "Contact-1"}]
+            + [{"type": "outfunds__funding_request__c", "id": "Request-2"}]
+        )
+
+        waves = plan_deletes(session, load_dependencies())
+
+        self.assertEqual(
+            [
+                {
+                    "outfunds__Funding_Request__c": [
+                        "outfunds__Funding_Request__c-0",
+                        "Request-2",
+                    ]
+                },
+                {"Contact": ["Contact-0", "Contact-1"]},
+            ],
+            [dict(wave) for wave in waves],
+        )
+
+    def test_cycles_are_reported(self):
+        with self.assertRaisesRegex(ValueError, "cycle"):
+            plan_deletes(records("a", 1), {"a": {"b"}, "b": {"a"}})
+
+
+class TestBulkTeardown(unittest.TestCase):
+    def delete(self, session, api, **kwargs):
+        responses.add_callback(responses.DELETE, COLLECTIONS_URL, callback=api)
+        self.sleep = mock.Mock()
+        teardown = BulkTeardown(
+            make_sf(), load_dependencies(), sleep=self.sleep, **kwargs
+        )
+        return teardown.delete(session)
+
+    @responses.activate
+    def test_batches_of_200_per_object(self):
+        api = FakeCollectionsApi()
+        session = records("outfunds__Funding_Request__c", 450) + records(
+            "outfunds__Disbursement__c", 10
+        )
+
+        stats = self.delete(session, api)
+
+        self.assertEqual(4, stats.api_calls)
+        self.assertEqual(460, stats.deleted)
+        self.assertEqual(460, len(stats.removed))
+        self.assertTrue(api.calls[0][0].startswith("outfunds__Disbursement__c"))
+        self.assertEqual([10, 200, 200, 50], [len(ids) for ids in api.calls])
+
+    @responses.activate
+    def test_lock_errors_are_retried_with_backoff(self):
+        api = FakeCollectionsApi(
+            {"Account-1": ["UNABLE_TO_LOCK_ROW", "UNABLE_TO_LOCK_ROW"]}
+        )
+
+        stats = self.delete(records("Account", 3), api)
+
+        self.assertEqual(
+            [["Account-0", "Account-1", "Account-2"]] + [["Account-1"]] * 2, api.calls
+        )
+        self.assertEqual([mock.call(0.5), mock.call(1.0)], self.sleep.call_args_list)
+        self.assertEqual(3, stats.deleted)
+        self.assertEqual(2, stats.lock_retries)
+
+    @responses.activate
+    def test_failures_and_already_deleted_records(self):
+        api = FakeCollectionsApi(
+            {
+                "Contact-0": ["ENTITY_IS_DELETED"],
+                "Contact-1": ["DELETE_FAILED"],
+                "Contact-2": ["UNABLE_TO_LOCK_ROW"] * 3,
+            }
+        )
+
+        stats = self.delete(records("Contact", 3), api, lock_retries=2)
+
+        self.assertEqual(1, stats.already_deleted)
+        self.assertEqual(["Contact-0"], stats.removed)
+        self.assertEqual(
+            [
+                ("Contact", "Contact-1", "DELETE_FAILED: no"),
+                ("Contact", "Contact-2", "UNABLE_TO_LOCK_ROW: no"),
+            ],
+            stats.failed,
+        )
+        self.assertIn("1 already deleted, 2 failed", stats.format())
+
+    @responses.activate
+    def test_failed_requests_are_reported_per_batch(self):
+        def api(request):
+            ids = parse_qs(urlparse(request.url).query)["ids"][0]
+            if ids.startswith("Contact"):
+                return (500, {}, json.dumps([{"errorCode": "SERVER_ERROR"}]))
+            return FakeCollectionsApi()(request)
+
+        stats = self.delete(records("Contact", 2) + records("Account", 1), api)
+
+        self.assertEqual(1, stats.deleted)
+        self.assertEqual(["Account-0"], stats.removed)
+        self.assertEqual(
+            ["Contact-0", "Contact-1"], [record_id for _, record_id, _ in stats.failed]
+        )
+        self.assertIn("SERVER_ERROR", stats.failed[0][2])
+        self.assertEqual(2, stats.api_calls)
+
+
+class TestDeleteSessionRecordsInBulk(unittest.TestCase):
+    @responses.activate
+    def test_removes_deleted_records_from_the_session(self):
+        api = FakeCollectionsApi({"Contact-1": ["DELETE_FAILED"]})
+        responses.add_callback(responses.DELETE, COLLECTIONS_URL, callback=api)
+        cumulusci = mock.Mock()
+        cumulusci.sf = make_sf()
+        cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        salesforce = mock.Mock()
+        salesforce._session_records = records("Account", 1) + records("Contact", 2)
+        builtin = mock.Mock()
+        for name, value in (
+            ("cumulusci", cumulusci),
+            ("salesforce", salesforce),
+            ("builtin", builtin),
+        ):
+            patcher = mock.patch.object(
+                OutboundFundsNPSP, name, new_callable=mock.PropertyMock
+            )
+            patcher.start().return_value = value
+            self.addCleanup(patcher.stop)
+
+        OutboundFundsNPSP().delete_session_records_in_bulk()
+
+        self.assertEqual([["Contact-0", "Contact-1"], ["Account-0"]], api.calls)
+        self.assertEqual(records("Contact", 1, start=1), salesforce._session_records)
+        builtin.log.assert_any_call(
+            "Contact Contact-1 could not be deleted: DELETE_FAILED: no", level="WARN"
+        )
@@ -0,0 +1,196 @@
+import json
+import threading
+import unittest
+from io import StringIO
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from keyword_harness import FakeUserBackend
+from user_pool import (
+    SfdxUserBackend,
+    UserPool,
+    UserPoolError,
+    get_definition_path,
+    get_holder,
+)
+
+PROFILE = "perms_test_user"
+
+
+class FailingUserBackend(FakeUserBackend):
+    """Fails to create the user after the first"""
+
+    def create_user(self, definition_path, alias):
+        if self.created:
+            raise UserPoolError("User limit reached")
+        return super().create_user(definition_path, alias)
+
+
+class TestUserPool(unittest.TestCase):
+    def setUp(self):
+        directory = TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name, "00d000000000001.json")
+        self.backend = FakeUserBackend()
+
+    def get_pool(self, **kwargs):
+        """Returns a pool over the same table, like another robot process's."""
+        return UserPool(self.path, self.backend, **kwargs)
+
+    def test_provision_creates_users_once(self):
+        pool = self.get_pool(size=3)
+
+        self.assertEqual(3, pool.provision(PROFILE))
+        self.assertEqual(0, self.get_pool(size=3).provision(PROFILE))
+        # A bigger pool only creates the users it is missing
+        self.assertEqual(1, self.get_pool(size=4).provision(PROFILE))
+
+        self.assertEqual(
+            [
+                "perms_test_user-00d000-1",
+                "perms_test_user-00d000-2",
+                "perms_test_user-00d000-3",
+                "perms_test_user-00d000-4",
+            ],
+            [user["alias"] for user in pool.get_users(PROFILE)],
+        )
+
+    def test_provision_keeps_users_created_before_a_failure(self):
+        pool = UserPool(self.path, FailingUserBackend())
+
+        with self.assertRaisesRegex(UserPoolError, "User limit"):
+            pool.provision(PROFILE)
+
+        self.assertEqual(1, len(pool.get_users(PROFILE)))
+
+    def test_provision_unknown_profile(self):
+        with self.assertRaisesRegex(UserPoolError, "No user definition"):
+            self.get_pool().provision("admin_user")
+
+    def test_lease_gives_each_holder_its_own_user(self):
+        pool = self.get_pool()
+        pool.provision(PROFILE)
+
+        first = pool.lease(PROFILE, "host:1")
+        second = self.get_pool().lease(PROFILE, "host:2")
+
+        self.assertNotEqual(first["id"], second["id"])
+        self.assertEqual(first, pool.lease(PROFILE, "host:1"))
+        with self.assertRaisesRegex(UserPoolError, "All 2 perms_test_user users"):
+            pool.lease(PROFILE, "host:3", timeout=0)
+
+    def test_lease_in_parallel(self):
+        self.get_pool(size=4).provision(PROFILE)
+        leased = []
+
+        def lease(number):
+            leased.append(self.get_pool().lease(PROFILE, f"host:{number}")["id"])
+
+        threads = [threading.Thread(target=lease, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(4, len(set(leased)))
+
+    def test_lease_waits_for_a_release(self):
+        pool = self.get_pool(size=1)
+        pool.provision(PROFILE)
+        pool.lease(PROFILE, "host:1")
+
+        with mock.patch("time.sleep") as sleep:
+            sleep.side_effect = lambda seconds: pool.release("host:1")
+            user = pool.lease(PROFILE, "host:2", timeout=60)
+
+        self.assertEqual("host:2", user["lease"]["holder"])
+        sleep.assert_called_once_with(1)
+
+    def test_lease_of_a_dead_process_is_given_to_the_next(self):
+        pool = self.get_pool(size=1)
+        pool.provision(PROFILE)
+        host = get_holder().rpartition(":")[0]
+        pool.lease(PROFILE, f"{host}:1234")
+
+        with mock.patch("user_pool.is_process_alive", return_value=False) as alive:
+            user = pool.lease(PROFILE, "other:1", timeout=0)
+
+        alive.assert_called_once_with(1234)
+        self.assertEqual("other:1", user["lease"]["holder"])
+
+    def test_lease_of_another_host_expires_after_the_ttl(self):
+        pool = self.get_pool(size=1)
+        pool.provision(PROFILE)
+        pool.lease(PROFILE, "other:1")
+
+        with self.assertRaises(UserPoolError):
+            pool.lease(PROFILE, "other:2", timeout=0)
+        user = self.get_pool(lease_ttl=0).lease(PROFILE, "other:2", timeout=0)
+
+        self.assertEqual("other:2", user["lease"]["holder"])
+
+    def test_lease_before_provision(self):
+        with self.assertRaisesRegex(UserPoolError, "No perms_test_user users"):
+            self.get_pool().lease(PROFILE)
+
+    def test_release_only_returns_the_holders_users(self):
+        pool = self.get_pool()
+        pool.provision(PROFILE)
+        first = pool.lease(PROFILE, "host:1")
+        pool.lease(PROFILE, "host:2")
+
+        self.assertEqual([first["alias"]], pool.release("host:1"))
+        self.assertEqual([], pool.release("host:1"))
+
+        self.assertEqual(
+            [None, "host:2"],
+            [
+                user["lease"] and user["lease"]["holder"]
+                for user in pool.get_users(PROFILE)
+            ],
+        )
+
+
+class TestSfdxUserBackend(unittest.TestCase):
+    @mock.patch("user_pool.sfdx")
+    def test_create_user(self, sfdx):
+        output = {
+            "status": 0,
+            "result": {
+                "orgId": "00D000000000001AAA",
+                "fields": {"id": "005000000000001AAA", "username": "test@example.com"},
+            },
+        }
+        sfdx.return_value.stdout_text = StringIO(json.dumps(output))
+        definition_path = get_definition_path(PROFILE)
+
+        user = SfdxUserBackend("admin@example.com").create_user(
+            definition_path, "permtest-1"
+        )
+
+        self.assertEqual(
+            {"id": "005000000000001AAA", "username": "test@example.com"}, user
+        )
+        sfdx.assert_called_once_with(
+            "force:user:create",
+            username="admin@example.com",
+            args=[
+                "--definitionfile",
+                str(definition_path),
+                "-a",
+                "permtest-1",
+                "--json",
+            ],
+            log_note="Creating pool user permtest-1",
+        )
+
+    @mock.patch("user_pool.sfdx")
+    def test_create_user_error(self, sfdx):
+        sfdx.return_value.stdout_text = StringIO('{"status": 1, "name": "Limit"}')
+        sfdx.return_value.stderr_text = StringIO("")
+
+        with self.assertRaisesRegex(UserPoolError, "Could not create pool user"):
+            SfdxUserBackend("admin@example.com").create_user(
+                get_definition_path(PROFILE), "permtest-1"
+            )
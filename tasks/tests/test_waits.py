@@ -0,0 +1,228 @@
+import json
+import time
+import unittest
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from selenium.common.exceptions import TimeoutException
+
+from keyword_harness import KeywordTestCase, StubElement
+from OutboundFundsNPSP import OutboundFundsNPSP
+from waits import (
+    COUNT_MATCHES_JS,
+    FIND_FIRST_MATCH_JS,
+    IS_LOADING_COMPLETE_JS,
+    IS_TAB_SHOWN_JS,
+    WaitRecorder,
+    count_matches,
+    find_first_match,
+    wait_for_count,
+    wait_for_script,
+)
+
+
+class TestWaitRecorder(unittest.TestCase):
+    def test_summary_is_ordered_by_total_wait(self):
+        recorder = WaitRecorder()
+        recorder.durations["short"] = [0.1, 0.2]
+        recorder.durations["long"] = [1.5]
+
+        summary = recorder.summary()
+
+        self.assertEqual(["long", "short"], [row["name"] for row in summary])
+        self.assertEqual(2, summary[1]["count"])
+        self.assertAlmostEqual(0.15, summary[1]["mean"])
+
+    def test_failures_are_counted_and_reraised(self):
+        recorder = WaitRecorder()
+        with self.assertRaises(TimeoutException):
+            with recorder.timed("select_tab"):
+                raise TimeoutException()
+        with recorder.timed("select_tab"):
+            pass
+
+        (row,) = recorder.summary()
+        self.assertEqual(2, row["count"])
+        self.assertEqual(1, row["failures"])
+
+    def test_write_json_and_reset(self):
+        recorder = WaitRecorder()
+        with recorder.timed("click_save"):
+            pass
+        with TemporaryDirectory() as directory:
+            path = Path(directory, "waits.json")
+            recorder.write_json(path)
+            self.assertEqual("click_save", json.loads(path.read_text())[0]["name"])
+        self.assertIn("click_save", recorder.format_report())
+
+        recorder.reset()
+        self.assertEqual([], recorder.summary())
+
+
+class TestScripts(unittest.TestCase):
+    def test_find_first_match_uses_one_call(self):
+        driver = mock.Mock()
+        driver.execute_script.return_value = [1, "element", "text"]
+
+        self.assertEqual(
+            (1, "element", "text"), find_first_match(driver, iter(["//a", "//b"]))
+        )
+        driver.execute_script.assert_called_once_with(
+            FIND_FIRST_MATCH_JS, ["//a", "//b"], False
+        )
+
+    def test_find_first_match_without_match(self):
+        driver = mock.Mock()
+        driver.execute_script.return_value = None
+
+        self.assertIsNone(find_first_match(driver, ["//a"]))
+
+    def test_count_matches_uses_one_call(self):
+        driver = mock.Mock()
+        driver.execute_script.return_value = 500
+
+        self.assertEqual(500, count_matches(driver, "//tr"))
+        driver.execute_script.assert_called_once_with(COUNT_MATCHES_JS, "//tr")
+
+    def test_wait_for_count(self):
+        driver = mock.Mock()
+        driver.execute_script.side_effect = [0, 250, 500]
+
+        wait_for_count(driver, "//tr", "500", poll_frequency=0)
+        self.assertEqual(3, driver.execute_script.call_count)
+
+        driver.execute_script.side_effect = None
+        driver.execute_script.return_value = 499
+        with self.assertRaises(TimeoutException):
+            wait_for_count(driver, "//tr", 500, timeout=0.05)
+
+    def test_wait_for_script_polls_until_truthy(self):
+        driver = mock.Mock()
+        driver.execute_script.side_effect = [False, False, True]
+
+        self.assertTrue(
+            wait_for_script(driver, IS_LOADING_COMPLETE_JS, poll_frequency=0)
+        )
+        self.assertEqual(3, driver.execute_script.call_count)
+
+    def test_wait_for_script_times_out(self):
+        driver = mock.Mock()
+        driver.execute_script.return_value = False
+
+        with self.assertRaises(TimeoutException):
+            wait_for_script(driver, IS_LOADING_COMPLETE_JS, timeout=0.05)
+
+
+class TestLibraryWaits(unittest.TestCase):
+    def setUp(self):
+        cumulusci = mock.Mock()
+        cumulusci.tooling._call_salesforce.return_value.json.return_value = [
+            {"version": "54.0"}
+        ]
+        self.selenium = mock.Mock()
+        self.salesforce = mock.Mock()
+        self.driver = self.selenium.driver
+        for name, value in (
+            ("cumulusci", cumulusci),
+            ("selenium", self.selenium),
+            ("salesforce", self.salesforce),
+        ):
+            patcher = mock.patch.object(
+                OutboundFundsNPSP, name, new_callable=mock.PropertyMock
+            )
+            patcher.start().return_value = value
+            self.addCleanup(patcher.stop)
+        # Failing keywords capture the page through robot's BuiltIn
+        patcher = mock.patch.object(OutboundFundsNPSP, "capture_failure_artifacts")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.library = OutboundFundsNPSP()
+
+    def test_select_tab_waits_for_selection_instead_of_sleeping(self):
+        button = mock.Mock()
+        self.driver.execute_script.side_effect = [[0, button, "Related"], True]
+
+        with mock.patch("time.sleep") as sleep:
+            self.library.select_tab("Related")
+
+        sleep.assert_not_called()
+        button.click.assert_called_once()
+        self.salesforce._focus.assert_called_once_with(button)
+        self.assertEqual(
+            IS_TAB_SHOWN_JS, self.driver.execute_script.call_args_list[1][0][0]
+        )
+        names = {row["name"] for row in self.library.waits.summary()}
+        self.assertEqual({"select_tab: find tab", "select_tab: tab selected"}, names)
+
+    def test_select_tab_waits_at_most_the_timeout(self):
+        button = mock.Mock()
+
+        def execute_script(script, *args):
+            if script == FIND_FIRST_MATCH_JS:
+                return [0, button, "Details"]
+            return False
+
+        self.driver.execute_script.side_effect = execute_script
+
+        start = time.monotonic()
+        with self.assertRaises(TimeoutException):
+            self.library.select_tab("Details", timeout=0.2)
+
+        # One wait for the tab or the page, not one after the other
+        self.assertLess(time.monotonic() - start, 0.4)
+        scripts = [call[0][0] for call in self.driver.execute_script.call_args_list]
+        self.assertEqual({IS_TAB_SHOWN_JS}, set(scripts[1:]))
+
+    def test_select_tab_not_found(self):
+        self.driver.execute_script.return_value = None
+
+        with self.assertRaisesRegex(AssertionError, "tab not found"):
+            self.library.select_tab("Chatter")
+
+    def test_validate_field_value_resolves_locators_in_one_call(self):
+        self.driver.execute_script.return_value = [1, mock.Mock(), "Open"]
+
+        self.library.validate_field_value("Status", "contains", "Open")
+        self.driver.execute_script.assert_called_once()
+        self.selenium.get_element_count.assert_not_called()
+
+        self.driver.execute_script.return_value = [0, mock.Mock(), "Closed"]
+        with self.assertRaisesRegex(AssertionError, "Expected Status value to be"):
+            self.library.validate_field_value("Status", "contains", "Open")
+
+    def test_validate_field_value_does_not_contain(self):
+        self.driver.execute_script.return_value = None
+        self.library.validate_field_value("Status", "does not contain", "Open")
+
+        self.driver.execute_script.return_value = [0, mock.Mock(), "Open"]
+        with self.assertRaisesRegex(Exception, "should not contain value Open"):
+            self.library.validate_field_value("Status", "does not contain", "Open")
+
+    def test_verify_row_count_counts_in_the_browser(self):
+        self.driver.execute_script.return_value = 3
+
+        self.library.verify_row_count("3")
+        self.assertEqual(COUNT_MATCHES_JS, self.driver.execute_script.call_args[0][0])
+        self.selenium.get_webelements.assert_not_called()
+
+        with self.assertRaisesRegex(AssertionError, "Expected value to be 4"):
+            self.library.verify_row_count(4)
+
+
+class TestTabWaits(KeywordTestCase):
+    REQUEST_PAGE = "/lightning/r/outfunds__Funding_Request__c/a0A000000000001AAA/view"
+
+    @mock.patch.object(StubElement, "click")
+    def test_select_tab_ignores_active_containers(self, click):
+        self.show_page(self.REQUEST_PAGE)
+        # Lightning marks the page's content container active, e.g.
+        # div.oneContent.active, around the unselected tab
+        (body,) = self.driver.document.xpath("//body")
+        body.set("class", "oneContent active")
+
+        with self.assertRaises(TimeoutException):
+            self.library.select_tab("Related", timeout=0)
+
+        (related,) = self.driver.find_elements_by_xpath("//a[text()='Related']")
+        self.assertFalse(self.driver.execute_script(IS_TAB_SHOWN_JS, related))